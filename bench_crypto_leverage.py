@@ -0,0 +1,400 @@
+"""
+bench_crypto_leverage.py
+Performance benchmarks for the calculator, fetch and render paths.
+
+Benchmarks:
+  - calc_scalar:   calculate_position + stop loss + take profit + risk/reward, per position
+  - calc_grid:     calculate_grid over 100k positions, per position (needs NumPy)
+  - fixed:         calculate_fixed per position, and fixed_grid over 100k
+                   positions per position (crypto_fixed.py, tick/lot rounding)
+  - alerts:        AlertEngine.on_tick with 100k live SL/TP triggers, per tick
+  - journal:       Journal.record per calculation (buffered, into a temporary directory)
+  - fetch:         fetch_crypto_price against a local stub server with
+                   injected delay/jitter (p50, p95) and with none (client overhead)
+  - render:        display_results text report, and write_reports per report
+  - confetti:      one surprise._burst animation frame on a virtual canvas
+                   (or a real Tk canvas when a display is available)
+
+Every metric is seconds per operation, so lower is better. Results can be
+saved as a JSON baseline; later runs are compared against it and the run
+fails (exit status 1) if any metric is slower than baseline × (1 + threshold),
+or if a benchmark that ran no longer reports a metric the baseline has.
+Metrics without a baseline value are listed but not gated. The confetti
+frame is only compared against a baseline taken on the same kind of canvas.
+Each metric is a best-of-N measurement; on noisy machines add --rounds to
+repeat the whole suite and keep the best of every metric.
+
+Usage:
+    python bench_crypto_leverage.py --save-baseline --rounds 3   # record bench_baseline.json
+    python bench_crypto_leverage.py --rounds 3                   # compare against it
+    python bench_crypto_leverage.py --only calc_scalar render --threshold 0.5
+    python bench_crypto_leverage.py --quick | tee bench_output.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Optional
+
+import crypto_leverage
+from crypto_leverage import (
+    calculate_position,
+    calculate_risk_reward_ratio,
+    calculate_stop_loss,
+    calculate_take_profit,
+    display_results,
+)
+from stub_price_server import StubPriceServer
+
+
+DEFAULT_BASELINE = "bench_baseline.json"
+DEFAULT_THRESHOLD = 0.30
+
+BENCHMARKS: dict[str, Callable[[bool], dict[str, float]]] = {}
+
+
+def benchmark(name: str) -> Callable:
+    """Register a benchmark; it takes `quick` and returns {metric: seconds}."""
+    def register(func: Callable[[bool], dict[str, float]]) -> Callable[[bool], dict[str, float]]:
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def _per_op(func: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """Best-of-`repeat` seconds per call over `number` calls."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+@benchmark("calc_scalar")
+def bench_calc_scalar(quick: bool) -> dict[str, float]:
+    def one_position():
+        position_info = calculate_position(50000.0, 1000.0, leverage=10)
+        stop_loss_price = calculate_stop_loss(position_info["entry_price"], 5.0)
+        take_profit_price = calculate_take_profit(position_info["entry_price"], 10.0)
+        calculate_risk_reward_ratio(position_info["entry_price"], stop_loss_price, take_profit_price)
+
+    return {"per_position": _per_op(one_position, 2_000 if quick else 20_000)}
+
+
+@benchmark("calc_grid")
+def bench_calc_grid(quick: bool) -> dict[str, float]:
+    if crypto_leverage.np is None:
+        return {}
+    np = crypto_leverage.np
+    n = 10_000 if quick else 100_000
+    prices = np.linspace(100.0, 100_000.0, n)
+    grid = lambda: crypto_leverage.calculate_grid(prices, 1000.0, 5.0, 10.0, leverage=10)  # noqa: E731
+    return {"per_position": _per_op(grid, 1 if quick else 5) / n}
+
+
+@benchmark("fixed")
+def bench_fixed(quick: bool) -> dict[str, float]:
+    from crypto_fixed import calculate_fixed, fixed_grid
+
+    metrics = {"per_position": _per_op(lambda: calculate_fixed("BTC", 45123.45, 1000.0, 5.0, 10.0),
+                                       2_000 if quick else 20_000)}
+    if crypto_leverage.np is not None:
+        n = 10_000 if quick else 100_000
+        prices = crypto_leverage.np.linspace(100.0, 100_000.0, n)
+        grid = lambda: fixed_grid("BTC", prices, 1000.0, 5.0, 10.0, leverage=10)  # noqa: E731
+        metrics["grid_per_position"] = _per_op(grid, 1 if quick else 5) / n
+    return metrics
+
+
+@benchmark("alerts")
+def bench_alerts(quick: bool) -> dict[str, float]:
+    from crypto_alerts import AlertEngine
+
+    engine = AlertEngine()
+    for i in range(5_000 if quick else 50_000):
+        entry = 40_000.0 + (i * 7919) % 10_000
+        engine.add_position(f"p{i}", "BTC", entry, 1 + i % 9, 1 + i % 19)
+    prices = itertools.cycle([45_000.0 + i / 100 for i in range(200)])
+    return {"per_tick": _per_op(lambda: engine.on_tick("BTC", next(prices)), 2_000 if quick else 20_000)}
+
+
+@benchmark("journal")
+def bench_journal(quick: bool) -> dict[str, float]:
+    import tempfile
+
+    from crypto_journal import Journal
+
+    row = {"symbol": "BTC", "leverage": 10, "price": 50000.0, "investment_amount": 1000.0,
+           "stop_loss_percent": 5.0, "profit_target_percent": 10.0, "position_size": 0.2,
+           "effective_capital": 10000.0, "stop_loss_price": 47500.0, "take_profit_price": 55000.0,
+           "risk_reward": 2.0}
+    with tempfile.TemporaryDirectory() as tmp, Journal(tmp) as journal:
+        return {"per_record": _per_op(lambda: journal.record(row, "batch"), 2_000 if quick else 20_000)}
+
+
+@benchmark("fetch")
+def bench_fetch(quick: bool) -> dict[str, float]:
+    calls = 10 if quick else 50
+    original_url = crypto_leverage.COINGECKO_PRICE_URL
+    metrics = {}
+    try:
+        for label, delay, jitter in (("", 0.005, 0.005), ("overhead_", 0.0, 0.0)):
+            crypto_leverage._session = None
+            with StubPriceServer(prices={"bitcoin": 50000.0}, delay=delay, jitter=jitter) as server:
+                crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+                crypto_leverage.fetch_crypto_price("BTC")  # open the keep-alive connection
+                rounds = []
+                for _ in range(3):
+                    samples = []
+                    for _ in range(calls):
+                        start = time.perf_counter()
+                        crypto_leverage.fetch_crypto_price("BTC")
+                        samples.append(time.perf_counter() - start)
+                    rounds.append(samples)
+            # Best round, like timeit: scheduler noise only ever adds time
+            metrics[f"{label}p50"] = min(statistics.median(samples) for samples in rounds)
+            if not label:
+                metrics["p95"] = min(_percentile(samples, 95) for samples in rounds)
+    finally:
+        crypto_leverage.COINGECKO_PRICE_URL = original_url
+        crypto_leverage._session = None
+    return metrics
+
+
+@benchmark("render")
+def bench_render(quick: bool) -> dict[str, float]:
+    from crypto_render import build_report, write_reports
+
+    position_info = calculate_position(50000.0, 1000.0, leverage=10)
+    args = (50000.0, 1000.0, 5.0, 10.0, position_info, 47500.0, 55000.0, "bitcoin", "BTC")
+    sink = io.StringIO()
+
+    def one_report():
+        sink.seek(0)
+        display_results(*args, out=sink)
+
+    reports = [build_report(*args[:7], asset_name="bitcoin", symbol="BTC")] * (200 if quick else 2000)
+    with open(os.devnull, "wb") as devnull:
+        stream = lambda: write_reports(reports, devnull.fileno(), "text")  # noqa: E731
+        per_streamed = _per_op(stream, 1, repeat=3) / len(reports)
+
+    return {
+        "display_results": _per_op(one_report, 200 if quick else 2_000),
+        "write_reports_per_report": per_streamed,
+    }
+
+
+class VirtualCanvas:
+    """Just enough of tk.Canvas for surprise._burst, with no display."""
+
+    def __init__(self) -> None:
+        self.items = 0
+        self.pending: list[Callable[[], None]] = []
+
+    def delete(self, tag: str) -> None:
+        self.items = 0
+
+    def create_oval(self, *coords, **options) -> int:
+        self.items += 1
+        return self.items
+
+    def after(self, delay_ms: int, callback: Callable[[], None]) -> None:
+        self.pending.append(callback)
+
+
+def _make_canvas() -> tuple[object, Optional[object], str]:
+    """A real Tk canvas if a display is reachable, else a VirtualCanvas."""
+    import surprise
+
+    if surprise.tk is not None and (os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin")):
+        try:
+            root = surprise.tk.Tk()
+            root.withdraw()
+            return surprise.tk.Canvas(root, width=600, height=400), root, "tk"
+        except Exception:
+            pass
+    return VirtualCanvas(), None, "virtual"
+
+
+@benchmark("confetti")
+def bench_confetti(quick: bool) -> dict[str, float]:
+    import surprise
+
+    canvas, root, kind = _make_canvas()
+    frames = 50 if quick else 500
+    try:
+        if kind == "virtual":
+            scheduled = canvas.pending
+        else:
+            # Capture the frame callbacks instead of letting Tk's event loop pace them
+            scheduled = []
+            canvas.after = lambda delay_ms, callback: scheduled.append(callback)
+        surprise._burst(canvas, 600, 400, burst_time=3600)
+        scheduled.pop()()  # first frame
+
+        def frame():
+            scheduled.pop()()
+            if root is not None:
+                root.update_idletasks()
+
+        per_frame = _per_op(frame, frames)
+    finally:
+        if root is not None:
+            root.destroy()
+    global _confetti_canvas
+    _confetti_canvas = kind
+    return {"frame": per_frame}
+
+
+def run_benchmarks(names: Optional[list[str]] = None, quick: bool = False, rounds: int = 1) -> dict[str, float]:
+    """
+    Run the selected benchmarks `rounds` times.
+
+    Returns {"bench.metric": seconds}, keeping each metric's best round.
+    """
+    names = names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            raise ValueError(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+    results: dict[str, float] = {}
+    for _ in range(rounds):
+        for name in names:
+            for metric, value in BENCHMARKS[name](quick).items():
+                key = f"{name}.{metric}"
+                results[key] = min(value, results.get(key, value))
+    return results
+
+
+# Canvas the confetti benchmark last ran on ("tk" or "virtual"); recorded in the environment
+_confetti_canvas: Optional[str] = None
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[tuple]:
+    """Metrics slower than baseline × (1 + threshold): [(name, baseline, current, ratio)]."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base and current > base * (1 + threshold):
+            regressions.append((name, base, current, current / base))
+    return regressions
+
+
+def unmatched(results: dict[str, float], baseline: dict[str, float]) -> tuple[list[str], list[str]]:
+    """
+    (new, missing): metrics only in this run, and baseline metrics of the
+    benchmarks that ran which this run did not report.
+    """
+    ran = {name.split(".", 1)[0] for name in results}
+    new = [name for name in results if name not in baseline]
+    missing = [name for name in baseline if name.split(".", 1)[0] in ran and name not in results]
+    return new, missing
+
+
+def _environment() -> dict[str, str]:
+    numpy_version = getattr(crypto_leverage.np, "__version__", None)
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": numpy_version or "not installed",
+        **({"confetti_canvas": _confetti_canvas} if _confetti_canvas else {}),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the crypto leverage calculator.")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help=f"Subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before failing (0.3 = 30%%)")
+    parser.add_argument("--json", metavar="PATH", help="Also write this run's results to PATH")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations (noisier)")
+    parser.add_argument("--rounds", type=int, default=1,
+                        help="Run the suite this many times and keep each metric's best")
+    args = parser.parse_args(argv)
+
+    try:
+        results = run_benchmarks(args.only, args.quick, max(1, args.rounds))
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(2)
+
+    baseline, baseline_environment = {}, {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            document = json.load(f)
+        baseline, baseline_environment = document["results"], document.get("environment", {})
+    canvas_changed = (
+        "confetti.frame" in results and "confetti.frame" in baseline
+        and baseline_environment.get("confetti_canvas") != _confetti_canvas
+    )
+    if canvas_changed:
+        # A real Tk frame and a virtual one are different measurements
+        baseline = {name: value for name, value in baseline.items() if name != "confetti.frame"}
+
+    print("\n" + "=" * 70)
+    print("⏱️  BENCHMARKS (seconds per operation, lower is better)")
+    print("=" * 70)
+    for name, value in results.items():
+        line = f"  {name:<38}{_format_seconds(value):>12}"
+        if name in baseline:
+            line += f"   {value / baseline[name] - 1:+7.1%} vs baseline"
+        print(line)
+    print("=" * 70)
+
+    document = {"environment": _environment(), "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}\n")
+        return
+    if not baseline and not canvas_changed:
+        print(f"ℹ️  No baseline at {args.baseline}; run with --save-baseline to record one.\n")
+        return
+
+    new, missing = unmatched(results, baseline)
+    if canvas_changed:
+        print(f"⚠️  confetti.frame not compared: baseline ran on a "
+              f"{baseline_environment.get('confetti_canvas', 'unknown')} canvas, this run on {_confetti_canvas}")
+        new.remove("confetti.frame")
+    if new:
+        print(f"⚠️  Not in the baseline, not gated: {', '.join(new)}")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions or missing:
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for name, base, current, ratio in regressions:
+                print(f"  {name}: {_format_seconds(base)} → {_format_seconds(current)} ({ratio:.2f}x)")
+        if missing:
+            print(f"❌ In the baseline but not measured: {', '.join(missing)} (re-record with --save-baseline)")
+        print()
+        raise SystemExit(1)
+    print(f"✅ No regressions beyond {args.threshold:.0%}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,11 +21,11 @@ import random
 import time
 from typing import Optional
 
-try:
-    import tkinter as tk
-    from tkinter import font
-except Exception:
-    tk = None  # type: ignore
+from optional_imports import lazy_modules
+
+
+# Text-only callers never load tkinter; ``module.tk`` still works.
+_optional, __getattr__ = lazy_modules(globals(), {"tk": "tkinter"})
 
 
 def get_surprise_message(name: Optional[str]) -> str:
@@ -60,6 +60,7 @@ def create_calendar_grid(year: int = 2026, highlight_day: int = 1) -> list[list[
 
 def show_surprise_popup(name: Optional[str] = None) -> None:
     """Show a surprise popup window before the calendar."""
+    tk = _optional("tk")
     if tk is None:
         print(get_surprise_message(name))
         return
@@ -93,10 +94,13 @@ def show_surprise_popup(name: Optional[str] = None) -> None:
 
 def show_calendar_window(year: int = 2026, name: Optional[str] = None) -> None:
     """Display the full 2026 calendar in a Tkinter window."""
+    tk = _optional("tk")
     if tk is None:
         print(generate_calendar_text(year))
         return
 
+    from tkinter import font
+
     root = tk.Tk()
     root.title(f"Calendar {year}")
     root.geometry("1200x900")
@@ -0,0 +1,335 @@
+"""
+crypto_alerts.py
+Price-trigger engine for stop loss / take profit alerts.
+
+calculate_stop_loss and calculate_take_profit give the levels; AlertEngine
+watches them. Each symbol keeps two trigger heaps:
+
+  - "below" triggers (stop losses) fire when price <= level; the heap
+    yields the highest level first, the first one a falling price crosses
+  - "above" triggers (take profits) fire when price >= level; the heap
+    yields the lowest level first, the first one a rising price crosses
+
+A tick that fires nothing looks at one heap top per side, O(1); firing k
+triggers costs O(k log n), however many triggers are waiting. Adding a
+trigger is a heap push, O(log n). Cancelling only drops it from a dict,
+O(1), and its dead heap entry is skipped when popped. The heap is rebuilt
+once dead entries outnumber live ones, O(1) amortized. Moving a trigger
+is a cancel plus an add.
+
+Triggers can share a group (one-cancels-other): when one fires, the rest
+of its group is cancelled. add_position registers a position's SL and TP
+that way.
+
+Usage:
+    engine = AlertEngine()
+    engine.add_position("btc-1", "BTC", 45000, stop_loss_percent=5, profit_target_percent=10)
+    engine.on_tick("BTC", 42700.0)   # -> [{"id": "btc-1:stop_loss", ...}]
+
+    python crypto_alerts.py positions.json --ticks ticks.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+from heapq import heapify, heappop, heappush
+from typing import Iterable, Optional, TextIO
+
+from crypto_leverage import calculate_stop_loss, calculate_take_profit
+from crypto_monitor import polling_feed, read_ticks
+
+DIRECTIONS = ("below", "above")
+
+
+class Alert:
+    """One registered trigger."""
+
+    __slots__ = ("id", "symbol", "level", "direction", "group", "_key")
+
+    def __init__(self, alert_id: str, symbol: str, level: float, direction: str, group: Optional[str]) -> None:
+        self.id = alert_id
+        self.symbol = symbol
+        self.level = level
+        self.direction = direction
+        self.group = group
+        self._key: tuple[float, int] = (0.0, 0)
+
+    def __repr__(self) -> str:
+        return f"Alert({self.id!r}, {self.symbol!r}, {self.level!r}, {self.direction!r})"
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "symbol": self.symbol, "level": self.level,
+                "direction": self.direction, "group": self.group}
+
+
+class _TriggerSide:
+    """
+    Triggers of one direction for one symbol, in a heap of keys.
+
+    The key is (sign × level, sequence number): sign is +1 for "below" and
+    -1 for "above", so in both cases the triggers a price crosses are the
+    keys >= sign × price, the largest keys. The heap holds negated keys so
+    the largest pops first. The sequence number keeps keys unique, so a
+    cancelled trigger is recognised by its key no longer being in `alerts`.
+    """
+
+    __slots__ = ("sign", "heap", "alerts")
+
+    def __init__(self, sign: int) -> None:
+        self.sign = sign
+        self.heap: list[tuple[float, int]] = []
+        self.alerts: dict[tuple[float, int], Alert] = {}
+
+    def __len__(self) -> int:
+        return len(self.alerts)
+
+    def add(self, alert: Alert, sequence: int) -> None:
+        alert._key = (self.sign * alert.level, sequence)
+        heappush(self.heap, (-alert._key[0], -sequence))
+        self.alerts[alert._key] = alert
+
+    def remove(self, alert: Alert) -> None:
+        del self.alerts[alert._key]
+        if len(self.heap) > 2 * len(self.alerts) + 64:
+            self.heap = [(-level, -sequence) for level, sequence in self.alerts]
+            heapify(self.heap)
+
+    def fire(self, price: float) -> list[Alert]:
+        """Remove and return the crossed triggers, nearest level first."""
+        threshold = self.sign * price
+        heap, alerts = self.heap, self.alerts
+        fired = []
+        while heap and -heap[0][0] >= threshold:
+            level, sequence = heappop(heap)
+            alert = alerts.pop((-level, -sequence), None)
+            if alert is not None:
+                fired.append(alert)
+        fired.reverse()
+        return fired
+
+    def ordered(self) -> list[Alert]:
+        """Live triggers, first to be crossed first."""
+        return [self.alerts[key] for key in sorted(self.alerts, reverse=True)]
+
+
+class AlertEngine:
+    """SL/TP triggers for many symbols, fired by price ticks."""
+
+    def __init__(self) -> None:
+        self._sides: dict[str, tuple[_TriggerSide, _TriggerSide]] = {}
+        self._alerts: dict[str, Alert] = {}
+        self._groups: dict[str, set[str]] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __contains__(self, alert_id: str) -> bool:
+        return alert_id in self._alerts
+
+    def symbols(self) -> list[str]:
+        """Symbols with at least one live trigger."""
+        return list(self._sides)
+
+    def get(self, alert_id: str) -> Alert:
+        try:
+            return self._alerts[alert_id]
+        except KeyError:
+            raise ValueError(f"Unknown alert '{alert_id}'") from None
+
+    def add(
+        self,
+        alert_id: str,
+        symbol: str,
+        level: float,
+        direction: str,
+        group: Optional[str] = None,
+    ) -> Alert:
+        """
+        Register a trigger: "below" fires at price <= level, "above" at price >= level.
+
+        Raises:
+            ValueError: If the id exists, the direction is invalid or the level is not positive
+        """
+        if alert_id in self._alerts:
+            raise ValueError(f"Alert '{alert_id}' already exists")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Invalid direction: {direction!r} (expected 'below' or 'above')")
+        if not level > 0:
+            raise ValueError(f"Alert level must be positive, got {level}")
+
+        symbol_upper = symbol.upper()
+        alert = Alert(alert_id, symbol_upper, float(level), direction, group)
+        sides = self._sides.get(symbol_upper)
+        if sides is None:
+            sides = self._sides[symbol_upper] = (_TriggerSide(+1), _TriggerSide(-1))
+        sides[direction == "above"].add(alert, next(self._sequence))
+        self._alerts[alert_id] = alert
+        if group is not None:
+            self._groups.setdefault(group, set()).add(alert_id)
+        return alert
+
+    def cancel(self, alert_id: str) -> Alert:
+        """Remove a live trigger. Returns it."""
+        alert = self.get(alert_id)
+        sides = self._sides[alert.symbol]
+        sides[alert.direction == "above"].remove(alert)
+        self._forget(alert)
+        if not sides[0] and not sides[1]:
+            del self._sides[alert.symbol]
+        return alert
+
+    def modify(self, alert_id: str, level: float) -> Alert:
+        """Move a live trigger to a new level (it keeps its id, direction and group)."""
+        if not level > 0:
+            raise ValueError(f"Alert level must be positive, got {level}")
+        alert = self.get(alert_id)
+        side = self._sides[alert.symbol][alert.direction == "above"]
+        side.remove(alert)
+        alert.level = float(level)
+        side.add(alert, next(self._sequence))
+        return alert
+
+    def add_position(
+        self,
+        position_id: str,
+        symbol: str,
+        entry_price: float,
+        stop_loss_percent: float,
+        profit_target_percent: float,
+    ) -> tuple[Alert, Alert]:
+        """
+        Register a long position's stop loss and take profit as one group.
+
+        The triggers are "<position_id>:stop_loss" and
+        "<position_id>:take_profit"; whichever fires first cancels the other.
+        """
+        stop_loss = self.add(f"{position_id}:stop_loss", symbol,
+                             calculate_stop_loss(entry_price, stop_loss_percent), "below", group=position_id)
+        try:
+            take_profit = self.add(f"{position_id}:take_profit", symbol,
+                                   calculate_take_profit(entry_price, profit_target_percent), "above",
+                                   group=position_id)
+        except ValueError:
+            self.cancel(stop_loss.id)
+            raise
+        return stop_loss, take_profit
+
+    def on_tick(self, symbol: str, price: float) -> list[dict]:
+        """
+        Apply a price tick and return the triggers it fired.
+
+        Each fired trigger is removed; other triggers in its group are
+        cancelled. Rows are {"id", "symbol", "level", "direction", "group",
+        "price"}, nearest level first per direction ("below" first).
+        """
+        symbol_upper = symbol.upper()
+        sides = self._sides.get(symbol_upper)
+        if sides is None:
+            return []
+        fired = sides[0].fire(price) + sides[1].fire(price)
+        if not fired:
+            return []
+
+        rows = []
+        fired_ids = {alert.id for alert in fired}
+        for alert in fired:
+            if alert.id not in self._alerts:
+                continue  # cancelled by a group member fired on this tick
+            self._forget(alert)
+            rows.append({**alert.as_dict(), "price": price})
+            if alert.group is not None:
+                for sibling in list(self._groups.get(alert.group, ())):
+                    if sibling in fired_ids:
+                        self._forget(self._alerts[sibling])  # already cut from its side
+                    else:
+                        self.cancel(sibling)
+        if symbol_upper in self._sides and not sides[0] and not sides[1]:
+            del self._sides[symbol_upper]
+        return rows
+
+    def pending(self, symbol: str) -> list[Alert]:
+        """Live triggers for `symbol`: "below" from highest, then "above" from lowest."""
+        sides = self._sides.get(symbol.upper())
+        if sides is None:
+            return []
+        return [alert for side in sides for alert in side.ordered()]
+
+    def _forget(self, alert: Alert) -> None:
+        del self._alerts[alert.id]
+        if alert.group is not None:
+            members = self._groups[alert.group]
+            members.discard(alert.id)
+            if not members:
+                del self._groups[alert.group]
+
+
+def format_alert(row: dict) -> str:
+    """One human-readable line per fired trigger."""
+    icon = "🛑" if row["direction"] == "below" else "📈"
+    return (f"{icon} {row['id']:<24} {row['symbol']:<6} {row['direction']:<5} "
+            f"${row['level']:>14,.2f}  at ${row['price']:>14,.2f}")
+
+
+def run_alerts(engine: AlertEngine, ticks: Iterable[tuple[str, float]], out: Optional[TextIO] = None) -> int:
+    """Feed ticks to the engine and write fired triggers (stdout by default). Returns triggers fired."""
+    if out is None:
+        out = sys.stdout
+    fired = 0
+    for symbol, price in ticks:
+        for row in engine.on_tick(symbol, price):
+            out.write(format_alert(row) + "\n")
+            fired += 1
+        out.flush()
+        if not len(engine):
+            break
+    return fired
+
+
+def load_alerts(engine: AlertEngine, positions: list[dict]) -> None:
+    """Register SL/TP groups for positions in crypto_monitor's positions.json format."""
+    for index, item in enumerate(positions, start=1):
+        engine.add_position(
+            str(item.get("id", index)),
+            item["symbol"],
+            float(item["entry_price"]),
+            float(item["stop_loss_percent"]),
+            float(item["profit_target_percent"]),
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Alert engine entry point."""
+    parser = argparse.ArgumentParser(description="Fire stop loss / take profit alerts on price ticks.")
+    parser.add_argument("positions", help="JSON file with a list of positions (as for crypto_monitor.py)")
+    parser.add_argument("--ticks", help="Tick file ('-' for stdin) instead of live polling")
+    parser.add_argument("--interval", type=float, default=5.0, help="Live polling interval in seconds")
+    args = parser.parse_args(argv)
+
+    engine = AlertEngine()
+    try:
+        with open(args.positions, encoding="utf-8") as f:
+            load_alerts(engine, json.load(f))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Could not load positions: {e}")
+        sys.exit(1)
+
+    print(f"🔔 Watching {len(engine)} trigger(s) in {', '.join(engine.symbols())}")
+    try:
+        if args.ticks == "-":
+            run_alerts(engine, read_ticks(sys.stdin))
+        elif args.ticks:
+            with open(args.ticks, encoding="utf-8") as f:
+                run_alerts(engine, read_ticks(f))
+        else:
+            run_alerts(engine, polling_feed(engine.symbols(), args.interval))
+    except KeyboardInterrupt:
+        print("\n\n👋 Alerts stopped.")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+crypto_async.py
+asyncio counterparts of the crypto_leverage.py price fetch functions.
+
+Features:
+  - async_fetch_crypto_price / async_fetch_crypto_prices with the same
+    return contract and ValueError semantics as the sync versions
+  - AsyncPriceClient with bounded concurrency and per-request timeouts
+  - Cancellation-safe: a cancelled fetch closes its connection and
+    propagates asyncio.CancelledError
+
+Requests are made with a small HTTP/1.1 client on asyncio streams, so no
+extra dependency (and no thread pool) is needed.
+
+Usage:
+    price, asset_name, symbol = await async_fetch_crypto_price("BTC")
+
+    client = AsyncPriceClient(max_concurrency=4, timeout=2.0)
+    prices = await client.fetch_crypto_prices(["BTC", "ETH", "SOL"])
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+import weakref
+from typing import Optional
+from urllib.parse import urlencode, urlsplit
+
+import crypto_leverage
+import crypto_metrics
+from crypto_leverage import _api_error, _extract_prices, _price_params, _resolve_symbol
+from crypto_resilience import breaker_for, is_upstream_failure, request_timeout
+
+
+class _HTTPError(Exception):
+    """Non-2xx response or malformed HTTP message."""
+
+    def __init__(self, message: str, status: Optional[int] = None, headers: Optional[dict] = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    """Read a `Transfer-Encoding: chunked` body."""
+    body = bytearray()
+    while True:
+        size_line = await reader.readline()
+        size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+        if size == 0:
+            # Skip optional trailers up to the terminating blank line
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            return bytes(body)
+        body += await reader.readexactly(size)
+        await reader.readexactly(2)
+
+
+async def _http_get_json(url: str, params: dict[str, str], fetch_metrics=None) -> object:
+    """
+    GET `url` with query `params` over a fresh connection and decode JSON.
+
+    The body size is recorded in `fetch_metrics.bytes` when given.
+
+    Raises:
+        _HTTPError: On a non-2xx status or malformed / truncated response
+        OSError: On connection failures
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == "https"
+    host = parts.hostname
+    port = parts.port or (443 if secure else 80)
+    target = f"{parts.path or '/'}?{urlencode(params)}"
+
+    reader, writer = await asyncio.open_connection(
+        host, port, ssl=ssl.create_default_context() if secure else None
+    )
+    try:
+        writer.write(
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"Accept: application/json\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+        status_line = (await reader.readline()).decode("latin-1").split(" ", 2)
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            raise _HTTPError("Malformed HTTP response")
+        status = int(status_line[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        # No status on these errors: a broken body counts as an upstream failure
+        try:
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                body = await _read_chunked(reader)
+            elif "content-length" in headers:
+                body = await reader.readexactly(int(headers["content-length"]))
+            else:
+                body = await reader.read()
+        except asyncio.IncompleteReadError as e:
+            raise _HTTPError(f"Truncated response: got {len(e.partial)} of {e.expected} bytes")
+        except (EOFError, ValueError) as e:
+            # int() on a bad Content-Length or chunk-size line; readexactly() on a negative one
+            raise _HTTPError(f"Malformed HTTP response body: {e}")
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+    if not 200 <= status < 300:
+        reason = status_line[2].strip() if len(status_line) > 2 else ""
+        raise _HTTPError(f"{status} {reason} for url: {url}", status, headers)
+    if fetch_metrics is not None:
+        fetch_metrics.bytes = len(body)
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise _HTTPError(f"Invalid JSON response: {e}")
+
+
+class AsyncPriceClient:
+    """asyncio price client with bounded concurrency and per-request timeouts."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 10,
+        timeout: float = 10.0,
+        url: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            max_concurrency: Most requests this client keeps in flight at once
+            timeout: Default per-request timeout in seconds (queueing excluded)
+            url: /simple/price endpoint (defaults to crypto_leverage.COINGECKO_PRICE_URL)
+        """
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be positive")
+        self.timeout = timeout
+        self.url = url
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_crypto_prices(
+        self, symbols, timeout: Optional[float] = None
+    ) -> dict[str, tuple[float, str, str]]:
+        """
+        Fetch prices for several symbols in one request.
+
+        Returns:
+            Dict of symbol_upper -> (price, asset_name, symbol_upper)
+
+        Raises:
+            ValueError: If API fails / times out, a symbol is not found or has no price
+        """
+        resolved = dict(_resolve_symbol(symbol) for symbol in symbols)
+        if not resolved:
+            return {}
+
+        url = self.url or crypto_leverage.COINGECKO_PRICE_URL
+        async with self._semaphore:
+            with crypto_metrics.track_fetch() as fetch_metrics:
+                limit = request_timeout(self.timeout if timeout is None else timeout)
+                breaker = breaker_for(url)
+                breaker.allow()
+                failed = None
+                try:
+                    data = await asyncio.wait_for(
+                        _http_get_json(url, _price_params(resolved.values()), fetch_metrics), limit
+                    )
+                    failed = False
+                except asyncio.TimeoutError:
+                    failed = True
+                    raise _api_error(f"timed out after {limit:g}s")
+                except (_HTTPError, OSError, ssl.SSLError) as e:
+                    failed = is_upstream_failure(e)
+                    raise _api_error(e)
+                finally:
+                    breaker.record(failed)
+
+                return _extract_prices(data, resolved)
+
+    async def fetch_crypto_price(
+        self, symbol: str, timeout: Optional[float] = None
+    ) -> tuple[float, str, str]:
+        """Fetch one symbol; same contract as crypto_leverage.fetch_crypto_price."""
+        prices = await self.fetch_crypto_prices([symbol], timeout)
+        return prices[symbol.upper()]
+
+
+# One default client per event loop (asyncio primitives are loop-bound)
+_default_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncPriceClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _default_client() -> AsyncPriceClient:
+    loop = asyncio.get_running_loop()
+    client = _default_clients.get(loop)
+    if client is None:
+        client = _default_clients[loop] = AsyncPriceClient()
+    return client
+
+
+async def async_fetch_crypto_price(
+    symbol: str, timeout: Optional[float] = None
+) -> tuple[float, str, str]:
+    """
+    Fetch real-time crypto price from CoinGecko API without blocking the loop.
+
+    Args:
+        symbol: Crypto symbol (BTC, ETH, SOL, etc)
+        timeout: Per-request timeout in seconds (default 10)
+
+    Returns:
+        Tuple of (price, asset_name, symbol)
+
+    Raises:
+        ValueError: If API fails, times out or symbol not found
+    """
+    return await _default_client().fetch_crypto_price(symbol, timeout)
+
+
+async def async_fetch_crypto_prices(
+    symbols, timeout: Optional[float] = None
+) -> dict[str, tuple[float, str, str]]:
+    """Fetch several symbols in one request; see fetch_crypto_prices."""
+    return await _default_client().fetch_crypto_prices(symbols, timeout)
+
+
+async def async_select_crypto_asset(
+    symbol: str,
+    manual_price: Optional[float] = None,
+    client: Optional[AsyncPriceClient] = None,
+) -> tuple[float, str, str]:
+    """
+    Non-interactive async counterpart of select_crypto_asset.
+
+    Unknown symbols raise ValueError as before. On an API / network error
+    the given `manual_price` is used instead, mirroring the manual-input
+    fallback of the interactive version.
+
+    Returns:
+        Tuple of (current_price, asset_name, symbol)
+    """
+    client = client or _default_client()
+    try:
+        return await client.fetch_crypto_price(symbol)
+    except ValueError as e:
+        if "not found" in str(e) or manual_price is None:
+            raise
+        symbol_upper = symbol.upper()
+        price = crypto_leverage.validate_positive_number(str(manual_price), f"{symbol_upper} price")
+        return price, crypto_leverage.SYMBOL_MAP.get(symbol_upper, symbol_upper), symbol_upper
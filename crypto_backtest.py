@@ -0,0 +1,316 @@
+"""
+crypto_backtest.py
+Replay historical OHLCV bars and apply the stop loss / take profit rules
+from crypto_leverage.py to every entry signal.
+
+Features:
+  - OHLCV data is memory-mapped from `.npy` or raw `.bin` files, so years
+    of minute bars for every asset can be scanned without loading them
+  - SL/TP levels come from calculate_stop_loss / calculate_take_profit
+  - First-hit detection is vectorized across all open trades: each round
+    gathers a window of bars for every unresolved trade and finds the
+    first SL/TP touch with NumPy, doubling the window until all resolve
+  - Configurable intrabar tie-break when a bar touches both levels
+  - Trade list (column arrays) and aggregate stats
+
+File formats:
+  - `.npy` with the structured OHLCV_DTYPE, or a float (n, 6) array with
+    columns timestamp, open, high, low, close, volume
+  - `.bin`: raw little-endian OHLCV_DTYPE records (write with save_ohlcv)
+
+Usage:
+    python crypto_backtest.py data/ --symbols BTC ETH --every 60 --stop-loss 2 --take-profit 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from typing import Optional
+
+import numpy as np
+
+from crypto_leverage import SYMBOL_MAP, calculate_stop_loss, calculate_take_profit
+
+
+OHLCV_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+OHLCV_FIELDS = OHLCV_DTYPE.names
+
+# Trade outcome codes
+TIMEOUT, TAKE_PROFIT, STOP_LOSS, LIQUIDATION = 0, 1, 2, 3
+OUTCOME_NAMES = ("timeout", "take_profit", "stop_loss", "liquidation")
+
+TIE_BREAKS = ("stop", "take_profit", "nearest")
+
+# Upper bound on bars gathered per vectorized round (trades × window)
+_MAX_CELLS = 4_000_000
+
+
+def load_ohlcv(path: str) -> dict[str, np.ndarray]:
+    """
+    Memory-map an OHLCV file and return its columns as array views.
+
+    Nothing is read from disk until a column is indexed.
+    """
+    if path.endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+    else:
+        data = np.memmap(path, dtype=OHLCV_DTYPE, mode="r")
+
+    if data.dtype.names:
+        missing = set(OHLCV_FIELDS) - set(data.dtype.names)
+        if missing:
+            raise ValueError(f"{path}: missing OHLCV fields {sorted(missing)}")
+        return {name: data[name] for name in OHLCV_FIELDS}
+    if data.ndim != 2 or data.shape[1] != len(OHLCV_FIELDS):
+        raise ValueError(f"{path}: expected a structured array or an (n, 6) array")
+    return {name: data[:, i] for i, name in enumerate(OHLCV_FIELDS)}
+
+
+def save_ohlcv(path: str, columns: dict) -> None:
+    """Write OHLCV columns as a structured `.npy` or raw `.bin` file."""
+    n = len(columns["close"])
+    records = np.empty(n, dtype=OHLCV_DTYPE)
+    for name in OHLCV_FIELDS:
+        if name in columns:
+            records[name] = columns[name]
+        else:
+            records[name] = np.arange(n) if name == "timestamp" else 0
+    if path.endswith(".npy"):
+        np.save(path, records)
+    else:
+        records.tofile(path)
+
+
+def load_symbol(data_dir: str, symbol: str) -> dict[str, np.ndarray]:
+    """Memory-map `<data_dir>/<SYMBOL>.npy` or `.bin`."""
+    for ext in (".npy", ".bin"):
+        path = os.path.join(data_dir, symbol.upper() + ext)
+        if os.path.exists(path):
+            return load_ohlcv(path)
+    raise ValueError(f"No OHLCV file for {symbol.upper()} in {data_dir}")
+
+
+def find_first_hits(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    tie_break: str = "stop",
+    initial_window: int = 64,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    For each trade find the first bar in [start, end) with low <= lower or high >= upper.
+
+    Returns:
+        (hit_index, hit_upper): bar index of the first touch (-1 if none)
+        and whether the upper level is the one taken on that bar
+    """
+    if tie_break not in TIE_BREAKS:
+        raise ValueError(f"tie_break must be one of {', '.join(TIE_BREAKS)}")
+
+    n = len(starts)
+    hit_index = np.full(n, -1, dtype=np.int64)
+    hit_upper = np.zeros(n, dtype=bool)
+    pending = np.flatnonzero(starts < ends)
+    offset = np.zeros(n, dtype=np.int64)
+    window = initial_window
+    last_bar = len(high) - 1
+
+    while pending.size:
+        width = max(1, min(window, _MAX_CELLS // pending.size))
+        first_bar = starts[pending] + offset[pending]
+        bars = first_bar[:, None] + np.arange(width)
+        valid = bars < ends[pending, None]
+        bars = np.minimum(bars, last_bar)
+
+        up = (high[bars] >= upper[pending, None]) & valid
+        down = (low[bars] <= lower[pending, None]) & valid
+        first_up = np.where(up.any(axis=1), up.argmax(axis=1), width)
+        first_down = np.where(down.any(axis=1), down.argmax(axis=1), width)
+        first = np.minimum(first_up, first_down)
+        resolved = first < width
+
+        trades = pending[resolved]
+        bar = first_bar[resolved] + first[resolved]
+        takes_upper = first_up[resolved] < first_down[resolved]
+        both = first_up[resolved] == first_down[resolved]
+        if both.any():
+            if tie_break == "take_profit":
+                takes_upper |= both
+            elif tie_break == "nearest":
+                bar_open = open_[bar]
+                closer_to_upper = (upper[trades] - bar_open) < (bar_open - lower[trades])
+                takes_upper |= both & closer_to_upper
+        hit_index[trades] = bar
+        hit_upper[trades] = takes_upper
+
+        offset[pending] += width
+        exhausted = starts[pending] + offset[pending] >= ends[pending]
+        pending = pending[~resolved & ~exhausted]
+        window *= 2
+
+    return hit_index, hit_upper
+
+
+def backtest(
+    bars: dict[str, np.ndarray],
+    entries,
+    stop_loss_percent: float,
+    profit_target_percent: float,
+    investment_amount: float = 1000.0,
+    leverage: int = 10,
+    tie_break: str = "stop",
+    max_bars: Optional[int] = None,
+    allow_overlap: bool = True,
+) -> dict[str, np.ndarray]:
+    """
+    Simulate a long trade at the close of every entry bar.
+
+    Each trade exits at the first later bar touching its stop loss (or
+    liquidation at entry × (1 - 1/leverage), if that comes first) or its
+    take profit. A bar that gaps through a level fills at its open. Trades
+    still open after `max_bars` bars (or at the end of data) exit at the
+    last close. With allow_overlap=False, signals during an open trade are
+    skipped.
+
+    Returns the trade list as column arrays: entry_index, exit_index,
+    entry_price, exit_price, stop_loss_price, take_profit_price, outcome
+    (see OUTCOME_NAMES), bars_held, pnl, return_percent.
+    """
+    open_, high, low, close = bars["open"], bars["high"], bars["low"], bars["close"]
+    n_bars = len(close)
+
+    entry_index = np.unique(np.asarray(entries, dtype=np.int64))
+    entry_index = entry_index[(entry_index >= 0) & (entry_index < n_bars - 1)]
+    entry_price = np.asarray(close[entry_index], dtype=np.float64)
+
+    stop_loss_price = calculate_stop_loss(entry_price, stop_loss_percent)
+    take_profit_price = calculate_take_profit(entry_price, profit_target_percent)
+    liquidation_price = entry_price * (1 - 1 / leverage)
+    lower = np.maximum(stop_loss_price, liquidation_price)
+
+    starts = entry_index + 1
+    ends = np.full_like(starts, n_bars) if max_bars is None else np.minimum(starts + max_bars, n_bars)
+
+    hit_index, hit_upper = find_first_hits(
+        open_, high, low, starts, ends, lower, take_profit_price, tie_break
+    )
+
+    hit = hit_index >= 0
+    exit_index = np.where(hit, hit_index, ends - 1)
+    exit_open = np.asarray(open_[exit_index], dtype=np.float64)
+
+    outcome = np.full(len(entry_index), TIMEOUT, dtype=np.int8)
+    outcome[hit & hit_upper] = TAKE_PROFIT
+    lower_hit = hit & ~hit_upper
+    outcome[lower_hit] = np.where(stop_loss_price[lower_hit] >= liquidation_price[lower_hit], STOP_LOSS, LIQUIDATION)
+
+    exit_price = np.asarray(close[exit_index], dtype=np.float64)
+    exit_price = np.where(outcome == TAKE_PROFIT, np.maximum(take_profit_price, exit_open), exit_price)
+    exit_price = np.where(outcome == STOP_LOSS, np.minimum(stop_loss_price, exit_open), exit_price)
+
+    position_size = investment_amount * leverage / entry_price
+    pnl = np.maximum(position_size * (exit_price - entry_price), -investment_amount)
+    pnl[outcome == LIQUIDATION] = -investment_amount
+
+    trades = {
+        "entry_index": entry_index,
+        "exit_index": exit_index,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "stop_loss_price": stop_loss_price,
+        "take_profit_price": take_profit_price,
+        "outcome": outcome,
+        "bars_held": exit_index - entry_index,
+        "pnl": pnl,
+        "return_percent": pnl / investment_amount * 100,
+    }
+
+    if not allow_overlap and len(entry_index):
+        keep = np.zeros(len(entry_index), dtype=bool)
+        free_from = -1
+        for i, (entry, exit_) in enumerate(zip(entry_index.tolist(), exit_index.tolist())):
+            if entry >= free_from:
+                keep[i] = True
+                free_from = exit_
+        trades = {name: column[keep] for name, column in trades.items()}
+
+    return trades
+
+
+def trade_stats(trades: dict[str, np.ndarray]) -> dict[str, float]:
+    """Aggregate stats for a trade list (pnl is per trade, ordered by entry)."""
+    pnl = trades["pnl"]
+    count = len(pnl)
+    outcomes = np.bincount(trades["outcome"], minlength=len(OUTCOME_NAMES))
+    stats = {"trades": count, **{name: int(outcomes[i]) for i, name in enumerate(OUTCOME_NAMES)}}
+    if not count:
+        return {**stats, "win_rate": 0.0, "total_pnl": 0.0, "avg_pnl": 0.0, "avg_return_percent": 0.0,
+                "profit_factor": 0.0, "max_drawdown": 0.0, "avg_bars_held": 0.0}
+
+    equity = np.cumsum(pnl[np.argsort(trades["exit_index"], kind="stable")])
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0)) - equity
+    gains = pnl[pnl > 0].sum()
+    losses = -pnl[pnl < 0].sum()
+    return {
+        **stats,
+        "win_rate": float((pnl > 0).mean()),
+        "total_pnl": float(pnl.sum()),
+        "avg_pnl": float(pnl.mean()),
+        "avg_return_percent": float(trades["return_percent"].mean()),
+        "profit_factor": float(gains / losses) if losses else float("inf"),
+        "max_drawdown": float(drawdown.max()),
+        "avg_bars_held": float(trades["bars_held"].mean()),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Backtest entry point."""
+    parser = argparse.ArgumentParser(description="Backtest SL/TP rules over memory-mapped OHLCV bars.")
+    parser.add_argument("data_dir", help="Directory with <SYMBOL>.npy / <SYMBOL>.bin files")
+    parser.add_argument("--symbols", nargs="+", default=sorted(SYMBOL_MAP), help="Symbols to test")
+    parser.add_argument("--every", type=int, default=60, help="Enter a trade every N bars")
+    parser.add_argument("--stop-loss", type=float, required=True, help="Stop loss percentage")
+    parser.add_argument("--take-profit", type=float, required=True, help="Target profit percentage")
+    parser.add_argument("--investment", type=float, default=1000.0)
+    parser.add_argument("--leverage", type=int, default=10)
+    parser.add_argument("--max-bars", type=int, default=None, help="Close trades after N bars")
+    parser.add_argument("--tie-break", choices=TIE_BREAKS, default="stop")
+    parser.add_argument("--no-overlap", action="store_true", help="Skip signals while a trade is open")
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 70)
+    print(f"📜 BACKTEST  SL {args.stop_loss}%  TP {args.take_profit}%  x{args.leverage}")
+    print("=" * 70)
+    for symbol in args.symbols:
+        try:
+            bars = load_symbol(args.data_dir, symbol)
+        except ValueError as e:
+            print(f"  {symbol:<6} ⚠️  {e}")
+            continue
+        trades = backtest(
+            bars, np.arange(0, len(bars["close"]), args.every), args.stop_loss, args.take_profit,
+            investment_amount=args.investment, leverage=args.leverage, tie_break=args.tie_break,
+            max_bars=args.max_bars, allow_overlap=not args.no_overlap,
+        )
+        stats = trade_stats(trades)
+        print(f"  {symbol:<6} trades {stats['trades']:>7,}  win {stats['win_rate']:>6.1%}  "
+              f"PnL ${stats['total_pnl']:>14,.2f}  maxDD ${stats['max_drawdown']:>12,.2f}  "
+              f"PF {stats['profit_factor']:>5.2f}")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
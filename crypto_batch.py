@@ -0,0 +1,382 @@
+"""
+crypto_batch.py
+Non-interactive batch mode for the crypto leverage calculator.
+
+Features:
+  - Streams CSV or JSONL position rows from a file or stdin
+  - Validates every row with the same rules as the interactive prompts
+  - Writes one CSV or JSONL result row per input row, with a per-row error
+  - Each symbol's price is fetched at most once per batch, and missing
+    prices are requested in chunks with a single API call per chunk
+  - Memory use is bounded by the chunk size, not the input size
+  - --deadline bounds all price lookups; --allow-stale falls back to the
+    last known prices (reported on stderr) when the API is down
+
+Input columns / keys:
+    symbol, investment_amount, stop_loss_percent, profit_target_percent,
+    and optional price (skips the lookup), leverage (default 10) and id
+
+Usage:
+    python crypto_batch.py positions.csv -o results.csv
+    python crypto_batch.py positions.csv --fixed   # exchange tick/lot sizes
+    python crypto_batch.py positions.csv --journal journal/
+    python crypto_batch.py positions.csv --deadline 5 --allow-stale
+    cat positions.jsonl | python crypto_batch.py - --input-format jsonl
+    python crypto_leverage.py --batch positions.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import functools
+import json
+import math
+import sys
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+from crypto_journal import open_journal
+from crypto_leverage import (
+    _resolve_symbol,
+    calculate_position,
+    calculate_risk_reward_ratio,
+    calculate_stop_loss,
+    calculate_take_profit,
+    deadline,
+    fetch_crypto_prices,
+    format_age,
+    is_stale,
+    validate_positive_number,
+)
+
+
+RESULT_FIELDS = [
+    "line",
+    "id",
+    "symbol",
+    "price",
+    "investment_amount",
+    "stop_loss_percent",
+    "profit_target_percent",
+    "leverage",
+    "position_size",
+    "effective_capital",
+    "stop_loss_price",
+    "take_profit_price",
+    "risk_reward",
+    "error",
+]
+
+
+def iter_csv_rows(stream: TextIO) -> Iterator[dict]:
+    """Yield one dict per CSV data row (header row required)."""
+    yield from csv.DictReader(stream)
+
+
+def iter_jsonl_rows(stream: TextIO) -> Iterator[dict]:
+    """Yield one dict per JSONL line; undecodable lines yield an error marker."""
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            row = {"_error": f"Invalid JSON: {e}"}
+        yield row
+
+
+def parse_row(row: dict) -> dict:
+    """
+    Validate one input row.
+
+    Returns:
+        Dict with symbol, price (None if it must be fetched), investment_amount,
+        stop_loss_percent, profit_target_percent, leverage and id
+
+    Raises:
+        ValueError: On the first invalid field, with the interactive prompt's message
+    """
+    if "_error" in row:
+        raise ValueError(row["_error"])
+
+    symbol = str(row.get("symbol") or "").strip().upper()
+    if not symbol:
+        raise ValueError("Missing symbol")
+
+    def present(key: str) -> bool:
+        # An explicit 0 is present (and then invalid); only None / blank means "use the default"
+        value = row.get(key)
+        return value is not None and str(value).strip() != ""
+
+    def field(key: str, name: str) -> float:
+        if not present(key):
+            raise ValueError(f"Missing {name}")
+        number = validate_positive_number(str(row[key]).strip(), name)
+        if not math.isfinite(number):
+            raise ValueError(f"Invalid {name}: must be finite")
+        return number
+
+    price = None
+    if present("price"):
+        price = field("price", f"{symbol} price")
+
+    investment_amount = field("investment_amount", "investment amount")
+
+    stop_loss_percent = field("stop_loss_percent", "stop loss percentage")
+    if stop_loss_percent >= 100:
+        raise ValueError("Stop loss percentage must be less than 100%")
+
+    profit_target_percent = field("profit_target_percent", "target profit percentage")
+    if profit_target_percent >= 100:
+        raise ValueError("Target profit percentage must be less than 100%")
+
+    leverage = 10
+    if present("leverage"):
+        leverage_value = field("leverage", "leverage")
+        if leverage_value != int(leverage_value):
+            raise ValueError("Invalid leverage: must be a whole number")
+        leverage = int(leverage_value)
+
+    return {
+        "id": row.get("id", ""),
+        "symbol": symbol,
+        "price": price,
+        "investment_amount": investment_amount,
+        "stop_loss_percent": stop_loss_percent,
+        "profit_target_percent": profit_target_percent,
+        "leverage": leverage,
+    }
+
+
+def calculate_row(parsed: dict, price: float) -> dict:
+    """Run the standard calculators for one validated row."""
+    position_info = calculate_position(price, parsed["investment_amount"], leverage=parsed["leverage"])
+    stop_loss_price = calculate_stop_loss(position_info["entry_price"], parsed["stop_loss_percent"])
+    take_profit_price = calculate_take_profit(position_info["entry_price"], parsed["profit_target_percent"])
+    return {
+        **parsed,
+        "price": price,
+        "position_size": position_info["position_size"],
+        "effective_capital": position_info["effective_capital"],
+        "stop_loss_price": stop_loss_price,
+        "take_profit_price": take_profit_price,
+        "risk_reward": calculate_risk_reward_ratio(
+            position_info["entry_price"], stop_loss_price, take_profit_price
+        ),
+        "error": "",
+    }
+
+
+def calculate_fixed_row(parsed: dict, price: float) -> dict:
+    """calculate_row on exchange increments: SL/TP on the tick grid, size in whole lots."""
+    from crypto_fixed import calculate_fixed
+
+    fixed = calculate_fixed(
+        parsed["symbol"], price, parsed["investment_amount"],
+        parsed["stop_loss_percent"], parsed["profit_target_percent"], leverage=parsed["leverage"],
+    )
+    return {
+        **parsed,
+        "price": fixed["entry_price"],
+        "position_size": fixed["position_size"],
+        "effective_capital": fixed["effective_capital"],
+        "stop_loss_price": fixed["stop_loss_price"],
+        "take_profit_price": fixed["take_profit_price"],
+        "risk_reward": fixed["risk_reward"],
+        "error": "",
+    }
+
+
+class PriceMemo:
+    """Per-batch price lookups: every symbol is fetched (or fails) at most once."""
+
+    def __init__(
+        self,
+        fetcher: Callable[[list[str]], dict[str, tuple[float, str, str]]] = fetch_crypto_prices,
+    ) -> None:
+        self._fetcher = fetcher
+        self._prices: dict[str, object] = {}
+        self.fetches = 0
+        # symbol -> age in seconds of prices served stale (degraded mode)
+        self.stale: dict[str, float] = {}
+
+    def prefetch(self, symbols: Iterable[str]) -> None:
+        """Fetch every not-yet-seen symbol with one call."""
+        missing = []
+        for symbol in symbols:
+            if symbol in self._prices or symbol in missing:
+                continue
+            try:
+                _resolve_symbol(symbol)
+            except ValueError as e:
+                self._prices[symbol] = ValueError(str(e).splitlines()[0])
+            else:
+                missing.append(symbol)
+        if not missing:
+            return
+
+        self.fetches += 1
+        try:
+            quotes = self._fetcher(missing)
+        except ValueError as e:
+            error = ValueError(str(e).splitlines()[0])
+            for symbol in missing:
+                self._prices[symbol] = error
+            return
+        for symbol in missing:
+            if symbol in quotes:
+                price = quotes[symbol][0]
+                if not math.isfinite(price) or price <= 0:
+                    # A bad quote fails its rows instead of the calculators (price 0 divides by zero)
+                    self._prices[symbol] = ValueError(f"Invalid {symbol} price from API: {price}")
+                    continue
+                self._prices[symbol] = price
+                if is_stale(quotes[symbol]):
+                    self.stale[symbol] = quotes[symbol].age
+            else:
+                self._prices[symbol] = ValueError(f"Could not fetch price for {symbol}")
+
+    def get(self, symbol: str) -> float:
+        """Return the memoized price or raise the memoized error."""
+        if symbol not in self._prices:
+            self.prefetch([symbol])
+        value = self._prices[symbol]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+def process_rows(
+    rows: Iterable[dict],
+    prices: Optional[PriceMemo] = None,
+    chunk_size: int = 1000,
+    calculate: Callable[[dict, float], dict] = calculate_row,
+) -> Iterator[dict]:
+    """
+    Validate and calculate a stream of input rows, yielding one result per row.
+
+    Rows are handled in chunks of `chunk_size`: symbols without an inline
+    price are collected per chunk and fetched together, then each row is
+    calculated with `calculate` (calculate_row, or calculate_fixed_row for
+    exchange increments). Invalid rows yield a result with only `error` filled in.
+    """
+    prices = prices or PriceMemo()
+    iterator = enumerate(rows, start=1)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+
+        parsed_chunk = []
+        for line, row in chunk:
+            try:
+                parsed_chunk.append((line, parse_row(row), None))
+            except ValueError as e:
+                parsed_chunk.append((line, {"id": row.get("id", ""), "symbol": row.get("symbol", "")}, e))
+
+        prices.prefetch(
+            parsed["symbol"] for _, parsed, error in parsed_chunk
+            if error is None and parsed["price"] is None
+        )
+
+        for line, parsed, error in parsed_chunk:
+            if error is None:
+                try:
+                    price = parsed["price"] if parsed["price"] is not None else prices.get(parsed["symbol"])
+                    yield {"line": line, **calculate(parsed, price)}
+                    continue
+                except ValueError as e:
+                    error = e
+            yield {"line": line, "id": parsed.get("id", ""), "symbol": parsed.get("symbol", ""),
+                   "error": str(error)}
+
+
+def write_csv(results: Iterable[dict], out: TextIO) -> tuple[int, int]:
+    """Write results as CSV. Returns (rows, errors)."""
+    writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS, restval="", lineterminator="\n")
+    writer.writeheader()
+    rows = errors = 0
+    for result in results:
+        writer.writerow(result)
+        rows += 1
+        errors += bool(result["error"])
+    return rows, errors
+
+
+def write_jsonl(results: Iterable[dict], out: TextIO) -> tuple[int, int]:
+    """Write results as JSON lines. Returns (rows, errors)."""
+    rows = errors = 0
+    for result in results:
+        out.write(json.dumps(result) + "\n")
+        rows += 1
+        errors += bool(result["error"])
+    return rows, errors
+
+
+def _guess_format(path: Optional[str], default: str = "csv") -> str:
+    if path and path.lower().endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    if path and path.lower().endswith(".csv"):
+        return "csv"
+    return default
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Batch entry point."""
+    parser = argparse.ArgumentParser(description="Calculate many crypto positions from CSV/JSONL.")
+    parser.add_argument("input", nargs="?", default="-", help="Input file ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Output file ('-' for stdout)")
+    parser.add_argument("--input-format", choices=["csv", "jsonl"], help="Default: from file extension, else csv")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], help="Default: same as input")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per price-lookup chunk")
+    parser.add_argument("--fixed", action="store_true",
+                        help="Round prices and sizes to exchange tick/lot sizes (crypto_fixed.py)")
+    parser.add_argument("--journal", metavar="DIR",
+                        help="Append each calculated row to this journal (default: $CRYPTO_JOURNAL)")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="Give up on price lookups this long after the batch starts")
+    parser.add_argument("--allow-stale", action="store_true",
+                        help="If the price API is down, use the last known prices instead of erroring")
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format or _guess_format(None if args.input == "-" else args.input)
+    output_format = args.output_format or _guess_format(
+        None if args.output == "-" else args.output, input_format
+    )
+
+    journal = open_journal(args.journal)
+    source = sink = None
+    prices = PriceMemo(functools.partial(fetch_crypto_prices, allow_stale=args.allow_stale))
+    try:
+        source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+        sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+        rows = iter_jsonl_rows(source) if input_format == "jsonl" else iter_csv_rows(source)
+        results = process_rows(rows, prices, chunk_size=args.chunk_size,
+                               calculate=calculate_fixed_row if args.fixed else calculate_row)
+        if journal is not None:
+            results = journal.tee(results, source="batch")
+        writer = write_jsonl if output_format == "jsonl" else write_csv
+        with deadline(args.deadline):
+            total, errors = writer(results, sink)
+    except OSError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if source not in (None, sys.stdin):
+            source.close()
+        if sink not in (None, sys.stdout):
+            sink.close()
+        if journal is not None:
+            journal.close()
+
+    if prices.stale:
+        stale = ", ".join(f"{symbol} ({format_age(age)} old)" for symbol, age in sorted(prices.stale.items()))
+        print(f"⚠️  API unavailable, used STALE prices: {stale}", file=sys.stderr)
+    print(f"✅ {total} row(s) processed, {errors} error(s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
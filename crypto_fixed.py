@@ -0,0 +1,319 @@
+"""
+crypto_fixed.py
+Exact fixed-point pricing: prices, sizes and percentages as scaled integers.
+
+The float calculators put a 7% stop below 3001.7 at 2791.5809999999997;
+an exchange wants a price on its tick grid (2791.59 on a 0.01 tick). Here
+every quantity is an integer count of its increment:
+
+  - prices       ticks of the asset's tick size (0.01 for BTC)
+  - sizes        lots of the asset's lot size (0.00001 BTC)
+  - amounts      QUOTE_SCALE units per quote currency unit (micro-dollars)
+  - percentages  PERCENT_SCALE units per 1%
+
+so stop loss, take profit and position size are computed with integer
+arithmetic only and rounded to valid increments, always conservatively:
+
+  - stop loss rounds up (towards entry, never a larger loss than asked)
+  - take profit rounds down (towards entry, a target the market can fill)
+  - position size rounds down (never more than the buying power)
+
+and each of SL/TP stays at least one tick away from the entry price.
+
+calculate_fixed handles one position with Python ints; fixed_grid does the
+same over NumPy int64 arrays (falling back to exact object arrays when
+any intermediate product could overflow int64), so there is no decimal.Decimal in the hot path.
+
+Usage:
+    calculate_fixed("BTC", 45000, 1000, stop_loss_percent=5, profit_target_percent=10)
+    python crypto_batch.py positions.csv --fixed
+"""
+
+from __future__ import annotations
+
+import math
+from fractions import Fraction
+from typing import Union
+
+from crypto_leverage import _optional
+
+# Amount and percentage scales (see module docstring)
+QUOTE_SCALE = 10**6
+PERCENT_SCALE = 10**4
+_HUNDRED_PERCENT = 100 * PERCENT_SCALE
+
+_INT64_MAX = 2**63 - 1
+
+
+class AssetSpec:
+    """Exchange increments for one asset: price tick size and order lot size."""
+
+    __slots__ = ("tick_size", "lot_size", "_lot_factor")
+
+    def __init__(self, tick_size: Union[str, int], lot_size: Union[str, int]) -> None:
+        self.tick_size = _increment(tick_size, "tick size")
+        self.lot_size = _increment(lot_size, "lot size")
+        # lots = amount_units * leverage * _lot_factor / ticks, exactly
+        self._lot_factor = 1 / (QUOTE_SCALE * self.tick_size * self.lot_size)
+
+    def __repr__(self) -> str:
+        return f"AssetSpec(tick_size={str(self.tick_size)!r}, lot_size={str(self.lot_size)!r})"
+
+    def to_ticks(self, price: float) -> int:
+        """Nearest whole tick to a float price."""
+        if not math.isfinite(price):
+            raise ValueError("Invalid price: must be finite")
+        ticks = round(price * self.tick_size.denominator / self.tick_size.numerator)
+        if ticks <= 0:
+            raise ValueError(f"Price {price} is below the tick size {self.tick_size}")
+        return ticks
+
+    def price(self, ticks):
+        """Ticks back to a price: the float closest to the exact decimal value."""
+        return ticks * self.tick_size.numerator / self.tick_size.denominator
+
+    def size(self, lots):
+        """Lots back to a position size: the float closest to the exact decimal value."""
+        return lots * self.lot_size.numerator / self.lot_size.denominator
+
+
+def _increment(value: Union[str, int], name: str) -> Fraction:
+    """Parse a positive decimal increment given as a string (not a float)."""
+    if isinstance(value, float):
+        raise ValueError(f"Invalid {name}: give {value!r} as a string, e.g. '0.01'")
+    try:
+        increment = Fraction(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value!r}")
+    if increment <= 0:
+        raise ValueError(f"Invalid {name}: must be positive")
+    return increment
+
+
+# Tick and lot sizes for SYMBOL_MAP assets, in the quote currency (USD)
+ASSET_SPECS = {
+    "BTC": AssetSpec("0.01", "0.00001"),
+    "ETH": AssetSpec("0.01", "0.0001"),
+    "SOL": AssetSpec("0.001", "0.01"),
+    "ADA": AssetSpec("0.0001", "1"),
+    "XRP": AssetSpec("0.0001", "1"),
+    "DOT": AssetSpec("0.001", "0.01"),
+    "DOGE": AssetSpec("0.00001", "1"),
+    "MATIC": AssetSpec("0.0001", "1"),
+    "AVAX": AssetSpec("0.001", "0.01"),
+    "ARB": AssetSpec("0.0001", "0.1"),
+    "OP": AssetSpec("0.0001", "0.01"),
+    "LINK": AssetSpec("0.001", "0.01"),
+    "UNI": AssetSpec("0.001", "0.01"),
+    "AAVE": AssetSpec("0.01", "0.001"),
+    "LTC": AssetSpec("0.01", "0.001"),
+    "BCH": AssetSpec("0.01", "0.001"),
+}
+
+# Fine enough for any listed price; used for symbols without their own spec
+DEFAULT_SPEC = AssetSpec("0.00000001", "0.0001")
+
+
+def get_spec(asset: Union[str, AssetSpec]) -> AssetSpec:
+    """AssetSpec for a symbol (DEFAULT_SPEC if unlisted), or the spec itself."""
+    if isinstance(asset, AssetSpec):
+        return asset
+    return ASSET_SPECS.get(asset.upper(), DEFAULT_SPEC)
+
+
+def to_percent_units(percent: float) -> int:
+    return round(percent * PERCENT_SCALE)
+
+
+def to_quote_units(amount: float) -> int:
+    return round(amount * QUOTE_SCALE)
+
+
+def fixed_stop_loss(entry_ticks: int, stop_loss_units: int) -> int:
+    """entry × (1 - SL%), rounded up to a tick and at least one tick below entry."""
+    ticks = -(-entry_ticks * (_HUNDRED_PERCENT - stop_loss_units) // _HUNDRED_PERCENT)
+    return min(ticks, entry_ticks - 1)
+
+
+def fixed_take_profit(entry_ticks: int, profit_units: int) -> int:
+    """entry × (1 + TP%), rounded down to a tick and at least one tick above entry."""
+    ticks = entry_ticks * (_HUNDRED_PERCENT + profit_units) // _HUNDRED_PERCENT
+    return max(ticks, entry_ticks + 1)
+
+
+def _whole_leverage(leverage) -> int:
+    """Leverage as an int; fractional or non-finite leverage is an error, not truncated."""
+    try:
+        whole = int(leverage)
+    except (OverflowError, ValueError):
+        raise ValueError(f"Invalid leverage {leverage!r}: must be a whole number")
+    if whole != leverage:
+        raise ValueError(f"Invalid leverage {leverage!r}: must be a whole number")
+    return whole
+
+
+def _check_inputs(price: float, investment: float, stop_loss_percent: float, profit_target_percent: float) -> None:
+    """Finite inputs, positive investment and profit target, stop loss strictly between 0 and 100%."""
+    for name, value in (("price", price), ("investment amount", investment),
+                        ("stop loss", stop_loss_percent), ("profit target", profit_target_percent)):
+        if not math.isfinite(value):
+            raise ValueError(f"Invalid {name}: must be finite")
+    if investment <= 0:
+        raise ValueError(f"Invalid investment amount {investment}: must be positive")
+    if not 0 < stop_loss_percent < 100:
+        raise ValueError(f"Invalid stop loss {stop_loss_percent}: must be between 0 and 100%")
+    if profit_target_percent <= 0:
+        raise ValueError(f"Invalid profit target {profit_target_percent}: must be positive")
+
+
+def fixed_position_size(spec: AssetSpec, entry_ticks: int, investment_units: int, leverage: int = 10) -> int:
+    """(investment × leverage) / entry, rounded down to whole lots."""
+    factor = spec._lot_factor
+    return investment_units * _whole_leverage(leverage) * factor.numerator // (entry_ticks * factor.denominator)
+
+
+def calculate_fixed(
+    asset: Union[str, AssetSpec],
+    current_price: float,
+    investment_amount: float,
+    stop_loss_percent: float,
+    profit_target_percent: float,
+    leverage: int = 10,
+) -> dict:
+    """
+    Size one position and its SL/TP on exchange increments.
+
+    Returns dict with the integer results (entry_ticks, stop_loss_ticks,
+    take_profit_ticks, size_lots) and the same values as floats
+    (entry_price, stop_loss_price, take_profit_price, position_size),
+    plus effective_capital and risk_reward from the rounded prices.
+
+    Raises:
+        ValueError: If an input is not finite, investment or profit target is
+                    not positive, stop loss is not between 0 and 100%,
+                    leverage is fractional or the price rounds to zero ticks
+    """
+    _check_inputs(current_price, investment_amount, stop_loss_percent, profit_target_percent)
+    leverage = _whole_leverage(leverage)
+    spec = get_spec(asset)
+    entry = spec.to_ticks(current_price)
+    stop_loss = fixed_stop_loss(entry, to_percent_units(stop_loss_percent))
+    take_profit = fixed_take_profit(entry, to_percent_units(profit_target_percent))
+    lots = fixed_position_size(spec, entry, to_quote_units(investment_amount), leverage)
+    return {
+        "entry_ticks": entry,
+        "stop_loss_ticks": stop_loss,
+        "take_profit_ticks": take_profit,
+        "size_lots": lots,
+        "entry_price": spec.price(entry),
+        "stop_loss_price": spec.price(stop_loss),
+        "take_profit_price": spec.price(take_profit),
+        "position_size": spec.size(lots),
+        "effective_capital": investment_amount * leverage,
+        "risk_reward": (take_profit - entry) / (entry - stop_loss),
+    }
+
+
+def fixed_grid(
+    asset: Union[str, AssetSpec],
+    current_price,
+    investment_amount,
+    stop_loss_percent,
+    profit_target_percent,
+    leverage=10,
+) -> dict:
+    """
+    Vectorized calculate_fixed. Arguments broadcast like calculate_grid.
+
+    Returns dict of arrays (all of the broadcast shape): int64 entry_ticks,
+    stop_loss_ticks, take_profit_ticks and size_lots, and float64
+    entry_price, stop_loss_price, take_profit_price and position_size.
+    Every element equals calculate_fixed for the same inputs. If any
+    intermediate product could exceed int64, the integer columns are
+    object arrays of Python ints instead, so results stay exact.
+
+    Raises:
+        ValueError: If numpy is not installed, or for any input
+                    calculate_fixed rejects
+    """
+    np = _optional("np")
+    if np is None:
+        raise ValueError(
+            "numpy library not installed. "
+            "Install with: pip install numpy"
+        )
+    spec = get_spec(asset)
+    tick, factor = spec.tick_size, spec._lot_factor
+
+    price, investment, sl_percent, tp_percent, lev = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (
+            current_price, investment_amount, stop_loss_percent, profit_target_percent, leverage,
+        ))
+    )
+    for name, values in (("price", price), ("investment amount", investment), ("stop loss", sl_percent),
+                         ("profit target", tp_percent), ("leverage", lev)):
+        if not np.isfinite(values).all():
+            raise ValueError(f"Invalid {name}: must be finite")
+    fractional = lev != np.floor(lev)
+    if fractional.any():
+        raise ValueError(f"Invalid leverage {lev.flat[int(fractional.argmax())]}: must be a whole number")
+    for values, bad, message in ((investment, investment <= 0, "Invalid investment amount {}: must be positive"),
+                                 (sl_percent, (sl_percent <= 0) | (sl_percent >= 100),
+                                  "Invalid stop loss {}: must be between 0 and 100%"),
+                                 (tp_percent, tp_percent <= 0, "Invalid profit target {}: must be positive")):
+        if bad.any():
+            raise ValueError(message.format(values.flat[int(bad.argmax())]))
+
+    # Scaled inputs as rounded floats, so their bounds are checked before any int64 math
+    entry_f = np.rint(price * tick.denominator / tick.numerator)
+    if entry_f.size and entry_f.min() <= 0:
+        raise ValueError(f"Price {price.flat[int(entry_f.argmin())]} is below the tick size {tick}")
+    sl_f = np.rint(sl_percent * PERCENT_SCALE)
+    tp_f = np.rint(tp_percent * PERCENT_SCALE)
+    investment_f = np.rint(investment * QUOTE_SCALE)
+
+    if not entry_f.size or _fits_int64(entry_f, sl_f, tp_f, investment_f, lev, factor):
+        entry = entry_f.astype(np.int64)
+        sl_units, tp_units = sl_f.astype(np.int64), tp_f.astype(np.int64)
+        budget = investment_f.astype(np.int64) * lev.astype(np.int64)
+        lots = budget * factor.numerator // (entry * factor.denominator)
+        size = spec.size(lots)
+    else:
+        # Python ints in object arrays stay exact where int64 would wrap (just slower)
+        entry, sl_units, tp_units, investment_units, leverages = (
+            np.array([int(v) for v in values.flat], dtype=object).reshape(values.shape)
+            for values in (entry_f, sl_f, tp_f, investment_f, lev)
+        )
+        lots = investment_units * leverages * factor.numerator // (entry * factor.denominator)
+        size = _floats(np, spec.size, lots)
+
+    stop_loss = np.minimum(-(-entry * (_HUNDRED_PERCENT - sl_units) // _HUNDRED_PERCENT), entry - 1)
+    take_profit = np.maximum(entry * (_HUNDRED_PERCENT + tp_units) // _HUNDRED_PERCENT, entry + 1)
+
+    return {
+        "entry_ticks": entry,
+        "stop_loss_ticks": stop_loss,
+        "take_profit_ticks": take_profit,
+        "size_lots": lots,
+        "entry_price": _floats(np, spec.price, entry),
+        "stop_loss_price": _floats(np, spec.price, stop_loss),
+        "take_profit_price": _floats(np, spec.price, take_profit),
+        "position_size": size,
+    }
+
+
+def _fits_int64(entry_f, sl_f, tp_f, investment_f, lev, factor: Fraction) -> bool:
+    """True if every intermediate product in fixed_grid stays within int64."""
+    def bound(values) -> int:
+        return max(abs(int(values.min())), abs(int(values.max())))
+
+    entry, budget = bound(entry_f), bound(investment_f) * bound(lev)
+    percent = _HUNDRED_PERCENT + max(bound(sl_f), bound(tp_f))
+    return max(entry * percent, budget * factor.numerator, entry * factor.denominator) <= _INT64_MAX
+
+
+def _floats(np, convert, values):
+    """spec.price / spec.size over an int64 array, or element-wise over Python ints."""
+    if values.dtype == object:
+        return np.array([convert(n) for n in values.flat], dtype=np.float64).reshape(values.shape)
+    return convert(values)
@@ -0,0 +1,255 @@
+"""
+crypto_fx.py
+Quote currencies and FX cross rates for multi-currency pricing.
+
+CoinGecko quotes every coin in any number of vs_currencies per request, so
+asset prices and FX rates come from the same call: a coin priced at
+$50,000 and €46,000 says one EUR is worth 50000 / 46000 USD. Stablecoins
+(USDT, USDC) are not vs_currencies; they are requested as coins and their
+USD price is their value.
+
+FXMatrix holds each currency's value in USD and the cross-rate matrix
+derived from it (rate[i, j] = units of j per unit of i), so converting any
+number of amounts between currencies is one NumPy gather, with no request
+per currency. FXCache keeps the latest matrix for `ttl` seconds.
+
+Usage:
+    prices, fx = fetch_quotes(["BTC", "ETH"], ["usd", "eur", "gbp", "usdt"])
+    fx.convert(1000, "eur", "usd")
+    calculate_position(prices["BTC"][0], 1000, investment_currency="eur", fx=fx)
+    calculate_grid(prices, amounts, 5, 10, investment_currency=desk_currencies, fx=fx)
+"""
+
+from __future__ import annotations
+
+import math
+import statistics
+import threading
+import time
+from typing import Callable, Iterable, Mapping, Optional
+
+import crypto_metrics
+from crypto_leverage import _extract_prices, _optional, _price_params, _request_price_data, _resolve_symbol
+
+
+CURRENCIES = ("usd", "eur", "gbp", "usdt")
+
+# Stablecoins priced as coins (CoinGecko has no vs_currency for them)
+STABLECOINS = {"usdt": "tether", "usdc": "usd-coin"}
+
+# Coin quoted in every fiat currency when a request has no other asset
+_REFERENCE_ID = "bitcoin"
+
+
+class FXMatrix:
+    """Cross rates between currencies, from each currency's value in USD."""
+
+    __slots__ = ("currencies", "fetched_at", "_index", "_usd_values", "_matrix")
+
+    def __init__(self, usd_values: Mapping[str, float], fetched_at: float = 0.0) -> None:
+        """
+        Args:
+            usd_values: Currency code -> USD value of one unit (USD itself is 1)
+            fetched_at: When the rates were fetched (time.time())
+        """
+        values = {"usd": 1.0}
+        for currency, value in usd_values.items():
+            value = float(value)
+            if not (value > 0 and math.isfinite(value)):
+                raise ValueError(f"Invalid FX rate for {currency.upper()}: {value}")
+            values[currency.lower()] = value
+        self.currencies = tuple(values)
+        self.fetched_at = fetched_at
+        self._index = {currency: i for i, currency in enumerate(self.currencies)}
+        self._usd_values = values
+        self._matrix = None
+
+    def __contains__(self, currency: str) -> bool:
+        return currency.lower() in self._index
+
+    def __repr__(self) -> str:
+        return f"FXMatrix({self._usd_values!r})"
+
+    def _key(self, currency: str) -> str:
+        key = currency.lower()
+        if key not in self._index:
+            raise ValueError(
+                f"No FX rate for {currency.upper()}.\n"
+                f"Available: {', '.join(c.upper() for c in self.currencies)}"
+            )
+        return key
+
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        """Units of to_currency per unit of from_currency."""
+        return self._usd_values[self._key(from_currency)] / self._usd_values[self._key(to_currency)]
+
+    def convert(self, amount: float, from_currency: str, to_currency: str) -> float:
+        return amount * self.rate(from_currency, to_currency)
+
+    @property
+    def matrix(self):
+        """rate[i, j] for currencies[i] -> currencies[j], as a float64 array (needs NumPy)."""
+        if self._matrix is None:
+            np = _numpy()
+            values = np.array([self._usd_values[c] for c in self.currencies], dtype=np.float64)
+            self._matrix = values[:, None] / values[None, :]
+        return self._matrix
+
+    def rates(self, from_currencies, to_currency: str):
+        """
+        Vectorized rate(): an array of currency codes to one target currency.
+
+        Each distinct code is resolved once, then every element is a gather
+        from the matrix column. Elements equal rate() exactly.
+        """
+        np = _numpy()
+        codes = np.char.lower(np.asarray(from_currencies, dtype=str))
+        distinct, inverse = np.unique(codes, return_inverse=True)
+        rows = np.array([self._index[self._key(code)] for code in distinct.tolist()], dtype=np.intp)
+        column = self.matrix[:, self._index[self._key(to_currency)]]
+        return column[rows][inverse].reshape(codes.shape)
+
+    def convert_many(self, amounts, from_currencies, to_currency: str):
+        """amounts[i] in from_currencies[i] (broadcast) converted to to_currency."""
+        np = _numpy()
+        return np.asarray(amounts, dtype=np.float64) * self.rates(from_currencies, to_currency)
+
+
+def _numpy():
+    np = _optional("np")
+    if np is None:
+        raise ValueError(
+            "numpy library not installed. "
+            "Install with: pip install numpy"
+        )
+    return np
+
+
+def _split_currencies(currencies: Iterable[str]) -> tuple[list[str], list[str]]:
+    """(vs_currencies to request, stablecoins to price as coins); USD always included."""
+    fiat, stable = ["usd"], []
+    for currency in currencies:
+        currency = currency.lower()
+        target = stable if currency in STABLECOINS else fiat
+        if currency not in target:
+            target.append(currency)
+    return fiat, stable
+
+
+def fx_from_prices(data: dict, currencies: Iterable[str], fetched_at: float = 0.0) -> FXMatrix:
+    """
+    Build an FXMatrix from a /simple/price response.
+
+    A fiat currency's USD value is usd_price / currency_price of the coins
+    quoted in both (the median over all of them, so one stale quote does not
+    skew it); a stablecoin's is its own USD price.
+
+    Raises:
+        ValueError: If a currency has no usable quote in the response
+    """
+    fiat, stable = _split_currencies(currencies)
+    usd_values = {}
+    for currency in fiat[1:]:
+        ratios = [
+            quote["usd"] / quote[currency]
+            for quote in data.values()
+            if quote.get("usd") and quote.get(currency)
+        ]
+        if not ratios:
+            raise ValueError(f"Could not fetch FX rate for {currency.upper()}")
+        usd_values[currency] = statistics.median(ratios)
+    for currency in stable:
+        quote = data.get(STABLECOINS[currency], {})
+        if not quote.get("usd"):
+            raise ValueError(f"Could not fetch FX rate for {currency.upper()}")
+        usd_values[currency] = quote["usd"]
+    return FXMatrix(usd_values, fetched_at)
+
+
+def fetch_quotes(
+    symbols: Iterable[str],
+    currencies: Iterable[str] = CURRENCIES,
+    url: Optional[str] = None,
+    timeout: float = 10,
+    cache: Optional["FXCache"] = None,
+) -> tuple[dict[str, tuple[float, str, str]], FXMatrix]:
+    """
+    Fetch USD prices for `symbols` and the FX matrix for `currencies` in one API call.
+
+    Returns:
+        ({symbol_upper: (usd_price, asset_name, symbol_upper)}, FXMatrix);
+        the matrix is also stored in `cache` when given
+
+    Raises:
+        ValueError: If the API fails, or a symbol or currency has no price
+    """
+    resolved = dict(_resolve_symbol(symbol) for symbol in symbols)
+    fiat, stable = _split_currencies(currencies)
+    gecko_ids = list(resolved.values()) + [STABLECOINS[c] for c in stable]
+
+    with crypto_metrics.track_fetch() as fetch_metrics:
+        data = _request_price_data(_price_params(gecko_ids or [_REFERENCE_ID], fiat), url, timeout, fetch_metrics)
+        prices = _extract_prices(data, resolved)
+        fx = fx_from_prices(data, fiat + stable, fetched_at=time.time())
+    if cache is not None:
+        cache.update(fx)
+    return prices, fx
+
+
+def fetch_fx(currencies: Iterable[str] = CURRENCIES, url: Optional[str] = None, timeout: float = 10) -> FXMatrix:
+    """Fetch just the FX matrix for `currencies` (one API call)."""
+    return fetch_quotes([], currencies, url=url, timeout=timeout)[1]
+
+
+class FXCache:
+    """The latest FXMatrix, refetched once it is older than `ttl` seconds."""
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        currencies: Iterable[str] = CURRENCIES,
+        fetcher: Callable[[list[str]], FXMatrix] = fetch_fx,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            ttl: Seconds a matrix is served before it is refetched
+            currencies: Currencies fetched on a miss (more are added on demand)
+            fetcher: currencies -> FXMatrix, same contract as fetch_fx
+            clock: Wall-clock source, compared with FXMatrix.fetched_at
+        """
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self.ttl = ttl
+        self._currencies = [c.lower() for c in currencies]
+        self._fetcher = fetcher
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._fx: Optional[FXMatrix] = None
+
+    def get(self, currencies: Iterable[str] = ()) -> FXMatrix:
+        """
+        The cached matrix, fetched again if it is stale or lacks one of `currencies`.
+
+        Raises:
+            ValueError: Propagated from the fetcher
+        """
+        with self._lock:
+            for currency in currencies:
+                if currency.lower() not in self._currencies:
+                    self._currencies.append(currency.lower())
+            fx = self._fx
+            if (fx is None or self._clock() - fx.fetched_at >= self.ttl
+                    or not all(c in fx for c in self._currencies)):
+                fx = self._fx = self._fetcher(list(self._currencies))
+            return fx
+
+    def update(self, fx: FXMatrix) -> None:
+        """Store a matrix fetched elsewhere (e.g. by fetch_quotes)."""
+        with self._lock:
+            if self._fx is None or fx.fetched_at >= self._fx.fetched_at:
+                self._fx = fx
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._fx = None
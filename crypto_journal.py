@@ -0,0 +1,357 @@
+"""
+crypto_journal.py
+Append-only journal of every calculation, for audit and analytics.
+
+Each calculation (interactive run or batch row) is one fixed-width binary
+record (journal_dtype()): timestamp, source, symbol, leverage, price,
+investment, SL/TP percentages and prices, position size, effective capital
+and risk/reward.
+
+Writing:
+  - records are packed with struct into an in-memory buffer and written
+    with one os.write per `buffer_records` records (and on flush/close)
+  - files are only ever appended to; every Journal writes its own segment
+    files (<first timestamp ns>-<pid>-<n>.journal), rolling over every
+    `segment_records` records, so concurrent writers never share a file
+    and timestamps inside a segment never go backwards
+  - writing needs no NumPy
+
+Reading:
+  - JournalReader memory-maps each segment as a structured NumPy array, so
+    columns are read straight from the page cache without parsing
+  - time ranges are found with a binary search per segment; segments that
+    start after the range are skipped unopened
+  - a torn record at the end of a segment (a crash mid-write) is ignored
+
+Usage:
+    with Journal("journal/") as journal:
+        journal.record(row, source="batch")
+
+    reader = JournalReader("journal/")
+    reader.columns(["symbol", "risk_reward"], start_ns=..., end_ns=...)
+    reader.summary()
+
+    python crypto_journal.py journal/ --since 2026-01-01 --symbol BTC
+    CRYPTO_JOURNAL=journal/ python crypto_leverage.py   # journal interactive runs
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Mapping, Optional
+
+from crypto_leverage import _optional
+
+# Directory journaled by crypto_leverage.py main (and the batch default)
+JOURNAL_ENV = "CRYPTO_JOURNAL"
+
+SOURCES = ("interactive", "batch", "server", "api")
+
+SEGMENT_SUFFIX = ".journal"
+
+VALUE_FIELDS = (
+    "price",
+    "investment_amount",
+    "stop_loss_percent",
+    "profit_target_percent",
+    "position_size",
+    "effective_capital",
+    "stop_loss_price",
+    "take_profit_price",
+    "risk_reward",
+)
+
+# timestamp (ns since epoch), symbol (ASCII, NUL padded), leverage, source
+# index, 3 pad bytes so the float64 columns are 8-byte aligned
+_RECORD = struct.Struct("<q16sIB3x" + "d" * len(VALUE_FIELDS))
+
+_DTYPE_SPEC = {
+    "names": ["timestamp", "symbol", "leverage", "source", *VALUE_FIELDS],
+    "formats": ["<i8", "S16", "<u4", "u1"] + ["<f8"] * len(VALUE_FIELDS),
+    "offsets": [0, 8, 24, 28] + [32 + 8 * i for i in range(len(VALUE_FIELDS))],
+    "itemsize": _RECORD.size,
+}
+
+RECORD_SIZE = _RECORD.size
+_FIRST_TIMESTAMP = struct.Struct("<q")
+
+
+def journal_dtype():
+    """The NumPy structured dtype of one record (same layout as the writer's struct)."""
+    return _numpy().dtype(_DTYPE_SPEC)
+
+
+def _numpy():
+    np = _optional("np")
+    if np is None:
+        raise ValueError(
+            "numpy library not installed. "
+            "Install with: pip install numpy"
+        )
+    return np
+
+
+class Journal:
+    """Buffered, append-only writer of calculation records."""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_records: int = 1_000_000,
+        buffer_records: int = 1024,
+    ) -> None:
+        """
+        Args:
+            directory: Journal directory (created if missing)
+            segment_records: Records per segment file before rolling over
+            buffer_records: Records buffered in memory per write
+        """
+        if segment_records <= 0 or buffer_records <= 0:
+            raise ValueError("segment_records and buffer_records must be positive")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_records = segment_records
+        self.buffer_records = buffer_records
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._fd: Optional[int] = None
+        self._segment_count = 0
+        self._last_ns = 0
+        self.records = 0
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def record(self, row: Mapping, source: str = "interactive", timestamp_ns: Optional[int] = None) -> None:
+        """
+        Append one calculation.
+
+        `row` needs symbol, leverage and the VALUE_FIELDS keys (a batch
+        result row, or the interactive calculator's values).
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        # Never go backwards inside a segment (the reader binary-searches time)
+        if timestamp_ns < self._last_ns:
+            timestamp_ns = self._last_ns
+        self._last_ns = timestamp_ns
+        self._buffer += _RECORD.pack(
+            timestamp_ns,
+            str(row["symbol"]).encode("ascii", "replace")[:16],
+            int(row.get("leverage", 10)),
+            SOURCES.index(source),
+            *(float(row[name]) for name in VALUE_FIELDS),
+        )
+        self._buffered += 1
+        self.records += 1
+        if self._buffered >= self.buffer_records:
+            self.flush()
+
+    def tee(self, rows: Iterable[dict], source: str = "batch") -> Iterator[dict]:
+        """Pass rows through, journaling each one without an error."""
+        for row in rows:
+            if not row.get("error"):
+                self.record(row, source)
+            yield row
+
+    def flush(self) -> None:
+        """Write buffered records (split at segment boundaries)."""
+        offset = 0
+        while self._buffered:
+            if self._fd is None or self._segment_count >= self.segment_records:
+                self._open_segment(_FIRST_TIMESTAMP.unpack_from(self._buffer, offset)[0])
+            count = min(self._buffered, self.segment_records - self._segment_count)
+            end = offset + count * RECORD_SIZE
+            while offset < end:
+                offset += os.write(self._fd, self._buffer[offset:end])
+            self._segment_count += count
+            self._buffered -= count
+        self._buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _open_segment(self, first_ns: int) -> None:
+        """Start a new segment, named after its first record's timestamp."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        for attempt in itertools.count():
+            name = f"{first_ns:020d}-{os.getpid()}-{attempt}{SEGMENT_SUFFIX}"
+            try:
+                self._fd = os.open(os.path.join(self.directory, name),
+                                   os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+                break
+            except FileExistsError:
+                continue
+        self._segment_count = 0
+
+
+def open_journal(directory: Optional[str] = None, **kwargs) -> Optional[Journal]:
+    """A Journal for `directory` or $CRYPTO_JOURNAL; None if neither is set."""
+    directory = directory or os.environ.get(JOURNAL_ENV)
+    return Journal(directory, **kwargs) if directory else None
+
+
+class JournalReader:
+    """Memory-mapped, read-only view of a journal directory."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def segments(self) -> list[str]:
+        """Segment paths, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in sorted(names) if name.endswith(SEGMENT_SUFFIX)]
+
+    def segment(self, path: str):
+        """One segment as a structured array (memory-mapped; empty if it has no whole record yet)."""
+        np = _numpy()
+        count = os.path.getsize(path) // RECORD_SIZE
+        if not count:
+            return np.empty(0, dtype=journal_dtype())
+        return np.memmap(path, dtype=journal_dtype(), mode="r", shape=(count,))
+
+    def __len__(self) -> int:
+        return sum(os.path.getsize(path) // RECORD_SIZE for path in self.segments())
+
+    def scan(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> Iterator:
+        """
+        Yield the records in [start_ns, end_ns) segment by segment, as
+        memory-mapped slices (nothing is copied).
+        """
+        np = _numpy()
+        for path in self.segments():
+            if end_ns is not None and int(os.path.basename(path).split("-", 1)[0]) >= end_ns:
+                continue
+            records = self.segment(path)
+            if not len(records):
+                continue
+            timestamps = records["timestamp"]
+            lo = 0 if start_ns is None else int(np.searchsorted(timestamps, start_ns, side="left"))
+            hi = len(records) if end_ns is None else int(np.searchsorted(timestamps, end_ns, side="left"))
+            if lo < hi:
+                yield records[lo:hi]
+
+    def columns(
+        self,
+        fields: Iterable[str],
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        symbol: Optional[str] = None,
+    ) -> dict:
+        """Selected columns over a time range (optionally one symbol), concatenated."""
+        np = _numpy()
+        fields = list(fields)
+        parts = {name: [] for name in fields}
+        for records in self.scan(start_ns, end_ns):
+            if symbol is not None:
+                records = records[records["symbol"] == symbol.upper().encode()]
+            for name in fields:
+                parts[name].append(records[name])
+        dtype = journal_dtype()
+        return {
+            name: np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype[name])
+            for name, chunks in parts.items()
+        }
+
+    def summary(
+        self,
+        start_ns: Optional[int] = None,
+        end_ns: Optional[int] = None,
+        symbol: Optional[str] = None,
+    ) -> dict[str, dict]:
+        """
+        Per-symbol aggregates: calculations, total investment and effective
+        capital, mean stop loss / take profit percentages and risk/reward,
+        first and last timestamp.
+        """
+        np = _numpy()
+        data = self.columns(
+            ["timestamp", "symbol", "investment_amount", "effective_capital",
+             "stop_loss_percent", "profit_target_percent", "risk_reward"],
+            start_ns, end_ns, symbol,
+        )
+        if not len(data["symbol"]):
+            return {}
+        symbols, inverse, counts = np.unique(data["symbol"], return_inverse=True, return_counts=True)
+
+        def total(name):
+            return np.bincount(inverse, weights=data[name], minlength=len(symbols))
+
+        first = np.full(len(symbols), np.iinfo(np.int64).max)
+        last = np.full(len(symbols), np.iinfo(np.int64).min)
+        np.minimum.at(first, inverse, data["timestamp"])
+        np.maximum.at(last, inverse, data["timestamp"])
+        investment, capital = total("investment_amount"), total("effective_capital")
+        stop_loss, take_profit, risk_reward = total("stop_loss_percent"), total("profit_target_percent"), \
+            total("risk_reward")
+        return {
+            name.decode(): {
+                "calculations": int(counts[i]),
+                "total_investment": float(investment[i]),
+                "total_effective_capital": float(capital[i]),
+                "mean_stop_loss_percent": float(stop_loss[i] / counts[i]),
+                "mean_profit_target_percent": float(take_profit[i] / counts[i]),
+                "mean_risk_reward": float(risk_reward[i] / counts[i]),
+                "first_ns": int(first[i]),
+                "last_ns": int(last[i]),
+            }
+            for i, name in enumerate(symbols.tolist())
+        }
+
+
+def _parse_time(value: str) -> int:
+    """ISO date/time (UTC unless it has an offset) -> ns since epoch."""
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date/time: {value!r} (use e.g. 2026-01-31 or 2026-01-31T12:00)")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1_000_000_000)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Journal entry point: per-symbol summary over a time range."""
+    parser = argparse.ArgumentParser(description="Summarize the calculation journal.")
+    parser.add_argument("directory", nargs="?", default=os.environ.get(JOURNAL_ENV),
+                        help=f"Journal directory (default: ${JOURNAL_ENV})")
+    parser.add_argument("--since", type=_parse_time, help="Start (inclusive), ISO date/time, UTC")
+    parser.add_argument("--until", type=_parse_time, help="End (exclusive), ISO date/time, UTC")
+    parser.add_argument("--symbol", help="Only this symbol")
+    args = parser.parse_args(argv)
+    if not args.directory:
+        parser.error(f"give a journal directory or set ${JOURNAL_ENV}")
+
+    reader = JournalReader(args.directory)
+    summary = reader.summary(args.since, args.until, args.symbol)
+    print("\n" + "=" * 78)
+    print(f"📒 JOURNAL  {args.directory}  ({len(reader.segments())} segment(s), {len(reader):,} record(s))")
+    print("=" * 78)
+    if not summary:
+        print("  No calculations in range.")
+    for symbol, stats in summary.items():
+        last = datetime.fromtimestamp(stats["last_ns"] / 1e9, timezone.utc).strftime("%Y-%m-%d %H:%M")
+        print(f"  {symbol:<8} {stats['calculations']:>9,} calc  invested ${stats['total_investment']:>16,.2f}  "
+              f"SL {stats['mean_stop_loss_percent']:>5.2f}%  TP {stats['mean_profit_target_percent']:>5.2f}%  "
+              f"R:R {stats['mean_risk_reward']:>5.2f}  last {last}")
+    print("=" * 78 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,17 +16,35 @@ Calculates and displays with formulas:
 
 Usage:
     python crypto_leverage.py
+    python crypto_leverage.py --monitor positions.json [--ticks FILE]
+    python crypto_leverage.py --batch positions.csv [-o results.csv]
+    python crypto_leverage.py --serve [--port 8080]
+    CRYPTO_JOURNAL=journal/ python crypto_leverage.py   # journal each calculation
+    CRYPTO_RATE_LIMIT=/tmp/crypto-rate python crypto_leverage.py   # share one API budget
 """
 
 from __future__ import annotations
 
+import os
 import sys
-from typing import Optional
-
-try:
-    import requests
-except ImportError:
-    requests = None  # type: ignore
+import time
+from typing import Mapping, Optional
+
+import crypto_metrics
+from crypto_metrics import instrument
+from crypto_resilience import (
+    STALE_QUOTES,
+    CircuitOpenError,
+    DeadlineExceeded,
+    StaleQuote,
+    breaker_for,
+    deadline,
+    format_age,
+    is_stale,
+    is_upstream_failure,
+    request_timeout,
+)
+from optional_imports import lazy_modules
 
 
 # Mapping of common crypto symbols to CoinGecko IDs
@@ -61,68 +79,316 @@ def validate_positive_number(value: str, name: str) -> float:
         raise ValueError(f"Invalid {name}: {e}")
 
 
-def fetch_crypto_price(symbol: str) -> tuple[float, str, str]:
+# Heavy optional dependencies, imported on first use so that math-only
+# imports stay fast; exposed as module attributes via __getattr__.
+_OPTIONAL_MODULES = {"requests": "requests", "np": "numpy"}
+_optional, __getattr__ = lazy_modules(globals(), _OPTIONAL_MODULES)
+
+
+# CoinGecko simple price endpoint (accepts a comma-separated list of ids)
+COINGECKO_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+
+# Directory of the machine-wide rate limiter state (see crypto_ratelimit);
+# when set, default price fetches share one request budget across processes
+RATE_LIMIT_ENV = "CRYPTO_RATE_LIMIT"
+
+# Per-request timeout when the caller sets none (capped by any deadline())
+DEFAULT_TIMEOUT = 10.0
+
+# Seconds select_crypto_asset waits for a price before degrading
+INTERACTIVE_DEADLINE = 5.0
+
+# (currency, symbol_upper) -> (price, asset_name, symbol_upper, fetched_at) of
+# the last successful fetch, served as StaleQuote in degraded mode
+_last_known: dict[tuple[str, str], tuple[float, str, str, float]] = {}
+
+# Shared keep-alive HTTP session, created on first fetch
+_session = None
+
+
+def _get_session():
+    """Return the shared requests.Session so connections are reused."""
+    global _session
+    if _session is None:
+        _session = _optional("requests").Session()
+    return _session
+
+
+def _resolve_symbol(symbol: str) -> tuple[str, str]:
     """
-    Fetch real-time crypto price from CoinGecko API.
-    
+    Map a crypto symbol to its CoinGecko ID.
+
+    Returns:
+        Tuple of (symbol_upper, gecko_id)
+
+    Symbols outside SYMBOL_MAP are looked up in the cached CoinGecko coin
+    list (crypto_symbols.py), which is only loaded on such a miss.
+
+    Raises:
+        ValueError: If the symbol is not in SYMBOL_MAP or the symbol index
+    """
+    symbol_upper = symbol.upper()
+
+    if symbol_upper in SYMBOL_MAP:
+        return symbol_upper, SYMBOL_MAP[symbol_upper]
+
+    import crypto_symbols  # lazy: only needed for symbols outside SYMBOL_MAP
+
+    gecko_id = crypto_symbols.lookup_symbol(symbol_upper)
+    if gecko_id is not None:
+        return symbol_upper, gecko_id
+
+    index = crypto_symbols.get_index()
+    suggestions = index.fuzzy(symbol_upper) if index is not None else []
+    if suggestions:
+        available = ", ".join(entry[0] for entry in suggestions)
+        raise ValueError(
+            f"Asset '{symbol}' not found.\n"
+            f"Did you mean: {available}"
+        )
+    available = ", ".join(sorted(SYMBOL_MAP.keys()))
+    raise ValueError(
+        f"Asset '{symbol}' not found.\n"
+        f"Available: {available}"
+    )
+
+
+def _price_params(gecko_ids, currencies=("usd",)) -> dict[str, str]:
+    """Query parameters for a /simple/price request, quoted in every one of `currencies`."""
+    return {
+        "ids": ",".join(sorted(set(gecko_ids))),
+        "vs_currencies": ",".join(currencies),
+        "include_market_cap": "false",
+        "include_24hr_vol": "false",
+    }
+
+
+def _extract_prices(
+    data: dict,
+    resolved: dict[str, str],
+    currency: str = "usd",
+) -> dict[str, tuple[float, str, str]]:
+    """
+    Pick each resolved symbol's price in `currency` out of a /simple/price response.
+
+    Raises:
+        ValueError: If a symbol has no price in the response
+    """
+    prices = {}
+    for symbol_upper, gecko_id in resolved.items():
+        if gecko_id not in data or currency not in data[gecko_id]:
+            raise ValueError(f"Could not fetch price for {symbol_upper}")
+        prices[symbol_upper] = (data[gecko_id][currency], gecko_id, symbol_upper)
+    return prices
+
+
+class RateLimitedError(ValueError):
+    """The price API answered 429 Too Many Requests; wait `retry_after` seconds."""
+
+    def __init__(self, retry_after: float, detail: object = "") -> None:
+        self.retry_after = retry_after
+        super().__init__(
+            f"Price API rate limit reached: {detail or 'HTTP 429'}\n"
+            f"Retry after {retry_after:g}s, or enter price manually."
+        )
+
+
+def _retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import datetime
+    import email.utils  # lazy: only reached on a 429 with an HTTP-date
+
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+def _api_error(error: Exception) -> ValueError:
+    """
+    ValueError raised for any network / HTTP failure on the fetch path.
+
+    A 429 response becomes RateLimitedError carrying the server's
+    Retry-After, so callers can back off instead of treating it as fatal.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    if status == 429:
+        headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+        return RateLimitedError(_retry_after(headers.get("retry-after")), error)
+    return ValueError(
+        f"Failed to fetch price from API: {error}\n"
+        f"Make sure you have internet connection.\n"
+        f"Or enter price manually."
+    )
+
+
+def fetch_crypto_prices(
+    symbols,
+    url: Optional[str] = None,
+    timeout: Optional[float] = None,
+    currency: str = "usd",
+    allow_stale: bool = False,
+) -> dict[str, tuple[float, str, str]]:
+    """
+    Fetch real-time prices for several crypto symbols in one API call.
+
+    All symbols are resolved through SYMBOL_MAP (or the symbol index) and
+    requested together via CoinGecko's comma-separated `ids` parameter, over
+    a shared keep-alive session, so pricing N assets costs a single round
+    trip. Latency, response size and failures are recorded in crypto_metrics.
+    With $CRYPTO_RATE_LIMIT set, default-endpoint USD fetches go through the
+    machine-wide limiter in crypto_ratelimit.
+
+    The request timeout is capped by the caller's deadline() and each
+    endpoint sits behind a circuit breaker (see crypto_resilience), so an
+    upstream outage fails fast instead of costing a full timeout per call.
+
     Args:
-        symbol: Crypto symbol (BTC, ETH, SOL, etc)
-    
+        symbols: Iterable of crypto symbols (BTC, ETH, SOL, etc)
+        url: /simple/price endpoint (default COINGECKO_PRICE_URL)
+        timeout: Request timeout in seconds (default DEFAULT_TIMEOUT)
+        currency: CoinGecko quote currency code (usd, eur, gbp, ...)
+        allow_stale: Degraded mode: if the fetch fails, serve each symbol's
+                     last known price as a StaleQuote instead of raising
+
     Returns:
-        Tuple of (price, asset_name, symbol) or raises ValueError
-    
+        Dict of symbol_upper -> (price, asset_name, symbol_upper)
+
     Raises:
-        ValueError: If API fails or symbol not found
+        RateLimitedError: If the API answers 429 (a ValueError with retry_after)
+        CircuitOpenError: If the endpoint's breaker is open
+        DeadlineExceeded: If the caller's deadline has passed
+        ValueError: If API fails, a symbol is not found or has no price
+    """
+    resolved = dict(_resolve_symbol(symbol) for symbol in symbols)
+    if not resolved:
+        return {}
+
+    currency = currency.lower()
+    try:
+        if url is None and currency == "usd" and os.environ.get(RATE_LIMIT_ENV):
+            from crypto_ratelimit import shared_limiter
+            prices = shared_limiter(os.environ[RATE_LIMIT_ENV]).fetch_prices(resolved, timeout)
+        else:
+            with crypto_metrics.track_fetch() as fetch_metrics:
+                data = _request_price_data(_price_params(resolved.values(), (currency,)), url, timeout, fetch_metrics)
+                prices = _extract_prices(data, resolved, currency)
+    except ValueError as e:
+        if not allow_stale:
+            raise
+        return _stale_prices(resolved, currency, e)
+
+    fetched_at = time.time()
+    for symbol_upper, quote in prices.items():
+        _last_known[currency, symbol_upper] = (*quote, fetched_at)
+    return prices
+
+
+def _stale_prices(resolved: Mapping[str, str], currency: str, error: ValueError) -> dict[str, StaleQuote]:
+    """
+    Last known prices for a failed fetch, or `error` re-raised if any symbol has none.
+
+    The process's own last fetch is preferred; with $CRYPTO_RATE_LIMIT set,
+    the limiter's per-symbol files give the machine-wide last known USD price.
+    """
+    limiter = None
+    if currency == "usd" and os.environ.get(RATE_LIMIT_ENV):
+        from crypto_ratelimit import shared_limiter
+        limiter = shared_limiter(os.environ[RATE_LIMIT_ENV])
+
+    reason = str(error).splitlines()[0]
+    stale = {}
+    for symbol_upper in resolved:
+        entry = _last_known.get((currency, symbol_upper))
+        if entry is None and limiter is not None:
+            entry = limiter.last_known(symbol_upper)
+        if entry is None:
+            raise error
+        stale[symbol_upper] = StaleQuote(entry[:3], entry[3], reason)
+    for symbol_upper in stale:
+        STALE_QUOTES.labels(symbol_upper).inc()
+    return stale
+
+
+def _request_price_data(
+    params: dict[str, str], url: Optional[str], timeout: Optional[float], fetch_metrics
+) -> dict:
+    """
+    GET /simple/price over the shared session and decode the JSON body.
+
+    Callers wrap this in crypto_metrics.track_fetch() together with their
+    own parsing, so missing prices count as fetch errors too. The outcome
+    is reported to the endpoint's circuit breaker.
+
+    Raises:
+        ValueError: If requests is missing or the API fails
+        CircuitOpenError: If the breaker is open (no request is made)
+        DeadlineExceeded: If the caller's deadline has passed
     """
+    requests = _optional("requests")
     if requests is None:
         raise ValueError(
             "requests library not installed. "
             "Install with: pip install requests"
         )
-    
-    # Mapping of common symbols to CoinGecko IDs
-    symbol_upper = symbol.upper()
-    
-    if symbol_upper not in SYMBOL_MAP:
-        available = ", ".join(sorted(SYMBOL_MAP.keys()))
-        raise ValueError(
-            f"Asset '{symbol}' not found.\n"
-            f"Available: {available}"
-        )
-    
-    gecko_id = SYMBOL_MAP[symbol_upper]
-    
+    endpoint = url or COINGECKO_PRICE_URL
+    limit = request_timeout(DEFAULT_TIMEOUT if timeout is None else timeout)
+    breaker = breaker_for(endpoint)
+    breaker.allow()
+    failed = None
     try:
-        url = f"https://api.coingecko.com/api/v3/simple/price"
-        params = {
-            "ids": gecko_id,
-            "vs_currencies": "usd",
-            "include_market_cap": "false",
-            "include_24hr_vol": "false",
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
+        response = _get_session().get(endpoint, params=params, timeout=limit)
         response.raise_for_status()
-        
+
+        fetch_metrics.bytes = len(response.content)
         data = response.json()
-        if gecko_id not in data or "usd" not in data[gecko_id]:
-            raise ValueError(f"Could not fetch price for {symbol}")
-        
-        price = data[gecko_id]["usd"]
-        
-        return price, SYMBOL_MAP[symbol_upper], symbol_upper
-    
+        failed = False
+        return data
+
     except requests.exceptions.RequestException as e:
-        raise ValueError(
-            f"Failed to fetch price from API: {e}\n"
-            f"Make sure you have internet connection.\n"
-            f"Or enter price manually."
-        )
+        failed = is_upstream_failure(e)
+        raise _api_error(e)
+    finally:
+        breaker.record(failed)
 
 
-def select_crypto_asset() -> tuple[float, str, str]:
+def fetch_crypto_price(
+    symbol: str, timeout: Optional[float] = None, allow_stale: bool = False
+) -> tuple[float, str, str]:
+    """
+    Fetch real-time crypto price from CoinGecko API.
+    
+    Args:
+        symbol: Crypto symbol (BTC, ETH, SOL, etc)
+        timeout: Request timeout in seconds (capped by any deadline())
+        allow_stale: Serve the last known price as a StaleQuote if the fetch fails
+    
+    Returns:
+        Tuple of (price, asset_name, symbol) or raises ValueError
+    
+    Raises:
+        ValueError: If API fails or symbol not found
+    """
+    return fetch_crypto_prices([symbol], timeout=timeout, allow_stale=allow_stale)[symbol.upper()]
+
+
+def select_crypto_asset(timeout: float = INTERACTIVE_DEADLINE) -> tuple[float, str, str]:
     """
     Let user select a crypto asset and fetch real-time price.
+
+    Each lookup gets `timeout` seconds. If the API is down (or its breaker
+    is open) the last known price is offered, marked stale, before falling
+    back to manual input.
     
     Returns:
         Tuple of (current_price, asset_name, symbol)
@@ -131,9 +397,11 @@ def select_crypto_asset() -> tuple[float, str, str]:
     print("🪙 SELECT CRYPTO ASSET")
     print("=" * 60 + "\n")
     
+    symbols = list(SYMBOL_MAP)
     print("Available assets:")
-    print("  BTC, ETH, SOL, ADA, XRP, DOT, DOGE, MATIC, AVAX")
-    print("  ARB, OP, LINK, UNI, AAVE, LTC, BCH")
+    for i in range(0, len(symbols), 9):
+        print("  " + ", ".join(symbols[i:i + 9]))
+    print("  (any CoinGecko ticker once the index is cached: python crypto_symbols.py refresh)")
     print()
     
     while True:
@@ -145,8 +413,15 @@ def select_crypto_asset() -> tuple[float, str, str]:
         
         try:
             print(f"📡 Fetching price for {symbol}...")
-            current_price, asset_name, symbol_upper = fetch_crypto_price(symbol)
-            print(f"✅ {asset_name.upper()}: ${current_price:,.2f}\n")
+            with deadline(timeout):
+                quote = fetch_crypto_price(symbol, allow_stale=True)
+            current_price, asset_name, symbol_upper = quote
+            if is_stale(quote):
+                print(f"⚠️  {quote.reason}")
+                print(f"⚠️  STALE {asset_name.upper()}: ${current_price:,.2f} "
+                      f"(last fetched {format_age(quote.age)} ago)\n")
+            else:
+                print(f"✅ {asset_name.upper()}: ${current_price:,.2f}\n")
             return current_price, asset_name, symbol_upper
         
         except ValueError as e:
@@ -246,10 +521,14 @@ def get_user_inputs() -> tuple[float, float, float, float, str, str]:
     return current_price, investment_amount, stop_loss_percent, profit_target_percent, asset_name, symbol
 
 
+@instrument
 def calculate_position(
     current_price: float,
     investment_amount: float,
-    leverage: int = 10
+    leverage: int = 10,
+    investment_currency: Optional[str] = None,
+    quote_currency: str = "usd",
+    fx=None,
 ) -> dict[str, float]:
     """
     Calculate position size with leverage.
@@ -257,13 +536,24 @@ def calculate_position(
     With x10 leverage:
       - Effective buying power = investment_amount * leverage
       - Position size (crypto amount) = (investment_amount * leverage) / current_price
+
+    When the investment is funded in another currency than the price is
+    quoted in (investment_currency="eur", quote_currency="usd"), it is
+    converted with the cross rate from `fx` (a crypto_fx.FXMatrix) first.
     
     Returns dict with:
       - position_size: amount of crypto to buy
       - entry_price: the price at which we enter
-      - effective_capital: total buying power
+      - effective_capital: total buying power, in the quote currency
+      - initial_capital: investment_amount, in the investment currency
+
+    Raises:
+        ValueError: If a conversion is needed but no fx matrix is given
     """
-    effective_capital = investment_amount * leverage
+    if investment_currency is None:
+        effective_capital = investment_amount * leverage
+    else:
+        effective_capital = investment_amount * _fx_rate(fx, investment_currency, quote_currency) * leverage
     position_size = effective_capital / current_price
 
     return {
@@ -274,6 +564,29 @@ def calculate_position(
     }
 
 
+def _fx_rate(fx, from_currency: str, to_currency: str) -> float:
+    """Units of to_currency per unit of from_currency (1.0 for the same currency)."""
+    if from_currency.lower() == to_currency.lower():
+        return 1.0
+    if fx is None:
+        raise ValueError(
+            f"Converting {from_currency.upper()} to {to_currency.upper()} needs FX rates.\n"
+            f"Pass fx=crypto_fx.FXCache().get()."
+        )
+    return fx.rate(from_currency, to_currency)
+
+
+def _entry_price(position):
+    """
+    Entry price of a number, a position (dict or crypto_positions.Position)
+    or a PositionBook, whose entry_price is a NumPy column.
+    """
+    if isinstance(position, dict):
+        return position["entry_price"]
+    return getattr(position, "entry_price", position)
+
+
+@instrument
 def calculate_stop_loss(
     entry_price: float,
     stop_loss_percent: float
@@ -283,12 +596,18 @@ def calculate_stop_loss(
     
     Stop loss price = entry_price * (1 - stop_loss_percent / 100)
     
+    entry_price may also be a Position / calculate_position dict, or a
+    PositionBook (returns one price per position).
+
     Returns the price at which to stop loss.
     """
+    if type(entry_price) is not float:
+        entry_price = _entry_price(entry_price)
     stop_loss_price = entry_price * (1 - stop_loss_percent / 100)
     return stop_loss_price
 
 
+@instrument
 def calculate_take_profit(
     entry_price: float,
     profit_percent: float = 10.0
@@ -309,19 +628,34 @@ def calculate_take_profit(
     Args:
         entry_price: The entry price (current crypto value)
         profit_percent: Target profit percentage (default 10% with x10 leverage)
+
+    entry_price may also be a Position / calculate_position dict, or a
+    PositionBook (returns one price per position).
     
     Returns the price at which to take profit.
     """
+    if type(entry_price) is not float:
+        entry_price = _entry_price(entry_price)
     take_profit_price = entry_price * (1 + profit_percent / 100)
     return take_profit_price
 
 
+@instrument
 def calculate_risk_reward_ratio(
     entry_price: float,
     stop_loss_price: float,
     take_profit_price: float
 ) -> float:
-    """Calculate the risk/reward ratio."""
+    """
+    Calculate the risk/reward ratio.
+
+    With a PositionBook (or arrays) the stop loss / take profit prices are
+    arrays too, and one ratio per position is returned (0 where risk <= 0).
+    """
+    if type(entry_price) is not float:
+        entry_price = _entry_price(entry_price)
+        if getattr(entry_price, "ndim", 0):
+            return _risk_reward_array(_optional("np"), entry_price, stop_loss_price, take_profit_price)
     risk = entry_price - stop_loss_price
     reward = take_profit_price - entry_price
     
@@ -331,90 +665,179 @@ def calculate_risk_reward_ratio(
     return reward / risk
 
 
+def _risk_reward_array(np, entry_price, stop_loss_price, take_profit_price):
+    """calculate_risk_reward_ratio over arrays: 0 where risk <= 0."""
+    risk = entry_price - stop_loss_price
+    reward = take_profit_price - entry_price
+    risk_reward = np.zeros(risk.shape, dtype=np.float64)
+    np.divide(reward, risk, out=risk_reward, where=risk > 0)
+    return risk_reward
+
+
+@instrument
+def calculate_grid(
+    current_price,
+    investment_amount,
+    stop_loss_percent,
+    profit_target_percent,
+    leverage=10,
+    investment_currency=None,
+    quote_currency: str = "usd",
+    fx=None,
+) -> dict[str, "np.ndarray"]:
+    """
+    Vectorized batch version of the position / stop loss / take profit /
+    risk-reward calculators.
+
+    Every argument may be a scalar or an array-like; they are broadcast
+    against each other like any NumPy expression, so a full sweep is just
+    a matter of giving each input its own axis:
+
+      calculate_grid(prices[:, None], 10000, sl_pcts[None, :], 10)
+
+    Each column is computed with exactly the same operations, in the same
+    order, as the scalar functions, so every element is bit-identical to
+    calling them one combination at a time.
+
+    investment_currency may also be an array of currency codes (one per
+    investment, e.g. each desk's funding currency); the cross rates to
+    quote_currency are looked up from `fx` in one vectorized gather.
+
+    Returns dict of float64 arrays (all of the broadcast shape) with:
+      - position_size, entry_price, effective_capital, initial_capital
+        (same meaning as calculate_position)
+      - stop_loss_price, take_profit_price (calculate_stop_loss / calculate_take_profit)
+      - risk_reward (calculate_risk_reward_ratio, 0 where risk <= 0)
+
+    Raises:
+        ValueError: If numpy is not installed, or a conversion is needed
+                    but no fx matrix is given
+    """
+    np = _optional("np")
+    if np is None:
+        raise ValueError(
+            "numpy library not installed. "
+            "Install with: pip install numpy"
+        )
+
+    rate = 1.0
+    if investment_currency is not None:
+        codes = np.asarray(investment_currency, dtype=str)
+        if fx is not None:
+            rate = fx.rates(codes, quote_currency)
+        else:
+            foreign = codes[np.char.lower(codes) != quote_currency.lower()]
+            if foreign.size:
+                _fx_rate(None, str(foreign.flat[0]), quote_currency)
+
+    price, investment, sl_percent, tp_percent, lev, rate = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (
+            current_price, investment_amount, stop_loss_percent,
+            profit_target_percent, leverage, rate,
+        ))
+    )
+
+    # calculate_position
+    if investment_currency is None:
+        effective_capital = investment * lev
+    else:
+        effective_capital = investment * rate * lev
+    position_size = effective_capital / price
+
+    # calculate_stop_loss / calculate_take_profit
+    stop_loss_price = price * (1 - sl_percent / 100)
+    take_profit_price = price * (1 + tp_percent / 100)
+
+    # calculate_risk_reward_ratio
+    risk_reward = _risk_reward_array(np, price, stop_loss_price, take_profit_price)
+
+    return {
+        "position_size": position_size,
+        "entry_price": price.copy(),
+        "effective_capital": effective_capital,
+        "initial_capital": investment.copy(),
+        "stop_loss_price": stop_loss_price,
+        "take_profit_price": take_profit_price,
+        "risk_reward": risk_reward,
+    }
+
+
 def display_results(
     current_price: float,
     investment_amount: float,
     stop_loss_percent: float,
     profit_target_percent: float,
-    position_info: dict[str, float],
+    position_info: Mapping[str, float],
     stop_loss_price: float,
     take_profit_price: float,
+    asset_name: str = "",
+    symbol: str = "",
+    leverage: int = 10,
+    fmt: str = "text",
+    out=None,
+    currency: str = "usd",
+    investment_currency: Optional[str] = None,
 ) -> None:
-    """Display calculated results with formulas and clear output formatting."""
-    risk_reward = calculate_risk_reward_ratio(
-        position_info["entry_price"],
+    """
+    Display calculated results with formulas and clear output formatting.
+
+    The report is rendered into one buffer by crypto_render.py and written
+    with a single call; `fmt` selects text, table, json or csv.
+    position_info is a calculate_position dict or a crypto_positions.Position.
+    Prices are shown in `currency`, the investment in `investment_currency`.
+    """
+    from crypto_render import build_report, render_header, render_report
+
+    report = build_report(
+        current_price,
+        investment_amount,
+        stop_loss_percent,
+        profit_target_percent,
+        position_info,
         stop_loss_price,
-        take_profit_price
+        take_profit_price,
+        asset_name=asset_name,
+        symbol=symbol,
+        leverage=leverage,
+        currency=currency,
+        investment_currency=investment_currency,
     )
+    (out or sys.stdout).write(render_header(fmt) + render_report(report, fmt))
+
 
-    print("\n" + "=" * 70)
-    print("📈 CALCULATION RESULTS")
-    print("=" * 70)
-
-    # Show input values
-    print("\n� YOUR INPUTS:")
-    print(f"  Current Price (Entry):        ${position_info['entry_price']:,.2f}")
-    print(f"  Investment Amount:            ${position_info['initial_capital']:,.2f}")
-    print(f"  Stop Loss Tolerance:          {stop_loss_percent:.2f}%")
-    print(f"  Target Profit Goal:           {profit_target_percent:.2f}%")
-    print(f"  Leverage:                     x10")
-
-    print("\n💼 POSITION DETAILS:")
-    print(f"  Position Size (Crypto):       {position_info['position_size']:.8f} BTC/ETH")
-    print(f"  Effective Capital:            ${position_info['effective_capital']:,.2f}")
-
-    print("\n" + "-" * 70)
-    print("🔢 CALCULATION FORMULAS:")
-    print("-" * 70)
-
-    # Stop Loss Calculation
-    print(f"\n🛑 STOP LOSS PRICE:")
-    print(f"  Formula: Entry Price × (1 - Stop Loss % / 100)")
-    print(f"  Formula: ${position_info['entry_price']:,.2f} × (1 - {stop_loss_percent}/100)")
-    print(f"  Formula: ${position_info['entry_price']:,.2f} × {1 - stop_loss_percent/100:.4f}")
-    print(f"  ➜ Result: ${stop_loss_price:,.2f}")
-
-    # Take Profit Calculation
-    print(f"\n📈 TAKE PROFIT PRICE:")
-    print(f"  Formula: Entry Price × (1 + Target Profit % / 100)")
-    print(f"  Formula: ${position_info['entry_price']:,.2f} × (1 + {profit_target_percent}/100)")
-    print(f"  Formula: ${position_info['entry_price']:,.2f} × {1 + profit_target_percent/100:.4f}")
-    print(f"  ➜ Result: ${take_profit_price:,.2f}")
-
-    print("\n" + "=" * 70)
-    print("🎯 PRICE TARGETS:")
-    print("=" * 70)
-    print(f"  Entry Price:                  ${position_info['entry_price']:,.2f}")
-    print(f"  Stop Loss Price:              ${stop_loss_price:,.2f}")
-    print(f"  Take Profit Price:            ${take_profit_price:,.2f}")
-
-    print("\n" + "=" * 70)
-    print("📊 RISK/REWARD ANALYSIS:")
-    print("=" * 70)
-
-    loss_on_stop = position_info['initial_capital'] * (stop_loss_percent / 100)
-    profit_on_tp = position_info['initial_capital'] * (profit_target_percent / 100)
-
-    print(f"\n💸 POTENTIAL LOSS (at stop loss):")
-    print(f"  Formula: Investment × (Stop Loss % / 100)")
-    print(f"  Formula: ${position_info['initial_capital']:,.2f} × ({stop_loss_percent}/100)")
-    print(f"  ➜ Result: ${loss_on_stop:,.2f}")
-
-    print(f"\n💰 POTENTIAL PROFIT (at take profit):")
-    print(f"  Formula: Investment × (Target Profit % / 100)")
-    print(f"  Formula: ${position_info['initial_capital']:,.2f} × ({profit_target_percent}/100)")
-    print(f"  ➜ Result: ${profit_on_tp:,.2f}")
-
-    print(f"\n⚖️  RISK/REWARD RATIO:")
-    print(f"  Formula: Reward / Risk")
-    print(f"  Formula: {profit_on_tp:,.2f} / {loss_on_stop:,.2f}")
-    print(f"  ➜ Result: 1:{risk_reward:.2f}")
-
-    print("\n" + "=" * 70 + "\n")
+def _journal_calculation(row: dict) -> None:
+    """Append an interactive calculation to $CRYPTO_JOURNAL, if set (crypto_journal.py)."""
+    from crypto_journal import open_journal
+
+    try:
+        journal = open_journal()
+        if journal is not None:
+            with journal:
+                journal.record(row, source="interactive")
+    except OSError as e:
+        print(f"⚠️  Could not write the calculation journal: {e}", file=sys.stderr)
 
 
 def main(argv: list[str] | None = None) -> None:
     """Main interactive entry point."""
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if argv and argv[0] == "--monitor":
+        from crypto_monitor import main as monitor_main
+        monitor_main(argv[1:])
+        return
+
+    if argv and argv[0] == "--batch":
+        from crypto_batch import main as batch_main
+        batch_main(argv[1:])
+        return
+
+    if argv and argv[0] == "--serve":
+        from crypto_server import main as server_main
+        server_main(argv[1:])
+        return
+
     try:
         current_price, investment_amount, stop_loss_percent, profit_target_percent, asset_name, symbol = get_user_inputs()
 
@@ -436,8 +859,25 @@ def main(argv: list[str] | None = None) -> None:
             take_profit_price,
             asset_name,
             symbol,
+            leverage=10,
         )
 
+        _journal_calculation({
+            "symbol": symbol,
+            "leverage": 10,
+            "price": current_price,
+            "investment_amount": investment_amount,
+            "stop_loss_percent": stop_loss_percent,
+            "profit_target_percent": profit_target_percent,
+            "position_size": position_info["position_size"],
+            "effective_capital": position_info["effective_capital"],
+            "stop_loss_price": stop_loss_price,
+            "take_profit_price": take_profit_price,
+            "risk_reward": calculate_risk_reward_ratio(
+                position_info["entry_price"], stop_loss_price, take_profit_price
+            ),
+        })
+
     except KeyboardInterrupt:
         print("\n\n👋 Calculation cancelled.")
         sys.exit(0)
@@ -0,0 +1,392 @@
+"""
+crypto_metrics.py
+In-process metrics for the crypto leverage calculator, exportable as
+Prometheus exposition text.
+
+Metrics are off by default. Functions marked with @instrument then cost
+one flag check per call: the wrapper calls straight through until
+enable() sets the module-level flag, and stops timing again after
+disable(). Set CRYPTO_METRICS=1 to start enabled.
+
+Recorded:
+  - crypto_fetch_seconds / crypto_fetch_errors_total{type} /
+    crypto_fetch_response_bytes_total: price fetches
+  - crypto_calls_total{function} / crypto_call_seconds{function}:
+    calculation and rendering functions
+
+Usage:
+    import crypto_metrics
+    crypto_metrics.enable()
+    crypto_metrics.serve(9464)                      # GET /metrics
+    crypto_metrics.write_textfile("/var/lib/node_exporter/crypto.prom")
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets (seconds) for network calls and for in-process calls
+FETCH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base for a metric family; children are keyed by label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: dict[tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The child metric for one combination of label values."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Zero every child in place (callers may hold references to them)."""
+        with self._lock:
+            for child in self._children.values():
+                child.clear()
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def clear(self) -> None:
+        self.value = 0.0
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self._children[()].inc(amount)
+
+    def value(self, *labels: str) -> float:
+        return self.labels(*labels).value
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count", "lock")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.sum = 0.0
+            self.count = 0
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed upper bounds."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = FETCH_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _Buckets:
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class Registry:
+    """A named set of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = FETCH_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        return "".join(metric.render() for metric in list(self._metrics.values()))
+
+    def reset(self) -> None:
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+
+REGISTRY = Registry()
+
+FETCH_SECONDS = REGISTRY.histogram("crypto_fetch_seconds", "Price fetch latency in seconds")
+FETCH_ERRORS = REGISTRY.counter("crypto_fetch_errors_total", "Failed price fetches by error type", ("type",))
+FETCH_BYTES = REGISTRY.counter("crypto_fetch_response_bytes_total", "Price API response body bytes")
+CALLS = REGISTRY.counter("crypto_calls_total", "Calls to instrumented functions", ("function",))
+CALL_SECONDS = REGISTRY.histogram(
+    "crypto_call_seconds", "Duration of instrumented functions in seconds", ("function",), CALL_BUCKETS
+)
+
+
+# --- Enabling --------------------------------------------------------------
+
+_enabled = os.environ.get("CRYPTO_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def instrument(func: Callable) -> Callable:
+    """
+    Record call counts and durations for `func` while metrics are enabled.
+
+    While disabled the wrapper only checks the flag and calls through.
+    """
+    calls = CALLS.labels(func.__name__)
+    seconds = CALL_SECONDS.labels(func.__name__)
+    perf_counter = time.perf_counter
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            seconds.observe(perf_counter() - start)
+            calls.inc()
+
+    return wrapper
+
+
+def enable() -> None:
+    """Start recording fetches and instrumented calls."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop recording; instrumented functions call straight through."""
+    global _enabled
+    _enabled = False
+
+
+# --- Fetch tracking --------------------------------------------------------
+
+class _FetchTracker:
+    __slots__ = ("bytes",)
+
+    def __init__(self) -> None:
+        self.bytes = 0
+
+
+_NULL_TRACKER = _FetchTracker()
+
+
+def _error_type(error: BaseException) -> str:
+    """Short error label: timeout, connection, http_<status>, no_price, ..."""
+    cause = error.__cause__ or error.__context__ or error
+    status = getattr(getattr(cause, "response", None), "status_code", None) or getattr(cause, "status", None)
+    if status:
+        return f"http_{status}"
+    name = type(cause).__name__.lower()
+    if "timeout" in name:
+        return "timeout"
+    if "connect" in name or isinstance(cause, ConnectionError):
+        return "connection"
+    if cause is error and isinstance(error, ValueError):
+        return "no_price" if "price" in str(error) else "bad_response"
+    return type(cause).__name__
+
+
+@contextmanager
+def track_fetch() -> Iterator[_FetchTracker]:
+    """
+    Record one price fetch: latency, response bytes (set `tracker.bytes`)
+    and, if the block raises, the error type.
+    """
+    if not _enabled:
+        yield _NULL_TRACKER
+        return
+    tracker = _FetchTracker()
+    start = time.perf_counter()
+    try:
+        yield tracker
+    except Exception as e:
+        FETCH_ERRORS.labels(_error_type(e)).inc()
+        raise
+    finally:
+        FETCH_SECONDS.observe(time.perf_counter() - start)
+        if tracker.bytes:
+            FETCH_BYTES.inc(tracker.bytes)
+
+
+# --- Export ----------------------------------------------------------------
+
+def render(registry: Optional[Registry] = None) -> str:
+    """Prometheus exposition text for the registry."""
+    return (registry or REGISTRY).render()
+
+
+def write_textfile(path: str, registry: Optional[Registry] = None) -> None:
+    """Write exposition text atomically (for node_exporter's textfile collector)."""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render(registry))
+    os.replace(tmp_path, path)
+
+
+def serve(port: int = 9464, host: str = "127.0.0.1", registry: Optional[Registry] = None) -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics from a daemon thread. Returns the server
+    (server.server_address has the bound port; call shutdown() to stop).
+    """
+    # Imported here so that importing the calculators stays cheap
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            payload = (registry or REGISTRY).render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="crypto-metrics", daemon=True).start()
+    return server
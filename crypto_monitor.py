@@ -0,0 +1,326 @@
+"""
+crypto_monitor.py
+Long-running monitor for open leveraged positions.
+
+Features:
+  - Keeps a book of open positions indexed by symbol
+  - Consumes a stream of (symbol, price) ticks from live polling or a
+    local tick file / stdin
+  - On each tick recomputes distance to stop loss / take profit,
+    unrealized PnL and R-multiple only for positions in that symbol
+  - Emits a line only for rows whose values actually changed
+
+Usage:
+    python crypto_monitor.py positions.json                 # poll live prices
+    python crypto_monitor.py positions.json --ticks ticks.txt
+    cat ticks.txt | python crypto_monitor.py positions.json --ticks -
+
+positions.json is a list of objects with keys: symbol, entry_price,
+investment_amount, stop_loss_percent, profit_target_percent and optional
+leverage (default 10) and id. Tick files hold one "SYMBOL PRICE" per line;
+malformed lines and non-positive prices are skipped with a warning on stderr.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import time
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+from crypto_leverage import (
+    calculate_position,
+    calculate_stop_loss,
+    calculate_take_profit,
+    fetch_crypto_prices,
+    validate_positive_number,
+)
+
+
+class PositionMonitor:
+    """Open positions indexed by symbol, recomputed incrementally per tick."""
+
+    def __init__(self, decimals: int = 2) -> None:
+        """
+        Args:
+            decimals: Rounding used for emitted values; a row only counts as
+                      changed when a rounded value or its status differs
+        """
+        self.decimals = decimals
+        self._by_symbol: dict[str, dict[str, dict]] = {}
+        self._symbol_of: dict[str, str] = {}
+        self._last_keys: dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._symbol_of)
+
+    def symbols(self) -> list[str]:
+        """Symbols with at least one open position."""
+        return list(self._by_symbol)
+
+    def add_position(
+        self,
+        position_id: str,
+        symbol: str,
+        entry_price: float,
+        investment_amount: float,
+        stop_loss_percent: float,
+        profit_target_percent: float,
+        leverage: int = 10,
+    ) -> dict:
+        """Open a position; its SL/TP levels come from the standard calculators."""
+        if position_id in self._symbol_of:
+            raise ValueError(f"Position '{position_id}' already exists")
+
+        symbol_upper = symbol.upper()
+        position_info = calculate_position(entry_price, investment_amount, leverage=leverage)
+        record = {
+            "id": position_id,
+            "symbol": symbol_upper,
+            "entry_price": position_info["entry_price"],
+            "position_size": position_info["position_size"],
+            "stop_loss_price": calculate_stop_loss(entry_price, stop_loss_percent),
+            "take_profit_price": calculate_take_profit(entry_price, profit_target_percent),
+        }
+        self._by_symbol.setdefault(symbol_upper, {})[position_id] = record
+        self._symbol_of[position_id] = symbol_upper
+        return record
+
+    def remove_position(self, position_id: str) -> None:
+        """Close a position and forget its last emitted row."""
+        symbol = self._symbol_of.pop(position_id)
+        positions = self._by_symbol[symbol]
+        del positions[position_id]
+        if not positions:
+            del self._by_symbol[symbol]
+        self._last_keys.pop(position_id, None)
+
+    def on_tick(self, symbol: str, price: float) -> list[dict]:
+        """
+        Apply a price tick and return the rows that changed.
+
+        Only positions in `symbol` are touched, so the cost is proportional
+        to that symbol's positions, not the whole book.
+
+        Raises:
+            ValueError: If price is not a positive finite number
+        """
+        if not math.isfinite(price) or price <= 0:
+            raise ValueError(f"Invalid price for {symbol.upper()}: {price} (must be positive)")
+        changed = []
+        for position_id, record in self._by_symbol.get(symbol.upper(), {}).items():
+            row = self._row(record, price)
+            key = (
+                row["distance_to_stop_loss_pct"],
+                row["distance_to_take_profit_pct"],
+                row["unrealized_pnl"],
+                row["r_multiple"],
+                row["status"],
+            )
+            if self._last_keys.get(position_id) != key:
+                self._last_keys[position_id] = key
+                changed.append(row)
+        return changed
+
+    def _row(self, record: dict, price: float) -> dict:
+        entry = record["entry_price"]
+        stop_loss = record["stop_loss_price"]
+        take_profit = record["take_profit_price"]
+        risk = entry - stop_loss
+
+        if price <= stop_loss:
+            status = "STOP"
+        elif price >= take_profit:
+            status = "TARGET"
+        else:
+            status = "OPEN"
+
+        d = self.decimals
+        return {
+            "id": record["id"],
+            "symbol": record["symbol"],
+            "price": price,
+            "distance_to_stop_loss_pct": round((price - stop_loss) / price * 100, d),
+            "distance_to_take_profit_pct": round((take_profit - price) / price * 100, d),
+            "unrealized_pnl": round(record["position_size"] * (price - entry), d),
+            "r_multiple": round((price - entry) / risk, d) if risk > 0 else 0.0,
+            "status": status,
+        }
+
+
+def format_row(row: dict) -> str:
+    """One human-readable line per changed position."""
+    return (
+        f"{row['id']:<12} {row['symbol']:<6} ${row['price']:>14,.2f}  "
+        f"SL {row['distance_to_stop_loss_pct']:>+8.2f}%  "
+        f"TP {row['distance_to_take_profit_pct']:>+8.2f}%  "
+        f"PnL ${row['unrealized_pnl']:>+14,.2f}  "
+        f"R {row['r_multiple']:>+6.2f}  {row['status']}"
+    )
+
+
+def read_ticks(stream: TextIO) -> Iterator[tuple[str, float]]:
+    """
+    Yield (symbol, price) from "SYMBOL PRICE" lines; blank and # lines are skipped.
+
+    Malformed lines are reported on stderr and skipped.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.replace(",", " ").split()
+        try:
+            if len(fields) < 2:
+                raise ValueError("expected 'SYMBOL PRICE'")
+            price = float(fields[1])
+        except ValueError as e:
+            print(f"⚠️  Skipping tick line {line_number} {line!r}: {e}", file=sys.stderr)
+            continue
+        yield fields[0].upper(), price
+
+
+def polling_feed(
+    symbols: Iterable[str],
+    interval: float = 5.0,
+    fetcher: Callable[[list[str]], dict[str, tuple[float, str, str]]] = fetch_crypto_prices,
+    sleep: Callable[[float], None] = time.sleep,
+    max_polls: Optional[int] = None,
+) -> Iterator[tuple[str, float]]:
+    """
+    Poll prices for `symbols` every `interval` seconds with one batched request.
+
+    Only symbols whose price moved since the previous poll are yielded.
+    Failed polls are reported on stderr and retried on the next interval.
+    """
+    symbols = list(symbols)
+    last: dict[str, float] = {}
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        if polls:
+            sleep(interval)
+        polls += 1
+        try:
+            prices = fetcher(symbols)
+        except ValueError as e:
+            print(f"⚠️  {e}", file=sys.stderr)
+            continue
+        for symbol, (price, _asset_name, _symbol) in prices.items():
+            if last.get(symbol) != price:
+                last[symbol] = price
+                yield symbol, price
+
+
+def run_monitor(
+    monitor: PositionMonitor,
+    ticks: Iterable[tuple[str, float]],
+    out: Optional[TextIO] = None,
+) -> int:
+    """
+    Feed ticks to the monitor and write changed rows (stdout by default). Returns rows written.
+
+    Ticks with a non-positive or non-finite price are reported on stderr and skipped.
+    """
+    if out is None:
+        out = sys.stdout
+    written = 0
+    for symbol, price in ticks:
+        try:
+            rows = monitor.on_tick(symbol, price)
+        except ValueError as e:
+            print(f"⚠️  Skipping tick: {e}", file=sys.stderr)
+            continue
+        for row in rows:
+            out.write(format_row(row) + "\n")
+            written += 1
+        out.flush()
+    return written
+
+
+def _position_field(item: dict, key: str) -> float:
+    """A positive, finite number from `item[key]`."""
+    name = key.replace("_", " ")
+    if item.get(key) is None:
+        raise ValueError(f"Missing {name}")
+    number = validate_positive_number(str(item[key]).strip(), name)
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid {name}: must be finite")
+    return number
+
+
+def load_positions(monitor: PositionMonitor, positions: list[dict]) -> None:
+    """
+    Add positions from a list of dicts (see module docstring for keys).
+
+    Raises:
+        ValueError: If positions is not a list of objects or a position is
+                    invalid; the message names the position's index
+    """
+    if not isinstance(positions, list):
+        raise ValueError(f"Expected a JSON list of positions, got {type(positions).__name__}")
+    for index, item in enumerate(positions, start=1):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError(f"expected an object, got {type(item).__name__}")
+            symbol = item.get("symbol")
+            if not isinstance(symbol, str) or not symbol.strip():
+                raise ValueError("Missing symbol")
+            entry_price = _position_field(item, "entry_price")
+            investment_amount = _position_field(item, "investment_amount")
+            stop_loss_percent = _position_field(item, "stop_loss_percent")
+            if stop_loss_percent >= 100:
+                raise ValueError("Stop loss percentage must be less than 100%")
+            profit_target_percent = _position_field(item, "profit_target_percent")
+            leverage = _position_field(item, "leverage") if "leverage" in item else 10
+            if leverage != int(leverage):
+                raise ValueError("Invalid leverage: must be a whole number")
+            monitor.add_position(
+                str(item.get("id", index)),
+                symbol.strip(),
+                entry_price,
+                investment_amount,
+                stop_loss_percent,
+                profit_target_percent,
+                leverage=int(leverage),
+            )
+        except ValueError as e:
+            raise ValueError(f"Position {index}: {e}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Monitor entry point."""
+    parser = argparse.ArgumentParser(description="Monitor open crypto positions on each price tick.")
+    parser.add_argument("positions", help="JSON file with a list of positions")
+    parser.add_argument("--ticks", help="Tick file ('-' for stdin) instead of live polling")
+    parser.add_argument("--interval", type=float, default=5.0, help="Live polling interval in seconds")
+    args = parser.parse_args(argv)
+
+    monitor = PositionMonitor()
+    try:
+        with open(args.positions, encoding="utf-8") as f:
+            load_positions(monitor, json.load(f))
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load positions: {e}")
+        sys.exit(1)
+
+    print(f"👀 Monitoring {len(monitor)} position(s) in {', '.join(monitor.symbols())}")
+    try:
+        if args.ticks == "-":
+            run_monitor(monitor, read_ticks(sys.stdin))
+        elif args.ticks:
+            with open(args.ticks, encoding="utf-8") as f:
+                run_monitor(monitor, read_ticks(f))
+        else:
+            run_monitor(monitor, polling_feed(monitor.symbols(), args.interval))
+    except OSError as e:
+        print(f"❌ Could not read ticks: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n👋 Monitor stopped.")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+crypto_montecarlo.py
+Monte Carlo estimate of how likely a leveraged trade hits take profit
+before stop loss.
+
+The entry, stop loss and take profit prices come from the standard
+calculators in crypto_leverage.py. Prices follow geometric Brownian motion
+with configurable annualized volatility and drift, monitored at discrete
+steps. A long position with leverage L is liquidated when price falls
+1/L below entry, so a stop loss placed beyond that level is never reached.
+
+Features:
+  - Probability of take profit / stop loss / liquidation / timeout
+  - Expected PnL on the invested capital
+  - Distribution of time to exit (histogram and percentiles)
+  - Vectorized NumPy paths, split into fixed chunks and spread over a
+    process pool for 10^6+ paths
+  - Deterministic: each chunk gets its own seed spawned from `seed`, so
+    results are identical for any number of workers
+
+Usage:
+    python crypto_montecarlo.py --price 50000 --investment 1000 \\
+        --stop-loss 5 --take-profit 10 --volatility 0.8 --days 30 --paths 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from crypto_leverage import calculate_position, calculate_stop_loss, calculate_take_profit
+
+
+# Outcome codes used inside the simulation
+TIMEOUT, TAKE_PROFIT, STOP_LOSS, LIQUIDATION = 0, 1, 2, 3
+
+# Steps simulated per vectorized block
+_BLOCK_STEPS = 32
+
+
+def _simulate_chunk(args: tuple) -> tuple:
+    """
+    Simulate one chunk of paths.
+
+    Returns (outcome counts, sum of PnL, sum of PnL², exit step histogram)
+    so only small aggregates travel back from worker processes.
+    """
+    (seed_seq, n_paths, steps, mu, sigma, log_tp, log_lower,
+     lower_outcome, entry, position_size, investment) = args
+    rng = np.random.default_rng(seed_seq)
+
+    log_price = np.zeros(n_paths)
+    alive = np.arange(n_paths)
+    outcome = np.zeros(n_paths, dtype=np.int8)
+    exit_step = np.full(n_paths, steps, dtype=np.int64)
+
+    step = 0
+    while step < steps and alive.size:
+        block = min(_BLOCK_STEPS, steps - step)
+        increments = mu + sigma * rng.standard_normal((alive.size, block))
+        paths = log_price[alive, None] + np.cumsum(increments, axis=1)
+
+        hit_up = paths >= log_tp
+        hit_down = paths <= log_lower
+        first_up = np.where(hit_up.any(axis=1), hit_up.argmax(axis=1), block)
+        first_down = np.where(hit_down.any(axis=1), hit_down.argmax(axis=1), block)
+        first = np.minimum(first_up, first_down)
+        exited = first < block
+
+        done = alive[exited]
+        outcome[done] = np.where(first_up[exited] < first_down[exited], TAKE_PROFIT, lower_outcome)
+        exit_step[done] = step + first[exited] + 1
+
+        log_price[alive] = paths[:, -1]
+        alive = alive[~exited]
+        step += block
+
+    take_profit_pnl = position_size * (entry * math.exp(log_tp) - entry)
+    lower_pnl = -investment if lower_outcome == LIQUIDATION else position_size * (entry * math.exp(log_lower) - entry)
+    pnl = np.where(outcome == TAKE_PROFIT, take_profit_pnl, lower_pnl)
+    timed_out = outcome == TIMEOUT
+    pnl[timed_out] = np.maximum(position_size * (entry * np.exp(log_price[timed_out]) - entry), -investment)
+
+    counts = np.bincount(outcome, minlength=4)
+    histogram = np.bincount(exit_step[~timed_out], minlength=steps + 1)
+    return counts, float(pnl.sum()), float((pnl * pnl).sum()), histogram
+
+
+def simulate_exit_probabilities(
+    current_price: float,
+    investment_amount: float,
+    stop_loss_percent: float,
+    profit_target_percent: float,
+    leverage: int = 10,
+    volatility: float = 0.8,
+    drift: float = 0.0,
+    horizon_days: float = 30.0,
+    steps_per_day: int = 24,
+    n_paths: int = 100_000,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_size: int = 50_000,
+) -> dict:
+    """
+    Estimate exit probabilities, expected PnL and time to exit for a long position.
+
+    Args:
+        current_price: Entry price
+        investment_amount: Capital put up (margin)
+        stop_loss_percent / profit_target_percent: As in the interactive calculator
+        leverage: Leverage multiple; liquidation at entry × (1 - 1/leverage)
+        volatility: Annualized volatility of the GBM (e.g. 0.8 = 80%)
+        drift: Annualized drift of the GBM
+        horizon_days: Paths still open after this are closed at the last price
+        steps_per_day: Price observations per day
+        n_paths: Number of simulated paths
+        seed: Seed for reproducible runs
+        workers: Process count (default: all cores; 1 runs in-process)
+        chunk_size: Paths per chunk (the unit of work and of seeding)
+
+    Returns dict with:
+      - p_take_profit, p_stop_loss, p_liquidation, p_timeout
+      - expected_pnl, pnl_std, expected_return_percent
+      - stop_loss_price, take_profit_price, liquidation_price
+      - mean_days_to_exit, days_to_exit_percentiles (5/25/50/75/95, exits only)
+      - exit_step_histogram (exits per step), step_days
+    """
+    if volatility <= 0 or horizon_days <= 0 or steps_per_day <= 0 or n_paths <= 0 or chunk_size <= 0:
+        raise ValueError("volatility, horizon_days, steps_per_day, n_paths and chunk_size must be positive")
+
+    position_info = calculate_position(current_price, investment_amount, leverage=leverage)
+    entry = position_info["entry_price"]
+    stop_loss_price = calculate_stop_loss(entry, stop_loss_percent)
+    take_profit_price = calculate_take_profit(entry, profit_target_percent)
+    liquidation_price = entry * (1 - 1 / leverage)
+
+    if liquidation_price >= stop_loss_price:
+        lower_price, lower_outcome = liquidation_price, LIQUIDATION
+    else:
+        lower_price, lower_outcome = stop_loss_price, STOP_LOSS
+    log_lower = math.log(lower_price / entry) if lower_price > 0 else -math.inf
+
+    steps = max(1, round(horizon_days * steps_per_day))
+    dt = 1 / (365 * steps_per_day)
+    mu = (drift - 0.5 * volatility ** 2) * dt
+    sigma = volatility * math.sqrt(dt)
+
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [
+        (seed_seq, size, steps, mu, sigma, math.log(take_profit_price / entry), log_lower,
+         lower_outcome, entry, position_info["position_size"], investment_amount)
+        for seed_seq, size in zip(seeds, sizes)
+    ]
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers == 1:
+        results = list(map(_simulate_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+
+    counts = sum(r[0] for r in results)
+    pnl_sum = sum(r[1] for r in results)
+    pnl_sq_sum = sum(r[2] for r in results)
+    histogram = sum(r[3] for r in results)
+
+    expected_pnl = pnl_sum / n_paths
+    exits = int(histogram.sum())
+    step_days = 1 / steps_per_day
+    if exits:
+        cumulative = np.cumsum(histogram)
+        percentiles = {
+            q: float(np.searchsorted(cumulative, q / 100 * exits) * step_days)
+            for q in (5, 25, 50, 75, 95)
+        }
+        mean_days = float((histogram * np.arange(histogram.size)).sum() / exits * step_days)
+    else:
+        percentiles, mean_days = {}, math.nan
+
+    return {
+        "paths": n_paths,
+        "p_take_profit": counts[TAKE_PROFIT] / n_paths,
+        "p_stop_loss": counts[STOP_LOSS] / n_paths,
+        "p_liquidation": counts[LIQUIDATION] / n_paths,
+        "p_timeout": counts[TIMEOUT] / n_paths,
+        "expected_pnl": expected_pnl,
+        "pnl_std": math.sqrt(max(pnl_sq_sum / n_paths - expected_pnl ** 2, 0.0)),
+        "expected_return_percent": expected_pnl / investment_amount * 100,
+        "stop_loss_price": stop_loss_price,
+        "take_profit_price": take_profit_price,
+        "liquidation_price": liquidation_price,
+        "mean_days_to_exit": mean_days,
+        "days_to_exit_percentiles": percentiles,
+        "exit_step_histogram": histogram,
+        "step_days": step_days,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Simulator entry point."""
+    parser = argparse.ArgumentParser(description="Monte Carlo probability of hitting TP before SL.")
+    parser.add_argument("--price", type=float, required=True, help="Entry price")
+    parser.add_argument("--investment", type=float, required=True, help="Investment amount")
+    parser.add_argument("--stop-loss", type=float, required=True, help="Stop loss percentage")
+    parser.add_argument("--take-profit", type=float, required=True, help="Target profit percentage")
+    parser.add_argument("--leverage", type=int, default=10)
+    parser.add_argument("--volatility", type=float, default=0.8, help="Annualized volatility (0.8 = 80%%)")
+    parser.add_argument("--drift", type=float, default=0.0, help="Annualized drift")
+    parser.add_argument("--days", type=float, default=30.0, help="Horizon in days")
+    parser.add_argument("--steps-per-day", type=int, default=24)
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    result = simulate_exit_probabilities(
+        args.price, args.investment, args.stop_loss, args.take_profit,
+        leverage=args.leverage, volatility=args.volatility, drift=args.drift,
+        horizon_days=args.days, steps_per_day=args.steps_per_day,
+        n_paths=args.paths, seed=args.seed, workers=args.workers,
+    )
+
+    print("\n" + "=" * 70)
+    print(f"🎲 MONTE CARLO ({result['paths']:,} paths, {args.days:g} days, vol {args.volatility:.0%})")
+    print("=" * 70)
+    rows = [
+        (f"Take Profit (${result['take_profit_price']:,.2f}):", f"{result['p_take_profit']:.2%}"),
+        (f"Stop Loss (${result['stop_loss_price']:,.2f}):", f"{result['p_stop_loss']:.2%}"),
+        (f"Liquidation (${result['liquidation_price']:,.2f}):", f"{result['p_liquidation']:.2%}"),
+        ("Still open at horizon:", f"{result['p_timeout']:.2%}"),
+        ("", ""),
+        ("Expected PnL:", f"${result['expected_pnl']:,.2f} "
+                          f"({result['expected_return_percent']:+.2f}% of investment)"),
+        ("Mean days to exit:", f"{result['mean_days_to_exit']:.2f}"),
+    ]
+    rows += [(f"p{q} days to exit:", f"{days:.2f}") for q, days in result["days_to_exit_percentiles"].items()]
+    for label, value in rows:
+        print(f"  {label:<30}{value}".rstrip())
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+crypto_optimizer.py
+Search stop loss / take profit / leverage settings against historical bars.
+
+Every candidate (SL%, TP%, leverage) is backtested with crypto_backtest.py
+over the same entry signals and scored; the result is a table ranked best
+first.
+
+Search modes:
+  - grid     every combination of the given SL, TP and leverage values
+  - random   `samples` uniform draws between the smallest and largest
+             SL / TP values (leverage picked from the given values)
+  - refine   `rounds` rounds of `samples` candidates: the first round is
+             random, later rounds sample around the best quarter so far
+             with a shrinking spread, so evaluations concentrate where the
+             score is high
+
+Scores (higher is better):
+  - expectancy  average PnL per trade
+  - drawdown    total PnL / max drawdown (PnL per unit of worst drop)
+  - sharpe      mean / standard deviation of per-trade returns
+
+Evaluation is spread over a process pool. The open/high/low/close columns
+are copied once into a shared-memory block that every worker maps, so the
+price history is not pickled per worker or per task.
+
+Usage:
+    python crypto_optimizer.py data/ --symbols BTC ETH --every 60 \\
+        --stop-loss 1 2 3 5 --take-profit 2 4 6 10 --leverage 5 10 --score sharpe
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional, Sequence
+
+import numpy as np
+
+from crypto_backtest import TIE_BREAKS, backtest, load_symbol, trade_stats
+from crypto_leverage import SYMBOL_MAP
+
+
+SEARCHES = ("grid", "random", "refine")
+SCORES = ("expectancy", "drawdown", "sharpe")
+
+# Columns backtest() reads; these are what goes into shared memory
+_PRICE_FIELDS = ("open", "high", "low", "close")
+
+# Worker state, set by _attach (or directly for in-process runs)
+_worker: dict = {}
+
+
+def score_trades(trades: dict[str, np.ndarray], stats: dict, score: str) -> float:
+    """Score one backtest; NaN when it cannot be scored (no trades, no variance)."""
+    if not stats["trades"]:
+        return math.nan
+    if score == "expectancy":
+        return stats["avg_pnl"]
+    if score == "drawdown":
+        if stats["max_drawdown"] == 0:
+            return math.inf if stats["total_pnl"] > 0 else math.nan
+        return stats["total_pnl"] / stats["max_drawdown"]
+    if score == "sharpe":
+        returns = trades["return_percent"]
+        std = float(returns.std())
+        return float(returns.mean()) / std if std > 0 else math.nan
+    raise ValueError(f"score must be one of {', '.join(SCORES)}")
+
+
+def _attach(name: str, n_bars: int, entries: np.ndarray, settings: dict) -> None:
+    """Pool initializer: map the shared price block into this worker."""
+    block = shared_memory.SharedMemory(name=name)
+    columns = np.ndarray((len(_PRICE_FIELDS), n_bars), dtype=np.float64, buffer=block.buf)
+    _worker.update(
+        block=block,
+        bars=dict(zip(_PRICE_FIELDS, columns)),
+        entries=entries,
+        settings=settings,
+    )
+
+
+def _evaluate(params: tuple[float, float, int]) -> dict:
+    """Backtest and score one (SL%, TP%, leverage) candidate."""
+    stop_loss_percent, profit_target_percent, leverage = params
+    settings = _worker["settings"]
+    trades = backtest(
+        _worker["bars"], _worker["entries"], stop_loss_percent, profit_target_percent,
+        investment_amount=settings["investment_amount"], leverage=leverage,
+        tie_break=settings["tie_break"], max_bars=settings["max_bars"],
+        allow_overlap=settings["allow_overlap"],
+    )
+    stats = trade_stats(trades)
+    return {
+        "stop_loss_percent": stop_loss_percent,
+        "take_profit_percent": profit_target_percent,
+        "leverage": leverage,
+        "score": score_trades(trades, stats, settings["score"]),
+        **stats,
+    }
+
+
+class _Evaluator:
+    """Runs candidate batches in-process or on a pool over shared memory."""
+
+    def __init__(self, bars: dict, entries: np.ndarray, settings: dict, workers: int) -> None:
+        self._block = None
+        self._pool = None
+        if workers == 1:
+            _worker.update(bars={name: bars[name] for name in _PRICE_FIELDS},
+                           entries=entries, settings=settings)
+            return
+        n_bars = len(bars["close"])
+        self._block = shared_memory.SharedMemory(create=True, size=max(1, len(_PRICE_FIELDS) * n_bars * 8))
+        columns = np.ndarray((len(_PRICE_FIELDS), n_bars), dtype=np.float64, buffer=self._block.buf)
+        for i, name in enumerate(_PRICE_FIELDS):
+            columns[i] = bars[name]
+        del columns
+        self._workers = workers
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach,
+            initargs=(self._block.name, n_bars, entries, settings),
+        )
+
+    def run(self, candidates: list[tuple[float, float, int]]) -> list[dict]:
+        if self._pool is None:
+            return list(map(_evaluate, candidates))
+        chunksize = max(1, len(candidates) // (self._workers * 4))
+        return list(self._pool.map(_evaluate, candidates, chunksize=chunksize))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._block.close()
+            self._block.unlink()
+        _worker.clear()
+
+
+def _bounds(values: Sequence[float], name: str) -> tuple[float, float]:
+    values = [float(v) for v in values]
+    if not values or min(values) <= 0:
+        raise ValueError(f"{name} values must be positive")
+    return min(values), max(values)
+
+
+def _random_candidates(rng, count, sl_bounds, tp_bounds, leverages) -> list[tuple[float, float, int]]:
+    return [
+        (round(float(sl), 4), round(float(tp), 4), int(lev))
+        for sl, tp, lev in zip(rng.uniform(*sl_bounds, count), rng.uniform(*tp_bounds, count),
+                               rng.choice(leverages, count))
+    ]
+
+
+def _rank_key(row: dict) -> float:
+    return -row["score"] if not math.isnan(row["score"]) else math.inf
+
+
+def optimize(
+    bars: dict[str, np.ndarray],
+    entries,
+    stop_losses: Sequence[float] = (1, 2, 3, 5, 8),
+    take_profits: Sequence[float] = (2, 4, 6, 10, 15),
+    leverages: Sequence[int] = (10,),
+    search: str = "grid",
+    score: str = "expectancy",
+    samples: int = 64,
+    rounds: int = 4,
+    seed: int = 0,
+    investment_amount: float = 1000.0,
+    tie_break: str = "stop",
+    max_bars: Optional[int] = None,
+    allow_overlap: bool = True,
+    workers: Optional[int] = None,
+) -> list[dict]:
+    """
+    Backtest many (SL%, TP%, leverage) candidates and rank them by `score`.
+
+    Args:
+        bars: OHLCV columns (as from load_symbol); only open/high/low/close are used
+        entries: Entry bar indices, as for backtest()
+        stop_losses / take_profits: Values for "grid", bounds for "random" / "refine"
+        leverages: Leverage values to try (all searches)
+        search: One of SEARCHES (see module docstring)
+        score: One of SCORES
+        samples: Candidates per random / refine round
+        rounds: Refine rounds
+        seed: Seed for random / refine, so runs are reproducible
+        investment_amount, tie_break, max_bars, allow_overlap: Passed to backtest()
+        workers: Process count (default: all cores; 1 runs in-process)
+
+    Returns one row per distinct candidate, best first (unscorable
+    candidates last): stop_loss_percent, take_profit_percent, leverage,
+    score and the trade_stats() fields.
+
+    Raises:
+        ValueError: If search, score, tie_break or a parameter is invalid
+    """
+    if search not in SEARCHES:
+        raise ValueError(f"search must be one of {', '.join(SEARCHES)}")
+    if score not in SCORES:
+        raise ValueError(f"score must be one of {', '.join(SCORES)}")
+    if tie_break not in TIE_BREAKS:
+        raise ValueError(f"tie_break must be one of {', '.join(TIE_BREAKS)}")
+    if samples <= 0 or rounds <= 0:
+        raise ValueError("samples and rounds must be positive")
+    sl_bounds = _bounds(stop_losses, "Stop loss")
+    tp_bounds = _bounds(take_profits, "Take profit")
+    leverages = [int(lev) for lev in leverages]
+    if not leverages or min(leverages) < 1:
+        raise ValueError("Leverage values must be at least 1")
+
+    rng = np.random.default_rng(seed)
+    if search == "grid":
+        first = [(float(sl), float(tp), lev)
+                 for sl, tp, lev in itertools.product(stop_losses, take_profits, leverages)]
+        total_rounds = 1
+    else:
+        first = _random_candidates(rng, samples, sl_bounds, tp_bounds, leverages)
+        total_rounds = rounds if search == "refine" else 1
+
+    settings = {
+        "score": score,
+        "investment_amount": investment_amount,
+        "tie_break": tie_break,
+        "max_bars": max_bars,
+        "allow_overlap": allow_overlap,
+    }
+    workers = max(1, min(workers or os.cpu_count() or 1, len(first)))
+    evaluator = _Evaluator(bars, np.asarray(entries, dtype=np.int64), settings, workers)
+    results: dict[tuple, dict] = {}
+    try:
+        candidates = first
+        for round_number in range(total_rounds):
+            new = list(dict.fromkeys(c for c in candidates if c not in results))
+            for row in evaluator.run(new):
+                results[row["stop_loss_percent"], row["take_profit_percent"], row["leverage"]] = row
+            if round_number + 1 == total_rounds:
+                break
+            # Next round: jitter the best quarter, spread halving each round
+            elite = sorted(results.values(), key=_rank_key)[:max(1, len(results) // 4)]
+            spread = 0.5 ** (round_number + 1) / 2
+            parents = rng.integers(0, len(elite), samples)
+            candidates = []
+            for i in parents.tolist():
+                parent = elite[i]
+                sl = np.clip(parent["stop_loss_percent"] + rng.normal(0, spread * (sl_bounds[1] - sl_bounds[0])),
+                             *sl_bounds)
+                tp = np.clip(parent["take_profit_percent"] + rng.normal(0, spread * (tp_bounds[1] - tp_bounds[0])),
+                             *tp_bounds)
+                lev = parent["leverage"] if rng.random() < 0.75 else int(rng.choice(leverages))
+                candidates.append((round(float(sl), 4), round(float(tp), 4), lev))
+    finally:
+        evaluator.close()
+
+    return sorted(results.values(), key=_rank_key)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Optimizer entry point."""
+    parser = argparse.ArgumentParser(description="Rank SL/TP/leverage settings over historical OHLCV bars.")
+    parser.add_argument("data_dir", help="Directory with <SYMBOL>.npy / <SYMBOL>.bin files")
+    parser.add_argument("--symbols", nargs="+", default=sorted(SYMBOL_MAP), help="Symbols to optimize")
+    parser.add_argument("--every", type=int, default=60, help="Enter a trade every N bars")
+    parser.add_argument("--stop-loss", type=float, nargs="+", default=[1, 2, 3, 5, 8],
+                        help="Stop loss percentages (bounds for random/refine)")
+    parser.add_argument("--take-profit", type=float, nargs="+", default=[2, 4, 6, 10, 15],
+                        help="Take profit percentages (bounds for random/refine)")
+    parser.add_argument("--leverage", type=int, nargs="+", default=[10])
+    parser.add_argument("--search", choices=SEARCHES, default="grid")
+    parser.add_argument("--score", choices=SCORES, default="expectancy")
+    parser.add_argument("--samples", type=int, default=64, help="Candidates per random/refine round")
+    parser.add_argument("--rounds", type=int, default=4, help="Refine rounds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--investment", type=float, default=1000.0)
+    parser.add_argument("--max-bars", type=int, default=None, help="Close trades after N bars")
+    parser.add_argument("--tie-break", choices=TIE_BREAKS, default="stop")
+    parser.add_argument("--no-overlap", action="store_true", help="Skip signals while a trade is open")
+    parser.add_argument("--top", type=int, default=10, help="Rows shown per symbol")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    print("\n" + "=" * 78)
+    print(f"🔧 OPTIMIZER  search {args.search}  score {args.score}")
+    print("=" * 78)
+    for symbol in args.symbols:
+        try:
+            bars = load_symbol(args.data_dir, symbol)
+        except ValueError as e:
+            print(f"  {symbol:<6} ⚠️  {e}")
+            continue
+        ranked = optimize(
+            bars, np.arange(0, len(bars["close"]), args.every),
+            stop_losses=args.stop_loss, take_profits=args.take_profit, leverages=args.leverage,
+            search=args.search, score=args.score, samples=args.samples, rounds=args.rounds,
+            seed=args.seed, investment_amount=args.investment, tie_break=args.tie_break,
+            max_bars=args.max_bars, allow_overlap=not args.no_overlap, workers=args.workers,
+        )
+        print(f"\n  {symbol} — {len(ranked)} candidates")
+        print(f"  {'#':>3}  {'SL%':>7} {'TP%':>7} {'Lev':>4}  {'Score':>10}  {'Trades':>7}  "
+              f"{'Win':>6}  {'PnL':>14}  {'MaxDD':>12}")
+        for rank, row in enumerate(ranked[:args.top], 1):
+            print(f"  {rank:>3}  {row['stop_loss_percent']:>7.2f} {row['take_profit_percent']:>7.2f} "
+                  f"{row['leverage']:>4}  {row['score']:>10.4f}  {row['trades']:>7,}  "
+                  f"{row['win_rate']:>6.1%}  ${row['total_pnl']:>13,.2f}  ${row['max_drawdown']:>11,.2f}")
+    print("\n" + "=" * 78 + "\n")
+
+
+if __name__ == "__main__":
+    main()
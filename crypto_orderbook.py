@@ -0,0 +1,403 @@
+"""
+crypto_orderbook.py
+Order-book model for effective entry prices and slippage.
+
+calculate_position assumes the whole leveraged notional fills at the
+quoted price. A large ticket instead walks the book: it takes the best
+ask, then the next level, and so on, so the average (VWAP) entry is worse
+than the top of book and the position is smaller than notional / price.
+
+OrderBook keeps each side as a price -> size dict plus the best
+`max_levels` prices (default 5000, the deepest snapshot exchanges serve)
+in a sorted list searched with bisect:
+
+  - changing the size of an existing level is a dict update, O(1)
+  - finding a level is a binary search, O(log n); a level that appears
+    or disappears near the top is one list insert/delete, a memmove of at
+    most max_levels prices (O(max_levels), but bounded and in C)
+  - levels past the best max_levels wait in a heap, O(log n) per update;
+    when a top level disappears the best of them moves up, so no level
+    the feed still lists is lost
+  - a fill only visits the levels it consumes, best first
+
+Books are loaded from a depth snapshot and kept current with diffs, as
+exchange depth feeds publish them. A recorded feed (JSON lines of
+{"type": "snapshot" | "diff", "bids": [[price, size], ...], "asks": [...]})
+can be replayed with replay().
+
+Usage:
+    book = replay("btc_depth.jsonl")
+    book.fill("buy", notional=100_000)["slippage_percent"]
+    position_from_book(book, 10_000, stop_loss_percent=5, profit_target_percent=10)
+
+    python crypto_orderbook.py btc_depth.jsonl --investment 10000 --stop-loss 5 --take-profit 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from bisect import bisect_left, insort
+from heapq import heapify, heappop, heappush
+from typing import Iterable, Iterator, Optional, TextIO, Union
+
+from crypto_leverage import calculate_risk_reward_ratio, calculate_stop_loss, calculate_take_profit
+
+DEFAULT_MAX_LEVELS = 5000
+
+
+class _BookSide:
+    """
+    Price levels of one side: sizes for every level, the best max_levels
+    prices as an ascending list, and the rest in a heap best-first.
+
+    Every price in `deep` is worse than every price in `prices`.
+    """
+
+    __slots__ = ("prices", "sizes", "best_is_highest", "max_levels", "deep", "_heap")
+
+    def __init__(self, best_is_highest: bool, max_levels: int = DEFAULT_MAX_LEVELS) -> None:
+        self.prices: list[float] = []
+        self.sizes: dict[float, float] = {}
+        self.best_is_highest = best_is_highest
+        self.max_levels = max_levels
+        self.deep: set[float] = set()
+        # Heap keys of deep prices (negated for bids, so the best pops first); may hold stale keys
+        self._heap: list[float] = []
+
+    def _key(self, price: float) -> float:
+        return -price if self.best_is_highest else price
+
+    def _push_deep(self, price: float) -> None:
+        self.deep.add(price)
+        heappush(self._heap, self._key(price))
+
+    def set(self, price: float, size: float) -> None:
+        if size <= 0:
+            if self.sizes.pop(price, None) is None:
+                return
+            if price in self.deep:
+                self.deep.discard(price)
+                if len(self._heap) > 2 * len(self.deep) + 64:
+                    self._heap = [self._key(p) for p in self.deep]
+                    heapify(self._heap)
+            else:
+                del self.prices[bisect_left(self.prices, price)]
+                self._promote()
+            return
+        if price not in self.sizes:
+            if len(self.prices) >= self.max_levels:
+                worst_index = 0 if self.best_is_highest else -1
+                worst = self.prices[worst_index]
+                if (price < worst) if self.best_is_highest else (price > worst):
+                    self._push_deep(price)
+                    self.sizes[price] = size
+                    return
+                del self.prices[worst_index]
+                self._push_deep(worst)
+            insort(self.prices, price)
+        self.sizes[price] = size
+
+    def _promote(self) -> None:
+        """Move the best deep level up once the top list has room."""
+        while self.deep and len(self.prices) < self.max_levels:
+            key = heappop(self._heap)
+            price = -key if self.best_is_highest else key
+            if price in self.deep:  # else a stale key of a deleted or promoted level
+                self.deep.discard(price)
+                insort(self.prices, price)
+
+    def load(self, sizes: dict[float, float]) -> None:
+        """Replace every level; the best max_levels go in the list, the rest in the heap."""
+        prices = sorted(sizes)
+        deep = []
+        if len(prices) > self.max_levels:
+            if self.best_is_highest:
+                deep, prices = prices[:-self.max_levels], prices[-self.max_levels:]
+            else:
+                prices, deep = prices[:self.max_levels], prices[self.max_levels:]
+        self.prices = prices
+        self.sizes = sizes
+        self.deep = set(deep)
+        self._heap = [self._key(price) for price in deep]
+        heapify(self._heap)
+
+    def clear(self) -> None:
+        self.prices.clear()
+        self.sizes.clear()
+        self.deep.clear()
+        self._heap.clear()
+
+    def best(self) -> Optional[float]:
+        if not self.prices:
+            return None
+        return self.prices[-1] if self.best_is_highest else self.prices[0]
+
+    def walk(self) -> Iterator[float]:
+        """Prices from best to worst (deep levels are sorted only if a walk reaches them)."""
+        yield from reversed(self.prices) if self.best_is_highest else self.prices
+        if self.deep:
+            yield from sorted(self.deep, reverse=self.best_is_highest)
+
+
+def _level(level) -> tuple[float, float]:
+    """(price, size) from [price, size]; exchanges send both as strings."""
+    price, size = float(level[0]), float(level[1])
+    if price <= 0 or size < 0:
+        raise ValueError(f"Invalid order book level: {level!r}")
+    return price, size
+
+
+class OrderBook:
+    """Bids and asks for one market, updated from snapshots and diffs."""
+
+    def __init__(self, symbol: str = "", max_levels: int = DEFAULT_MAX_LEVELS) -> None:
+        """
+        Args:
+            symbol: Market label
+            max_levels: Levels per side kept in the sorted top list; deeper
+                        levels are kept in a heap and move up as room frees
+        """
+        if max_levels <= 0:
+            raise ValueError("max_levels must be positive")
+        self.symbol = symbol
+        self._bids = _BookSide(best_is_highest=True, max_levels=max_levels)
+        self._asks = _BookSide(best_is_highest=False, max_levels=max_levels)
+
+    def __len__(self) -> int:
+        return len(self._bids.sizes) + len(self._asks.sizes)
+
+    def apply_snapshot(self, bids: Iterable, asks: Iterable) -> None:
+        """Replace the whole book with a depth snapshot."""
+        for side, levels in ((self._bids, bids), (self._asks, asks)):
+            sizes = {}
+            for level in levels:
+                price, size = _level(level)
+                if size > 0:
+                    sizes[price] = size
+            side.load(sizes)
+
+    def apply_diff(self, bids: Iterable = (), asks: Iterable = ()) -> None:
+        """Apply level updates; size 0 removes the level."""
+        for side, levels in ((self._bids, bids), (self._asks, asks)):
+            for level in levels:
+                side.set(*_level(level))
+
+    def apply(self, event: dict) -> None:
+        """Apply one recorded feed event ({"type": "snapshot" | "diff", "bids", "asks"})."""
+        kind = event.get("type", "diff")
+        if kind == "snapshot":
+            self.apply_snapshot(event.get("bids", ()), event.get("asks", ()))
+        elif kind == "diff":
+            self.apply_diff(event.get("bids", ()), event.get("asks", ()))
+        else:
+            raise ValueError(f"Unknown order book event type: {kind}")
+
+    def best_bid(self) -> Optional[float]:
+        return self._bids.best()
+
+    def best_ask(self) -> Optional[float]:
+        return self._asks.best()
+
+    def mid_price(self) -> Optional[float]:
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def depth(self, side: str, levels: int = 10) -> list[tuple[float, float]]:
+        """Top `levels` (price, size) pairs a `side` order would take, best first."""
+        book_side = self._side(side)
+        top = []
+        for price in book_side.walk():
+            if len(top) == levels:
+                break
+            top.append((price, book_side.sizes[price]))
+        return top
+
+    def _side(self, side: str) -> _BookSide:
+        """The levels an order on `side` fills against."""
+        if side == "buy":
+            return self._asks
+        if side == "sell":
+            return self._bids
+        raise ValueError(f"Invalid side: {side!r} (expected 'buy' or 'sell')")
+
+    def fill(
+        self,
+        side: str,
+        quantity: Optional[float] = None,
+        notional: Optional[float] = None,
+        reference_price: Optional[float] = None,
+    ) -> dict:
+        """
+        Walk the book for a market order of `quantity` coins or `notional`
+        quote currency (exactly one of them).
+
+        Returns dict with:
+          - quantity, notional: what actually fills
+          - vwap: average fill price; worst_price: last level touched
+          - levels: number of levels consumed
+          - reference_price: mid price (or best price on a one-sided book),
+            unless given
+          - slippage_percent: how much worse vwap is than the reference
+          - slippage_cost: that difference × quantity, in quote currency
+          - complete: False if the book ran out first
+
+        Raises:
+            ValueError: If the side is invalid, the size is not positive or
+                        the book side is empty
+        """
+        if (quantity is None) == (notional is None):
+            raise ValueError("Give exactly one of quantity or notional")
+        remaining = quantity if quantity is not None else notional
+        if remaining <= 0:
+            raise ValueError("Order size must be positive")
+        book_side = self._side(side)
+        if not book_side.sizes:
+            raise ValueError(f"No {'asks' if side == 'buy' else 'bids'} in the order book")
+
+        filled = cost = 0.0
+        worst_price = None
+        levels = 0
+        sizes = book_side.sizes
+        for price in book_side.walk():
+            size = sizes[price]
+            levels += 1
+            worst_price = price
+            if quantity is not None:
+                take = size if size < remaining else remaining
+                remaining -= take
+            elif size * price < remaining:
+                take = size
+                remaining -= size * price
+            else:
+                take = remaining / price
+                remaining = 0.0
+            filled += take
+            cost += take * price
+            if remaining <= 0:
+                break
+
+        vwap = cost / filled
+        if reference_price is None:
+            reference_price = self.mid_price() or book_side.best()
+        adverse = vwap - reference_price if side == "buy" else reference_price - vwap
+        return {
+            "side": side,
+            "quantity": filled,
+            "notional": cost,
+            "vwap": vwap,
+            "worst_price": worst_price,
+            "levels": levels,
+            "reference_price": reference_price,
+            "slippage_percent": adverse / reference_price * 100,
+            "slippage_cost": adverse * filled,
+            "complete": remaining <= 0,
+        }
+
+
+def replay(
+    source: Union[str, TextIO, Iterable[dict]],
+    symbol: str = "",
+    max_levels: int = DEFAULT_MAX_LEVELS,
+) -> OrderBook:
+    """Build a book by applying a recorded feed: a JSONL path, open file or event list."""
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            return replay(f, symbol, max_levels)
+    book = OrderBook(symbol, max_levels)
+    for event in source:
+        if isinstance(event, str):
+            if not event.strip():
+                continue
+            event = json.loads(event)
+        book.apply(event)
+    return book
+
+
+def position_from_book(
+    book: OrderBook,
+    investment_amount: float,
+    stop_loss_percent: Optional[float] = None,
+    profit_target_percent: Optional[float] = None,
+    leverage: int = 10,
+) -> dict:
+    """
+    calculate_position with the entry taken from the book instead of one price.
+
+    The leveraged notional is filled against the asks; entry_price is the
+    VWAP and position_size what that notional actually buys. With
+    stop_loss_percent / profit_target_percent, SL, TP and risk/reward are
+    derived from that effective entry.
+
+    Returns the calculate_position keys (position_size, entry_price,
+    effective_capital, initial_capital) plus reference_price,
+    slippage_percent, slippage_cost, worst_price and levels, and
+    stop_loss_price / take_profit_price / risk_reward when requested.
+
+    Raises:
+        ValueError: If the book cannot fill the whole notional
+    """
+    effective_capital = investment_amount * leverage
+    fill = book.fill("buy", notional=effective_capital)
+    if not fill["complete"]:
+        raise ValueError(
+            f"Order book too thin: only ${fill['notional']:,.2f} of "
+            f"${effective_capital:,.2f} can be filled"
+        )
+    entry_price = fill["vwap"]
+    result = {
+        "position_size": fill["quantity"],
+        "entry_price": entry_price,
+        "effective_capital": effective_capital,
+        "initial_capital": investment_amount,
+        "reference_price": fill["reference_price"],
+        "slippage_percent": fill["slippage_percent"],
+        "slippage_cost": fill["slippage_cost"],
+        "worst_price": fill["worst_price"],
+        "levels": fill["levels"],
+    }
+    if stop_loss_percent is not None:
+        result["stop_loss_price"] = calculate_stop_loss(entry_price, stop_loss_percent)
+    if profit_target_percent is not None:
+        result["take_profit_price"] = calculate_take_profit(entry_price, profit_target_percent)
+    if stop_loss_percent is not None and profit_target_percent is not None:
+        result["risk_reward"] = calculate_risk_reward_ratio(
+            entry_price, result["stop_loss_price"], result["take_profit_price"]
+        )
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Order book entry point: size a position against a recorded book."""
+    parser = argparse.ArgumentParser(description="Effective entry price and slippage from an order book.")
+    parser.add_argument("book", help="Recorded depth feed (JSON lines, '-' for stdin)")
+    parser.add_argument("--investment", type=float, required=True, help="Investment amount in USD")
+    parser.add_argument("--leverage", type=int, default=10)
+    parser.add_argument("--stop-loss", type=float, help="Stop loss percentage")
+    parser.add_argument("--take-profit", type=float, help="Target profit percentage")
+    args = parser.parse_args(argv)
+
+    try:
+        book = replay(sys.stdin if args.book == "-" else args.book)
+        result = position_from_book(book, args.investment, args.stop_loss, args.take_profit, args.leverage)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"📥 Effective entry: ${result['entry_price']:,.2f} over {result['levels']} level(s)")
+    print(f"   Reference (mid): ${result['reference_price']:,.2f}")
+    print(f"   Slippage:        {result['slippage_percent']:.4f}% (${result['slippage_cost']:,.2f})")
+    print(f"   Position size:   {result['position_size']:.8f}")
+    if "stop_loss_price" in result:
+        print(f"🛑 Stop loss:       ${result['stop_loss_price']:,.2f}")
+    if "take_profit_price" in result:
+        print(f"📈 Take profit:     ${result['take_profit_price']:,.2f}")
+    if "risk_reward" in result:
+        print(f"⚖️  Risk/reward:     {result['risk_reward']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
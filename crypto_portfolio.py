@@ -0,0 +1,201 @@
+"""
+crypto_portfolio.py
+Portfolio-level risk aggregation across many leveraged positions.
+
+Positions are sized with calculate_position / calculate_stop_loss, grouped
+by symbol, and summarized by running aggregates:
+
+  - notional per symbol and in total (quantity × mark price)
+  - total margin (sum of invested capital)
+  - worst-case loss if every stop is hit, measured from entry
+    (loss_at_stops) and from the current mark (open_risk)
+  - net unrealized PnL
+
+Every aggregate is linear in price, so each symbol only keeps a few sums
+(quantity, cost, stop value). A price update therefore adjusts the totals
+in O(1) without touching the individual positions, add/remove are O(1),
+totals() is O(1) and snapshot() is O(symbols) — cheap enough for every tick.
+
+Usage:
+    portfolio = Portfolio()
+    portfolio.add_position("BTC", 50000, 1000, stop_loss_percent=5)
+    portfolio.update_price("BTC", 51000)
+    portfolio.totals()["unrealized_pnl"]
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Optional
+
+from crypto_leverage import calculate_position, calculate_stop_loss, calculate_take_profit
+
+
+class _SymbolBook:
+    """Running sums for one symbol's positions."""
+
+    __slots__ = ("positions", "quantity", "cost", "stop_value", "margin", "loss_at_stops", "mark")
+
+    def __init__(self) -> None:
+        self.positions: dict[str, dict] = {}
+        self.quantity = 0.0       # sum of position sizes
+        self.cost = 0.0           # sum of size × entry
+        self.stop_value = 0.0     # sum of size × stop loss price
+        self.margin = 0.0         # sum of invested capital
+        self.loss_at_stops = 0.0  # sum of loss if each stop is hit (capped at its margin)
+        self.mark: Optional[float] = None
+
+    def notional(self) -> float:
+        return self.quantity * self.mark if self.mark is not None else self.cost
+
+    def unrealized_pnl(self) -> float:
+        return self.quantity * self.mark - self.cost if self.mark is not None else 0.0
+
+    def open_risk(self) -> float:
+        return self.notional() - self.stop_value
+
+
+class Portfolio:
+    """Thousands of positions with incrementally maintained risk aggregates."""
+
+    def __init__(self) -> None:
+        self._books: dict[str, _SymbolBook] = {}
+        self._symbol_of: dict[str, str] = {}
+        self._ids = itertools.count(1)
+        self._notional = 0.0
+        self._pnl = 0.0
+        self._stop_value = 0.0
+        self._margin = 0.0
+        self._loss_at_stops = 0.0
+
+    def __len__(self) -> int:
+        return len(self._symbol_of)
+
+    def add_position(
+        self,
+        symbol: str,
+        entry_price: float,
+        investment_amount: float,
+        stop_loss_percent: float,
+        profit_target_percent: Optional[float] = None,
+        leverage: int = 10,
+        position_id: Optional[str] = None,
+    ) -> str:
+        """Open a position and fold it into the aggregates. Returns its id."""
+        if position_id is None:
+            position_id = str(next(self._ids))
+        if position_id in self._symbol_of:
+            raise ValueError(f"Position '{position_id}' already exists")
+
+        symbol_upper = symbol.upper()
+        position_info = calculate_position(entry_price, investment_amount, leverage=leverage)
+        size = position_info["position_size"]
+        stop_loss_price = calculate_stop_loss(position_info["entry_price"], stop_loss_percent)
+        record = {
+            "id": position_id,
+            "symbol": symbol_upper,
+            **position_info,
+            "leverage": leverage,
+            "stop_loss_price": stop_loss_price,
+            "take_profit_price": (
+                calculate_take_profit(position_info["entry_price"], profit_target_percent)
+                if profit_target_percent is not None else None
+            ),
+            "loss_at_stop": min(size * (entry_price - stop_loss_price), investment_amount),
+        }
+
+        book = self._books.get(symbol_upper)
+        if book is None:
+            book = self._books[symbol_upper] = _SymbolBook()
+        self._apply(book, record, +1)
+        book.positions[position_id] = record
+        self._symbol_of[position_id] = symbol_upper
+        return position_id
+
+    def remove_position(self, position_id: str) -> dict:
+        """Close a position and remove it from the aggregates. Returns its record."""
+        symbol = self._symbol_of.pop(position_id)
+        book = self._books[symbol]
+        record = book.positions.pop(position_id)
+        self._apply(book, record, -1)
+        if not book.positions:
+            self._notional -= book.notional()
+            self._pnl -= book.unrealized_pnl()
+            del self._books[symbol]
+        return record
+
+    def update_price(self, symbol: str, price: float) -> None:
+        """Mark a symbol to a new price; O(1) regardless of its position count."""
+        book = self._books.get(symbol.upper())
+        if book is None:
+            return
+        old_notional, old_pnl = book.notional(), book.unrealized_pnl()
+        book.mark = price
+        self._notional += book.notional() - old_notional
+        self._pnl += book.unrealized_pnl() - old_pnl
+
+    def totals(self) -> dict[str, float]:
+        """Portfolio-wide aggregates, O(1)."""
+        return {
+            "positions": len(self._symbol_of),
+            "notional": self._notional,
+            "margin": self._margin,
+            "unrealized_pnl": self._pnl,
+            "loss_at_stops": self._loss_at_stops,
+            "open_risk": self._notional - self._stop_value,
+        }
+
+    def snapshot(self) -> dict:
+        """Totals plus a per-symbol breakdown, O(symbols)."""
+        return {
+            "total": self.totals(),
+            "symbols": {
+                symbol: {
+                    "positions": len(book.positions),
+                    "mark": book.mark,
+                    "quantity": book.quantity,
+                    "notional": book.notional(),
+                    "margin": book.margin,
+                    "unrealized_pnl": book.unrealized_pnl(),
+                    "loss_at_stops": book.loss_at_stops,
+                    "open_risk": book.open_risk(),
+                }
+                for symbol, book in self._books.items()
+            },
+        }
+
+    def positions(self, symbol: str) -> list[dict]:
+        """Position records for one symbol, with PnL at the current mark."""
+        book = self._books.get(symbol.upper())
+        if book is None:
+            return []
+        mark = book.mark
+        return [
+            {**record, "unrealized_pnl": record["position_size"] * (mark - record["entry_price"])
+             if mark is not None else 0.0}
+            for record in book.positions.values()
+        ]
+
+    def recompute(self) -> None:
+        """Rebuild all sums from the positions, discarding accumulated rounding drift."""
+        self._notional = self._pnl = self._stop_value = self._margin = self._loss_at_stops = 0.0
+        for book in self._books.values():
+            book.quantity = book.cost = book.stop_value = book.margin = book.loss_at_stops = 0.0
+            for record in book.positions.values():
+                self._apply(book, record, +1)
+
+    def _apply(self, book: _SymbolBook, record: dict, sign: int) -> None:
+        """Add (sign=+1) or subtract (sign=-1) one position from its book and the totals."""
+        old_notional, old_pnl = book.notional(), book.unrealized_pnl()
+        size = record["position_size"]
+        book.quantity += sign * size
+        book.cost += sign * size * record["entry_price"]
+        book.stop_value += sign * size * record["stop_loss_price"]
+        book.margin += sign * record["initial_capital"]
+        book.loss_at_stops += sign * record["loss_at_stop"]
+
+        self._notional += book.notional() - old_notional
+        self._pnl += book.unrealized_pnl() - old_pnl
+        self._stop_value += sign * size * record["stop_loss_price"]
+        self._margin += sign * record["initial_capital"]
+        self._loss_at_stops += sign * record["loss_at_stop"]
@@ -0,0 +1,176 @@
+"""
+crypto_positions.py
+Compact position storage: a slotted Position record and a columnar PositionBook.
+
+calculate_position returns a four-entry dict, which costs a few hundred
+bytes per position. For a single position, Position holds the same fields
+in __slots__ and still answers position["entry_price"], so it can be passed
+anywhere a position_info dict is expected. For millions of positions,
+PositionBook keeps one array('d') per field (8 bytes per value), appends in
+amortized O(1) and exports each column to NumPy without copying.
+
+Both forms are accepted by calculate_stop_loss, calculate_take_profit and
+calculate_risk_reward_ratio; a PositionBook yields one result per position.
+
+Usage:
+    position = Position.calculate(50000, 1000, leverage=10)
+    calculate_stop_loss(position, 5)
+
+    book = PositionBook()
+    for price in prices:
+        book.add(price, 1000, leverage=10)
+    calculate_stop_loss(book, 5)            # NumPy array, one per position
+    book.position_size.sum()                # zero-copy column view
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Iterator, Mapping, Union
+
+from crypto_leverage import _optional
+
+# Same keys, in the same order, as the dict returned by calculate_position
+POSITION_FIELDS = ("position_size", "entry_price", "effective_capital", "initial_capital")
+
+
+class Position:
+    """One sized position, as a slotted record instead of a dict."""
+
+    __slots__ = POSITION_FIELDS
+
+    def __init__(
+        self,
+        position_size: float,
+        entry_price: float,
+        effective_capital: float,
+        initial_capital: float,
+    ) -> None:
+        self.position_size = position_size
+        self.entry_price = entry_price
+        self.effective_capital = effective_capital
+        self.initial_capital = initial_capital
+
+    @classmethod
+    def calculate(cls, current_price: float, investment_amount: float, leverage: int = 10) -> Position:
+        """Size a position exactly like calculate_position (same operations, same order)."""
+        effective_capital = investment_amount * leverage
+        return cls(effective_capital / current_price, current_price, effective_capital, investment_amount)
+
+    @classmethod
+    def from_mapping(cls, position_info: Mapping[str, float]) -> Position:
+        """Build a Position from a calculate_position dict (or another Position)."""
+        return cls(*(position_info[field] for field in POSITION_FIELDS))
+
+    # Mapping protocol, so a Position works as a position_info dict
+    # (position["entry_price"], dict(position), {**position}).
+    def __getitem__(self, key: str) -> float:
+        if key not in POSITION_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def keys(self) -> tuple[str, ...]:
+        return POSITION_FIELDS
+
+    def as_dict(self) -> dict[str, float]:
+        return {field: getattr(self, field) for field in POSITION_FIELDS}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Position):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in POSITION_FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in POSITION_FIELDS)
+        return f"Position({fields})"
+
+
+class PositionBook:
+    """
+    Many positions stored column-wise, one array('d') per field.
+
+    book.position_size (and the other fields) are NumPy views sharing the
+    book's memory. array('d') cannot grow in place while a view exists, so
+    an append with views alive first moves that column to a fresh array
+    (one memcpy). The old views stay valid, but from then on they are
+    snapshots: later appends and writes through them are not shared.
+    Appends without live views stay amortized O(1).
+    """
+
+    __slots__ = ("_columns",)
+
+    def __init__(self) -> None:
+        self._columns = {field: array("d") for field in POSITION_FIELDS}
+
+    @classmethod
+    def from_grid(cls, grid: Mapping[str, object]) -> PositionBook:
+        """Build a book from calculate_grid output (every array flattened, C order)."""
+        np = _numpy()
+        book = cls()
+        arrays = [np.ascontiguousarray(grid[field], dtype=np.float64).ravel() for field in POSITION_FIELDS]
+        if len({a.size for a in arrays}) > 1:
+            raise ValueError("Grid columns must all have the same size")
+        for field, values in zip(POSITION_FIELDS, arrays):
+            book._columns[field].frombytes(values.tobytes())
+        return book
+
+    def add(self, current_price: float, investment_amount: float, leverage: int = 10) -> int:
+        """Size a position like calculate_position and append it. Returns its index."""
+        effective_capital = investment_amount * leverage
+        return self._append((effective_capital / current_price, current_price, effective_capital, investment_amount))
+
+    def append(self, position: Union[Position, Mapping[str, float]]) -> int:
+        """Append a Position or calculate_position dict. Returns its index."""
+        return self._append(tuple(position[field] for field in POSITION_FIELDS))
+
+    def _append(self, values: tuple[float, float, float, float]) -> int:
+        columns = self._columns
+        for field, value in zip(POSITION_FIELDS, values):
+            column = columns[field]
+            try:
+                column.append(value)
+            except BufferError:
+                # Exported to NumPy: grow a copy and leave the old buffer to its views
+                grown = columns[field] = array("d")
+                grown.frombytes(memoryview(column).cast("B"))
+                grown.append(value)
+        return len(self) - 1
+
+    def __len__(self) -> int:
+        return len(self._columns["entry_price"])
+
+    def __getitem__(self, index: int) -> Position:
+        columns = self._columns
+        return Position(*(columns[field][index] for field in POSITION_FIELDS))
+
+    def __iter__(self) -> Iterator[Position]:
+        return map(Position, *(self._columns[field] for field in POSITION_FIELDS))
+
+    def __getattr__(self, name: str):
+        if name in POSITION_FIELDS:
+            return self.column(name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def column(self, field: str):
+        """Zero-copy float64 NumPy view of one field."""
+        if field not in POSITION_FIELDS:
+            raise ValueError(f"Unknown position field: {field}")
+        return _numpy().frombuffer(self._columns[field], dtype="float64")
+
+    def to_numpy(self) -> dict[str, object]:
+        """Zero-copy NumPy views of every field."""
+        return {field: self.column(field) for field in POSITION_FIELDS}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(column) * column.itemsize for column in self._columns.values())
+
+
+def _numpy():
+    np = _optional("np")
+    if np is None:
+        raise ValueError(
+            "numpy library not installed. "
+            "Install with: pip install numpy"
+        )
+    return np
@@ -0,0 +1,329 @@
+"""
+crypto_price_cache.py
+TTL + LRU price cache in front of crypto_leverage.fetch_crypto_price.
+
+Features:
+  - Fresh entries (younger than `ttl`) are served from memory
+  - Stale entries (up to `max_stale` seconds past the TTL) are served
+    immediately while a background thread refreshes them
+    (stale-while-revalidate)
+  - Concurrent misses for one symbol share a single upstream fetch
+  - Least recently used entries are evicted beyond `max_entries`
+  - Optional SQLite file so a restarted process starts warm; writes are
+    batched and committed outside the cache lock, evictions delete rows
+  - Degraded (StaleQuote) results keep the time they were really fetched
+  - Hit / miss / staleness counters via stats()
+
+Usage:
+    cache = PriceCache(ttl=30, persist_path="prices.sqlite3")
+    price, asset_name, symbol = cache.get("BTC")
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from crypto_leverage import fetch_crypto_price, fetch_crypto_prices
+from crypto_resilience import is_stale
+
+
+class _Flight:
+    """One in-progress upstream fetch that other callers for the same symbol wait on."""
+
+    __slots__ = ("done", "quote", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.quote: Optional[tuple] = None
+        self.error: Optional[BaseException] = None
+
+
+class PriceCache:
+    """Thread-safe price cache with TTL, LRU eviction and stale-while-revalidate."""
+
+    def __init__(
+        self,
+        ttl: float = 30.0,
+        max_stale: float = 300.0,
+        max_entries: int = 256,
+        persist_path: Optional[str] = None,
+        fetcher: Callable[[str], tuple[float, str, str]] = fetch_crypto_price,
+        batch_fetcher: Callable[[list[str]], dict[str, tuple[float, str, str]]] = fetch_crypto_prices,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Args:
+            ttl: Seconds an entry is served as fresh
+            max_stale: Seconds past the TTL an entry may still be served
+                       while it is refreshed in the background
+            max_entries: LRU capacity
+            persist_path: Optional SQLite file for a warm start across restarts
+            fetcher: Single-symbol fetch, same contract as fetch_crypto_price
+            batch_fetcher: Multi-symbol fetch, same contract as fetch_crypto_prices
+            clock: Wall-clock source (persisted timestamps must survive restarts)
+        """
+        if ttl <= 0 or max_stale < 0 or max_entries <= 0:
+            raise ValueError("ttl and max_entries must be positive, max_stale non-negative")
+
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._fetcher = fetcher
+        self._batch_fetcher = batch_fetcher
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, str, str, float]] = OrderedDict()
+        self._refreshing: dict[str, threading.Thread] = {}
+        self._inflight: dict[str, _Flight] = {}
+        # Rows to write (None = delete) since the last flush; the SQLite
+        # connection is only used under _db_lock, taken before _lock
+        self._db_lock = threading.Lock()
+        self._pending: dict[str, Optional[tuple[str, float, str, float]]] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale_hits": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "evictions": 0,
+            "coalesced": 0,
+        }
+
+        self._db = None
+        if persist_path is not None:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS prices ("
+                "symbol TEXT PRIMARY KEY, price REAL, asset_name TEXT, fetched_at REAL)"
+            )
+            self._db.commit()
+            self._load()
+
+    def get(self, symbol: str) -> tuple[float, str, str]:
+        """
+        Return (price, asset_name, symbol), fetching only on a miss.
+
+        Raises:
+            ValueError: Propagated from the fetcher on a miss
+        """
+        key = symbol.upper()
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        while True:
+            flight, owner = self._join_flight(key)
+            if owner:
+                break
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.quote is not None:
+                return flight.quote[:3]
+            # The other fetch did not return this symbol; fetch it ourselves
+
+        try:
+            quote = self._fetcher(key)
+            self._store({key: quote})
+            flight.quote = quote
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._land(key, flight)
+        return quote[:3]
+
+    def get_many(self, symbols) -> dict[str, tuple[float, str, str]]:
+        """
+        Return {symbol: (price, asset_name, symbol)} for several symbols.
+
+        Misses are fetched together with a single batch_fetcher call;
+        symbols another caller is already fetching are waited for instead.
+        """
+        result = {}
+        owned: dict[str, _Flight] = {}
+        waiting: dict[str, _Flight] = {}
+        for symbol in symbols:
+            key = symbol.upper()
+            if key in result or key in owned or key in waiting:
+                continue
+            cached = self._lookup(key)
+            if cached is not None:
+                result[key] = cached
+                continue
+            flight, owner = self._join_flight(key)
+            (owned if owner else waiting)[key] = flight
+
+        if owned:
+            try:
+                quotes = self._batch_fetcher(list(owned))
+                self._store(quotes)
+                for key, quote in quotes.items():
+                    result[key] = quote[:3]
+                    if key in owned:
+                        owned[key].quote = quote
+            except BaseException as e:
+                for flight in owned.values():
+                    flight.error = e
+                raise
+            finally:
+                for key, flight in owned.items():
+                    self._land(key, flight)
+
+        for key, flight in waiting.items():
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.quote is not None:
+                result[key] = flight.quote[:3]
+
+        return result
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """Drop one symbol, or everything, from memory and the persistent tier."""
+        with self._db_lock:
+            with self._lock:
+                if symbol is None:
+                    self._entries.clear()
+                    self._pending.clear()
+                else:
+                    key = symbol.upper()
+                    self._entries.pop(key, None)
+                    self._pending.pop(key, None)
+            if self._db is not None:
+                if symbol is None:
+                    self._db.execute("DELETE FROM prices")
+                else:
+                    self._db.execute("DELETE FROM prices WHERE symbol = ?", (key,))
+                self._db.commit()
+
+    def stats(self) -> dict[str, int]:
+        """Return hit / miss / staleness counters and current size."""
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for in-flight background refreshes to finish."""
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def close(self) -> None:
+        """Wait for refreshes, flush pending writes and close the persistent tier."""
+        self.join()
+        self._flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _lookup(self, key: str) -> Optional[tuple[float, str, str]]:
+        """Serve a fresh or stale entry (scheduling a refresh), or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = self._clock() - entry[3]
+                if age <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[:3]
+                if age <= self.ttl + self.max_stale:
+                    self._entries.move_to_end(key)
+                    self._stats["stale_hits"] += 1
+                    self._schedule_refresh(key)
+                    return entry[:3]
+            self._stats["misses"] += 1
+            return None
+
+    def _join_flight(self, key: str) -> tuple[_Flight, bool]:
+        """Return (flight, owner): the fetch in progress for key, or a new one the caller must run."""
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self._stats["coalesced"] += 1
+                return flight, False
+            flight = self._inflight[key] = _Flight()
+            return flight, True
+
+    def _land(self, key: str, flight: _Flight) -> None:
+        """Finish the caller's flight and wake everyone waiting on it."""
+        with self._lock:
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+        flight.done.set()
+
+    def _schedule_refresh(self, key: str) -> None:
+        """Start one background refresh per symbol. Caller holds the lock."""
+        if key in self._refreshing:
+            return
+        thread = threading.Thread(target=self._refresh, args=(key,), daemon=True)
+        self._refreshing[key] = thread
+        thread.start()
+
+    def _refresh(self, key: str) -> None:
+        try:
+            quote = self._fetcher(key)
+        except Exception:
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+        else:
+            self._store({key: quote})
+            with self._lock:
+                self._stats["refreshes"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def _store(self, quotes: dict[str, tuple[float, str, str]]) -> None:
+        """Cache {key: quote}; a StaleQuote keeps its own fetched_at and never replaces newer data."""
+        now = self._clock()
+        with self._lock:
+            for key, quote in quotes.items():
+                price, asset_name, symbol = quote[:3]
+                fetched_at = quote.fetched_at if is_stale(quote) else now
+                current = self._entries.get(key)
+                if current is not None and current[3] > fetched_at:
+                    continue
+                self._entries[key] = (price, asset_name, symbol, fetched_at)
+                self._entries.move_to_end(key)
+                if self._db is not None:
+                    self._pending[key] = (key, price, asset_name, fetched_at)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+                if self._db is not None:
+                    self._pending[evicted] = None
+        self._flush()
+
+    def _flush(self) -> None:
+        """Write pending rows and deletions in one transaction, outside the cache lock."""
+        if self._db is None:
+            return
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending or self._db is None:
+                return
+            rows = [row for row in pending.values() if row is not None]
+            deleted = [(key,) for key, row in pending.items() if row is None]
+            with self._db:
+                if deleted:
+                    self._db.executemany("DELETE FROM prices WHERE symbol = ?", deleted)
+                if rows:
+                    self._db.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)", rows)
+
+    def _load(self) -> None:
+        """Warm the memory tier from the persistent tier, newest entries last."""
+        rows = self._db.execute(
+            "SELECT symbol, price, asset_name, fetched_at FROM prices "
+            "ORDER BY fetched_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, price, asset_name, fetched_at in reversed(rows):
+            self._entries[key] = (price, asset_name, key, fetched_at)
@@ -0,0 +1,398 @@
+"""
+crypto_providers.py
+Pluggable price providers and hedged fetching across them.
+
+A provider is anything with fetch_crypto_prices' contract:
+
+    provider(symbols) -> {symbol_upper: (price, asset_name, symbol_upper)}
+
+raising ValueError on failure, so providers drop into
+PriceCache(fetcher=provider.fetch_price, batch_fetcher=provider) and
+PriceMemo(fetcher=provider) unchanged. CoinGeckoProvider and
+BinanceProvider take their endpoint URL, so tests point them at
+stub_price_server.StubPriceServer instances.
+
+HedgedProvider cuts tail latency: it asks the first provider, and if no
+valid answer has arrived after the hedge delay (by default the p95 of the
+first provider's recent latencies) it also asks the next one. The first
+valid answer wins; a failed answer fires the next provider immediately.
+With max_divergence_percent set, the other providers' answers are compared
+against the winner in the background and large gaps are flagged.
+
+Usage:
+    provider = HedgedProvider([CoinGeckoProvider(), BinanceProvider()], max_divergence_percent=1.0)
+    provider.fetch_price("BTC")
+    python crypto_providers.py BTC ETH --max-divergence 0.5    # compare providers
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import contextvars
+import json
+import math
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Optional, Sequence
+
+import crypto_metrics
+from crypto_leverage import _api_error, _get_session, _optional, _resolve_symbol, fetch_crypto_prices
+from crypto_resilience import breaker_for, is_upstream_failure, request_timeout
+
+BINANCE_PRICE_URL = "https://api.binance.com/api/v3/ticker/price"
+
+HEDGES = crypto_metrics.REGISTRY.counter(
+    "crypto_price_hedges_total", "Backup price requests fired by hedged fetches", ("provider",)
+)
+DIVERGENCES = crypto_metrics.REGISTRY.counter(
+    "crypto_price_divergence_total", "Cross-provider price checks beyond the allowed divergence", ("symbol",)
+)
+
+
+class PriceProvider:
+    """Base class for a named price source (see module docstring for the contract)."""
+
+    name = "provider"
+
+    def fetch_prices(self, symbols: Iterable[str]) -> dict[str, tuple[float, str, str]]:
+        raise NotImplementedError
+
+    def fetch_price(self, symbol: str) -> tuple[float, str, str]:
+        """Single-symbol form, same contract as fetch_crypto_price."""
+        return self.fetch_prices([symbol])[symbol.upper()]
+
+    def __call__(self, symbols: Iterable[str]) -> dict[str, tuple[float, str, str]]:
+        return self.fetch_prices(symbols)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class CoinGeckoProvider(PriceProvider):
+    """CoinGecko /simple/price via fetch_crypto_prices (shared keep-alive session)."""
+
+    name = "coingecko"
+
+    def __init__(self, url: Optional[str] = None, timeout: float = 10.0, name: Optional[str] = None) -> None:
+        """
+        Args:
+            url: /simple/price endpoint (default crypto_leverage.COINGECKO_PRICE_URL)
+            timeout: Request timeout in seconds
+            name: Provider name used in stats and divergence reports
+        """
+        self.url = url
+        self.timeout = timeout
+        if name:
+            self.name = name
+
+    def fetch_prices(self, symbols: Iterable[str]) -> dict[str, tuple[float, str, str]]:
+        return fetch_crypto_prices(symbols, url=self.url, timeout=self.timeout)
+
+
+class BinanceProvider(PriceProvider):
+    """Binance spot /ticker/price, one request for all symbols, priced in USDT."""
+
+    name = "binance"
+
+    def __init__(
+        self,
+        url: str = BINANCE_PRICE_URL,
+        quote: str = "USDT",
+        timeout: float = 10.0,
+        name: Optional[str] = None,
+    ) -> None:
+        self.url = url
+        self.quote = quote
+        self.timeout = timeout
+        if name:
+            self.name = name
+
+    def fetch_prices(self, symbols: Iterable[str]) -> dict[str, tuple[float, str, str]]:
+        requests = _optional("requests")
+        if requests is None:
+            raise ValueError(
+                "requests library not installed. "
+                "Install with: pip install requests"
+            )
+
+        resolved = dict(_resolve_symbol(symbol) for symbol in symbols)
+        if not resolved:
+            return {}
+        pairs = {symbol_upper + self.quote: symbol_upper for symbol_upper in resolved}
+
+        with crypto_metrics.track_fetch() as fetch_metrics:
+            limit = request_timeout(self.timeout)
+            breaker = breaker_for(self.url)
+            breaker.allow()
+            failed = None
+            try:
+                params = {"symbols": json.dumps(sorted(pairs), separators=(",", ":"))}
+                response = _get_session().get(self.url, params=params, timeout=limit)
+                response.raise_for_status()
+                fetch_metrics.bytes = len(response.content)
+                data = response.json()
+                failed = False
+            except requests.exceptions.RequestException as e:
+                failed = is_upstream_failure(e)
+                raise _api_error(e)
+            finally:
+                breaker.record(failed)
+
+            try:
+                quoted = {pairs[item["symbol"]]: float(item["price"]) for item in data if item["symbol"] in pairs}
+            except (TypeError, KeyError, ValueError):
+                raise ValueError("Unexpected response from the Binance price API")
+            prices = {}
+            for symbol_upper, gecko_id in resolved.items():
+                if symbol_upper not in quoted:
+                    raise ValueError(f"Could not fetch price for {symbol_upper}")
+                prices[symbol_upper] = (quoted[symbol_upper], gecko_id, symbol_upper)
+            return prices
+
+
+def _check_prices(provider: PriceProvider, result: dict, symbols: list[str]) -> dict:
+    """Reject answers missing a symbol or carrying a non-positive / non-finite price."""
+    for symbol in symbols:
+        quote = result.get(symbol.upper())
+        if quote is None or not (quote[0] > 0 and math.isfinite(quote[0])):
+            raise ValueError(f"Could not fetch price for {symbol.upper()} from {provider.name}")
+    return result
+
+
+def _divergence(a: float, b: float) -> float:
+    """Gap between two prices, in percent of the lower one."""
+    return abs(a - b) / min(a, b) * 100
+
+
+class HedgedProvider(PriceProvider):
+    """Asks providers in order, hedging slow answers; the first valid answer wins."""
+
+    name = "hedged"
+
+    def __init__(
+        self,
+        providers: Sequence[PriceProvider],
+        hedge_delay: Optional[float] = None,
+        percentile: float = 95.0,
+        window: int = 256,
+        min_samples: int = 20,
+        initial_delay: float = 0.5,
+        max_divergence_percent: Optional[float] = None,
+        on_divergence: Optional[Callable[[dict], None]] = None,
+    ) -> None:
+        """
+        Args:
+            providers: Primary first, then backups in the order to try them
+            hedge_delay: Fixed seconds before the next provider is asked;
+                         default is adaptive (see percentile)
+            percentile: Adaptive delay = this percentile of the primary's
+                        last `window` successful latencies
+            min_samples: Latencies needed before the adaptive delay is used;
+                         until then `initial_delay` applies
+            max_divergence_percent: If set, every provider is asked (backups
+                         in the background, never delaying the answer) and
+                         prices further apart than this are flagged
+            on_divergence: Called with each flagged record
+                           ({symbol, prices: {provider: price}, divergence_percent})
+        """
+        if not providers:
+            raise ValueError("At least one price provider is required")
+        if hedge_delay is not None and hedge_delay < 0:
+            raise ValueError("hedge_delay must be non-negative")
+        self.providers = list(providers)
+        self.hedge_delay = hedge_delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.max_divergence_percent = max_divergence_percent
+        self.on_divergence = on_divergence
+        self.divergences: collections.deque[dict] = collections.deque(maxlen=100)
+
+        self._latencies: collections.deque[float] = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(self.providers), thread_name_prefix="hedged-fetch")
+        self._stats = {"requests": 0, "hedged": 0, "failovers": 0, "backup_wins": 0, "failures": 0, "divergences": 0}
+
+    def current_delay(self) -> float:
+        """Seconds to wait for the primary before asking the next provider."""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        return samples[min(len(samples) - 1, int(self.percentile / 100 * len(samples)))]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self) -> None:
+        """Stop the hedging thread pool; queued backup requests are cancelled."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> "HedgedProvider":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def fetch_prices(self, symbols: Iterable[str]) -> dict[str, tuple[float, str, str]]:
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        self._count("requests")
+        delay = self.current_delay()
+        pending: dict[Future, int] = {}
+        errors: list[Exception] = []
+
+        def launch() -> None:
+            index = len(pending) + len(errors)
+            pending[self._submit(index, symbols)] = index
+
+        launch()
+        while pending:
+            more = len(pending) + len(errors) < len(self.providers)
+            done, _ = wait(pending, timeout=delay if more else None, return_when=FIRST_COMPLETED)
+            if not done:
+                # No answer within the hedge delay: ask the next provider too
+                self._count("hedged")
+                if crypto_metrics.enabled():
+                    HEDGES.labels(self.providers[len(pending) + len(errors)].name).inc()
+                launch()
+                continue
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    result = future.result()
+                except ValueError as e:
+                    errors.append(e)
+                    continue
+                if index:
+                    self._count("backup_wins")
+                if self.max_divergence_percent is not None:
+                    self._cross_check(index, result, symbols, pending, len(pending) + len(errors) + 1)
+                return result
+            if len(pending) + len(errors) < len(self.providers):
+                self._count("failovers")
+                launch()
+
+        self._count("failures")
+        raise errors[0]
+
+    def _submit(self, index: int, symbols: list[str]) -> Future:
+        # Run in a copy of the caller's context so its deadline() reaches the provider
+        return self._executor.submit(contextvars.copy_context().run, self._fetch, index, symbols)
+
+    def _fetch(self, index: int, symbols: list[str]) -> dict:
+        provider = self.providers[index]
+        start = time.perf_counter()
+        result = _check_prices(provider, provider.fetch_prices(symbols), symbols)
+        if index == 0:
+            with self._lock:
+                self._latencies.append(time.perf_counter() - start)
+        return result
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _cross_check(self, winner: int, result: dict, symbols: list[str], pending: dict, launched: int) -> None:
+        """Compare the other providers' answers with the winner's as they arrive."""
+        others = list(pending.items())
+        for index in range(launched, len(self.providers)):
+            others.append((self._submit(index, symbols), index))
+        for future, index in others:
+            future.add_done_callback(
+                lambda future, index=index: self._compare(winner, result, index, future)
+            )
+
+    def _compare(self, winner: int, result: dict, index: int, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        other = future.result()
+        names = self.providers[winner].name, self.providers[index].name
+        for symbol, quote in result.items():
+            if symbol not in other:
+                continue
+            divergence = _divergence(quote[0], other[symbol][0])
+            if divergence <= self.max_divergence_percent:
+                continue
+            record = {
+                "symbol": symbol,
+                "prices": {names[0]: quote[0], names[1]: other[symbol][0]},
+                "divergence_percent": divergence,
+            }
+            self.divergences.append(record)
+            self._count("divergences")
+            if crypto_metrics.enabled():
+                DIVERGENCES.labels(symbol).inc()
+            if self.on_divergence is not None:
+                self.on_divergence(record)
+
+
+def compare_providers(
+    providers: Sequence[PriceProvider],
+    symbols: Iterable[str],
+    max_divergence_percent: float = 1.0,
+) -> dict:
+    """
+    Ask every provider at once and compare their prices.
+
+    Returns dict with:
+      - prices: provider name -> {symbol: price}
+      - errors: provider name -> error message
+      - divergent: records for symbols whose highest and lowest price are
+        more than max_divergence_percent apart
+    """
+    symbols = [symbol.upper() for symbol in symbols]
+    with ThreadPoolExecutor(max_workers=len(providers)) as executor:
+        futures = {provider.name: executor.submit(provider.fetch_prices, symbols) for provider in providers}
+    prices, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            prices[name] = {symbol: quote[0] for symbol, quote in future.result().items()}
+        except ValueError as e:
+            errors[name] = str(e).split("\n")[0]
+
+    divergent = []
+    for symbol in symbols:
+        quotes = {name: quoted[symbol] for name, quoted in prices.items() if symbol in quoted}
+        if len(quotes) < 2:
+            continue
+        divergence = _divergence(max(quotes.values()), min(quotes.values()))
+        if divergence > max_divergence_percent:
+            divergent.append({"symbol": symbol, "prices": quotes, "divergence_percent": divergence})
+    return {"prices": prices, "errors": errors, "divergent": divergent}
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Compare CoinGecko and Binance prices for a few symbols."""
+    parser = argparse.ArgumentParser(description="Cross-check crypto prices across providers.")
+    parser.add_argument("symbols", nargs="+", help="Symbols to compare (BTC ETH ...)")
+    parser.add_argument("--max-divergence", type=float, default=1.0, help="Allowed gap in percent")
+    args = parser.parse_args(argv)
+
+    try:
+        report = compare_providers([CoinGeckoProvider(), BinanceProvider()], args.symbols, args.max_divergence)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    for name, quoted in report["prices"].items():
+        print(f"{name:<10} " + "  ".join(f"{symbol} ${price:,.4f}" for symbol, price in quoted.items()))
+    for name, error in report["errors"].items():
+        print(f"{name:<10} ❌ {error}")
+    for record in report["divergent"]:
+        print(f"⚠️  {record['symbol']} diverges by {record['divergence_percent']:.2f}%")
+    if report["divergent"]:
+        sys.exit(1)
+    if not report["errors"]:
+        print(f"✅ All providers within {args.max_divergence}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+crypto_ratelimit.py
+Machine-wide rate limiting and request coalescing for price lookups.
+
+Dozens of calculator processes on one host share a single CoinGecko
+request budget. SharedRateLimiter keeps that budget in a token bucket
+stored in a small state file under `directory`. The file is guarded by
+fcntl.flock, so every process that uses the same directory draws from the
+same bucket.
+
+Lookups are also single-flight. Within a process, threads asking for a
+symbol that is already being fetched wait for that fetch. Across
+processes, each symbol has a lock file that holds the last answer, and a
+process that finds one younger than `window` seconds reuses it. Any number
+of concurrent requests for a symbol therefore cost one upstream call.
+
+A 429 answer surfaces as RateLimitedError, a ValueError carrying the
+server's Retry-After. The limiter blocks the shared bucket for that long,
+so every process backs off, and then retries. Waits for the budget and
+for another process's lookup are capped by the caller's
+crypto_resilience.deadline().
+
+Setting $CRYPTO_RATE_LIMIT to a directory routes the default
+fetch_crypto_price / fetch_crypto_prices calls through a limiter there.
+
+Usage:
+    limiter = SharedRateLimiter("/tmp/crypto-rate", rate=0.5, burst=5)
+    price, asset_name, symbol = limiter.fetch_price("BTC")
+    CRYPTO_RATE_LIMIT=/tmp/crypto-rate python crypto_batch.py positions.csv
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional
+
+import crypto_leverage
+from crypto_leverage import RATE_LIMIT_ENV, RateLimitedError
+from crypto_resilience import DeadlineExceeded, is_stale, time_left
+
+try:
+    import fcntl
+except ImportError:  # Windows: the bucket is only shared between threads
+    fcntl = None
+
+__all__ = ["RATE_LIMIT_ENV", "RateLimitedError", "SharedRateLimiter", "TokenBucket", "shared_limiter"]
+
+
+def _lock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def _lock_file_by_deadline(fd: int) -> None:
+    """
+    _lock_file, giving up when the caller's deadline passes.
+
+    Raises:
+        DeadlineExceeded: If another holder keeps the lock past the deadline
+    """
+    if fcntl is None or time_left() is None:
+        _lock_file(fd)
+        return
+    poll = 0.001
+    while True:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            pass
+        left = time_left()
+        if left <= 0:
+            raise DeadlineExceeded(f"Deadline exceeded {-left:.2f}s waiting for a concurrent price lookup")
+        time.sleep(min(poll, left))
+        poll = min(poll * 2, 0.05)
+
+
+def _unlock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class TokenBucket:
+    """Token bucket whose state lives in a file shared by every process using it."""
+
+    # tokens, last refill time, blocked-until time (all time.time() based)
+    _STATE = struct.Struct("<ddd")
+
+    def __init__(
+        self,
+        path: str,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Args:
+            path: State file, created on first use
+            rate: Tokens added per second
+            capacity: Maximum tokens (the burst size)
+            clock: Wall-clock source; it must agree across processes
+            sleep: Called with the seconds to wait for a token
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1")
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        # flock does not exclude threads sharing one descriptor
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            _lock_file(self._fd)
+            try:
+                yield
+            finally:
+                _unlock_file(self._fd)
+
+    def _read(self, now: float) -> tuple[float, float, float]:
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        data = os.read(self._fd, self._STATE.size)
+        if len(data) < self._STATE.size:
+            return float(self.capacity), now, 0.0
+        return self._STATE.unpack(data)
+
+    def _write(self, tokens: float, updated: float, blocked_until: float) -> None:
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, self._STATE.pack(tokens, updated, blocked_until))
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take `tokens` if available; return 0.0, or the seconds to wait before retrying."""
+        with self._locked():
+            now = self._clock()
+            level, updated, blocked_until = self._read(now)
+            level = min(self.capacity, level + max(0.0, now - updated) * self.rate)
+            if now < blocked_until:
+                wait = blocked_until - now
+            elif level >= tokens:
+                level -= tokens
+                wait = 0.0
+            else:
+                wait = (tokens - level) / self.rate
+            self._write(level, max(now, updated), blocked_until)
+            return wait
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> float:
+        """
+        Take `tokens`, sleeping until the bucket has them.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitedError: If the wait would exceed `timeout` seconds
+        """
+        start = self._clock()
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return self._clock() - start
+            waited = self._clock() - start
+            if timeout is not None and waited + wait > timeout:
+                raise RateLimitedError(wait, "local request budget exhausted")
+            self._sleep(wait)
+
+    def penalize(self, retry_after: float) -> None:
+        """Empty the bucket and block it for `retry_after` seconds (after a 429)."""
+        with self._locked():
+            now = self._clock()
+            _, updated, blocked_until = self._read(now)
+            until = max(blocked_until, now + retry_after)
+            self._write(0.0, max(until, updated), until)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _Flight:
+    """One in-process fetch of a symbol that other threads can wait on."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[tuple[float, str, str]] = None
+        self.error: Optional[BaseException] = None
+
+
+def _fetch_upstream(symbols: list[str], timeout: Optional[float] = None) -> dict[str, tuple[float, str, str]]:
+    # An explicit url bypasses the $CRYPTO_RATE_LIMIT routing (no recursion)
+    return crypto_leverage.fetch_crypto_prices(symbols, url=crypto_leverage.COINGECKO_PRICE_URL, timeout=timeout)
+
+
+class SharedRateLimiter:
+    """Rate-limited, single-flight front end to a price fetcher, shared across processes."""
+
+    def __init__(
+        self,
+        directory: str,
+        rate: float = 0.5,
+        burst: int = 5,
+        window: float = 2.0,
+        max_wait: float = 30.0,
+        retries: int = 2,
+        fetcher: Callable[[list[str]], dict[str, tuple[float, str, str]]] = _fetch_upstream,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Args:
+            directory: Shared state directory (created if missing)
+            rate: Upstream requests per second for the whole machine
+            burst: Requests allowed back to back before `rate` applies
+            window: Seconds a fetched price is reused by concurrent lookups
+            max_wait: Longest wait for the budget before RateLimitedError
+            retries: Retries after a 429, each after its Retry-After
+            fetcher: Multi-symbol fetch, same contract as fetch_crypto_prices
+                     (called with timeout= only when a caller passes one)
+            clock: Wall-clock source; it must agree across processes
+            sleep: Called with the seconds to wait for the budget
+        """
+        if window < 0 or max_wait < 0 or retries < 0:
+            raise ValueError("window, max_wait and retries must not be negative")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.window = window
+        self.max_wait = max_wait
+        self.retries = retries
+        self.bucket = TokenBucket(os.path.join(directory, "bucket"), rate, burst, clock, sleep)
+        self._fetcher = fetcher
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+        self._stats = {
+            "lookups": 0,
+            "coalesced": 0,
+            "shared": 0,
+            "upstream_calls": 0,
+            "rate_limited": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def fetch_prices(
+        self, symbols: Iterable[str], timeout: Optional[float] = None
+    ) -> dict[str, tuple[float, str, str]]:
+        """
+        Prices for `symbols`, joining in-flight or just-finished fetches where possible.
+
+        `timeout` is passed to the fetcher as its request timeout (None: the
+        fetcher's default). Joined fetches keep the timeout they started with.
+
+        Raises:
+            RateLimitedError: If the budget stays exhausted past max_wait, or
+                              the API keeps answering 429 after `retries`
+            ValueError: Propagated from the fetcher
+        """
+        keys = sorted({symbol.upper() for symbol in symbols})
+        lead, follow = [], {}
+        with self._lock:
+            self._stats["lookups"] += len(keys)
+            for key in keys:
+                flight = self._flights.get(key)
+                if flight is None:
+                    self._flights[key] = _Flight()
+                    lead.append(key)
+                else:
+                    follow[key] = flight
+            self._stats["coalesced"] += len(follow)
+
+        results = {}
+        if lead:
+            try:
+                results.update(self._fetch_shared(lead, timeout))
+            except BaseException as e:
+                self._land(lead, {}, e)
+                raise
+            self._land(lead, results, None)
+        # Our own flights are landed before waiting, so two batches never wait on each other
+        for key, flight in follow.items():
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            results[key] = flight.result
+        return results
+
+    def fetch_price(self, symbol: str, timeout: Optional[float] = None) -> tuple[float, str, str]:
+        """Single-symbol form, same contract as fetch_crypto_price."""
+        return self.fetch_prices([symbol], timeout)[symbol.upper()]
+
+    def __call__(self, symbols: Iterable[str]) -> dict[str, tuple[float, str, str]]:
+        return self.fetch_prices(symbols)
+
+    def _land(self, keys: list[str], results: dict, error: Optional[BaseException]) -> None:
+        with self._lock:
+            for key in keys:
+                flight = self._flights.pop(key)
+                flight.result = results.get(key)
+                flight.error = error
+                if error is None and flight.result is None:
+                    flight.error = ValueError(f"Could not fetch price for {key}")
+                flight.done.set()
+
+    def _price_path(self, key: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^A-Z0-9_-]", "_", key) + ".price")
+
+    def _fetch_shared(self, keys: list[str], timeout: Optional[float]) -> dict[str, tuple[float, str, str]]:
+        """Fetch `keys` holding their lock files, reusing answers younger than `window`."""
+        fds = []
+        try:
+            # keys are sorted, so processes take overlapping locks in the same order
+            for key in keys:
+                fd = os.open(self._price_path(key), os.O_RDWR | os.O_CREAT, 0o644)
+                fds.append(fd)
+                _lock_file_by_deadline(fd)
+
+            results, missing = {}, []
+            now = self._clock()
+            for key, fd in zip(keys, fds):
+                entry = _read_entry(fd)
+                if entry is not None and 0 <= now - entry["fetched_at"] < self.window:
+                    results[key] = (entry["price"], entry["asset_name"], entry["symbol"])
+                else:
+                    missing.append((key, fd))
+            with self._lock:
+                self._stats["shared"] += len(results)
+
+            if missing:
+                fetched = self._fetch_upstream([key for key, _ in missing], timeout)
+                fetched_at = self._clock()
+                for key, fd in missing:
+                    # A degraded answer is no newer than what is already shared
+                    if key in fetched and not is_stale(fetched[key]):
+                        _write_entry(fd, fetched[key], fetched_at)
+                results.update(fetched)
+            return results
+        finally:
+            for fd in fds:
+                os.close(fd)  # also releases the flock
+
+    def _fetch_upstream(self, keys: list[str], timeout: Optional[float]) -> dict[str, tuple[float, str, str]]:
+        """One fetcher call within the shared budget, backing off on 429."""
+        for attempt in range(self.retries + 1):
+            left = time_left()
+            waited = self.bucket.acquire(timeout=self.max_wait if left is None else min(self.max_wait, left))
+            with self._lock:
+                self._stats["upstream_calls"] += 1
+                self._stats["wait_seconds"] += waited
+            try:
+                return self._fetcher(keys) if timeout is None else self._fetcher(keys, timeout=timeout)
+            except RateLimitedError as e:
+                with self._lock:
+                    self._stats["rate_limited"] += 1
+                self.bucket.penalize(e.retry_after)
+                if attempt == self.retries:
+                    raise
+
+    def last_known(self, symbol: str) -> Optional[tuple[float, str, str, float]]:
+        """(price, asset_name, symbol, fetched_at) last fetched by any process, however old."""
+        try:
+            fd = os.open(self._price_path(symbol.upper()), os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            entry = _read_entry(fd)
+        finally:
+            os.close(fd)
+        if entry is None:
+            return None
+        return entry["price"], entry["asset_name"], entry["symbol"], entry["fetched_at"]
+
+    def stats(self) -> dict[str, float]:
+        """Lookup / coalescing / upstream counters for this process."""
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self) -> None:
+        self.bucket.close()
+
+
+def _read_entry(fd: int) -> Optional[dict]:
+    os.lseek(fd, 0, os.SEEK_SET)
+    data = os.read(fd, 4096)
+    if not data:
+        return None
+    try:
+        return json.loads(data)
+    except ValueError:  # torn write from a crashed process
+        return None
+
+
+def _write_entry(fd: int, quote: tuple[float, str, str], fetched_at: float) -> None:
+    price, asset_name, symbol = quote
+    data = json.dumps({"price": price, "asset_name": asset_name, "symbol": symbol,
+                       "fetched_at": fetched_at}).encode()
+    os.ftruncate(fd, 0)
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.write(fd, data)
+
+
+_limiters: dict[str, SharedRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_limiter(directory: str) -> SharedRateLimiter:
+    """The process-wide limiter for `directory`, created with defaults on first use."""
+    key = os.path.abspath(directory)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = SharedRateLimiter(key)
+        return limiter
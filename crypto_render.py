@@ -0,0 +1,251 @@
+"""
+crypto_render.py
+Buffered report rendering for the crypto leverage calculator.
+
+Every report is produced as one string from a template built once at
+import, so rendering costs one format call instead of dozens of prints,
+and streams of reports go out with one write each.
+
+Formats:
+  - text:  the interactive calculator's layout, with formulas
+  - table: one fixed-width row per report under a single header
+  - json:  one JSON object per line
+  - csv:   header row plus one row per report
+
+Usage:
+    report = build_report(50000, 1000, 5, 10, position_info, 47500, 55000, symbol="BTC")
+    sys.stdout.write(render_report(report, "text"))
+    write_reports(reports, fd, "csv")
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Iterable, Mapping, Optional, Union
+
+from crypto_leverage import calculate_risk_reward_ratio
+from crypto_metrics import instrument
+
+
+FORMATS = ("text", "table", "json", "csv")
+
+REPORT_FIELDS = [
+    "symbol",
+    "asset_name",
+    "leverage",
+    "current_price",
+    "entry_price",
+    "investment_amount",
+    "stop_loss_percent",
+    "profit_target_percent",
+    "position_size",
+    "effective_capital",
+    "stop_loss_price",
+    "take_profit_price",
+    "loss_on_stop",
+    "profit_on_tp",
+    "risk_reward",
+    "currency",
+    "investment_currency",
+]
+
+# Signs for the common quote / funding currencies; others print as "EUR 1.00"
+CURRENCY_SIGNS = {"USD": "$", "EUR": "€", "GBP": "£"}
+
+_RULE = "=" * 70
+_THIN_RULE = "-" * 70
+
+_TEXT_TEMPLATE = f"""
+{_RULE}
+📈 CALCULATION RESULTS
+{_RULE}
+
+📥 YOUR INPUTS:
+  Current Price (Entry):        {{price_sign}}{{entry_price:,.2f}}
+  Investment Amount:            {{cash_sign}}{{investment_amount:,.2f}}
+  Stop Loss Tolerance:          {{stop_loss_percent:.2f}}%
+  Target Profit Goal:           {{profit_target_percent:.2f}}%
+  Leverage:                     x{{leverage}}
+
+💼 POSITION DETAILS:
+  Position Size (Crypto):       {{position_size:.8f}} {{unit}}
+  Effective Capital:            {{price_sign}}{{effective_capital:,.2f}}
+
+{_THIN_RULE}
+🔢 CALCULATION FORMULAS:
+{_THIN_RULE}
+
+🛑 STOP LOSS PRICE:
+  Formula: Entry Price × (1 - Stop Loss % / 100)
+  Formula: {{price_sign}}{{entry_price:,.2f}} × (1 - {{stop_loss_percent}}/100)
+  Formula: {{price_sign}}{{entry_price:,.2f}} × {{stop_loss_factor:.4f}}
+  ➜ Result: {{price_sign}}{{stop_loss_price:,.2f}}
+
+📈 TAKE PROFIT PRICE:
+  Formula: Entry Price × (1 + Target Profit % / 100)
+  Formula: {{price_sign}}{{entry_price:,.2f}} × (1 + {{profit_target_percent}}/100)
+  Formula: {{price_sign}}{{entry_price:,.2f}} × {{take_profit_factor:.4f}}
+  ➜ Result: {{price_sign}}{{take_profit_price:,.2f}}
+
+{_RULE}
+🎯 PRICE TARGETS:
+{_RULE}
+  Entry Price:                  {{price_sign}}{{entry_price:,.2f}}
+  Stop Loss Price:              {{price_sign}}{{stop_loss_price:,.2f}}
+  Take Profit Price:            {{price_sign}}{{take_profit_price:,.2f}}
+
+{_RULE}
+📊 RISK/REWARD ANALYSIS:
+{_RULE}
+
+💸 POTENTIAL LOSS (at stop loss):
+  Formula: Investment × (Stop Loss % / 100)
+  Formula: {{cash_sign}}{{investment_amount:,.2f}} × ({{stop_loss_percent}}/100)
+  ➜ Result: {{cash_sign}}{{loss_on_stop:,.2f}}
+
+💰 POTENTIAL PROFIT (at take profit):
+  Formula: Investment × (Target Profit % / 100)
+  Formula: {{cash_sign}}{{investment_amount:,.2f}} × ({{profit_target_percent}}/100)
+  ➜ Result: {{cash_sign}}{{profit_on_tp:,.2f}}
+
+⚖️  RISK/REWARD RATIO:
+  Formula: Reward / Risk
+  Formula: {{profit_on_tp:,.2f}} / {{loss_on_stop:,.2f}}
+  ➜ Result: 1:{{risk_reward:.2f}}
+
+{_RULE}
+
+"""
+
+_TABLE_HEADER = (
+    f"{'SYMBOL':<8} {'LEV':>4} {'ENTRY':>14} {'SIZE':>16} "
+    f"{'STOP LOSS':>14} {'TAKE PROFIT':>14} {'LOSS':>12} {'PROFIT':>12} {'R:R':>7}\n"
+)
+_TABLE_TEMPLATE = (
+    "{symbol:<8} {leverage:>3}x {entry_price:>14,.2f} {position_size:>16.8f} "
+    "{stop_loss_price:>14,.2f} {take_profit_price:>14,.2f} {loss_on_stop:>12,.2f} "
+    "{profit_on_tp:>12,.2f} {risk_reward:>7.2f}\n"
+)
+
+_CSV_HEADER = ",".join(REPORT_FIELDS) + "\n"
+
+# Bound format methods, looked up once
+_render_text = _TEXT_TEMPLATE.format
+_render_table = _TABLE_TEMPLATE.format_map
+
+
+def build_report(
+    current_price: float,
+    investment_amount: float,
+    stop_loss_percent: float,
+    profit_target_percent: float,
+    position_info: Mapping[str, float],
+    stop_loss_price: float,
+    take_profit_price: float,
+    asset_name: str = "",
+    symbol: str = "",
+    leverage: int = 10,
+    currency: str = "usd",
+    investment_currency: Optional[str] = None,
+) -> dict:
+    """
+    Collect every value a report shows into one flat dict.
+    position_info is a calculate_position dict or a crypto_positions.Position.
+
+    Prices and effective capital are in `currency`; the investment and the
+    loss / profit on it are in `investment_currency` (default: the same).
+    """
+    initial_capital = position_info["initial_capital"]
+    currency = currency.upper()
+    return {
+        "symbol": symbol,
+        "asset_name": asset_name,
+        "leverage": leverage,
+        "current_price": current_price,
+        "entry_price": position_info["entry_price"],
+        "investment_amount": initial_capital,
+        "stop_loss_percent": stop_loss_percent,
+        "profit_target_percent": profit_target_percent,
+        "position_size": position_info["position_size"],
+        "effective_capital": position_info["effective_capital"],
+        "stop_loss_price": stop_loss_price,
+        "take_profit_price": take_profit_price,
+        "loss_on_stop": initial_capital * (stop_loss_percent / 100),
+        "profit_on_tp": initial_capital * (profit_target_percent / 100),
+        "risk_reward": calculate_risk_reward_ratio(
+            position_info["entry_price"], stop_loss_price, take_profit_price
+        ),
+        "currency": currency,
+        "investment_currency": investment_currency.upper() if investment_currency else currency,
+    }
+
+
+def _csv_value(value: object) -> str:
+    """One CSV cell: floats/ints via repr, strings quoted only when needed."""
+    if isinstance(value, str):
+        if any(c in value for c in ',"\n\r'):
+            return '"' + value.replace('"', '""') + '"'
+        return value
+    return repr(value)
+
+
+def render_header(fmt: str) -> str:
+    """Text written once before a stream of reports ('' if the format has none)."""
+    if fmt == "table":
+        return _TABLE_HEADER
+    if fmt == "csv":
+        return _CSV_HEADER
+    if fmt in FORMATS:
+        return ""
+    raise ValueError(f"Unknown report format '{fmt}'. Available: {', '.join(FORMATS)}")
+
+
+def currency_sign(currency: str) -> str:
+    """Prefix for amounts in `currency`: "$", "€", "£" or the code and a space."""
+    return CURRENCY_SIGNS.get(currency.upper(), currency.upper() + " ")
+
+
+@instrument
+def render_report(report: dict, fmt: str = "text") -> str:
+    """Render one report built by build_report as a single string."""
+    if fmt == "text":
+        return _render_text(**report, unit=report["symbol"] or "coins",
+                            price_sign=currency_sign(report["currency"]),
+                            cash_sign=currency_sign(report["investment_currency"]),
+                            stop_loss_factor=1 - report["stop_loss_percent"] / 100,
+                            take_profit_factor=1 + report["profit_target_percent"] / 100)
+    if fmt == "table":
+        return _render_table(report)
+    if fmt == "json":
+        return json.dumps({name: report[name] for name in REPORT_FIELDS}) + "\n"
+    if fmt == "csv":
+        return ",".join([_csv_value(report[name]) for name in REPORT_FIELDS]) + "\n"
+    raise ValueError(f"Unknown report format '{fmt}'. Available: {', '.join(FORMATS)}")
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """os.write until every byte is out (pipes may take partial writes)."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def write_reports(reports: Iterable[dict], target: Union[int, object], fmt: str = "text") -> int:
+    """
+    Stream reports to a file descriptor (or an object with fileno()),
+    one write per report. Returns the number of reports written.
+    """
+    fd = target if isinstance(target, int) else target.fileno()
+    if hasattr(target, "flush"):
+        target.flush()
+
+    header = render_header(fmt)
+    if header:
+        _write_all(fd, header.encode())
+    count = 0
+    for report in reports:
+        _write_all(fd, render_report(report, fmt).encode())
+        count += 1
+    return count
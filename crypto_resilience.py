@@ -0,0 +1,237 @@
+"""
+crypto_resilience.py
+Deadlines, a circuit breaker and stale quotes for the price fetch path.
+
+Deadlines propagate from the caller. `with deadline(2.0):` bounds every
+price fetch made inside the block, including fetches made deep inside a
+PriceCache, PriceMemo or provider. Each request's timeout is whatever
+time is left, and a fetch that starts after the deadline fails at once
+with DeadlineExceeded. Nested deadlines keep the earlier one. The deadline
+lives in a contextvar, so asyncio tasks inherit it too.
+
+CircuitBreaker fails fast during an upstream outage. After
+`failure_threshold` consecutive upstream failures (network errors,
+timeouts, 5xx, 429) it opens. While open, fetches raise CircuitOpenError
+without touching the network. After `reset_timeout` seconds it lets
+`half_open_max` probe requests through: a successful probe closes it, a
+failed one opens it again. breaker_for(url) keeps one breaker per
+endpoint.
+
+StaleQuote marks a price served from the last successful fetch in
+degraded mode (fetch_crypto_prices(..., allow_stale=True)). It still
+unpacks as (price, asset_name, symbol), and `stale` / `age` say how old it is.
+
+Usage:
+    with deadline(2.0):
+        price, asset_name, symbol = fetch_crypto_price("BTC", allow_stale=True)
+    if is_stale(quote):
+        print(f"stale by {quote.age:.0f}s")
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+import crypto_metrics
+
+BREAKER_OPENS = crypto_metrics.REGISTRY.counter(
+    "crypto_price_breaker_opens_total", "Times a price endpoint's circuit breaker opened", ("endpoint",)
+)
+STALE_QUOTES = crypto_metrics.REGISTRY.counter(
+    "crypto_price_stale_total", "Last-known prices served while the upstream was unavailable", ("symbol",)
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class DeadlineExceeded(ValueError):
+    """The caller's deadline passed before the price could be fetched."""
+
+
+class CircuitOpenError(ValueError):
+    """The endpoint's breaker is open; no request was made."""
+
+    def __init__(self, endpoint: str, retry_after: float, failures: int) -> None:
+        self.retry_after = retry_after
+        super().__init__(
+            f"Price API unavailable ({failures} consecutive failures, not retrying for {retry_after:.0f}s)\n"
+            f"Endpoint: {endpoint}\n"
+            f"Or enter price manually."
+        )
+
+
+# --- Deadlines -------------------------------------------------------------
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("crypto_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Bound every price fetch in the block to `seconds` from now (None: no bound)."""
+    if seconds is None:
+        yield
+        return
+    expires_at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(expires_at if outer is None else min(outer, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current deadline, or None when there is none."""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+def request_timeout(timeout: float) -> float:
+    """
+    `timeout` capped by the time left before the current deadline.
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    left = time_left()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded {-left:.2f}s before the price request")
+    return min(timeout, left)
+
+
+# --- Circuit breaker -------------------------------------------------------
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker in front of one upstream endpoint."""
+
+    def __init__(
+        self,
+        endpoint: str = "",
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            endpoint: Label for errors and metrics
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds open before probe requests are let through
+            half_open_max: Probe requests allowed in flight while half-open
+            clock: Monotonic time source
+        """
+        if failure_threshold <= 0 or reset_timeout < 0 or half_open_max <= 0:
+            raise ValueError("failure_threshold and half_open_max must be positive, reset_timeout non-negative")
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> None:
+        """
+        Admit one request; pair every admitted request with record().
+
+        Raises:
+            CircuitOpenError: While open, or half-open with all probes in flight
+        """
+        with self._lock:
+            if self._state == OPEN:
+                waited = self._clock() - self._opened_at
+                if waited < self.reset_timeout:
+                    raise CircuitOpenError(self.endpoint, self.reset_timeout - waited, self._failures)
+                self._state, self._probes = HALF_OPEN, 0
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_max:
+                    raise CircuitOpenError(self.endpoint, 0.0, self._failures)
+                self._probes += 1
+
+    def record(self, failed: Optional[bool]) -> None:
+        """Report the outcome of an admitted request (None: no verdict, e.g. cancelled)."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+            if failed is None:
+                return
+            if not failed:
+                self._state, self._failures = CLOSED, 0
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state, self._opened_at = OPEN, self._clock()
+                BREAKER_OPENS.labels(self.endpoint).inc()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state, self._failures, self._probes = CLOSED, 0, 0
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(endpoint: str) -> CircuitBreaker:
+    """The process-wide breaker for `endpoint`, created with defaults on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """True for failures that say the upstream is unhealthy (not e.g. a 404)."""
+    status = getattr(getattr(error, "response", None), "status_code", None) or getattr(error, "status", None)
+    return status is None or status == 429 or status >= 500
+
+
+# --- Degraded mode ---------------------------------------------------------
+
+class StaleQuote(tuple):
+    """(price, asset_name, symbol) from the last successful fetch, served in degraded mode."""
+
+    stale = True
+
+    def __new__(cls, quote: tuple[float, str, str], fetched_at: float, reason: str = "") -> "StaleQuote":
+        self = super().__new__(cls, quote)
+        self.fetched_at = fetched_at
+        self.reason = reason
+        return self
+
+    @property
+    def age(self) -> float:
+        """Seconds since the price was fetched."""
+        return max(0.0, time.time() - self.fetched_at)
+
+    def __repr__(self) -> str:
+        return f"StaleQuote({tuple(self)!r}, age={self.age:.0f}s)"
+
+
+def is_stale(quote: tuple) -> bool:
+    return getattr(quote, "stale", False)
+
+
+def format_age(seconds: float) -> str:
+    """Short age for staleness markers: 45s, 12m, 3h, 2d."""
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{seconds / size:.0f}{unit}"
+    return f"{seconds:.0f}s"
@@ -0,0 +1,441 @@
+"""
+crypto_server.py
+Long-running HTTP/JSON service for position calculations.
+
+One process keeps the interpreter, the calculators and a shared PriceCache
+warm, so callers pay a local round trip instead of interpreter startup per
+calculation. Built on asyncio streams with HTTP/1.1 keep-alive; the
+calculation endpoints run inline on the event loop, while price lookups
+(which may hit the network) run in a small thread pool.
+
+Endpoints (JSON bodies in and out):
+    GET  /health
+    GET  /metrics                     Prometheus text (see crypto_metrics.py)
+    GET  /price?symbols=BTC,ETH       also POST {"symbols": [...]}
+    POST /position     {price | symbol, investment_amount, leverage?,
+                        stop_loss_percent?, profit_target_percent?}
+    POST /stop-loss    {entry_price, stop_loss_percent}
+    POST /take-profit  {entry_price, profit_target_percent}
+    POST /risk-reward  {entry_price, stop_loss_price, take_profit_price}
+    POST /batch        {"positions": [rows as in crypto_batch.py]}
+
+Request bodies may use Content-Length or Transfer-Encoding: chunked.
+
+Errors are {"error": message} with status 400 (invalid input), 404
+(unknown symbol or route), 405, 413, 501 (unsupported transfer coding)
+or 502 (price API failure).
+
+Usage:
+    python crypto_server.py --port 8080
+    python crypto_server.py --hedge          # CoinGecko, hedged with Binance
+    python crypto_leverage.py --serve --port 8080
+    curl -d '{"symbol": "BTC", "investment_amount": 1000}' localhost:8080/position
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import crypto_metrics
+from crypto_batch import PriceMemo, process_rows
+from crypto_leverage import (
+    calculate_position,
+    calculate_risk_reward_ratio,
+    calculate_stop_loss,
+    calculate_take_profit,
+    validate_positive_number,
+)
+from crypto_price_cache import PriceCache
+
+
+REQUESTS = crypto_metrics.REGISTRY.counter(
+    "crypto_server_requests_total", "HTTP requests served", ("route", "status")
+)
+REQUEST_SECONDS = crypto_metrics.REGISTRY.histogram(
+    "crypto_server_request_seconds", "HTTP request handling time in seconds", ("route",),
+    crypto_metrics.CALL_BUCKETS,
+)
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+    501: "Not Implemented", 502: "Bad Gateway",
+}
+_HEX_DIGITS = b"0123456789abcdefABCDEF"
+
+
+class HTTPError(Exception):
+    """Error response with a status code."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _number(body: dict, key: str, name: str) -> float:
+    """A positive number from the request body, validated like the prompts."""
+    value = body.get(key)
+    if value is None or isinstance(value, bool):
+        raise ValueError(f"Missing {name}" if value is None else f"Invalid {name}: must be a number")
+    number = validate_positive_number(str(value), name)
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid {name}: must be finite")
+    return number
+
+
+def _percent(body: dict, key: str, name: str) -> float:
+    value = _number(body, key, name)
+    if value >= 100:
+        raise ValueError(f"{name[0].upper()}{name[1:]} must be less than 100%")
+    return value
+
+
+def _leverage(body: dict) -> int:
+    if body.get("leverage") is None:
+        return 10
+    value = _number(body, "leverage", "leverage")
+    if value != int(value):
+        raise ValueError("Invalid leverage: must be a whole number")
+    return int(value)
+
+
+def _price_error(error: ValueError) -> HTTPError:
+    message = str(error).splitlines()[0]
+    return HTTPError(404 if "not found" in message else 502, message)
+
+
+class CalculatorServer:
+    """asyncio HTTP/JSON front end for the calculators and a shared price cache."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        cache: Optional[PriceCache] = None,
+        max_body: int = 1 << 20,
+        max_batch: int = 10_000,
+        price_workers: int = 8,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.cache = cache or PriceCache()
+        self.max_body = max_body
+        self.max_batch = max_batch
+        self._executor = ThreadPoolExecutor(max_workers=price_workers, thread_name_prefix="crypto-price")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set[asyncio.Task] = set()
+        self._routes: dict[tuple[str, str], Callable[[dict, dict], Awaitable[object]]] = {
+            ("GET", "/health"): self._health,
+            ("GET", "/price"): self._price,
+            ("POST", "/price"): self._price,
+            ("POST", "/position"): self._position,
+            ("POST", "/stop-loss"): self._stop_loss,
+            ("POST", "/take-profit"): self._take_profit,
+            ("POST", "/risk-reward"): self._risk_reward,
+            ("POST", "/batch"): self._batch,
+        }
+        self._paths = {path for _, path in self._routes} | {"/metrics"}
+
+    async def start(self) -> None:
+        """Bind and start accepting connections (self.port holds the bound port)."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening and drop open keep-alive connections."""
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    # --- HTTP ---------------------------------------------------------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.LimitOverrunError:
+                    writer.write(self._response(431, {"error": "Request headers too large"}, False))
+                    break
+                except asyncio.IncompleteReadError:
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    writer.write(self._response(400, {"error": "Malformed request line"}, False))
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                transfer_encoding = headers.get("transfer-encoding", "").lower()
+                if transfer_encoding:
+                    if transfer_encoding != "chunked":
+                        writer.write(self._response(501, {"error": "Only chunked transfer coding is supported"}, False))
+                        break
+                    if "content-length" in headers:
+                        writer.write(self._response(400, {"error": "Both Content-Length and Transfer-Encoding"}, False))
+                        break
+                    try:
+                        body = await self._read_chunked(reader)
+                    except HTTPError as e:
+                        writer.write(self._response(e.status, {"error": str(e)}, False))
+                        break
+                else:
+                    try:
+                        length = int(headers.get("content-length") or 0)
+                    except ValueError:
+                        length = -1
+                    if length < 0:
+                        writer.write(self._response(400, {"error": "Invalid Content-Length"}, False))
+                        break
+                    if length > self.max_body:
+                        writer.write(self._response(413, {"error": "Request body too large"}, False))
+                        break
+                    body = await reader.readexactly(length) if length else b""
+
+                writer.write(await self._dispatch(method, target, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        """
+        Decode a chunked request body; extensions and trailers are ignored.
+
+        Raises:
+            HTTPError: 400 for malformed framing, 413 past max_body
+        """
+        body = bytearray()
+        read = 0
+        try:
+            while True:
+                line = await reader.readuntil(b"\r\n")
+                read += len(line)
+                size_text = line[:-2].split(b";", 1)[0].strip()
+                if not size_text or size_text.strip(_HEX_DIGITS):
+                    raise HTTPError(400, "Invalid chunk size")
+                size = int(size_text, 16)
+                if size == 0:
+                    break
+                if len(body) + size > self.max_body:
+                    raise HTTPError(413, "Request body too large")
+                body += await reader.readexactly(size)
+                if await reader.readexactly(2) != b"\r\n":
+                    raise HTTPError(400, "Malformed chunk")
+            while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+                read += len(line)
+                if read > self.max_body:
+                    raise HTTPError(413, "Request body too large")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(400, "Malformed chunk") from None
+        return bytes(body)
+
+    def _response(self, status: int, payload: object, keep_alive: bool,
+                  content_type: str = "application/json") -> bytes:
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return head.encode() + body
+
+    async def _dispatch(self, method: str, target: str, raw_body: bytes, keep_alive: bool) -> bytes:
+        start = time.perf_counter()
+        parts = urlsplit(target)
+        path = parts.path.rstrip("/") or "/"
+        try:
+            if path == "/metrics" and method == "GET":
+                return self._response(200, crypto_metrics.render().encode(), keep_alive,
+                                      crypto_metrics.CONTENT_TYPE)
+            handler = self._routes.get((method, path))
+            if handler is None:
+                if path in self._paths:
+                    raise HTTPError(405, f"{method} not allowed on {path}")
+                raise HTTPError(404, f"No route for {path}")
+            try:
+                body = json.loads(raw_body) if raw_body else {}
+            except ValueError as e:
+                raise HTTPError(400, f"Invalid JSON: {e}")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+            status, payload = 200, await handler(body, parse_qs(parts.query))
+        except HTTPError as e:
+            status, payload = e.status, {"error": str(e)}
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            # A bug in a handler must still produce a response, not a dropped connection
+            print(f"⚠️  {method} {path} failed: {type(e).__name__}: {e}", file=sys.stderr)
+            status, payload = 500, {"error": f"Internal error: {type(e).__name__}"}
+
+        if crypto_metrics.enabled():
+            route = path if path in self._paths else "other"
+            REQUESTS.labels(route, str(status)).inc()
+            REQUEST_SECONDS.labels(route).observe(time.perf_counter() - start)
+        return self._response(status, payload, keep_alive)
+
+    # --- Endpoints ----------------------------------------------------------
+
+    async def _prices(self, symbols: list[str]) -> dict[str, tuple[float, str, str]]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, self.cache.get_many, symbols)
+        except ValueError as e:
+            raise _price_error(e)
+
+    async def _health(self, body: dict, query: dict) -> dict:
+        return {"status": "ok", "cache": self.cache.stats()}
+
+    async def _price(self, body: dict, query: dict) -> dict:
+        symbols = body.get("symbols") or [
+            s for value in query.get("symbols", []) + query.get("symbol", []) for s in value.split(",") if s
+        ]
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        if not isinstance(symbols, list) or not all(isinstance(s, str) for s in symbols):
+            raise ValueError("Invalid symbols: must be a string or a list of strings")
+        if not symbols:
+            raise ValueError("Missing symbols")
+        quotes = await self._prices([str(s).strip() for s in symbols])
+        return {symbol: {"price": price, "asset_name": asset_name} for symbol, (price, asset_name, _) in quotes.items()}
+
+    async def _position(self, body: dict, query: dict) -> dict:
+        leverage = _leverage(body)
+        investment_amount = _number(body, "investment_amount", "investment amount")
+        if body.get("price") is not None:
+            price, symbol = _number(body, "price", "price"), body.get("symbol")
+        elif body.get("symbol"):
+            symbol = str(body["symbol"]).strip().upper()
+            price = (await self._prices([symbol]))[symbol][0]
+        else:
+            raise ValueError("Missing price or symbol")
+
+        result = {"symbol": symbol, "leverage": leverage,
+                  **calculate_position(price, investment_amount, leverage=leverage)}
+        if body.get("stop_loss_percent") is not None and body.get("profit_target_percent") is not None:
+            entry_price = result["entry_price"]
+            stop_loss_price = calculate_stop_loss(
+                entry_price, _percent(body, "stop_loss_percent", "stop loss percentage"))
+            take_profit_price = calculate_take_profit(
+                entry_price, _percent(body, "profit_target_percent", "target profit percentage"))
+            result.update(
+                stop_loss_price=stop_loss_price,
+                take_profit_price=take_profit_price,
+                risk_reward=calculate_risk_reward_ratio(entry_price, stop_loss_price, take_profit_price),
+            )
+        return result
+
+    async def _stop_loss(self, body: dict, query: dict) -> dict:
+        return {"stop_loss_price": calculate_stop_loss(
+            _number(body, "entry_price", "entry price"),
+            _percent(body, "stop_loss_percent", "stop loss percentage"),
+        )}
+
+    async def _take_profit(self, body: dict, query: dict) -> dict:
+        return {"take_profit_price": calculate_take_profit(
+            _number(body, "entry_price", "entry price"),
+            _percent(body, "profit_target_percent", "target profit percentage"),
+        )}
+
+    async def _risk_reward(self, body: dict, query: dict) -> dict:
+        return {"risk_reward": calculate_risk_reward_ratio(
+            _number(body, "entry_price", "entry price"),
+            _number(body, "stop_loss_price", "stop loss price"),
+            _number(body, "take_profit_price", "take profit price"),
+        )}
+
+    async def _batch(self, body: dict, query: dict) -> dict:
+        rows = body.get("positions")
+        if not isinstance(rows, list):
+            raise ValueError("Missing positions list")
+        if len(rows) > self.max_batch:
+            raise HTTPError(413, f"At most {self.max_batch} positions per batch")
+        rows = [row if isinstance(row, dict) else {"_error": "Position must be a JSON object"} for row in rows]
+
+        def run() -> list[dict]:
+            memo = PriceMemo(fetcher=self.cache.get_many)
+            return list(process_rows(rows, prices=memo, chunk_size=max(1, len(rows))))
+
+        results = await asyncio.get_running_loop().run_in_executor(self._executor, run)
+        return {"results": results, "errors": sum(1 for r in results if r["error"])}
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Server entry point."""
+    parser = argparse.ArgumentParser(description="Serve position calculations over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--ttl", type=float, default=30.0, help="Price cache TTL in seconds")
+    parser.add_argument("--cache-file", help="SQLite file for a warm price cache across restarts")
+    parser.add_argument("--metrics", action="store_true", help="Record metrics (served at /metrics)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Hedge slow CoinGecko requests with Binance (crypto_providers.py)")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        crypto_metrics.enable()
+    cache_options = {}
+    provider = None
+    if args.hedge:
+        from crypto_providers import BinanceProvider, CoinGeckoProvider, HedgedProvider
+
+        provider = HedgedProvider([CoinGeckoProvider(), BinanceProvider()], max_divergence_percent=1.0)
+        cache_options = {"fetcher": provider.fetch_price, "batch_fetcher": provider}
+    cache = PriceCache(ttl=args.ttl, persist_path=args.cache_file, **cache_options)
+    server = CalculatorServer(args.host, args.port, cache)
+
+    async def run() -> None:
+        await server.start()
+        print(f"✅ Serving on http://{server.host}:{server.port}  (Ctrl+C to stop)")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+            cache.close()
+            if provider is not None:
+                provider.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+crypto_symbols.py
+Lazily loaded index of the full CoinGecko coin list (~15k entries).
+
+SYMBOL_MAP in crypto_leverage.py stays the fast path for the common
+assets: symbols found there never touch this module. Anything else is
+resolved through a locally cached snapshot of CoinGecko's /coins/list,
+stored in a compact binary file that is memory-mapped on first lookup.
+
+Index file layout (little-endian):
+    magic        8 bytes  b"CGSYMIX2"
+    count        uint32
+    fuzzy_count  uint32
+    fuzzy_size   uint32
+    by_symbol    count × uint32 record offsets, sorted by lowercase symbol
+    by_name      count × uint32 record offsets, sorted by lowercase name
+    fuzzy_refs   fuzzy_count × uint32 slots (< count: by_symbol, else count + by_name slot)
+    fuzzy_keys   fuzzy_size bytes: the distinct lowercase tickers and names, "\\n"-joined
+    records      UTF-8 "symbol \\x1f id \\x1f name \\n" (offsets relative to here)
+
+Lookups binary-search the offset tables directly in the mapping, so exact
+and prefix searches cost a few dozen record reads regardless of size.
+Fuzzy search checks the query's one-typo variants against the key list
+written at build time, read in one slice the first time fuzzy search is used.
+A truncated or corrupt file raises ValueError rather than struct.error.
+
+Ambiguous tickers (several coins sharing one symbol) are ranked
+deterministically at build time: the SYMBOL_MAP coin first, then coins
+whose id is their name slugified, then shorter ids, then id order.
+
+Usage:
+    python crypto_symbols.py refresh           # download and cache the coin list
+    python crypto_symbols.py search pepe
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import difflib
+import mmap
+import os
+import struct
+from typing import Optional
+
+from crypto_leverage import SYMBOL_MAP, _api_error, _get_session, _optional
+
+
+COINGECKO_COINS_URL = "https://api.coingecko.com/api/v3/coins/list"
+
+DEFAULT_INDEX_PATH = os.environ.get(
+    "CRYPTO_SYMBOL_INDEX",
+    os.path.join(os.path.expanduser("~"), ".cache", "crypto_leverage", "coins.idx"),
+)
+
+_MAGIC = b"CGSYMIX2"
+_HEADER = struct.Struct("<8sIII")
+_OFFSET = struct.Struct("<I")
+_SEP = b"\x1f"
+_FUZZY_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789 -"
+
+
+class _Keys:
+    """Sequence view of one sort key per table slot, for bisect."""
+
+    def __init__(self, index: "SymbolIndex", table: int, field: int) -> None:
+        self._index = index
+        self._table = table
+        self._field = field
+
+    def __len__(self) -> int:
+        return self._index.count
+
+    def __getitem__(self, i: int) -> bytes:
+        return self._index._key(self._table, i, self._field)
+
+
+class SymbolIndex:
+    """Read-only, memory-mapped symbol/name index."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Raises:
+            ValueError: If the file is not a symbol index, is from an older
+                        version or is truncated
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise ValueError(f"Corrupt symbol index {path}: file is truncated")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self.count, fuzzy_count, fuzzy_size = _HEADER.unpack_from(self._mm, 0)
+            if magic != _MAGIC:
+                raise ValueError(
+                    f"{path} is not a symbol index (or is from an older version).\n"
+                    f"Rebuild it with: python crypto_symbols.py refresh"
+                )
+            self._by_symbol = _HEADER.size
+            self._by_name = self._by_symbol + 4 * self.count
+            self._fuzzy_refs = self._by_name + 4 * self.count
+            self._fuzzy_blob = self._fuzzy_refs + 4 * fuzzy_count
+            self._records = self._fuzzy_blob + fuzzy_size
+            if self._records > len(self._mm) or (self.count and self._mm[-1:] != b"\n"):
+                raise ValueError(f"Corrupt symbol index {path}: file is truncated")
+        except (ValueError, struct.error) as e:
+            self._mm.close()
+            raise ValueError(str(e)) from None
+        self._symbol_keys = _Keys(self, self._by_symbol, 0)
+        self._name_keys = _Keys(self, self._by_name, 2)
+        self._fuzzy_keys: Optional[dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _offset(self, table: int, i: int) -> int:
+        return self._records + _OFFSET.unpack_from(self._mm, table + 4 * i)[0]
+
+    def _fields(self, table: int, i: int) -> list[bytes]:
+        start = self._offset(table, i)
+        end = self._mm.find(b"\n", start)
+        fields = self._mm[start:end].split(_SEP)
+        if end < 0 or len(fields) != 3:
+            raise ValueError(f"Corrupt symbol index {self.path}: bad record at byte {start}")
+        return fields
+
+    def _key(self, table: int, i: int, field: int) -> bytes:
+        value = self._fields(table, i)[field]
+        return value if field == 0 else value.decode().lower().encode()
+
+    def _entry(self, table: int, i: int) -> tuple[str, str, str]:
+        symbol, gecko_id, name = self._fields(table, i)
+        return symbol.decode().upper(), gecko_id.decode(), name.decode()
+
+    def exact(self, symbol: str) -> list[tuple[str, str, str]]:
+        """All coins with this ticker, best-ranked first."""
+        key = symbol.lower().encode()
+        lo = bisect.bisect_left(self._symbol_keys, key)
+        hi = bisect.bisect_right(self._symbol_keys, key, lo)
+        return [self._entry(self._by_symbol, i) for i in range(lo, hi)]
+
+    def prefix(self, query: str, limit: int = 10) -> list[tuple[str, str, str]]:
+        """Coins whose ticker starts with `query`, in ticker order."""
+        return self._prefix(self._by_symbol, self._symbol_keys, 0, query, limit)
+
+    def name_prefix(self, query: str, limit: int = 10) -> list[tuple[str, str, str]]:
+        """Coins whose name starts with `query` (case-insensitive), in name order."""
+        return self._prefix(self._by_name, self._name_keys, 2, query, limit)
+
+    def _prefix(self, table: int, keys: _Keys, field: int, query: str, limit: int) -> list:
+        key = query.lower().encode()
+        i = bisect.bisect_left(keys, key)
+        found = []
+        while i < self.count and len(found) < limit and self._key(table, i, field).startswith(key):
+            found.append(self._entry(table, i))
+            i += 1
+        return found
+
+    def fuzzy(self, query: str, limit: int = 5) -> list[tuple[str, str, str]]:
+        """
+        Tickers and names within one typo (insert, delete, substitute or
+        swap) of `query`, most similar first.
+
+        The typo variants are checked against the ticker and name keys
+        stored in the index, loaded on the first fuzzy search.
+        """
+        key = query.lower().strip()
+        if not key:
+            return []
+        if self._fuzzy_keys is None:
+            blob = self._mm[self._fuzzy_blob:self._records]
+            try:
+                keys = blob.decode().split("\n") if blob else []
+            except UnicodeDecodeError:
+                raise ValueError(f"Corrupt symbol index {self.path}: unreadable fuzzy keys") from None
+            if len(keys) != (self._fuzzy_blob - self._fuzzy_refs) // 4:
+                raise ValueError(f"Corrupt symbol index {self.path}: fuzzy key count mismatch")
+            self._fuzzy_keys = dict(zip(keys, range(len(keys))))
+
+        alphabet = set(_FUZZY_ALPHABET + key)
+        splits = [(key[:i], key[i:]) for i in range(len(key) + 1)]
+        variants = {a + b[1:] for a, b in splits if b}
+        variants |= {a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1}
+        variants |= {a + c + b[1:] for a, b in splits if b for c in alphabet}
+        variants |= {a + c + b for a, b in splits for c in alphabet}
+        variants.discard(key)
+
+        matches = sorted(
+            (v for v in variants if v in self._fuzzy_keys),
+            key=lambda v: (-difflib.SequenceMatcher(None, key, v).ratio(), v),
+        )
+        results: list[tuple[str, str, str]] = []
+        for variant in matches:
+            slot = _OFFSET.unpack_from(self._mm, self._fuzzy_refs + 4 * self._fuzzy_keys[variant])[0]
+            if slot < self.count:
+                entry = self._entry(self._by_symbol, slot)
+            else:
+                entry = self._entry(self._by_name, slot - self.count)
+            if entry not in results:
+                results.append(entry)
+        return results[:limit]
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, str, str]]:
+        """Exact ticker matches, then ticker prefix, name prefix and fuzzy matches."""
+        results: list[tuple[str, str, str]] = []
+        seen: set[str] = set()
+        for group in (self.exact(query), self.prefix(query, limit), self.name_prefix(query, limit)):
+            for entry in group:
+                if entry[1] not in seen and len(results) < limit:
+                    seen.add(entry[1])
+                    results.append(entry)
+        if not results:
+            results = self.fuzzy(query, limit)
+        return results
+
+
+def _rank(coin: dict, pinned: set[str]) -> tuple:
+    """Deterministic preference among coins sharing a ticker."""
+    gecko_id = coin["id"]
+    slug = "-".join(coin["name"].lower().split())
+    return (gecko_id not in pinned, gecko_id != slug, len(gecko_id), gecko_id)
+
+
+def build_index(coins: list[dict], path: str) -> int:
+    """
+    Write a symbol index for a CoinGecko coin list (dicts with id, symbol, name).
+
+    The file is written to a temporary name and renamed, so readers never
+    see a partial index. Returns the number of entries.
+    """
+    pinned = set(SYMBOL_MAP.values())
+    clean = []
+    for coin in coins:
+        symbol = str(coin.get("symbol") or "").strip().lower()
+        gecko_id = str(coin.get("id") or "").strip()
+        name = " ".join(str(coin.get("name") or gecko_id).split())
+        if symbol and gecko_id and not any(c in f"{symbol}{gecko_id}{name}" for c in "\x1f\n"):
+            clean.append({"symbol": symbol, "id": gecko_id, "name": name})
+
+    records = bytearray()
+    offsets = []
+    for coin in clean:
+        offsets.append(len(records))
+        records += _SEP.join(v.encode() for v in (coin["symbol"], coin["id"], coin["name"])) + b"\n"
+
+    order = range(len(clean))
+    by_symbol = sorted(order, key=lambda i: (clean[i]["symbol"].encode(), _rank(clean[i], pinned)))
+    by_name = sorted(order, key=lambda i: (clean[i]["name"].lower().encode(), _rank(clean[i], pinned)))
+
+    # Every distinct ticker and lowercase name -> its first slot, for fuzzy search
+    fuzzy: dict[str, int] = {}
+    for slot, i in enumerate(by_symbol):
+        fuzzy.setdefault(clean[i]["symbol"], slot)
+    for slot, i in enumerate(by_name):
+        fuzzy.setdefault(clean[i]["name"].lower(), len(clean) + slot)
+    fuzzy_keys = sorted(fuzzy)
+    fuzzy_blob = "\n".join(fuzzy_keys).encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(clean), len(fuzzy_keys), len(fuzzy_blob)))
+        f.write(b"".join(_OFFSET.pack(offsets[i]) for i in by_symbol))
+        f.write(b"".join(_OFFSET.pack(offsets[i]) for i in by_name))
+        f.write(b"".join(_OFFSET.pack(fuzzy[k]) for k in fuzzy_keys))
+        f.write(fuzzy_blob)
+        f.write(records)
+    os.replace(tmp_path, path)
+    return len(clean)
+
+
+def refresh_index(path: Optional[str] = None) -> int:
+    """
+    Download CoinGecko's full coin list and rebuild the local index.
+
+    Raises:
+        ValueError: If the download fails
+    """
+    requests = _optional("requests")
+    if requests is None:
+        raise ValueError(
+            "requests library not installed. "
+            "Install with: pip install requests"
+        )
+    try:
+        response = _get_session().get(COINGECKO_COINS_URL, timeout=30)
+        response.raise_for_status()
+        coins = response.json()
+    except requests.exceptions.RequestException as e:
+        raise _api_error(e)
+
+    count = build_index(coins, path or _index_path)
+    set_index_path(path or _index_path)
+    return count
+
+
+# Loaded lazily on the first lookup that misses SYMBOL_MAP
+_index_path = DEFAULT_INDEX_PATH
+_index: Optional[SymbolIndex] = None
+
+
+def set_index_path(path: str) -> None:
+    """Point lookups at another index file (re-opened on next use)."""
+    global _index_path, _index
+    if _index is not None:
+        _index.close()
+    _index_path, _index = path, None
+
+
+def get_index() -> Optional[SymbolIndex]:
+    """Open the index on first use; None if no snapshot has been downloaded."""
+    global _index
+    if _index is None and os.path.exists(_index_path):
+        _index = SymbolIndex(_index_path)
+    return _index
+
+
+def lookup_symbol(symbol: str) -> Optional[str]:
+    """
+    Resolve a ticker to its CoinGecko id.
+
+    SYMBOL_MAP is checked first without loading the index. Returns None if
+    the symbol is unknown or no index is available.
+    """
+    symbol_upper = symbol.upper()
+    if symbol_upper in SYMBOL_MAP:
+        return SYMBOL_MAP[symbol_upper]
+    index = get_index()
+    if index is None:
+        return None
+    matches = index.exact(symbol_upper)
+    return matches[0][1] if matches else None
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Symbol index entry point."""
+    parser = argparse.ArgumentParser(description="Manage and search the local CoinGecko symbol index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("refresh", help="Download the coin list and rebuild the index")
+    search = sub.add_parser("search", help="Search by ticker or name")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Index file path")
+    args = parser.parse_args(argv)
+
+    set_index_path(args.index)
+    if args.command == "refresh":
+        try:
+            count = refresh_index(args.index)
+        except ValueError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        print(f"✅ Indexed {count:,} coins into {args.index}")
+        return
+
+    index = get_index()
+    if index is None:
+        print("❌ No symbol index yet. Run: python crypto_symbols.py refresh")
+        raise SystemExit(1)
+    for symbol, gecko_id, name in index.search(args.query, args.limit):
+        print(f"  {symbol:<10} {name:<40} {gecko_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+optional_imports.py
+Lazy loading for heavy optional dependencies (requests, numpy, tkinter).
+
+A module declares the names it wants and gets back a loader plus a PEP 562
+module __getattr__. The import runs on first use, so math-only or text-only
+callers never pay for it. `module.np` and friends still work from outside,
+and a dependency that is not installed resolves to None.
+
+Usage:
+    _optional, __getattr__ = lazy_modules(globals(), {"np": "numpy"})
+
+    def f():
+        np = _optional("np")
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import Any, Callable
+
+
+def lazy_modules(namespace: dict[str, Any], modules: dict[str, str]) -> tuple[Callable, Callable]:
+    """
+    Loader and module __getattr__ for `modules` (attribute name -> module name).
+
+    Args:
+        namespace: The calling module's globals(); loaded modules are cached there
+        modules: Attribute name -> importable module name
+
+    Returns:
+        (optional, getattr): optional(name) returns the module or None if it
+        is not installed; getattr is meant to be bound as the module's __getattr__
+    """
+    def optional(name: str):
+        """Return the optional module bound to ``name``, or None if not installed."""
+        module = namespace.get(name, False)
+        if module is False:
+            try:
+                module = importlib.import_module(modules[name])
+            except ImportError:
+                module = None
+            namespace[name] = module
+        return module
+
+    def getattr_(name: str):
+        if name in modules:
+            return optional(name)
+        raise AttributeError(f"module {namespace['__name__']!r} has no attribute {name!r}")
+
+    return optional, getattr_
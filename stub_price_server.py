@@ -0,0 +1,145 @@
+"""
+stub_price_server.py
+Local stand-in for the CoinGecko /simple/price endpoint, used by the tests
+and benchmarks so nothing has to reach the real API.
+
+Usage:
+    with StubPriceServer({"bitcoin": 50000, "ethereum": 3000}) as server:
+        crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+        ...
+
+The server speaks HTTP/1.1 with keep-alive, counts requests and distinct
+client connections, and can inject a fixed delay plus random jitter or
+force an error status to simulate a slow or failing upstream.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients that time out or cancel hang up mid-response; that is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubPriceServer:
+    """Threaded local HTTP server answering CoinGecko-style price queries."""
+
+    def __init__(
+        self,
+        prices: Optional[dict] = None,
+        delay: float = 0.0,
+        jitter: float = 0.0,
+        status: int = 200,
+        headers: Optional[dict[str, str]] = None,
+        handler: Optional[Callable[[str, dict[str, list[str]]], tuple[int, dict, object]]] = None,
+    ) -> None:
+        """
+        Args:
+            prices: CoinGecko id -> USD price, or id -> {currency: price}
+            delay: Seconds to sleep before answering each request
+            jitter: Extra random delay, uniform in [0, jitter] seconds
+            status: HTTP status to answer with (e.g. 500, 429)
+            headers: Extra response headers (e.g. {"Retry-After": "1"})
+            handler: Optional (path, query) -> (status, headers, body) override,
+                     for emulating other providers' response formats
+        """
+        self.prices = dict(prices or {})
+        self.delay = delay
+        self.jitter = jitter
+        self.status = status
+        self.headers = dict(headers or {})
+        self.handler = handler
+        self.requests: list[str] = []
+        self.connections: set[tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self._httpd: Optional[_QuietHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def price_url(self) -> str:
+        return f"{self.url}/api/v3/simple/price"
+
+    @property
+    def request_count(self) -> int:
+        with self._lock:
+            return len(self.requests)
+
+    def answer(self, path: str, query: dict[str, list[str]]) -> tuple[int, dict, object]:
+        """Build (status, headers, body) for a request."""
+        if self.handler is not None:
+            return self.handler(path, query)
+        if self.status != 200:
+            return self.status, self.headers, {"error": "stub error"}
+
+        ids = ",".join(query.get("ids", [])).split(",")
+        currencies = ",".join(query.get("vs_currencies", ["usd"])).split(",")
+        body = {}
+        for gecko_id in filter(None, ids):
+            if gecko_id not in self.prices:
+                continue
+            quote = self.prices[gecko_id]
+            if not isinstance(quote, dict):
+                quote = {"usd": quote}
+            body[gecko_id] = {c: quote[c] for c in currencies if c in quote}
+        return 200, self.headers, body
+
+    def __enter__(self) -> "StubPriceServer":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def do_GET(self) -> None:
+                with stub._lock:
+                    stub.requests.append(self.path)
+                    stub.connections.add(self.client_address)
+
+                pause = stub.delay + (random.uniform(0, stub.jitter) if stub.jitter else 0)
+                if pause:
+                    time.sleep(pause)
+
+                parts = urlsplit(self.path)
+                status, headers, body = stub.answer(parts.path, parse_qs(parts.query))
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._httpd = _QuietHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
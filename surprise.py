@@ -15,11 +15,11 @@ import threading
 import time
 from typing import Optional
 
-try:
-    import tkinter as tk
-    from tkinter import messagebox
-except Exception:
-    tk = None  # type: ignore
+from optional_imports import lazy_modules
+
+
+# Text-only callers never load tkinter; ``module.tk`` still works.
+_optional, __getattr__ = lazy_modules(globals(), {"tk": "tkinter"})
 
 
 def generate_message(name: Optional[str]) -> str:
@@ -72,6 +72,7 @@ def _burst(canvas: tk.Canvas, width: int, height: int, burst_time: float = 2.0)
 
 def show_surprise(name: Optional[str] = None) -> None:
     """Show the Tkinter surprise window. Safe to call from main thread only."""
+    tk = _optional("tk")
     if tk is None:
         print(generate_message(name))
         return
@@ -0,0 +1,123 @@
+"""
+test_bench_crypto_leverage.py
+Tests for the bench_crypto_leverage.py benchmark harness (not for timings).
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+
+import bench_crypto_leverage
+from bench_crypto_leverage import compare, run_benchmarks, unmatched
+
+
+def run_main(argv):
+    """Run the CLI, returning (exit code, stdout)."""
+    original, sys.stdout = sys.stdout, io.StringIO()
+    try:
+        bench_crypto_leverage.main(argv)
+        code = 0
+    except SystemExit as e:
+        code = e.code
+    finally:
+        output, sys.stdout = sys.stdout.getvalue(), original
+    return code, output
+
+
+def test_compare_flags_only_slowdowns():
+    """Test regressions are slowdowns past the threshold; new metrics are ignored."""
+    baseline = {"a": 1.0, "b": 1.0, "c": 1.0}
+    results = {"a": 1.29, "b": 1.31, "c": 0.5, "d": 9.0}
+    regressions = compare(results, baseline, threshold=0.30)
+    assert [r[0] for r in regressions] == ["b"]
+    assert abs(regressions[0][3] - 1.31) < 1e-12
+    assert unmatched(results, baseline) == (["d"], [])
+    print("✓ Only slowdowns past the threshold are regressions")
+
+
+def test_unmatched_metrics_are_reported():
+    """Test metrics on only one side are listed, scoped to the benchmarks that ran."""
+    baseline = {"calc.old": 1.0, "calc.kept": 1.0, "other.metric": 1.0}
+    results = {"calc.kept": 1.0, "calc.new": 1.0}
+    assert unmatched(results, baseline) == (["calc.new"], ["calc.old"])
+    print("✓ Metrics present on only one side are reported")
+
+
+def test_quick_benchmarks_report_positive_timings():
+    """Test the calculator and confetti benchmarks run headless."""
+    results = run_benchmarks(["calc_scalar", "confetti"], quick=True, rounds=2)
+    assert set(results) == {"calc_scalar.per_position", "confetti.frame"}
+    assert all(value > 0 for value in results.values())
+    try:
+        run_benchmarks(["nope"])
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "Unknown benchmark" in str(e)
+    print("✓ Benchmarks run headless with positive timings")
+
+
+def test_baseline_round_trip_and_gate():
+    """Test --save-baseline writes JSON and a slower run fails the gate."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "baseline.json")
+        code, output = run_main(["--only", "calc_scalar", "--quick", "--baseline", path, "--save-baseline"])
+        assert code == 0 and "Baseline saved" in output
+        with open(path) as f:
+            document = json.load(f)
+        assert "python" in document["environment"]
+        assert document["results"]["calc_scalar.per_position"] > 0
+
+        code, output = run_main(["--only", "calc_scalar", "--quick", "--baseline", path, "--threshold", "100"])
+        assert code == 0 and "No regressions" in output
+
+        document["results"]["calc_scalar.per_position"] = 1e-12
+        with open(path, "w") as f:
+            json.dump(document, f)
+        code, output = run_main(["--only", "calc_scalar", "--quick", "--baseline", path])
+        assert code == 1 and "regression" in output
+
+        document["results"] = {"calc_scalar.renamed": 1.0}
+        with open(path, "w") as f:
+            json.dump(document, f)
+        code, output = run_main(["--only", "calc_scalar", "--quick", "--baseline", path])
+        assert code == 1 and "calc_scalar.renamed" in output and "not measured" in output
+        assert "Not in the baseline" in output and "calc_scalar.per_position" in output
+
+        document["results"] = {"confetti.frame": 1e-12}
+        document["environment"]["confetti_canvas"] = "elsewhere"
+        with open(path, "w") as f:
+            json.dump(document, f)
+        code, output = run_main(["--only", "confetti", "--quick", "--baseline", path])
+        assert code == 0 and "not compared" in output
+    print("✓ Baseline saved, compared and gated")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Benchmark Harness Tests\n")
+
+    tests = [
+        test_compare_flags_only_slowdowns,
+        test_unmatched_metrics_are_reported,
+        test_quick_benchmarks_report_positive_timings,
+        test_baseline_round_trip_and_gate,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
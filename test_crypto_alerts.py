@@ -0,0 +1,179 @@
+"""
+test_crypto_alerts.py
+Unit tests for the crypto_alerts.py trigger engine.
+"""
+
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import crypto_alerts
+from crypto_alerts import AlertEngine
+from crypto_leverage import calculate_stop_loss, calculate_take_profit
+
+
+def test_fires_crossed_triggers_like_a_scan():
+    """Test random ticks fire exactly the triggers a full scan would."""
+    rng = random.Random(5)
+    engine = AlertEngine()
+    live = {}
+    for i in range(3000):
+        symbol = rng.choice(["BTC", "ETH"])
+        level = float(rng.randrange(900, 1100))
+        direction = rng.choice(["below", "above"])
+        engine.add(f"a{i}", symbol, level, direction)
+        live[f"a{i}"] = (symbol, level, direction)
+
+    price = {"BTC": 1000.0, "ETH": 1000.0}
+    for _ in range(500):
+        symbol = rng.choice(["BTC", "ETH"])
+        price[symbol] = max(1.0, price[symbol] + rng.uniform(-15, 15))
+        expected = {alert_id for alert_id, (s, level, direction) in live.items() if s == symbol and (
+            price[symbol] <= level if direction == "below" else price[symbol] >= level)}
+        fired = engine.on_tick(symbol, price[symbol])
+        assert {row["id"] for row in fired} == expected
+        for row in fired:
+            del live[row["id"]]
+        if rng.random() < 0.2 and live:
+            alert_id = rng.choice(sorted(live))
+            engine.cancel(alert_id)
+            del live[alert_id]
+    assert len(engine) == len(live)
+    print("✓ Ticks fire exactly the crossed triggers")
+
+
+def test_cancel_modify_and_order():
+    """Test add/cancel/modify bookkeeping and nearest-first firing order."""
+    engine = AlertEngine()
+    for alert_id, level in (("s1", 95.0), ("s2", 90.0), ("s3", 95.0), ("s4", 80.0)):
+        engine.add(alert_id, "btc", level, "below")
+    engine.add("t1", "BTC", 110.0, "above")
+    engine.add("t2", "BTC", 105.0, "above")
+    assert [a.id for a in engine.pending("BTC")] == ["s3", "s1", "s2", "s4", "t2", "t1"]
+
+    engine.modify("s4", 99.0)
+    engine.cancel("s1")
+    assert "s1" not in engine and len(engine) == 5
+    assert [row["id"] for row in engine.on_tick("BTC", 92.0)] == ["s3", "s4"]
+    assert [row["id"] for row in engine.on_tick("BTC", 120.0)] == ["t1", "t2"]
+    assert engine.on_tick("BTC", 100.0) == [] and engine.on_tick("ETH", 1.0) == []
+    assert [row["id"] for row in engine.on_tick("BTC", 50.0)] == ["s2"]
+    assert len(engine) == 0 and engine.symbols() == []
+
+    for call in (lambda: engine.cancel("nope"), lambda: engine.modify("nope", 1.0),
+                 lambda: engine.add("x", "BTC", 1.0, "sideways"), lambda: engine.add("x", "BTC", 0.0, "above")):
+        try:
+            call()
+            assert False, "Should have raised ValueError"
+        except ValueError:
+            pass
+    engine.add("x", "BTC", 1.0, "above")
+    try:
+        engine.add("x", "ETH", 2.0, "above")
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "already exists" in str(e)
+    print("✓ Add, cancel and modify keep triggers ordered")
+
+
+def test_position_groups_cancel_each_other():
+    """Test a position's SL and TP come from the calculators and are one-cancels-other."""
+    engine = AlertEngine()
+    stop_loss, take_profit = engine.add_position("p1", "BTC", 45000.0, 5, 10)
+    engine.add_position("p2", "BTC", 45000.0, 2, 4)
+    assert stop_loss.level == calculate_stop_loss(45000.0, 5)
+    assert take_profit.level == calculate_take_profit(45000.0, 10)
+
+    fired = engine.on_tick("BTC", 44000.0)
+    assert [row["id"] for row in fired] == ["p2:stop_loss"] and fired[0]["group"] == "p2"
+    assert "p2:take_profit" not in engine and len(engine) == 2
+    assert [row["id"] for row in engine.on_tick("BTC", 50000.0)] == ["p1:take_profit"]
+    assert len(engine) == 0
+
+    engine.add("lo", "ETH", 100.0, "below", group="g")
+    engine.add("hi", "ETH", 100.0, "above", group="g")
+    assert [row["id"] for row in engine.on_tick("ETH", 100.0)] == ["lo"]
+    assert len(engine) == 0
+    print("✓ Position SL/TP fire once and cancel their sibling")
+
+
+def test_100k_triggers_sub_millisecond_ticks():
+    """Test ticks against 100k live triggers stay well under a millisecond."""
+    rng = random.Random(1)
+    engine = AlertEngine()
+    for i in range(50_000):
+        entry = rng.uniform(40_000, 50_000)
+        engine.add_position(f"p{i}", "BTC", entry, rng.uniform(1, 10), rng.uniform(1, 20))
+    assert len(engine) == 100_000
+
+    timings = []
+    price = 45_000.0
+    for _ in range(2000):
+        price += rng.uniform(-1, 1)
+        start = time.perf_counter()
+        engine.on_tick("BTC", price)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    assert median < 0.001, median
+    live = engine.pending("BTC")
+    start = time.perf_counter()
+    engine.modify(live[0].id, 1.0)
+    engine.cancel(live[-1].id)
+    assert time.perf_counter() - start < 0.005
+    print(f"✓ 100k triggers: median tick {median * 1e6:.1f} µs")
+
+
+def test_cli_from_tick_file():
+    """Test the CLI fires alerts from a positions file and a tick file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        positions = os.path.join(tmp, "positions.json")
+        ticks = os.path.join(tmp, "ticks.txt")
+        with open(positions, "w") as f:
+            json.dump([{"id": "btc-1", "symbol": "BTC", "entry_price": 45000, "investment_amount": 1000,
+                        "stop_loss_percent": 5, "profit_target_percent": 10}], f)
+        with open(ticks, "w") as f:
+            f.write("BTC 46000\nBTC 49600\nBTC 40000\n")
+        original, sys.stdout = sys.stdout, io.StringIO()
+        try:
+            crypto_alerts.main([positions, "--ticks", ticks])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = original
+    assert "Watching 2 trigger(s) in BTC" in output
+    assert "btc-1:take_profit" in output and "btc-1:stop_loss" not in output
+    print("✓ CLI fires alerts from a tick file")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Alert Engine Tests\n")
+
+    tests = [
+        test_fires_crossed_triggers_like_a_scan,
+        test_cancel_modify_and_order,
+        test_position_groups_cancel_each_other,
+        test_100k_triggers_sub_millisecond_ticks,
+        test_cli_from_tick_file,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -0,0 +1,225 @@
+"""
+test_crypto_async.py
+Tests for the crypto_async.py asyncio price client, run against a local stub server.
+"""
+
+import asyncio
+import time
+
+import crypto_metrics
+from crypto_resilience import OPEN, breaker_for
+
+from crypto_async import (
+    AsyncPriceClient,
+    _read_chunked,
+    async_fetch_crypto_price,
+    async_fetch_crypto_prices,
+    async_select_crypto_asset,
+)
+from stub_price_server import StubPriceServer
+
+
+PRICES = {"bitcoin": 50000.5, "ethereum": 3000.25, "solana": 150.0}
+
+
+def test_async_fetch_contract():
+    """Test async fetch keeps the (price, asset_name, symbol) contract."""
+    with StubPriceServer(PRICES) as server:
+        client = AsyncPriceClient(url=server.price_url)
+        assert asyncio.run(client.fetch_crypto_price("btc")) == (50000.5, "bitcoin", "BTC")
+
+        prices = asyncio.run(client.fetch_crypto_prices(["BTC", "eth", "SOL"]))
+        assert prices["ETH"] == (3000.25, "ethereum", "ETH")
+        assert len(prices) == 3
+        assert server.request_count == 2
+    print("✓ Async fetch returns (price, asset_name, symbol)")
+
+
+def test_async_module_functions_use_default_url():
+    """Test module-level helpers follow crypto_leverage.COINGECKO_PRICE_URL."""
+    import crypto_leverage
+
+    original = crypto_leverage.COINGECKO_PRICE_URL
+    with StubPriceServer(PRICES) as server:
+        crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+        try:
+            assert asyncio.run(async_fetch_crypto_price("SOL")) == (150.0, "solana", "SOL")
+            assert set(asyncio.run(async_fetch_crypto_prices(["BTC", "ETH"]))) == {"BTC", "ETH"}
+        finally:
+            crypto_leverage.COINGECKO_PRICE_URL = original
+    print("✓ Module-level async helpers work across event loops")
+
+
+def test_async_unknown_symbol():
+    """Test unknown symbols raise ValueError without a request."""
+    with StubPriceServer(PRICES) as server:
+        client = AsyncPriceClient(url=server.price_url)
+        try:
+            asyncio.run(client.fetch_crypto_price("NOPE"))
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "not found" in str(e)
+        assert server.request_count == 0
+    print("✓ Unknown symbol raises ValueError")
+
+
+def test_async_http_error_and_timeout():
+    """Test HTTP errors and timeouts surface as ValueError."""
+    with StubPriceServer(status=503) as server:
+        client = AsyncPriceClient(url=server.price_url)
+        try:
+            asyncio.run(client.fetch_crypto_price("BTC"))
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "Failed to fetch price from API: 503" in str(e)
+
+    with StubPriceServer(PRICES, delay=1.0) as server:
+        client = AsyncPriceClient(url=server.price_url, timeout=0.1)
+        start = time.perf_counter()
+        try:
+            asyncio.run(client.fetch_crypto_price("BTC"))
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "timed out" in str(e)
+        assert time.perf_counter() - start < 0.8
+    print("✓ HTTP errors and timeouts raise ValueError")
+
+
+def test_async_bounded_concurrency():
+    """Test at most max_concurrency requests are in flight."""
+    async def run(client):
+        return await asyncio.gather(*(client.fetch_crypto_price("BTC") for _ in range(4)))
+
+    with StubPriceServer(PRICES, delay=0.2) as server:
+        start = time.perf_counter()
+        asyncio.run(run(AsyncPriceClient(max_concurrency=4, url=server.price_url)))
+        parallel = time.perf_counter() - start
+
+        start = time.perf_counter()
+        asyncio.run(run(AsyncPriceClient(max_concurrency=2, url=server.price_url)))
+        bounded = time.perf_counter() - start
+
+    assert parallel < 0.35, parallel
+    assert bounded >= 0.4, bounded
+    print("✓ Concurrency bounded by max_concurrency")
+
+
+def test_async_cancellation():
+    """Test a cancelled fetch raises CancelledError promptly."""
+    async def run(url):
+        task = asyncio.create_task(AsyncPriceClient(url=url).fetch_crypto_price("BTC"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    with StubPriceServer(PRICES, delay=1.0) as server:
+        start = time.perf_counter()
+        assert asyncio.run(run(server.price_url))
+        assert time.perf_counter() - start < 0.8
+    print("✓ Cancellation propagates")
+
+
+def test_async_select_manual_fallback():
+    """Test API failures fall back to the manual price."""
+    with StubPriceServer(status=500) as server:
+        client = AsyncPriceClient(url=server.price_url)
+        result = asyncio.run(async_select_crypto_asset("eth", manual_price=3100, client=client))
+        assert result == (3100.0, "ethereum", "ETH")
+    print("✓ Async select falls back to manual price")
+
+
+def test_read_chunked_body():
+    """Test chunked transfer-encoding bodies are reassembled."""
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"5\r\n{\"a\":\r\n3;ext=1\r\n 1}\r\n0\r\n\r\n")
+        reader.feed_eof()
+        return await _read_chunked(reader)
+
+    assert asyncio.run(run()) == b'{"a": 1}'
+    print("✓ Chunked bodies decoded")
+
+
+def test_broken_responses_are_api_errors():
+    """Test truncated bodies and bad framing raise API errors, count for the breaker and record bytes."""
+    responses = [
+        b"HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\n{\"bitcoin\"",
+        b"HTTP/1.1 200 OK\r\nContent-Length: lots\r\n\r\n{}",
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n{}\r\n0\r\n\r\n",
+        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n10\r\n{}",
+    ]
+
+    async def run():
+        async def handle(reader, writer):
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(responses[handle.calls])
+            handle.calls += 1
+            await writer.drain()
+            writer.close()
+        handle.calls = 0
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/simple/price"
+        breaker_for(url).failure_threshold = len(responses)
+        errors = []
+        async with server:
+            client = AsyncPriceClient(url=url)
+            for _ in responses:
+                try:
+                    await client.fetch_crypto_price("BTC")
+                    errors.append(None)
+                except ValueError as e:
+                    errors.append(str(e))
+        return url, errors
+
+    url, errors = asyncio.run(run())
+    assert all(e and e.startswith("Failed to fetch price from API:") for e in errors), errors
+    assert "Truncated response" in errors[0] and "Malformed HTTP response body" in errors[1]
+    assert breaker_for(url).state == OPEN, "every broken response counts as a failure"
+
+    with StubPriceServer(PRICES) as server:
+        crypto_metrics.REGISTRY.reset()
+        crypto_metrics.enable()
+        try:
+            asyncio.run(AsyncPriceClient(url=server.price_url).fetch_crypto_price("BTC"))
+            assert crypto_metrics.FETCH_BYTES.value() > 0
+        finally:
+            crypto_metrics.disable()
+            crypto_metrics.REGISTRY.reset()
+    print("✓ Broken responses raise API errors and trip the breaker")
+
+
+if __name__ == "__main__":
+    tests = [
+        test_async_fetch_contract,
+        test_async_module_functions_use_default_url,
+        test_async_unknown_symbol,
+        test_async_http_error_and_timeout,
+        test_async_bounded_concurrency,
+        test_async_cancellation,
+        test_async_select_manual_fallback,
+        test_read_chunked_body,
+        test_broken_responses_are_api_errors,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -0,0 +1,185 @@
+"""
+test_crypto_backtest.py
+Unit tests for the crypto_backtest.py OHLCV backtest engine.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from crypto_backtest import (
+    LIQUIDATION,
+    STOP_LOSS,
+    TAKE_PROFIT,
+    TIMEOUT,
+    backtest,
+    find_first_hits,
+    load_ohlcv,
+    load_symbol,
+    save_ohlcv,
+    trade_stats,
+)
+
+
+def make_bars(closes, spread=0.0):
+    closes = np.asarray(closes, dtype=float)
+    opens = np.concatenate([[closes[0]], closes[:-1]])
+    return {
+        "open": opens,
+        "high": np.maximum(opens, closes) * (1 + spread),
+        "low": np.minimum(opens, closes) * (1 - spread),
+        "close": closes,
+    }
+
+
+def random_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return make_bars(closes, spread=0.004)
+
+
+def reference_first_hit(bars, start, end, lower, upper, tie_break):
+    """Per-bar loop used as the reference implementation."""
+    for i in range(start, end):
+        up = bars["high"][i] >= upper
+        down = bars["low"][i] <= lower
+        if up and down:
+            if tie_break == "take_profit":
+                return i, True
+            if tie_break == "nearest":
+                o = bars["open"][i]
+                return i, (upper - o) < (o - lower)
+            return i, False
+        if up or down:
+            return i, bool(up)
+    return -1, False
+
+
+def test_first_hits_match_per_bar_loop():
+    """Test the vectorized search matches a per-bar Python loop."""
+    bars = random_bars(5000, seed=1)
+    rng = np.random.default_rng(2)
+    starts = np.sort(rng.integers(0, 4990, 300))
+    ends = np.minimum(starts + rng.integers(1, 3000, 300), 5000)
+    entry = bars["close"][starts]
+    lower = entry * (1 - rng.uniform(0.005, 0.08, 300))
+    upper = entry * (1 + rng.uniform(0.005, 0.08, 300))
+
+    for tie_break in ("stop", "take_profit", "nearest"):
+        hit_index, hit_upper = find_first_hits(
+            bars["open"], bars["high"], bars["low"], starts, ends, lower, upper, tie_break, initial_window=8,
+        )
+        for k in range(300):
+            expected = reference_first_hit(bars, starts[k], ends[k], lower[k], upper[k], tie_break)
+            assert (hit_index[k], bool(hit_upper[k]) if hit_index[k] >= 0 else False) == expected, k
+    print("✓ Vectorized first-hit search matches per-bar loop")
+
+
+def test_backtest_outcomes_and_fills():
+    """Test TP and SL exits and fills on a hand-made series."""
+    #            0    1    2    3    4    5    6    7    8
+    closes = [100, 101, 104, 111, 100, 96, 100, 89, 100]
+    bars = make_bars(closes)
+    trades = backtest(bars, [0, 4, 6, 7], stop_loss_percent=5, profit_target_percent=10, leverage=5)
+
+    assert trades["outcome"].tolist() == [TAKE_PROFIT, STOP_LOSS, STOP_LOSS, TAKE_PROFIT]
+    assert trades["exit_index"].tolist() == [3, 7, 7, 8]
+    # Bar 3 opens at 104 and reaches 111: filled at the 110 target
+    assert abs(trades["exit_price"][0] - 110) < 1e-9
+    # Bar 7 opens at 100 and trades down to 89: filled at the 95 stop
+    assert abs(trades["exit_price"][2] - 95) < 1e-9
+    assert abs(trades["exit_price"][3] - 89 * 1.1) < 1e-9
+    assert trades["bars_held"].tolist() == [3, 3, 1, 1]
+    assert trades["pnl"][1] == (1000 * 5 / 100) * (95 - 100)
+    print("✓ Backtest outcomes and fills correct")
+
+
+def test_backtest_gap_and_liquidation():
+    """Test gap-through fills at the open and liquidation before a far stop."""
+    bars = {
+        "open": np.array([100, 100, 90, 100.0]),
+        "high": np.array([100, 100, 90, 100.0]),
+        "low": np.array([100, 99, 80, 100.0]),
+        "close": np.array([100, 100, 85, 100.0]),
+    }
+    gap = backtest(bars, [1], stop_loss_percent=5, profit_target_percent=10, leverage=2)
+    assert gap["outcome"].tolist() == [STOP_LOSS]
+    assert gap["exit_price"][0] == 90
+
+    liquidated = backtest(bars, [1], stop_loss_percent=30, profit_target_percent=10,
+                          investment_amount=500, leverage=10)
+    assert liquidated["outcome"].tolist() == [LIQUIDATION]
+    assert liquidated["pnl"][0] == -500
+    print("✓ Gap fills and liquidation handled")
+
+
+def test_backtest_overlap_and_max_bars():
+    """Test non-overlapping mode, max holding period and timeouts."""
+    bars = make_bars([100] * 20)
+    all_trades = backtest(bars, range(0, 19), 5, 10, max_bars=5)
+    assert len(all_trades["pnl"]) == 19
+    assert all_trades["bars_held"][0] == 5
+    assert set(all_trades["outcome"].tolist()) == {TIMEOUT}
+    assert all_trades["exit_index"][-1] == 19
+
+    sequential = backtest(bars, range(0, 19), 5, 10, max_bars=5, allow_overlap=False)
+    assert sequential["entry_index"].tolist() == [0, 5, 10, 15]
+    print("✓ Overlap filtering and max holding period work")
+
+
+def test_memory_mapped_files_and_stats():
+    """Test .npy and .bin files are memory-mapped and backtest identically."""
+    bars = random_bars(2000, seed=4)
+    with tempfile.TemporaryDirectory() as tmp:
+        save_ohlcv(os.path.join(tmp, "BTC.npy"), bars)
+        save_ohlcv(os.path.join(tmp, "ETH.bin"), bars)
+        np.save(os.path.join(tmp, "plain.npy"),
+                np.column_stack([np.arange(2000), bars["open"], bars["high"], bars["low"], bars["close"], np.zeros(2000)]))
+
+        from_npy = load_symbol(tmp, "btc")
+        from_bin = load_symbol(tmp, "ETH")
+        from_plain = load_ohlcv(os.path.join(tmp, "plain.npy"))
+        assert isinstance(from_npy["high"].base, np.memmap) or isinstance(from_npy["high"], np.memmap)
+        assert isinstance(from_bin["high"], np.memmap)
+
+        entries = np.arange(0, 2000, 25)
+        results = [backtest(b, entries, 2, 3, leverage=3) for b in (bars, from_npy, from_bin, from_plain)]
+        for other in results[1:]:
+            for name, column in results[0].items():
+                assert np.array_equal(column, other[name]), name
+
+    stats = trade_stats(results[0])
+    assert stats["trades"] == len(entries)
+    assert stats["take_profit"] + stats["stop_loss"] + stats["timeout"] + stats["liquidation"] == stats["trades"]
+    assert abs(stats["total_pnl"] - results[0]["pnl"].sum()) < 1e-6
+    assert stats["max_drawdown"] >= 0
+    print("✓ Memory-mapped files give identical backtests")
+
+
+if __name__ == "__main__":
+    tests = [
+        test_first_hits_match_per_bar_loop,
+        test_backtest_outcomes_and_fills,
+        test_backtest_gap_and_liquidation,
+        test_backtest_overlap_and_max_bars,
+        test_memory_mapped_files_and_stats,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -0,0 +1,208 @@
+"""
+test_crypto_batch.py
+Unit tests for the crypto_batch.py non-interactive batch mode.
+"""
+
+import io
+import json
+import sys
+
+from crypto_batch import (
+    PriceMemo,
+    iter_csv_rows,
+    iter_jsonl_rows,
+    main,
+    process_rows,
+    write_csv,
+    write_jsonl,
+)
+from crypto_leverage import calculate_position, calculate_stop_loss
+
+
+class CountingFetcher:
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def __call__(self, symbols):
+        self.calls.append(list(symbols))
+        return {s: (self.prices[s], s.lower(), s) for s in symbols if s in self.prices}
+
+
+def test_batch_csv_row_results():
+    """Test a valid CSV row matches the scalar calculators."""
+    rows = iter_csv_rows(io.StringIO(
+        "id,symbol,price,investment_amount,stop_loss_percent,profit_target_percent,leverage\n"
+        "t1,btc,45000,1000,5,10,\n"
+    ))
+    [result] = list(process_rows(rows, PriceMemo(CountingFetcher({}))))
+
+    assert result["error"] == ""
+    assert result["id"] == "t1" and result["symbol"] == "BTC" and result["leverage"] == 10
+    assert result["position_size"] == calculate_position(45000, 1000)["position_size"]
+    assert result["stop_loss_price"] == calculate_stop_loss(45000, 5)
+    print("✓ CSV rows calculated like the scalar functions")
+
+
+def test_batch_per_row_errors():
+    """Test invalid rows get an error and do not stop the batch."""
+    text = "\n".join([
+        '{"symbol": "BTC", "price": 50000, "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10}',
+        '{"symbol": "BTC", "price": 50000, "investment_amount": -1, "stop_loss_percent": 5, "profit_target_percent": 10}',
+        '{"symbol": "BTC", "price": 50000, "investment_amount": 100, "stop_loss_percent": 100, "profit_target_percent": 10}',
+        '{"symbol": "BTC", "price": 50000, "investment_amount": 100, "stop_loss_percent": 5}',
+        'not json',
+        '{"symbol": "NOPE", "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10}',
+        '{"symbol": "BTC", "price": 50000, "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10, "leverage": "inf"}',
+        '{"symbol": "BTC", "price": 50000, "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10, "leverage": 1e400}',
+        '{"symbol": "BTC", "price": 50000, "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10, "leverage": 0}',
+        '{"symbol": "BTC", "price": 0, "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10}',
+        '{"symbol": "BTC", "price": "nan", "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10}',
+    ])
+    fetcher = CountingFetcher({})
+    results = list(process_rows(iter_jsonl_rows(io.StringIO(text)), PriceMemo(fetcher)))
+
+    assert [r["line"] for r in results] == list(range(1, 12))
+    assert results[0]["error"] == ""
+    assert "investment amount must be positive" in results[1]["error"]
+    assert "less than 100%" in results[2]["error"]
+    assert "Missing target profit percentage" in results[3]["error"]
+    assert "Invalid JSON" in results[4]["error"]
+    assert "not found" in results[5]["error"]
+    assert results[6]["error"] == results[7]["error"] == "Invalid leverage: must be finite"
+    assert "leverage must be positive" in results[8]["error"], "an explicit 0 is not the default"
+    assert "price must be positive" in results[9]["error"] and "must be finite" in results[10]["error"]
+    assert fetcher.calls == [], "price 0 does not trigger a live fetch"
+    print("✓ Invalid rows reported per row")
+
+
+def test_batch_fetches_each_symbol_once():
+    """Test price lookups are deduplicated across chunks."""
+    fetcher = CountingFetcher({"BTC": 50000.0, "ETH": 3000.0})
+    rows = [{"symbol": s, "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10}
+            for s in ["BTC", "eth", "BTC", "ETH", "BTC", "ETH", "btc"]]
+    results = list(process_rows(rows, PriceMemo(fetcher), chunk_size=3))
+
+    assert all(r["error"] == "" for r in results)
+    assert [r["price"] for r in results[:2]] == [50000.0, 3000.0]
+    assert fetcher.calls == [["BTC", "ETH"]]
+    print("✓ Each symbol fetched once per batch")
+
+
+def test_batch_fetch_failure_is_memoized():
+    """Test an API failure errors the affected rows without refetching."""
+    calls = []
+
+    def failing(symbols):
+        calls.append(symbols)
+        raise ValueError("Failed to fetch price from API: down\nMake sure you have internet connection.")
+
+    rows = [{"symbol": "SOL", "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10}] * 3
+    results = list(process_rows(rows, PriceMemo(failing), chunk_size=1))
+
+    assert [r["error"] for r in results] == ["Failed to fetch price from API: down"] * 3
+    assert len(calls) == 1
+
+    fetcher = CountingFetcher({"BTC": 0.0, "ETH": float("nan"), "SOL": 150.0})
+    rows = [{"symbol": s, "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10}
+            for s in ("BTC", "ETH", "SOL")]
+    results = list(process_rows(rows, PriceMemo(fetcher)))
+    assert [r["error"] for r in results[:2]] == ["Invalid BTC price from API: 0.0", "Invalid ETH price from API: nan"]
+    assert results[2]["error"] == "" and results[2]["price"] == 150.0
+    print("✓ Fetch failures and bad quotes memoized per symbol")
+
+
+def test_batch_streams_lazily():
+    """Test results are produced before the whole input is consumed."""
+    consumed = []
+
+    def rows():
+        for i in range(10_000):
+            consumed.append(i)
+            yield {"symbol": "BTC", "price": 1000 + i, "investment_amount": 100,
+                   "stop_loss_percent": 5, "profit_target_percent": 10}
+
+    results = process_rows(rows(), PriceMemo(CountingFetcher({})), chunk_size=100)
+    first = next(results)
+    assert first["price"] == 1000.0
+    assert len(consumed) <= 101
+    print("✓ Batch processing streams in bounded chunks")
+
+
+def test_batch_writers():
+    """Test CSV and JSONL writers emit one row per result."""
+    results = list(process_rows(
+        [{"symbol": "BTC", "price": 50000, "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10},
+         {"symbol": "BTC"}],
+        PriceMemo(CountingFetcher({})),
+    ))
+
+    out = io.StringIO()
+    assert write_csv(results, out) == (2, 1)
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith("line,id,symbol,price")
+    assert len(lines) == 3
+
+    out = io.StringIO()
+    assert write_jsonl(results, out) == (2, 1)
+    decoded = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert decoded[1]["error"].startswith("Missing")
+    print("✓ CSV and JSONL writers work")
+
+
+def test_batch_main_stdin_to_stdout():
+    """Test the CLI reads stdin and writes stdout."""
+    original = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin = io.StringIO("symbol,price,investment_amount,stop_loss_percent,profit_target_percent\n"
+                            "ETH,3000,500,5,10\n")
+    sys.stdout, sys.stderr = io.StringIO(), io.StringIO()
+    try:
+        main(["-", "--output-format", "jsonl"])
+        output, summary = sys.stdout.getvalue(), sys.stderr.getvalue()
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = original
+
+    [result] = [json.loads(line) for line in output.splitlines()]
+    assert result["symbol"] == "ETH" and result["error"] == ""
+    assert "1 row(s) processed, 0 error(s)" in summary
+
+    original = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = io.StringIO(), io.StringIO()
+    try:
+        main(["/nonexistent/positions.csv"])
+        assert False, "Should have exited"
+    except SystemExit as e:
+        assert e.code == 1 and sys.stderr.getvalue().startswith("❌ ") and "positions.csv" in sys.stderr.getvalue()
+    finally:
+        sys.stdout, sys.stderr = original
+    print("✓ Batch CLI streams stdin to stdout")
+
+
+if __name__ == "__main__":
+    tests = [
+        test_batch_csv_row_results,
+        test_batch_per_row_errors,
+        test_batch_fetches_each_symbol_once,
+        test_batch_fetch_failure_is_memoized,
+        test_batch_streams_lazily,
+        test_batch_writers,
+        test_batch_main_stdin_to_stdout,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -0,0 +1,121 @@
+"""
+test_crypto_fetch.py
+Tests for the crypto_leverage.py price fetch path, run against a local stub server.
+"""
+
+from contextlib import contextmanager
+
+import crypto_leverage
+from crypto_leverage import SYMBOL_MAP, fetch_crypto_price, fetch_crypto_prices
+from stub_price_server import StubPriceServer
+
+
+ALL_PRICES = {gecko_id: 100.0 + i for i, gecko_id in enumerate(SYMBOL_MAP.values())}
+
+
+@contextmanager
+def stub_api(**kwargs):
+    """Point crypto_leverage at a fresh stub server and a fresh session."""
+    original_url = crypto_leverage.COINGECKO_PRICE_URL
+    crypto_leverage._session = None
+    with StubPriceServer(**kwargs) as server:
+        crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+        try:
+            yield server
+        finally:
+            crypto_leverage.COINGECKO_PRICE_URL = original_url
+            crypto_leverage._session = None
+
+
+def test_fetch_crypto_prices_single_round_trip():
+    """Test all SYMBOL_MAP assets are priced with one request."""
+    with stub_api(prices=ALL_PRICES) as server:
+        prices = fetch_crypto_prices(list(SYMBOL_MAP))
+
+        assert server.request_count == 1
+        assert set(prices) == set(SYMBOL_MAP)
+        for symbol, gecko_id in SYMBOL_MAP.items():
+            assert prices[symbol] == (ALL_PRICES[gecko_id], gecko_id, symbol)
+    print("✓ All assets priced in a single round trip")
+
+
+def test_fetch_crypto_prices_reuses_connection():
+    """Test repeated fetches share one keep-alive connection."""
+    with stub_api(prices=ALL_PRICES) as server:
+        for _ in range(5):
+            fetch_crypto_prices(["btc", "ETH", "BTC"])
+        fetch_crypto_price("SOL")
+
+        assert server.request_count == 6
+        assert len(server.connections) == 1
+    print("✓ Keep-alive session reused across fetches")
+
+
+def test_fetch_crypto_price_contract():
+    """Test the single-symbol fetch keeps its (price, name, symbol) contract."""
+    with stub_api(prices={"bitcoin": 50000.5}):
+        assert fetch_crypto_price("btc") == (50000.5, "bitcoin", "BTC")
+    print("✓ Single fetch contract unchanged")
+
+
+def test_fetch_crypto_prices_unknown_symbol():
+    """Test unknown symbols fail before any request is made."""
+    with stub_api(prices=ALL_PRICES) as server:
+        try:
+            fetch_crypto_prices(["BTC", "NOPE"])
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "not found" in str(e)
+        assert server.request_count == 0
+    print("✓ Unknown symbol rejected without a request")
+
+
+def test_fetch_crypto_prices_missing_price():
+    """Test a symbol missing from the response raises ValueError."""
+    with stub_api(prices={"bitcoin": 50000}):
+        try:
+            fetch_crypto_prices(["BTC", "ETH"])
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "Could not fetch price for ETH" in str(e)
+    print("✓ Missing price reported")
+
+
+def test_fetch_crypto_prices_http_error():
+    """Test upstream errors surface as ValueError."""
+    with stub_api(status=500):
+        try:
+            fetch_crypto_price("BTC")
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "Failed to fetch price from API" in str(e)
+    print("✓ HTTP errors surface as ValueError")
+
+
+if __name__ == "__main__":
+    tests = [
+        test_fetch_crypto_prices_single_round_trip,
+        test_fetch_crypto_prices_reuses_connection,
+        test_fetch_crypto_price_contract,
+        test_fetch_crypto_prices_unknown_symbol,
+        test_fetch_crypto_prices_missing_price,
+        test_fetch_crypto_prices_http_error,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -0,0 +1,185 @@
+"""
+test_crypto_fixed.py
+Unit tests for crypto_fixed.py fixed-point pricing, checked against decimal.Decimal.
+"""
+
+import random
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+
+import numpy as np
+
+from crypto_batch import calculate_fixed_row, process_rows
+from crypto_fixed import (
+    ASSET_SPECS,
+    DEFAULT_SPEC,
+    AssetSpec,
+    calculate_fixed,
+    fixed_grid,
+    get_spec,
+)
+
+
+def decimal_reference(spec, price, investment, sl_percent, tp_percent, leverage):
+    """The slow, obviously-correct version of calculate_fixed."""
+    tick, lot = (Decimal(f.numerator) / f.denominator for f in (spec.tick_size, spec.lot_size))
+    entry = Decimal(repr(price)).quantize(tick)
+    stop_loss = min((entry * (1 - Decimal(repr(sl_percent)) / 100) / tick).to_integral_value(ROUND_CEILING) * tick,
+                    entry - tick)
+    take_profit = max((entry * (1 + Decimal(repr(tp_percent)) / 100) / tick).to_integral_value(ROUND_FLOOR) * tick,
+                      entry + tick)
+    size = (Decimal(repr(investment)) * leverage / entry / lot).to_integral_value(ROUND_FLOOR) * lot
+    return entry, stop_loss, take_profit, size
+
+
+def random_case(rng, spec):
+    tick = float(spec.tick_size)
+    price = round(rng.uniform(50, 60_000) / tick) * tick
+    digits = len(str(spec.tick_size.denominator)) - 1
+    return (round(price, digits), round(rng.uniform(10, 50_000), 2),
+            round(rng.uniform(0.01, 50), 4), round(rng.uniform(0.01, 99), 4), rng.randint(1, 100))
+
+
+def test_matches_decimal_reference():
+    """Test SL rounds up, TP down, size down — exactly as Decimal does."""
+    rng = random.Random(7)
+    for symbol in ("BTC", "ETH", "SOL", "DOGE", "ARB"):
+        spec = ASSET_SPECS[symbol]
+        for _ in range(500):
+            case = random_case(rng, spec)
+            fixed = calculate_fixed(symbol, *case[:4], leverage=case[4])
+            entry, stop_loss, take_profit, size = decimal_reference(spec, *case)
+            assert fixed["entry_price"] == float(entry), (symbol, case)
+            assert fixed["stop_loss_price"] == float(stop_loss), (symbol, case)
+            assert fixed["take_profit_price"] == float(take_profit), (symbol, case)
+            assert fixed["position_size"] == float(size), (symbol, case)
+            assert fixed["stop_loss_price"] < fixed["entry_price"] < fixed["take_profit_price"]
+
+    # The float calculators cannot produce the exchange price
+    assert 3001.7 * (1 - 7 / 100) == 2791.5809999999997
+    assert calculate_fixed("ETH", 3001.7, 1000, 7, 10)["stop_loss_price"] == 2791.59
+    print("✓ Fixed-point results match Decimal exactly")
+
+
+def test_grid_matches_scalar():
+    """Test fixed_grid element by element, including the exact overflow fallback."""
+    rng = random.Random(11)
+    spec = ASSET_SPECS["ETH"]
+    cases = [random_case(rng, spec) for _ in range(1000)]
+    columns = [np.array(column) for column in zip(*cases)]
+    grid = fixed_grid(spec, *columns)
+    assert grid["stop_loss_ticks"].dtype == np.int64 and grid["size_lots"].dtype == np.int64
+    for i, case in enumerate(cases):
+        fixed = calculate_fixed(spec, *case[:4], leverage=case[4])
+        for key in ("entry_ticks", "stop_loss_ticks", "take_profit_ticks", "size_lots",
+                    "stop_loss_price", "take_profit_price", "position_size"):
+            assert grid[key][i] == fixed[key], (key, case)
+
+    # Tiny lots and a huge budget exceed int64; results stay exact
+    huge = fixed_grid(DEFAULT_SPEC, [0.00001234, 2.5], 10_000_000, 5, 10, leverage=100)
+    assert huge["size_lots"].tolist() == [calculate_fixed(DEFAULT_SPEC, p, 10_000_000, 5, 10, leverage=100)
+                                          ["size_lots"] for p in (0.00001234, 2.5)]
+    assert huge["size_lots"].dtype == object
+
+    # SL/TP products and the budget itself past int64: still equal to the scalar path
+    for asset, price, investment, sl, tp in (("NOPE", 90000.0, 1000.0, 5, 50), ("BTC", 50000.0, 2e12, 5, 10),
+                                             ("NOPE", 90000.0, 1e13, 99, 900)):
+        grid = fixed_grid(asset, [price, 100.0], investment, sl, tp)
+        for i, p in enumerate((price, 100.0)):
+            fixed = calculate_fixed(asset, p, investment, sl, tp)
+            for key in ("entry_ticks", "stop_loss_ticks", "take_profit_ticks", "size_lots",
+                        "entry_price", "stop_loss_price", "take_profit_price", "position_size"):
+                assert grid[key][i] == fixed[key], (key, asset, p, investment)
+    print("✓ fixed_grid matches calculate_fixed")
+
+
+def test_specs_and_errors():
+    """Test spec lookup, one-tick minimum distance and invalid input."""
+    assert get_spec("btc") is ASSET_SPECS["BTC"] and get_spec("NOPE") is DEFAULT_SPEC
+    tight = calculate_fixed("BTC", 100.00, 1000, 0.001, 0.001)
+    assert tight["stop_loss_price"] == 99.99 and tight["take_profit_price"] == 100.01
+    for bad in ((0.01, "1"), ("0", "1"), ("abc", "1")):
+        try:
+            AssetSpec(*bad)
+            assert False, f"Should have raised ValueError for {bad}"
+        except ValueError:
+            pass
+    for call in (lambda: calculate_fixed("BTC", 0.004, 100, 5, 10),
+                 lambda: fixed_grid("BTC", [100, 0.004], 100, 5, 10)):
+        try:
+            call()
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "below the tick size" in str(e)
+    for call in (lambda: calculate_fixed("BTC", 100, 100, 5, 10, leverage=2.5),
+                 lambda: fixed_grid("BTC", 100, 100, 5, 10, leverage=[10, 2.5]),
+                 lambda: calculate_fixed("BTC", 100, 100, 5, 10, leverage=float("inf")),
+                 lambda: fixed_grid("BTC", 100, [100, float("inf")], 5, 10)):
+        try:
+            call()
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "leverage" in str(e) or "finite" in str(e)
+
+    inf, nan = float("inf"), float("nan")
+    for args, message in (((inf, 100, 5, 10), "price: must be finite"),
+                          ((nan, 100, 5, 10), "price: must be finite"),
+                          ((100, inf, 5, 10), "investment amount: must be finite"),
+                          ((100, nan, 5, 10), "investment amount: must be finite"),
+                          ((100, -100, 5, 10), "must be positive"),
+                          ((100, 0, 5, 10), "must be positive"),
+                          ((100, 100, 100, 10), "between 0 and 100%"),
+                          ((100, 100, 150, 10), "between 0 and 100%"),
+                          ((100, 100, 0, 10), "between 0 and 100%"),
+                          ((100, 100, 5, -10), "must be positive")):
+        for call in (lambda: calculate_fixed("BTC", *args), lambda: fixed_grid("BTC", *[[1.0, a] for a in args])):
+            try:
+                call()
+                assert False, f"Should have raised ValueError for {args}"
+            except ValueError as e:
+                assert message in str(e), (args, str(e))
+    print("✓ Specs and invalid input handled")
+
+
+def test_batch_fixed_mode():
+    """Test the batch --fixed calculator rounds every row."""
+    rows = [
+        {"symbol": "BTC", "price": "45000", "investment_amount": "1000",
+         "stop_loss_percent": "5", "profit_target_percent": "10"},
+        {"symbol": "DOGE", "price": "0.12345", "investment_amount": "1000",
+         "stop_loss_percent": "2.5", "profit_target_percent": "7.5", "leverage": "3"},
+    ]
+    results = list(process_rows(rows, calculate=calculate_fixed_row))
+    assert [r["stop_loss_price"] for r in results] == [42750.0, 0.12037]
+    assert [r["take_profit_price"] for r in results] == [49500.0, 0.1327]
+    assert [r["position_size"] for r in results] == [0.22222, 24301.0]
+    assert all(r["error"] == "" for r in results)
+    print("✓ Batch fixed mode rounds to exchange increments")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Fixed-Point Pricing Tests\n")
+
+    tests = [
+        test_matches_decimal_reference,
+        test_grid_matches_scalar,
+        test_specs_and_errors,
+        test_batch_fixed_mode,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
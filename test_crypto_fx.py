@@ -0,0 +1,186 @@
+"""
+test_crypto_fx.py
+Tests for crypto_fx.py cross rates and multi-currency calculators, against a local stub server.
+"""
+
+import numpy as np
+
+from crypto_fx import FXCache, FXMatrix, fetch_quotes
+from crypto_leverage import calculate_grid, calculate_position, display_results
+from crypto_render import build_report, render_report
+from stub_price_server import StubPriceServer
+
+# USD value of one EUR / GBP / USDT
+EUR, GBP, USDT = 1.08, 1.27, 0.999
+
+STUB_PRICES = {
+    "bitcoin": {"usd": 54000.0, "eur": 50000.0, "gbp": 54000.0 / GBP},
+    "ethereum": {"usd": 3240.0, "eur": 3000.0, "gbp": 3240.0 / GBP},
+    "tether": {"usd": USDT, "eur": USDT / EUR, "gbp": USDT / GBP},
+}
+
+
+def test_prices_and_rates_in_one_request():
+    """Test asset prices and every FX rate come from a single API call."""
+    with StubPriceServer(STUB_PRICES) as server:
+        prices, fx = fetch_quotes(["btc", "ETH"], ["usd", "eur", "gbp", "usdt"], url=server.price_url)
+        assert server.request_count == 1
+        query = server.requests[0]
+        assert "vs_currencies=usd%2Ceur%2Cgbp" in query and "tether" in query
+    assert prices == {"BTC": (54000.0, "bitcoin", "BTC"), "ETH": (3240.0, "ethereum", "ETH")}
+    assert abs(fx.rate("eur", "usd") - EUR) < 1e-12
+    assert abs(fx.rate("GBP", "EUR") - GBP / EUR) < 1e-12
+    assert fx.rate("usdt", "usd") == USDT
+    assert fx.convert(100, "usd", "usd") == 100
+
+    skewed = {**STUB_PRICES, "ethereum": {"usd": 3240.0, "eur": 2000.0, "gbp": 3240.0 / GBP}}
+    with StubPriceServer(skewed) as server:
+        _, fx = fetch_quotes(["BTC", "ETH"], ["eur", "usdt"], url=server.price_url)
+    assert abs(fx.rate("eur", "usd") - EUR) < 1e-12, "median of three quotes ignores the outlier"
+
+    with StubPriceServer({"bitcoin": 50000.0}) as server:
+        try:
+            fetch_quotes(["BTC"], ["eur"], url=server.price_url)
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "EUR" in str(e)
+    print("✓ Prices and cross rates fetched in one request")
+
+
+def test_matrix_lookups_match_scalar_rates():
+    """Test vectorized matrix gathers equal the scalar rates exactly."""
+    fx = FXMatrix({"eur": EUR, "gbp": GBP, "usdt": USDT})
+    assert fx.currencies == ("usd", "eur", "gbp", "usdt")
+    assert np.allclose(np.diag(fx.matrix), 1.0)
+    assert np.allclose(fx.matrix * fx.matrix.T, 1.0)
+
+    codes = np.array(["EUR", "usd", "gbp", "usdt", "eur"] * 1000)
+    for target in fx.currencies:
+        rates = fx.rates(codes, target)
+        assert rates.tolist() == [fx.rate(code, target) for code in codes.tolist()]
+    assert fx.convert_many([[100.0], [200.0]], ["eur", "gbp"], "usd").shape == (2, 2)
+
+    for bad in (lambda: fx.rate("jpy", "usd"), lambda: fx.rates(["eur", "jpy"], "usd"),
+                lambda: FXMatrix({"eur": 0.0}), lambda: FXMatrix({"eur": float("nan")})):
+        try:
+            bad()
+            assert False, "Should have raised ValueError"
+        except ValueError:
+            pass
+    print("✓ Matrix lookups match scalar rates")
+
+
+def test_calculators_take_investment_currency():
+    """Test positions funded in EUR/GBP/USDT are sized in the quote currency."""
+    fx = FXMatrix({"eur": EUR, "gbp": GBP, "usdt": USDT})
+    position = calculate_position(54000.0, 1000.0, leverage=10, investment_currency="eur", fx=fx)
+    assert position["effective_capital"] == 1000.0 * EUR * 10
+    assert position["initial_capital"] == 1000.0
+    assert abs(position["position_size"] - 0.2) < 1e-12
+    assert calculate_position(54000.0, 1000.0, investment_currency="USD") == calculate_position(54000.0, 1000.0)
+
+    currencies = np.array(["eur", "gbp", "usdt", "usd"])
+    grid = calculate_grid(54000.0, [1000.0, 2000.0, 500.0, 750.0], 5, 10,
+                          investment_currency=currencies, fx=fx)
+    for i, currency in enumerate(currencies.tolist()):
+        expected = calculate_position(54000.0, grid["initial_capital"][i], investment_currency=currency, fx=fx)
+        assert grid["position_size"][i] == expected["position_size"]
+        assert grid["effective_capital"][i] == expected["effective_capital"]
+    in_eur = calculate_grid(50000.0, 1000.0, 5, 10, investment_currency="gbp", quote_currency="eur", fx=fx)
+    assert in_eur["effective_capital"] == 1000.0 * fx.rate("gbp", "eur") * 10
+
+    for call in (lambda: calculate_position(54000.0, 1000.0, investment_currency="eur"),
+                 lambda: calculate_grid(54000.0, 1000.0, 5, 10, investment_currency=["usd", "gbp"])):
+        try:
+            call()
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "FX" in str(e)
+    print("✓ Calculators convert the investment currency")
+
+
+def test_reports_show_both_currencies():
+    """Test the renderer labels prices and investment amounts with their currencies."""
+    fx = FXMatrix({"eur": EUR, "gbp": GBP})
+    position = calculate_position(50000.0, 1000.0, investment_currency="gbp", quote_currency="eur", fx=fx)
+    report = build_report(50000.0, 1000.0, 5, 10, position, 47500.0, 55000.0, symbol="BTC",
+                          currency="eur", investment_currency="gbp")
+    text = render_report(report, "text")
+    assert "Current Price (Entry):        €50,000.00" in text
+    assert "Investment Amount:            £1,000.00" in text
+    assert "➜ Result: £50.00" in text and "$" not in text
+    assert report["currency"] == "EUR" and report["investment_currency"] == "GBP"
+    assert render_report(report, "csv").rstrip().endswith(",EUR,GBP")
+
+    usdt = build_report(50000.0, 1000.0, 5, 10, calculate_position(50000.0, 1000.0), 47500.0, 55000.0,
+                        currency="usdt")
+    assert "Investment Amount:            USDT 1,000.00" in render_report(usdt, "text")
+
+    class Out:
+        text = ""
+
+        def write(self, s):
+            self.text += s
+
+    out = Out()
+    display_results(50000.0, 1000.0, 5, 10, calculate_position(50000.0, 1000.0), 47500.0, 55000.0, out=out)
+    assert "Stop Loss Price:              $47,500.00" in out.text
+    print("✓ Reports label both currencies")
+
+
+def test_fx_cache_ttl_and_updates():
+    """Test the cache refetches only when stale or missing a currency."""
+    now = [1000.0]
+    calls = []
+
+    def fetcher(currencies):
+        calls.append(list(currencies))
+        return FXMatrix({"eur": EUR, "gbp": GBP, "usdt": USDT, "usdc": 1.0}, fetched_at=now[0])
+
+    cache = FXCache(ttl=60, currencies=["usd", "eur"], fetcher=fetcher, clock=lambda: now[0])
+    fx = cache.get()
+    assert cache.get(["EUR"]) is fx and len(calls) == 1
+    now[0] += 59
+    assert cache.get() is fx
+    now[0] += 1
+    assert cache.get() is not fx and len(calls) == 2
+
+    cache.update(FXMatrix({"eur": 1.5}, fetched_at=now[0] + 1))
+    assert cache.get(["eur"]).rate("eur", "usd") == 1.5 and len(calls) == 2
+    assert cache.get(["gbp"]).rate("gbp", "usd") == GBP and calls[-1] == ["usd", "eur", "gbp"]
+
+    with StubPriceServer(STUB_PRICES) as server:
+        shared = FXCache(ttl=60, fetcher=lambda c: None)
+        _, fx = fetch_quotes(["BTC"], url=server.price_url, cache=shared)
+        assert shared.get() is fx
+    print("✓ FX cache honours its TTL")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running FX Tests\n")
+
+    tests = [
+        test_prices_and_rates_in_one_request,
+        test_matrix_lookups_match_scalar_rates,
+        test_calculators_take_investment_currency,
+        test_reports_show_both_currencies,
+        test_fx_cache_ttl_and_updates,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
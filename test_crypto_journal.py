@@ -0,0 +1,172 @@
+"""
+test_crypto_journal.py
+Unit tests for the crypto_journal.py calculation journal.
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+import crypto_batch
+import crypto_journal
+import crypto_leverage
+from crypto_journal import RECORD_SIZE, SOURCES, Journal, JournalReader, journal_dtype
+
+
+def make_row(symbol="BTC", price=50000.0, investment=1000.0, sl=5.0, tp=10.0, leverage=10):
+    position_info = crypto_leverage.calculate_position(price, investment, leverage=leverage)
+    sl_price = crypto_leverage.calculate_stop_loss(price, sl)
+    tp_price = crypto_leverage.calculate_take_profit(price, tp)
+    return {
+        "symbol": symbol, "leverage": leverage, "price": price, "investment_amount": investment,
+        "stop_loss_percent": sl, "profit_target_percent": tp,
+        "position_size": position_info["position_size"], "effective_capital": position_info["effective_capital"],
+        "stop_loss_price": sl_price, "take_profit_price": tp_price,
+        "risk_reward": crypto_leverage.calculate_risk_reward_ratio(price, sl_price, tp_price),
+    }
+
+
+def capture(func, *args):
+    original, sys.stdout = sys.stdout, io.StringIO()
+    try:
+        func(*args)
+        return sys.stdout.getvalue()
+    finally:
+        sys.stdout = original
+
+
+def test_round_trip_across_segments():
+    """Test buffered records land in rolled segments and read back column by column."""
+    assert journal_dtype().itemsize == RECORD_SIZE == 104
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = [make_row(symbol=("BTC", "ETH", "SOL")[i % 3], price=100.0 + i, leverage=1 + i % 20)
+                for i in range(250)]
+        with Journal(tmp, segment_records=100, buffer_records=32) as journal:
+            for i, row in enumerate(rows):
+                journal.record(row, source="batch", timestamp_ns=1_000 + i)
+            assert len(JournalReader(tmp)) == 224, "only whole buffers are written before close"
+
+        reader = JournalReader(tmp)
+        assert len(reader.segments()) == 3 and len(reader) == 250
+        data = reader.columns(["timestamp", "symbol", "leverage", "source", "price", "risk_reward"])
+        assert data["timestamp"].tolist() == list(range(1_000, 1_250))
+        assert data["symbol"][:3].tolist() == [b"BTC", b"ETH", b"SOL"]
+        assert data["leverage"].tolist() == [row["leverage"] for row in rows]
+        assert (data["source"] == SOURCES.index("batch")).all()
+        assert data["price"].tolist() == [row["price"] for row in rows]
+        assert data["risk_reward"].tolist() == [row["risk_reward"] for row in rows]
+        assert isinstance(reader.segment(reader.segments()[0]), np.memmap)
+
+        with open(reader.segments()[-1], "ab") as f:
+            f.write(b"\x00" * (RECORD_SIZE // 2))  # torn write
+        assert len(reader) == 250 and len(reader.columns(["price"])["price"]) == 250
+    print("✓ Records round-trip across segments")
+
+
+def test_range_scans_and_summary():
+    """Test time-range scans, symbol filters and per-symbol aggregates."""
+    with tempfile.TemporaryDirectory() as tmp:
+        with Journal(tmp, segment_records=10, buffer_records=7) as journal:
+            for i in range(100):
+                journal.record(make_row(symbol="BTC" if i % 2 else "ETH", investment=100.0 * (i + 1)),
+                               timestamp_ns=10 * i)
+            journal.record(make_row(), timestamp_ns=5)  # clock stepped back: clamped, not reordered
+
+        reader = JournalReader(tmp)
+        timestamps = reader.columns(["timestamp"], start_ns=200, end_ns=300)["timestamp"]
+        assert timestamps.tolist() == list(range(200, 300, 10))
+        assert reader.columns(["timestamp"], start_ns=995)["timestamp"].tolist() == []
+        assert len(reader.columns(["timestamp"], end_ns=0)["timestamp"]) == 0
+        assert sum(len(part) for part in reader.scan(end_ns=50)) == 5
+
+        eth = reader.columns(["investment_amount"], symbol="eth")["investment_amount"]
+        assert eth.tolist() == [100.0 * (i + 1) for i in range(0, 100, 2)]
+
+        summary = reader.summary(start_ns=0, end_ns=200)
+        assert set(summary) == {"BTC", "ETH"}
+        assert summary["ETH"]["calculations"] == 10 and summary["BTC"]["calculations"] == 10
+        assert summary["ETH"]["total_investment"] == sum(100.0 * (i + 1) for i in range(0, 20, 2))
+        assert abs(summary["BTC"]["mean_risk_reward"] - 2.0) < 1e-12
+        assert summary["BTC"]["first_ns"] == 10 and summary["BTC"]["last_ns"] == 190
+        assert JournalReader(os.path.join(tmp, "missing")).summary() == {}
+
+        output = capture(crypto_journal.main, [tmp, "--symbol", "BTC"])
+        assert "BTC" in output and "ETH" not in output and "101 record(s)" in output
+    print("✓ Range scans and aggregates over memory-mapped segments")
+
+
+def test_batch_run_is_journaled():
+    """Test crypto_batch --journal records every calculated row, but not errors."""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "positions.csv")
+        with open(source, "w") as f:
+            f.write("symbol,price,investment_amount,stop_loss_percent,profit_target_percent,leverage\n"
+                    "BTC,50000,1000,5,10,10\nETH,3000,500,2,6,5\nSOL,150,-1,5,10,\n")
+        journal_dir = os.path.join(tmp, "journal")
+        stderr, sys.stderr = sys.stderr, io.StringIO()
+        try:
+            capture(crypto_batch.main, [source, "--journal", journal_dir])
+        finally:
+            sys.stderr = stderr
+
+        data = JournalReader(journal_dir).columns(["symbol", "leverage", "source", "position_size"])
+        assert data["symbol"].tolist() == [b"BTC", b"ETH"]
+        assert data["leverage"].tolist() == [10, 5]
+        assert (data["source"] == SOURCES.index("batch")).all()
+        assert data["position_size"].tolist() == [0.2, 2500 / 3000]
+    print("✓ Batch runs are journaled")
+
+
+def test_interactive_run_is_journaled():
+    """Test main() journals a calculation when $CRYPTO_JOURNAL is set."""
+    original_inputs = crypto_leverage.get_user_inputs
+    crypto_leverage.get_user_inputs = lambda: (45000.0, 10000.0, 5.0, 10.0, "bitcoin", "BTC")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ[crypto_journal.JOURNAL_ENV] = tmp
+            try:
+                capture(crypto_leverage.main, [])
+            finally:
+                del os.environ[crypto_journal.JOURNAL_ENV]
+            capture(crypto_leverage.main, [])  # unset: nothing journaled
+
+            data = JournalReader(tmp).columns(["symbol", "source", "price", "stop_loss_price", "risk_reward"])
+            assert data["symbol"].tolist() == [b"BTC"]
+            assert data["source"].tolist() == [SOURCES.index("interactive")]
+            assert data["price"].tolist() == [45000.0] and data["stop_loss_price"].tolist() == [42750.0]
+            assert abs(data["risk_reward"][0] - 2.0) < 1e-12
+    finally:
+        crypto_leverage.get_user_inputs = original_inputs
+    print("✓ Interactive runs are journaled")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Journal Tests\n")
+
+    tests = [
+        test_round_trip_across_segments,
+        test_range_scans_and_summary,
+        test_batch_run_is_journaled,
+        test_interactive_run_is_journaled,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -9,6 +9,7 @@ from crypto_leverage import (
     calculate_stop_loss,
     calculate_take_profit,
     calculate_risk_reward_ratio,
+    calculate_grid,
 )
 
 
@@ -172,6 +173,63 @@ def test_full_scenario_large_investment():
     print("✓ Full scenario (large investment) works correctly")
 
 
+def test_calculate_grid_bit_identical_to_scalar():
+    """Test the batch API matches the scalar functions exactly."""
+    prices = [45000, 50000.5, 0.3127, 1234.5678, 61999.99]
+    investments = [1000, 2500.25, 100000]
+    stop_losses = [1, 3.3, 5, 12.75]
+    targets = [2, 10, 15.5]
+
+    for leverage in (1, 5, 10, 20):
+        grid = calculate_grid(
+            [[[[p]]] for p in prices],
+            [[[i]] for i in investments],
+            [[sl] for sl in stop_losses],
+            targets,
+            leverage,
+        )
+        assert grid["risk_reward"].shape == (5, 3, 4, 3)
+
+        for a, p in enumerate(prices):
+            for b, i in enumerate(investments):
+                for c, sl in enumerate(stop_losses):
+                    for d, tp in enumerate(targets):
+                        idx = (a, b, c, d)
+                        position = calculate_position(p, i, leverage=leverage)
+                        stop_loss = calculate_stop_loss(p, sl)
+                        take_profit = calculate_take_profit(p, tp)
+                        ratio = calculate_risk_reward_ratio(p, stop_loss, take_profit)
+
+                        assert grid["position_size"][idx] == position["position_size"]
+                        assert grid["effective_capital"][idx] == position["effective_capital"]
+                        assert grid["entry_price"][idx] == position["entry_price"]
+                        assert grid["initial_capital"][idx] == position["initial_capital"]
+                        assert grid["stop_loss_price"][idx] == stop_loss
+                        assert grid["take_profit_price"][idx] == take_profit
+                        assert grid["risk_reward"][idx] == ratio
+    print("✓ Batch grid is bit-identical to scalar calculators")
+
+
+def test_calculate_grid_broadcasts_columns():
+    """Test the batch API broadcasts inputs into column arrays."""
+    grid = calculate_grid([50000, 45000], 10000, [5, 10], 10, leverage=[10, 5])
+
+    assert grid["position_size"].shape == (2,)
+    assert grid["position_size"].tolist() == [2.0, 10000 * 5 / 45000]
+    assert grid["stop_loss_price"].tolist() == [50000 * 0.95, 45000 * 0.90]
+    assert grid["initial_capital"].tolist() == [10000.0, 10000.0]
+    print("✓ Batch grid broadcasts inputs")
+
+
+def test_calculate_grid_zero_risk():
+    """Test the batch API reports 0 risk/reward when risk is not positive."""
+    grid = calculate_grid(50000, 1000, [0, 5], 10)
+
+    assert grid["risk_reward"][0] == 0.0
+    assert abs(grid["risk_reward"][1] - 2.0) < 1e-9
+    print("✓ Batch grid handles zero risk")
+
+
 if __name__ == "__main__":
     tests = [
         test_validate_positive_number_valid,
@@ -186,6 +244,9 @@ if __name__ == "__main__":
         test_calculate_risk_reward_ratio_edge_case,
         test_full_scenario_small_investment,
         test_full_scenario_large_investment,
+        test_calculate_grid_bit_identical_to_scalar,
+        test_calculate_grid_broadcasts_columns,
+        test_calculate_grid_zero_risk,
     ]
 
     failed = 0
@@ -0,0 +1,173 @@
+"""
+test_crypto_metrics.py
+Unit tests for the crypto_metrics.py registry, instrumentation and export.
+"""
+
+import io
+import os
+import tempfile
+import urllib.request
+from contextlib import contextmanager
+
+import crypto_leverage
+import crypto_metrics
+import crypto_render
+from crypto_metrics import CALLS, FETCH_BYTES, FETCH_ERRORS, FETCH_SECONDS, Registry
+from stub_price_server import StubPriceServer
+
+
+@contextmanager
+def metrics_enabled():
+    crypto_metrics.REGISTRY.reset()
+    crypto_metrics.enable()
+    try:
+        yield
+    finally:
+        crypto_metrics.disable()
+        crypto_metrics.REGISTRY.reset()
+
+
+@contextmanager
+def stub_api(**kwargs):
+    original_url = crypto_leverage.COINGECKO_PRICE_URL
+    crypto_leverage._session = None
+    with StubPriceServer(**kwargs) as server:
+        crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+        try:
+            yield server
+        finally:
+            crypto_leverage.COINGECKO_PRICE_URL = original_url
+            crypto_leverage._session = None
+
+
+def test_exposition_format():
+    """Test counters, gauges and histograms render as Prometheus text."""
+    registry = Registry()
+    requests_total = registry.counter("app_requests_total", "Requests", ("path",))
+    in_flight = registry.gauge("app_in_flight", "In flight")
+    latency = registry.histogram("app_latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests_total.labels('/a"b').inc(2)
+    in_flight.set(3)
+    in_flight.inc(-1)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert "# TYPE app_requests_total counter" in text
+    assert 'app_requests_total{path="/a\\"b"} 2.0' in text
+    assert "app_in_flight 2.0" in text
+    assert 'app_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'app_latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'app_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "app_latency_seconds_count 3" in text
+    assert "app_latency_seconds_sum 5.55" in text
+    try:
+        requests_total.inc(-1)
+        assert False, "Should have raised ValueError"
+    except ValueError:
+        pass
+    print("✓ Exposition text format correct")
+
+
+def test_enable_toggles_recording():
+    """Test instrumented calls are recorded only while enabled, through every reference."""
+    calculate_position = crypto_leverage.calculate_position
+    calculate_risk_reward_ratio = crypto_render.calculate_risk_reward_ratio
+    assert calculate_risk_reward_ratio is crypto_leverage.calculate_risk_reward_ratio
+    crypto_metrics.REGISTRY.reset()
+    calculate_position(100, 10)
+    assert CALLS.value("calculate_position") == 0
+
+    with metrics_enabled():
+        assert crypto_leverage.calculate_position is calculate_position, "references are not rebound"
+        calculate_position(100, 10)
+        crypto_leverage.calculate_position(100, 10)
+        calculate_risk_reward_ratio(100, 95, 110)
+        assert CALLS.value("calculate_position") == 2
+        assert CALLS.value("calculate_risk_reward_ratio") == 1
+
+    calculate_position(100, 10)
+    assert CALLS.value("calculate_position") == 0
+    print("✓ enable()/disable() toggle recording for every reference")
+
+
+def test_fetch_and_render_instrumented():
+    """Test fetch latency/bytes, error types and render calls are recorded."""
+    with metrics_enabled():
+        with stub_api(prices={"bitcoin": 50000.0}) as server:
+            crypto_leverage.fetch_crypto_price("BTC")
+            server.status = 503
+            try:
+                crypto_leverage.fetch_crypto_price("BTC")
+            except ValueError:
+                pass
+            server.status = 200
+            try:
+                crypto_leverage.fetch_crypto_price("ETH")  # stub has no ETH price
+            except ValueError:
+                pass
+
+        assert FETCH_SECONDS.labels().count == 3
+        assert FETCH_BYTES.value() > 0
+        assert FETCH_ERRORS.value("http_503") == 1
+        assert FETCH_ERRORS.value("no_price") == 1
+
+        position_info = crypto_leverage.calculate_position(50000, 1000)
+        crypto_leverage.display_results(50000, 1000, 5, 10, position_info, 47500, 55000,
+                                        "bitcoin", "BTC", out=io.StringIO())
+        assert CALLS.value("render_report") == 1
+        assert CALLS.value("calculate_risk_reward_ratio") == 1
+    print("✓ Fetch and render paths instrumented")
+
+
+def test_textfile_and_http_export():
+    """Test the registry is written to a file and served over HTTP."""
+    with metrics_enabled():
+        crypto_leverage.calculate_stop_loss(100, 5)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "crypto.prom")
+            crypto_metrics.write_textfile(path)
+            with open(path) as f:
+                assert 'crypto_calls_total{function="calculate_stop_loss"} 1.0' in f.read()
+
+        server = crypto_metrics.serve(0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert 'crypto_call_seconds_count{function="calculate_stop_loss"} 1' in body
+    print("✓ Textfile and HTTP export work")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Crypto Metrics Tests\n")
+
+    tests = [
+        test_exposition_format,
+        test_enable_toggles_recording,
+        test_fetch_and_render_instrumented,
+        test_textfile_and_http_export,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -0,0 +1,235 @@
+"""
+test_crypto_monitor.py
+Unit tests for the crypto_monitor.py streaming position monitor.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+
+from crypto_monitor import (
+    PositionMonitor,
+    load_positions,
+    main,
+    polling_feed,
+    read_ticks,
+    run_monitor,
+)
+
+
+def make_monitor():
+    monitor = PositionMonitor()
+    monitor.add_position("btc-1", "btc", 50000, 10000, 5, 10)
+    monitor.add_position("btc-2", "BTC", 40000, 1000, 10, 20, leverage=5)
+    monitor.add_position("eth-1", "ETH", 3000, 2000, 5, 10)
+    return monitor
+
+
+def test_monitor_row_values():
+    """Test distance, PnL and R-multiple for a tick."""
+    monitor = make_monitor()
+    rows = {row["id"]: row for row in monitor.on_tick("BTC", 51000)}
+
+    row = rows["btc-1"]
+    # Position size 2 BTC, SL 47500, TP 55000
+    assert row["unrealized_pnl"] == 2000.0
+    assert row["r_multiple"] == 0.4
+    assert row["distance_to_stop_loss_pct"] == round((51000 - 47500) / 51000 * 100, 2)
+    assert row["distance_to_take_profit_pct"] == round((50000 * 1.1 - 51000) / 51000 * 100, 2)
+    assert row["status"] == "OPEN"
+    print("✓ Tick rows computed correctly")
+
+
+def test_monitor_only_touches_ticked_symbol():
+    """Test a tick only produces rows for positions in that symbol."""
+    monitor = make_monitor()
+    assert {row["id"] for row in monitor.on_tick("eth", 3100)} == {"eth-1"}
+    assert {row["id"] for row in monitor.on_tick("BTC", 45000)} == {"btc-1", "btc-2"}
+    assert monitor.on_tick("SOL", 150) == []
+    print("✓ Only positions of the ticked symbol are recomputed")
+
+
+def test_monitor_suppresses_unchanged_rows():
+    """Test repeated or sub-precision ticks emit nothing."""
+    monitor = make_monitor()
+    assert len(monitor.on_tick("ETH", 3100)) == 1
+    assert monitor.on_tick("ETH", 3100) == []
+    assert monitor.on_tick("ETH", 3100.00001) == []
+    assert len(monitor.on_tick("ETH", 3101)) == 1
+    print("✓ Unchanged rows are not emitted")
+
+
+def test_monitor_status_and_removal():
+    """Test stop/target status and position removal."""
+    monitor = make_monitor()
+    statuses = {row["id"]: row["status"] for row in monitor.on_tick("BTC", 47000)}
+    assert statuses == {"btc-1": "STOP", "btc-2": "OPEN"}
+    statuses = {row["id"]: row["status"] for row in monitor.on_tick("BTC", 48000)}
+    assert statuses == {"btc-1": "OPEN", "btc-2": "TARGET"}
+
+    monitor.remove_position("btc-1")
+    monitor.remove_position("eth-1")
+    assert len(monitor) == 1
+    assert monitor.symbols() == ["BTC"]
+    assert [row["id"] for row in monitor.on_tick("BTC", 47001)] == ["btc-2"]
+    print("✓ Status flags and removal work")
+
+
+def test_run_monitor_with_stub_feed():
+    """Test a stub tick stream drives output lines."""
+    monitor = make_monitor()
+    ticks = read_ticks(io.StringIO("# stub feed\nBTC 51000\n\neth,3100\nBTC 51000\nSOL 150\n"))
+    out = io.StringIO()
+
+    assert run_monitor(monitor, ticks, out) == 3
+    lines = out.getvalue().splitlines()
+    assert [line.split()[0] for line in lines] == ["btc-1", "btc-2", "eth-1"]
+    print("✓ Stub feed drives the monitor")
+
+
+def test_bad_ticks_are_skipped():
+    """Test malformed lines and non-positive or non-finite prices are skipped with a warning."""
+    monitor = make_monitor()
+    try:
+        monitor.on_tick("BTC", 0)
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "must be positive" in str(e)
+
+    feed = "BTC\nBTC abc\nBTC 0\nETH -5\nBTC nan\nBTC inf\nBTC 51000\n"
+    out = io.StringIO()
+    original, sys.stderr = sys.stderr, io.StringIO()
+    try:
+        written = run_monitor(monitor, read_ticks(io.StringIO(feed)), out)
+        warnings = sys.stderr.getvalue().splitlines()
+    finally:
+        sys.stderr = original
+
+    assert written == 2 and [line.split()[0] for line in out.getvalue().splitlines()] == ["btc-1", "btc-2"]
+    assert len(warnings) == 6
+    assert "line 1 'BTC'" in warnings[0] and "line 2 'BTC abc'" in warnings[1]
+    assert all("must be positive" in warning for warning in warnings[2:])
+    print("✓ Bad ticks are skipped with a warning")
+
+
+def test_load_positions_validates_input():
+    """Test invalid position files raise ValueError naming the position."""
+    good = {"symbol": "BTC", "entry_price": 50000, "investment_amount": 1000,
+            "stop_loss_percent": 5, "profit_target_percent": 10}
+    for positions, message in (({"symbol": "BTC"}, "Expected a JSON list"),
+                               (["BTC"], "Position 1: expected an object"),
+                               ([good, {**good, "entry_price": 0}], "Position 2: Invalid entry price"),
+                               ([{**good, "investment_amount": "abc"}], "Position 1: Invalid investment amount"),
+                               ([{**good, "stop_loss_percent": 150}], "less than 100%"),
+                               ([{**good, "profit_target_percent": [1]}], "Invalid profit target percent"),
+                               ([{**good, "leverage": 2.5}], "whole number"),
+                               ([{**good, "entry_price": "inf"}], "must be finite"),
+                               ([{**good, "symbol": None}], "Missing symbol"),
+                               ([{k: v for k, v in good.items() if k != "entry_price"}], "Missing entry price"),
+                               ([{**good, "id": "a"}, {**good, "id": "a"}], "Position 2: Position 'a' already exists")):
+        try:
+            load_positions(PositionMonitor(), positions)
+            assert False, f"Should have raised ValueError for {positions}"
+        except ValueError as e:
+            assert message in str(e), (message, str(e))
+
+    monitor = PositionMonitor()
+    load_positions(monitor, [good, {**good, "symbol": "eth", "entry_price": "3000", "leverage": 5}])
+    assert len(monitor) == 2 and monitor.symbols() == ["BTC", "ETH"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "positions.json")
+        with open(path, "w") as f:
+            json.dump({"symbol": "BTC"}, f)
+        original, sys.stdout = sys.stdout, io.StringIO()
+        try:
+            main([path, "--ticks", "-"])
+            assert False, "Should have exited"
+        except SystemExit as e:
+            assert e.code == 1 and "Could not load positions: Expected a JSON list" in sys.stdout.getvalue()
+        finally:
+            sys.stdout = original
+    print("✓ Invalid positions rejected with their index")
+
+
+def test_polling_feed_yields_only_moves():
+    """Test polling yields a tick only when a symbol's price moved."""
+    polls = iter([
+        {"BTC": (50000, "bitcoin", "BTC"), "ETH": (3000, "ethereum", "ETH")},
+        {"BTC": (50000, "bitcoin", "BTC"), "ETH": (3010, "ethereum", "ETH")},
+        {"BTC": (50100, "bitcoin", "BTC"), "ETH": (3010, "ethereum", "ETH")},
+    ])
+    sleeps = []
+    feed = polling_feed(["BTC", "ETH"], interval=2, fetcher=lambda s: next(polls),
+                        sleep=sleeps.append, max_polls=3)
+
+    assert list(feed) == [("BTC", 50000), ("ETH", 3000), ("ETH", 3010), ("BTC", 50100)]
+    assert sleeps == [2, 2]
+    print("✓ Polling feed yields only price moves")
+
+
+def test_monitor_main_with_tick_file():
+    """Test the CLI loads positions and replays a tick file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        positions = os.path.join(tmp, "positions.json")
+        ticks = os.path.join(tmp, "ticks.txt")
+        with open(positions, "w") as f:
+            json.dump([{"id": "a", "symbol": "BTC", "entry_price": 50000, "investment_amount": 1000,
+                        "stop_loss_percent": 5, "profit_target_percent": 10}], f)
+        with open(ticks, "w") as f:
+            f.write("BTC 50500\nBTC 50500\n")
+
+        out = io.StringIO()
+        original, sys.stdout = sys.stdout, out
+        try:
+            main([positions, "--ticks", ticks])
+        finally:
+            sys.stdout = original
+
+        original, sys.stdout = sys.stdout, io.StringIO()
+        try:
+            main([positions, "--ticks", os.path.join(tmp, "missing.txt")])
+            assert False, "Should have exited"
+        except SystemExit as e:
+            assert e.code == 1 and "Could not read ticks" in sys.stdout.getvalue()
+        finally:
+            sys.stdout = original
+
+    lines = out.getvalue().splitlines()
+    assert "Monitoring 1 position(s)" in lines[0]
+    assert len(lines) == 2 and lines[1].startswith("a ")
+    print("✓ Monitor CLI replays tick file")
+
+
+if __name__ == "__main__":
+    tests = [
+        test_monitor_row_values,
+        test_monitor_only_touches_ticked_symbol,
+        test_monitor_suppresses_unchanged_rows,
+        test_monitor_status_and_removal,
+        test_run_monitor_with_stub_feed,
+        test_bad_ticks_are_skipped,
+        test_load_positions_validates_input,
+        test_polling_feed_yields_only_moves,
+        test_monitor_main_with_tick_file,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
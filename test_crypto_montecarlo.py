@@ -0,0 +1,113 @@
+"""
+test_crypto_montecarlo.py
+Unit tests for the crypto_montecarlo.py probability-of-hit simulator.
+"""
+
+import numpy as np
+
+from crypto_leverage import calculate_position, calculate_stop_loss, calculate_take_profit
+from crypto_montecarlo import simulate_exit_probabilities
+
+
+def test_symmetric_barriers_are_a_coin_flip():
+    """Test TP/SL equidistant in log space with zero log drift gives ~50%."""
+    # log(1.25) == -log(0.8), and drift = vol²/2 cancels the GBM log drift
+    result = simulate_exit_probabilities(
+        100, 1000, 20, 25, leverage=2, volatility=0.8, drift=0.32,
+        horizon_days=3650, steps_per_day=4, n_paths=20_000, seed=7, workers=1,
+    )
+
+    assert result["p_timeout"] < 0.001
+    assert abs(result["p_take_profit"] - 0.5) < 0.02, result["p_take_profit"]
+    assert result["p_liquidation"] == 0
+    print("✓ Symmetric barriers hit TP about half the time")
+
+
+def test_probabilities_and_expected_pnl_consistent():
+    """Test outcome probabilities sum to 1 and PnL matches the levels."""
+    result = simulate_exit_probabilities(
+        50000, 1000, 5, 10, leverage=5, volatility=1.0,
+        horizon_days=365, n_paths=5_000, seed=1, workers=1,
+    )
+    total = result["p_take_profit"] + result["p_stop_loss"] + result["p_liquidation"] + result["p_timeout"]
+    assert abs(total - 1) < 1e-12
+
+    size = calculate_position(50000, 1000, leverage=5)["position_size"]
+    gain = size * (calculate_take_profit(50000, 10) - 50000)
+    loss = size * (calculate_stop_loss(50000, 5) - 50000)
+    expected = result["p_take_profit"] * gain + result["p_stop_loss"] * loss
+    assert result["p_timeout"] == 0
+    assert abs(result["expected_pnl"] - expected) < 1e-6 * abs(gain)
+    assert result["stop_loss_price"] == calculate_stop_loss(50000, 5)
+    print("✓ Probabilities and expected PnL are consistent")
+
+
+def test_deterministic_across_workers():
+    """Test seeded runs are identical for any worker count."""
+    kwargs = dict(volatility=0.9, horizon_days=10, n_paths=4_000, chunk_size=1_000, seed=42)
+    single = simulate_exit_probabilities(45000, 1000, 3, 6, workers=1, **kwargs)
+    pooled = simulate_exit_probabilities(45000, 1000, 3, 6, workers=2, **kwargs)
+    other_seed = simulate_exit_probabilities(45000, 1000, 3, 6, workers=1, **{**kwargs, "seed": 43})
+
+    for key in ("p_take_profit", "p_stop_loss", "p_timeout", "expected_pnl", "pnl_std"):
+        assert single[key] == pooled[key], key
+    assert np.array_equal(single["exit_step_histogram"], pooled["exit_step_histogram"])
+    assert single["expected_pnl"] != other_seed["expected_pnl"]
+    print("✓ Seeded runs reproducible across worker counts")
+
+
+def test_stop_beyond_liquidation_is_never_hit():
+    """Test a stop loss past the liquidation price liquidates instead."""
+    result = simulate_exit_probabilities(
+        50000, 1000, 15, 10, leverage=10, volatility=1.0,
+        horizon_days=365, n_paths=2_000, seed=3, workers=1,
+    )
+    assert result["liquidation_price"] == 50000 * (1 - 1 / 10)
+    assert result["p_stop_loss"] == 0
+    assert result["p_liquidation"] > 0
+    assert result["expected_pnl"] >= -1000
+    print("✓ Liquidation precedes an out-of-range stop loss")
+
+
+def test_time_to_exit_distribution():
+    """Test exit-time histogram and percentiles are well formed."""
+    result = simulate_exit_probabilities(
+        50000, 1000, 2, 2, volatility=1.0, horizon_days=30, n_paths=3_000, seed=5, workers=1,
+    )
+    histogram = result["exit_step_histogram"]
+    exits = round((1 - result["p_timeout"]) * result["paths"])
+
+    assert histogram.sum() == exits
+    assert histogram[0] == 0
+    p = result["days_to_exit_percentiles"]
+    assert 0 < p[5] <= p[25] <= p[50] <= p[75] <= p[95] <= 30
+    assert 0 < result["mean_days_to_exit"] <= 30
+    print("✓ Time-to-exit distribution well formed")
+
+
+if __name__ == "__main__":
+    tests = [
+        test_symmetric_barriers_are_a_coin_flip,
+        test_probabilities_and_expected_pnl_consistent,
+        test_deterministic_across_workers,
+        test_stop_beyond_liquidation_is_never_hit,
+        test_time_to_exit_distribution,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
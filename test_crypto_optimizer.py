@@ -0,0 +1,141 @@
+"""
+test_crypto_optimizer.py
+Unit tests for the crypto_optimizer.py parameter search.
+"""
+
+import io
+import math
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+import crypto_optimizer
+from crypto_backtest import backtest, save_ohlcv, trade_stats
+from crypto_optimizer import optimize, score_trades
+
+
+def random_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, n)))
+    opens = np.concatenate([[closes[0]], closes[:-1]])
+    return {
+        "open": opens,
+        "high": np.maximum(opens, closes) * 1.004,
+        "low": np.minimum(opens, closes) * 0.996,
+        "close": closes,
+    }
+
+
+BARS = random_bars(20_000)
+ENTRIES = np.arange(0, 20_000, 50)
+
+
+def test_grid_matches_direct_backtests():
+    """Test every grid row equals a direct backtest and rows are ranked."""
+    ranked = optimize(BARS, ENTRIES, stop_losses=[1, 3], take_profits=[2, 6], leverages=[5, 10], workers=1)
+    assert len(ranked) == 8
+    scores = [row["score"] for row in ranked]
+    assert scores == sorted(scores, reverse=True)
+    for row in ranked:
+        trades = backtest(BARS, ENTRIES, row["stop_loss_percent"], row["take_profit_percent"],
+                          leverage=row["leverage"])
+        stats = trade_stats(trades)
+        assert row["score"] == stats["avg_pnl"] and row["total_pnl"] == stats["total_pnl"]
+    print("✓ Grid rows match direct backtests, best first")
+
+
+def test_parallel_shared_memory_matches_in_process():
+    """Test the process pool over shared memory gives the in-process table."""
+    kwargs = dict(stop_losses=[1, 2, 4], take_profits=[2, 5, 8], leverages=[10], score="sharpe")
+    serial = optimize(BARS, ENTRIES, workers=1, **kwargs)
+    parallel = optimize(BARS, ENTRIES, workers=2, **kwargs)
+    assert [(r["stop_loss_percent"], r["take_profit_percent"]) for r in parallel] == \
+        [(r["stop_loss_percent"], r["take_profit_percent"]) for r in serial]
+    assert all(a["score"] == b["score"] for a, b in zip(serial, parallel))
+    assert crypto_optimizer._worker == {}
+    print("✓ Parallel evaluation over shared memory matches in-process")
+
+
+def test_random_and_refine_search():
+    """Test random draws stay in bounds and refine finds at least the random best."""
+    random_rows = optimize(BARS, ENTRIES, stop_losses=[0.5, 5], take_profits=[1, 10], leverages=[5, 10],
+                           search="random", samples=24, seed=7, workers=1)
+    assert 0 < len(random_rows) <= 24
+    assert all(0.5 <= r["stop_loss_percent"] <= 5 and 1 <= r["take_profit_percent"] <= 10 for r in random_rows)
+    assert all(r["leverage"] in (5, 10) for r in random_rows)
+    again = optimize(BARS, ENTRIES, stop_losses=[0.5, 5], take_profits=[1, 10], leverages=[5, 10],
+                     search="random", samples=24, seed=7, workers=1)
+    assert [r["score"] for r in again] == [r["score"] for r in random_rows]
+
+    refined = optimize(BARS, ENTRIES, stop_losses=[0.5, 5], take_profits=[1, 10], leverages=[5, 10],
+                       search="refine", samples=24, rounds=3, seed=7, workers=1)
+    assert len(refined) > len(random_rows)
+    assert refined[0]["score"] >= random_rows[0]["score"]
+    print(f"✓ Random and refine searches (best expectancy ${refined[0]['score']:.2f})")
+
+
+def test_scores_and_validation():
+    """Test the score functions and argument checks."""
+    trades = {"return_percent": np.array([10.0, -5.0, 10.0])}
+    stats = {"trades": 3, "avg_pnl": 50.0, "total_pnl": 150.0, "max_drawdown": 50.0}
+    assert score_trades(trades, stats, "expectancy") == 50.0
+    assert score_trades(trades, stats, "drawdown") == 3.0
+    assert abs(score_trades(trades, stats, "sharpe") - 5 / np.std([10.0, -5.0, 10.0])) < 1e-12
+    assert math.isnan(score_trades(trades, {**stats, "trades": 0}, "sharpe"))
+
+    for kwargs in ({"search": "bruteforce"}, {"score": "sortino"}, {"stop_losses": [0, 1]},
+                   {"leverages": []}, {"samples": 0}):
+        try:
+            optimize(BARS, ENTRIES, workers=1, **kwargs)
+            assert False, f"Should have raised ValueError for {kwargs}"
+        except ValueError:
+            pass
+    print("✓ Scores and argument validation")
+
+
+def test_cli_ranked_table():
+    """Test the CLI prints a ranked table per symbol."""
+    with tempfile.TemporaryDirectory() as tmp:
+        save_ohlcv(os.path.join(tmp, "BTC.npy"), random_bars(5_000, seed=1))
+        original, sys.stdout = sys.stdout, io.StringIO()
+        try:
+            crypto_optimizer.main([tmp, "--symbols", "BTC", "ETH", "--every", "25", "--stop-loss", "1", "2",
+                                   "--take-profit", "2", "4", "--top", "3", "--workers", "2"])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = original
+    assert "BTC — 4 candidates" in output and "No OHLCV file for ETH" in output
+    assert sum(line.strip().startswith(("1 ", "2 ", "3 ")) for line in output.splitlines()) == 3
+    print("✓ CLI prints the ranked table")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Optimizer Tests\n")
+
+    tests = [
+        test_grid_matches_direct_backtests,
+        test_parallel_shared_memory_matches_in_process,
+        test_random_and_refine_search,
+        test_scores_and_validation,
+        test_cli_ranked_table,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
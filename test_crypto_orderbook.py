@@ -0,0 +1,192 @@
+"""
+test_crypto_orderbook.py
+Unit tests for crypto_orderbook.py, replaying recorded books locally.
+"""
+
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+
+import crypto_orderbook
+from crypto_leverage import calculate_position, calculate_stop_loss, calculate_take_profit
+from crypto_orderbook import OrderBook, position_from_book, replay
+
+# A recorded BTC depth feed: one snapshot, then diffs (size "0" deletes a level)
+RECORDED_FEED = [
+    {"type": "snapshot",
+     "bids": [["49990.0", "0.5"], ["49980.0", "1.2"], ["49950.0", "3.0"]],
+     "asks": [["50010.0", "0.4"], ["50020.0", "0.8"], ["50050.0", "2.0"], ["50100.0", "5.0"]]},
+    {"type": "diff", "bids": [["49995.0", "0.3"]], "asks": [["50010.0", "0"], ["50015.0", "0.6"]]},
+    {"type": "diff", "bids": [["49980.0", "0"]], "asks": [["50020.0", "1.0"]]},
+]
+
+
+def test_snapshot_and_diffs():
+    """Test levels stay sorted through random diffs, matching a brute-force book."""
+    book = replay(RECORDED_FEED, symbol="BTC")
+    assert book.best_bid() == 49995.0 and book.best_ask() == 50015.0
+    assert book.mid_price() == 50005.0
+    assert book.depth("buy", 3) == [(50015.0, 0.6), (50020.0, 1.0), (50050.0, 2.0)]
+    assert book.depth("sell") == [(49995.0, 0.3), (49990.0, 0.5), (49950.0, 3.0)]
+    assert len(book) == 7
+
+    rng = random.Random(3)
+    book, reference = OrderBook(), {"bids": {}, "asks": {}}
+    for _ in range(5000):
+        side = rng.choice(["bids", "asks"])
+        price = float(rng.randrange(100, 200) if side == "bids" else rng.randrange(200, 300))
+        size = rng.choice([0.0, 0.0, rng.uniform(0.1, 5)])
+        book.apply_diff(**{side: [[price, size]]})
+        if size:
+            reference[side][price] = size
+        else:
+            reference[side].pop(price, None)
+    assert book.depth("sell", 1000) == sorted(reference["bids"].items(), reverse=True)
+    assert book.depth("buy", 1000) == sorted(reference["asks"].items())
+
+    # Levels past max_levels wait in the heap and move up when the top thins out
+    capped = OrderBook(max_levels=10)
+    capped.apply_snapshot([[p, 1] for p in range(100, 130)], [[p, 1] for p in range(200, 230)])
+    assert len(capped) == 60 and len(capped._bids.prices) == 10 and len(capped._asks.prices) == 10
+    assert capped.depth("sell", 99) == [(float(p), 1.0) for p in range(129, 99, -1)]
+    capped.apply_diff(bids=[[130, 1]], asks=[[199, 1]])
+    assert capped.best_bid() == 130.0 and capped.best_ask() == 199.0 and 120.0 in capped._bids.deep
+    capped.apply_diff(bids=[[p, 0] for p in range(121, 131)], asks=[[p, 0] for p in range(199, 215)])
+    assert capped.best_bid() == 120.0 and capped.best_ask() == 215.0
+    assert capped.depth("buy", 99) == [(float(p), 1.0) for p in range(215, 230)]
+    assert capped.fill("sell", quantity=21)["worst_price"] == 100.0, "fills walk into the deep levels"
+
+    capped, book = OrderBook(max_levels=10), OrderBook()
+    for _ in range(20000):
+        side = rng.choice(["bids", "asks"])
+        price = float(rng.randrange(100, 200) if side == "bids" else rng.randrange(200, 300))
+        size = rng.choice([0.0, 0.0, rng.uniform(0.1, 5)])
+        capped.apply_diff(**{side: [[price, size]]})
+        book.apply_diff(**{side: [[price, size]]})
+        assert len(capped._bids.prices) <= 10 and len(capped._asks.prices) <= 10
+        assert capped.best_bid() == book.best_bid() and capped.best_ask() == book.best_ask()
+    for side in ("buy", "sell"):
+        assert capped.depth(side, 1000) == book.depth(side, 1000)
+        assert capped.fill(side, quantity=50) == book.fill(side, quantity=50)
+    try:
+        OrderBook(max_levels=0)
+        assert False, "Should have raised ValueError"
+    except ValueError:
+        pass
+    print("✓ Snapshots and diffs keep the book sorted, bounded and complete")
+
+
+def test_fill_vwap_and_slippage():
+    """Test fills by quantity and notional walk the levels best first."""
+    book = replay(RECORDED_FEED)
+    fill = book.fill("buy", quantity=1.0)
+    expected_cost = 0.6 * 50015.0 + 0.4 * 50020.0
+    assert fill["complete"] and fill["levels"] == 2 and fill["worst_price"] == 50020.0
+    assert abs(fill["vwap"] - expected_cost) < 1e-6
+    assert abs(fill["slippage_percent"] - (fill["vwap"] - 50005.0) / 50005.0 * 100) < 1e-12
+    assert abs(fill["slippage_cost"] - (fill["vwap"] - 50005.0) * 1.0) < 1e-6
+
+    fill = book.fill("buy", notional=0.6 * 50015.0 + 500.0)
+    assert abs(fill["quantity"] - (0.6 + 500.0 / 50020.0)) < 1e-12 and fill["levels"] == 2
+
+    fill = book.fill("sell", quantity=0.5)
+    assert fill["vwap"] == (0.3 * 49995.0 + 0.2 * 49990.0) / 0.5 and fill["slippage_percent"] > 0
+
+    fill = book.fill("buy", quantity=100.0)
+    assert not fill["complete"] and abs(fill["quantity"] - 8.6) < 1e-12 and fill["levels"] == 4
+
+    for kwargs in ({"side": "hold", "quantity": 1}, {"side": "buy"}, {"side": "buy", "quantity": 1, "notional": 1},
+                   {"side": "buy", "quantity": -1}):
+        try:
+            book.fill(**kwargs)
+            assert False, f"Should have raised ValueError for {kwargs}"
+        except ValueError:
+            pass
+    try:
+        OrderBook().fill("buy", quantity=1)
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "No asks" in str(e)
+    print("✓ VWAP and slippage computed level by level")
+
+
+def test_position_from_book():
+    """Test size, SL and TP derived from the effective entry."""
+    deep = OrderBook()
+    deep.apply_snapshot(bids=[[49999.0, 1000]], asks=[[50000.0, 1000]])
+    result = position_from_book(deep, 1000)
+    plain = calculate_position(50000.0, 1000)
+    assert {key: result[key] for key in plain} == plain
+
+    book = replay(RECORDED_FEED)
+    result = position_from_book(book, 10_000, stop_loss_percent=5, profit_target_percent=10)
+    assert result["entry_price"] > book.best_ask()
+    assert result["position_size"] < 100_000 / book.best_ask()
+    assert abs(result["position_size"] * result["entry_price"] - 100_000) < 1e-6
+    assert result["stop_loss_price"] == calculate_stop_loss(result["entry_price"], 5)
+    assert result["take_profit_price"] == calculate_take_profit(result["entry_price"], 10)
+    assert abs(result["risk_reward"] - 2) < 1e-9
+    assert "stop_loss_price" not in position_from_book(book, 1000)
+
+    try:
+        position_from_book(book, 100_000)
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "too thin" in str(e)
+    print("✓ Position sized from the effective entry")
+
+
+def test_replay_recorded_file_and_cli():
+    """Test replaying a JSONL recording from disk and the CLI output."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "btc_depth.jsonl")
+        with open(path, "w") as f:
+            f.write("\n".join(json.dumps(event) for event in RECORDED_FEED) + "\n\n")
+        assert replay(path).depth("buy") == replay(RECORDED_FEED).depth("buy")
+
+        original, sys.stdout = sys.stdout, io.StringIO()
+        try:
+            crypto_orderbook.main([path, "--investment", "1000", "--stop-loss", "5", "--take-profit", "10"])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = original
+    assert "Effective entry" in output and "Slippage" in output and "Risk/reward" in output
+
+    try:
+        replay([{"type": "trade"}])
+        assert False, "Should have raised ValueError"
+    except ValueError:
+        pass
+    print("✓ Recorded books replay from disk")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Order Book Tests\n")
+
+    tests = [
+        test_snapshot_and_diffs,
+        test_fill_vwap_and_slippage,
+        test_position_from_book,
+        test_replay_recorded_file_and_cli,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
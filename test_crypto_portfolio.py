@@ -0,0 +1,166 @@
+"""
+test_crypto_portfolio.py
+Unit tests for the crypto_portfolio.py incremental risk aggregates.
+"""
+
+import random
+
+from crypto_leverage import calculate_position, calculate_stop_loss
+from crypto_portfolio import Portfolio
+
+
+def brute_force(portfolio, marks):
+    """Recompute totals from scratch over every position."""
+    totals = {"notional": 0.0, "margin": 0.0, "unrealized_pnl": 0.0, "loss_at_stops": 0.0, "open_risk": 0.0}
+    for symbol in portfolio.snapshot()["symbols"]:
+        for p in portfolio.positions(symbol):
+            mark = marks.get(symbol, p["entry_price"])
+            size = p["position_size"]
+            totals["notional"] += size * mark
+            totals["margin"] += p["initial_capital"]
+            totals["unrealized_pnl"] += size * (mark - p["entry_price"])
+            totals["loss_at_stops"] += min(size * (p["entry_price"] - p["stop_loss_price"]), p["initial_capital"])
+            totals["open_risk"] += size * (mark - p["stop_loss_price"])
+    return totals
+
+
+def assert_close(actual, expected, what):
+    for key, value in expected.items():
+        assert abs(actual[key] - value) <= 1e-6 * max(1.0, abs(value)), (what, key, actual[key], value)
+
+
+def test_portfolio_basic_aggregates():
+    """Test aggregates for a small hand-checked book."""
+    portfolio = Portfolio()
+    portfolio.add_position("btc", 50000, 1000, stop_loss_percent=5)
+    portfolio.add_position("BTC", 40000, 2000, stop_loss_percent=10, leverage=5)
+    portfolio.add_position("ETH", 3000, 600, stop_loss_percent=5, profit_target_percent=10)
+
+    totals = portfolio.totals()
+    assert totals["positions"] == 3
+    assert totals["margin"] == 3600
+    assert abs(totals["notional"] - (10000 + 10000 + 6000)) < 1e-9
+    assert abs(totals["loss_at_stops"] - (500 + 1000 + 300)) < 1e-9
+    assert totals["unrealized_pnl"] == 0
+
+    portfolio.update_price("BTC", 45000)
+    btc = portfolio.snapshot()["symbols"]["BTC"]
+    # 0.2 BTC at 50k and 0.25 BTC at 40k marked at 45k
+    assert abs(btc["unrealized_pnl"] - (0.2 * -5000 + 0.25 * 5000)) < 1e-9
+    assert abs(btc["notional"] - 0.45 * 45000) < 1e-9
+    assert btc["positions"] == 2 and btc["mark"] == 45000
+    print("✓ Basic portfolio aggregates correct")
+
+
+def test_portfolio_matches_brute_force():
+    """Test incremental aggregates match a full recompute under random updates."""
+    rng = random.Random(11)
+    portfolio = Portfolio()
+    marks = {}
+    ids = []
+    symbols = ["BTC", "ETH", "SOL", "ADA"]
+
+    for step in range(3000):
+        action = rng.random()
+        symbol = rng.choice(symbols)
+        if action < 0.4 or not ids:
+            entry = rng.uniform(10, 60000)
+            ids.append(portfolio.add_position(symbol, entry, rng.uniform(10, 5000),
+                                              stop_loss_percent=rng.uniform(1, 30),
+                                              leverage=rng.choice([1, 3, 5, 10, 20])))
+        elif action < 0.55:
+            portfolio.remove_position(ids.pop(rng.randrange(len(ids))))
+        else:
+            price = rng.uniform(10, 60000)
+            portfolio.update_price(symbol, price)
+            if symbol in portfolio.snapshot()["symbols"]:
+                marks[symbol] = price
+
+        if step % 250 == 0:
+            for symbol in list(marks):
+                if symbol not in portfolio.snapshot()["symbols"]:
+                    del marks[symbol]
+            assert_close(portfolio.totals(), brute_force(portfolio, marks), step)
+
+    portfolio.recompute()
+    for symbol in list(marks):
+        if symbol not in portfolio.snapshot()["symbols"]:
+            del marks[symbol]
+    assert_close(portfolio.totals(), brute_force(portfolio, marks), "recompute")
+    print("✓ Incremental aggregates match brute force")
+
+
+def test_portfolio_update_is_independent_of_book_size():
+    """Test a price update does not touch individual positions."""
+    portfolio = Portfolio()
+    for i in range(2000):
+        portfolio.add_position("BTC", 50000 + i, 100, stop_loss_percent=5)
+
+    class Exploding(dict):
+        def values(self):
+            raise AssertionError("positions iterated during update_price")
+
+    book = portfolio._books["BTC"]
+    book.positions = Exploding(book.positions)
+    portfolio.update_price("BTC", 51000)
+    portfolio.totals()
+    portfolio.snapshot()
+    print("✓ Price updates are O(1) per symbol")
+
+
+def test_portfolio_remove_and_errors():
+    """Test removal clears empty symbols and duplicate ids are rejected."""
+    portfolio = Portfolio()
+    first = portfolio.add_position("SOL", 150, 100, stop_loss_percent=5, position_id="a")
+    portfolio.update_price("SOL", 160)
+    record = portfolio.remove_position(first)
+
+    assert record["position_size"] == calculate_position(150, 100)["position_size"]
+    assert record["stop_loss_price"] == calculate_stop_loss(150, 5)
+    assert portfolio.snapshot()["symbols"] == {}
+    assert abs(portfolio.totals()["notional"]) < 1e-9
+    assert abs(portfolio.totals()["unrealized_pnl"]) < 1e-9
+
+    portfolio.add_position("SOL", 150, 100, stop_loss_percent=5, position_id="b")
+    try:
+        portfolio.add_position("SOL", 150, 100, stop_loss_percent=5, position_id="b")
+        assert False, "Should have raised ValueError"
+    except ValueError:
+        pass
+    print("✓ Removal and duplicate ids handled")
+
+
+def test_portfolio_stop_beyond_liquidation_caps_loss():
+    """Test loss at stops never exceeds the position's margin."""
+    portfolio = Portfolio()
+    portfolio.add_position("BTC", 50000, 1000, stop_loss_percent=20, leverage=10)
+    assert portfolio.totals()["loss_at_stops"] == 1000
+    print("✓ Loss at stops capped at margin")
+
+
+if __name__ == "__main__":
+    tests = [
+        test_portfolio_basic_aggregates,
+        test_portfolio_matches_brute_force,
+        test_portfolio_update_is_independent_of_book_size,
+        test_portfolio_remove_and_errors,
+        test_portfolio_stop_beyond_liquidation_caps_loss,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
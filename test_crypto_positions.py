@@ -0,0 +1,141 @@
+"""
+test_crypto_positions.py
+Unit tests for the Position record and the columnar PositionBook.
+"""
+
+import sys
+
+import numpy as np
+
+from crypto_leverage import (
+    calculate_grid,
+    calculate_position,
+    calculate_risk_reward_ratio,
+    calculate_stop_loss,
+    calculate_take_profit,
+)
+from crypto_positions import POSITION_FIELDS, Position, PositionBook
+from crypto_render import build_report
+
+
+def test_position_matches_dict():
+    """Test Position holds calculate_position's values and stands in for the dict."""
+    info = calculate_position(50000, 1000, leverage=10)
+    position = Position.calculate(50000, 1000, leverage=10)
+    assert position.as_dict() == info
+    assert dict(position) == info and {**position} == info
+    assert position["entry_price"] == 50000
+    assert Position.from_mapping(info) == position
+    assert not hasattr(position, "__dict__")
+    assert sys.getsizeof(position) < sys.getsizeof(info)
+    try:
+        position["calculate"]
+        assert False, "Should have raised KeyError"
+    except KeyError:
+        pass
+
+    args = (50000, 1000, 5, 10)
+    assert build_report(*args, position, 47500, 55000) == build_report(*args, info, 47500, 55000)
+    print("✓ Position matches calculate_position")
+
+
+def test_calculators_accept_either_form():
+    """Test the calculators take a number, dict, Position or PositionBook."""
+    info = calculate_position(50000, 1000)
+    position = Position.from_mapping(info)
+    for entry in (50000.0, info, position):
+        assert calculate_stop_loss(entry, 5) == 47500
+        assert calculate_take_profit(entry, 10) == calculate_take_profit(50000.0, 10)
+        assert calculate_risk_reward_ratio(entry, 47500, 55000) == calculate_risk_reward_ratio(50000.0, 47500, 55000)
+
+    prices = [100.0, 2500.5, 50000.0, 0.37]
+    book = PositionBook()
+    for price in prices:
+        book.add(price, 1000)
+    stop_loss = calculate_stop_loss(book, 5)
+    take_profit = calculate_take_profit(book, 10)
+    risk_reward = calculate_risk_reward_ratio(book, stop_loss, take_profit)
+    assert stop_loss.tolist() == [calculate_stop_loss(p, 5) for p in prices]
+    assert take_profit.tolist() == [calculate_take_profit(p, 10) for p in prices]
+    assert risk_reward.tolist() == [
+        calculate_risk_reward_ratio(p, calculate_stop_loss(p, 5), calculate_take_profit(p, 10)) for p in prices
+    ]
+    assert calculate_risk_reward_ratio(book, book.entry_price, take_profit).tolist() == [0.0] * 4
+    print("✓ Calculators accept numbers, dicts, Positions and PositionBooks")
+
+
+def test_book_columns_and_records():
+    """Test appends, record access and zero-copy column views."""
+    book = PositionBook()
+    assert len(book) == 0 and book.position_size.size == 0
+    n = 10_000
+    for i in range(n):
+        assert book.add(100.0 + i, 1000, leverage=5) == i
+    assert book.append(calculate_position(200, 10)) == n
+    assert book.append(Position.calculate(300, 10)) == n + 1
+
+    assert len(book) == n + 2 and book.nbytes == (n + 2) * 8 * len(POSITION_FIELDS)
+    assert book[0] == Position.calculate(100.0, 1000, leverage=5)
+    assert book[-1] == Position.calculate(300, 10)
+    assert list(book)[n] == Position.from_mapping(calculate_position(200, 10))
+
+    columns = book.to_numpy()
+    assert set(columns) == set(POSITION_FIELDS)
+    assert columns["effective_capital"][:n].sum() == 5000 * n
+    columns["entry_price"][0] = 1.0  # views write through to the book
+    assert book[0].entry_price == 1.0
+
+    # Appending with views alive moves the columns; the views keep their data
+    assert book.add(1, 1) == n + 2 and book.add(2, 1) == n + 3
+    assert len(columns["entry_price"]) == n + 2 and columns["entry_price"][0] == 1.0
+    assert book[0].entry_price == 1.0 and book[-1] == Position.calculate(2, 1)
+    assert len({len(book.column(field)) for field in POSITION_FIELDS}) == 1
+    del columns
+    book.add(1, 1)
+    assert len(book) == n + 5 and book.column("entry_price")[-1] == 1.0
+    print("✓ PositionBook appends and exports columns without copying")
+
+
+def test_book_from_grid():
+    """Test a calculate_grid sweep loads into a book in C order."""
+    prices = np.array([100.0, 200.0, 400.0])
+    grid = calculate_grid(prices[:, None], np.array([10.0, 20.0])[None, :], 5, 10)
+    book = PositionBook.from_grid(grid)
+    assert len(book) == 6
+    assert book[3] == Position.calculate(200.0, 20.0)
+    assert np.array_equal(calculate_stop_loss(book, 5), grid["stop_loss_price"].ravel())
+    try:
+        book.column("nope")
+        assert False, "Should have raised ValueError"
+    except ValueError:
+        pass
+    print("✓ PositionBook loads calculate_grid output")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Position Storage Tests\n")
+
+    tests = [
+        test_position_matches_dict,
+        test_calculators_accept_either_form,
+        test_book_columns_and_records,
+        test_book_from_grid,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
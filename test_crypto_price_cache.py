@@ -0,0 +1,245 @@
+"""
+test_crypto_price_cache.py
+Unit tests for the crypto_price_cache.py TTL / LRU / stale-while-revalidate cache.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from crypto_price_cache import PriceCache
+from crypto_resilience import StaleQuote
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFetcher:
+    """Counts calls and returns a price that changes on every fetch."""
+
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, symbol):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.calls.append(symbol)
+        return 100.0 + len(self.calls), symbol.lower(), symbol
+
+    def batch(self, symbols):
+        self.calls.append(tuple(symbols))
+        return {s: (200.0, s.lower(), s) for s in symbols}
+
+
+def test_cache_hit_and_miss():
+    """Test fresh entries are served without fetching."""
+    clock, fetcher = FakeClock(), FakeFetcher()
+    cache = PriceCache(ttl=30, fetcher=fetcher, clock=clock)
+
+    assert cache.get("btc") == (101.0, "btc", "BTC")
+    clock.now += 10
+    assert cache.get("BTC") == (101.0, "btc", "BTC")
+
+    assert fetcher.calls == ["BTC"]
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["size"] == 1
+    print("✓ Fresh entries served from cache")
+
+
+def test_cache_stale_while_revalidate():
+    """Test stale entries are served immediately while refreshing in background."""
+    clock, gate = FakeClock(), threading.Event()
+    fetcher = FakeFetcher()
+    cache = PriceCache(ttl=30, max_stale=60, fetcher=fetcher, clock=clock)
+    cache.get("ETH")
+
+    fetcher.gate = gate
+    clock.now += 45
+    # Served instantly from the stale entry although the fetcher is blocked
+    assert cache.get("ETH") == (101.0, "eth", "ETH")
+    assert cache.get("ETH") == (101.0, "eth", "ETH")
+    gate.set()
+    cache.join(5)
+
+    assert cache.get("ETH") == (102.0, "eth", "ETH")
+    stats = cache.stats()
+    assert stats["stale_hits"] == 2
+    assert stats["refreshes"] == 1
+    assert stats["hits"] == 1
+    print("✓ Stale-while-revalidate serves old price and refreshes once")
+
+
+def test_cache_expired_entry_is_a_miss():
+    """Test entries older than ttl + max_stale are fetched synchronously."""
+    clock, fetcher = FakeClock(), FakeFetcher()
+    cache = PriceCache(ttl=30, max_stale=60, fetcher=fetcher, clock=clock)
+    cache.get("SOL")
+    clock.now += 91
+
+    assert cache.get("SOL") == (102.0, "sol", "SOL")
+    assert cache.stats()["misses"] == 2
+    print("✓ Expired entries are refetched")
+
+
+def test_cache_refresh_error_keeps_entry():
+    """Test a failed background refresh keeps serving the stale price."""
+    clock = FakeClock()
+
+    def failing(symbol):
+        raise ValueError("Failed to fetch price from API: down")
+
+    cache = PriceCache(ttl=30, fetcher=failing, clock=clock)
+    cache._store({"BTC": (50000.0, "bitcoin", "BTC")})
+    clock.now += 40
+
+    assert cache.get("BTC") == (50000.0, "bitcoin", "BTC")
+    cache.join(5)
+    assert cache.stats()["refresh_errors"] == 1
+    print("✓ Failed refresh keeps the stale entry")
+
+
+def test_cache_lru_eviction():
+    """Test least recently used entries are evicted first."""
+    fetcher = FakeFetcher()
+    cache = PriceCache(ttl=30, max_entries=2, fetcher=fetcher, clock=FakeClock())
+    cache.get("BTC")
+    cache.get("ETH")
+    cache.get("BTC")
+    cache.get("SOL")
+
+    fetcher.calls.clear()
+    cache.get("BTC")
+    cache.get("ETH")
+    assert fetcher.calls == ["ETH"]
+    assert cache.stats()["evictions"] == 2
+    print("✓ LRU eviction drops least recently used")
+
+
+def test_cache_get_many_batches_misses():
+    """Test get_many fetches all misses with one batch call."""
+    fetcher = FakeFetcher()
+    cache = PriceCache(ttl=30, fetcher=fetcher, batch_fetcher=fetcher.batch, clock=FakeClock())
+    cache.get("BTC")
+
+    result = cache.get_many(["btc", "ETH", "SOL", "eth"])
+    assert result == {
+        "BTC": (101.0, "btc", "BTC"),
+        "ETH": (200.0, "eth", "ETH"),
+        "SOL": (200.0, "sol", "SOL"),
+    }
+    assert fetcher.calls == ["BTC", ("ETH", "SOL")]
+    print("✓ get_many batches misses into one fetch")
+
+
+def test_cache_coalesces_concurrent_misses():
+    """Test concurrent misses for one symbol share a single fetch."""
+    gate = threading.Event()
+    fetcher = FakeFetcher(gate)
+    cache = PriceCache(ttl=30, fetcher=fetcher, batch_fetcher=fetcher.batch, clock=FakeClock())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("btc"))) for _ in range(4)]
+    threads.append(threading.Thread(target=lambda: results.append(cache.get_many(["BTC"])["BTC"])))
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert fetcher.calls == ["BTC"]
+    assert results == [(101.0, "btc", "BTC")] * 5
+
+    def failing(symbol):
+        raise ValueError("upstream down")
+
+    cache = PriceCache(ttl=30, fetcher=failing, clock=FakeClock())
+    try:
+        cache.get("BTC")
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "upstream down" in str(e)
+    assert cache.stats()["size"] == 0
+    print("✓ Concurrent misses share one fetch")
+
+
+def test_cache_stale_quote_keeps_its_timestamp():
+    """Test a degraded StaleQuote is cached with the time it was really fetched."""
+    clock = FakeClock(1000.0)
+    stale = StaleQuote((90.0, "btc", "BTC"), fetched_at=900.0, reason="upstream down")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prices.sqlite3")
+        cache = PriceCache(ttl=30, max_stale=300, persist_path=path,
+                           fetcher=lambda symbol: stale, clock=clock)
+        assert cache.get("BTC") == (90.0, "btc", "BTC")
+        assert cache.get("BTC") == (90.0, "btc", "BTC")
+        cache.join(5)
+        assert cache.stats()["stale_hits"] == 1 and cache.stats()["hits"] == 0
+        cache.close()
+        with sqlite3.connect(path) as db:
+            assert db.execute("SELECT fetched_at FROM prices").fetchall() == [(900.0,)]
+    print("✓ StaleQuote keeps its original timestamp")
+
+
+def test_cache_persistence_warm_start():
+    """Test a new cache over the same SQLite file starts warm."""
+    clock, fetcher = FakeClock(), FakeFetcher()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prices.sqlite3")
+        cache = PriceCache(ttl=30, persist_path=path, fetcher=fetcher, clock=clock)
+        cache.get("BTC")
+        cache.close()
+
+        clock.now += 5
+        restarted = PriceCache(ttl=30, persist_path=path, fetcher=fetcher, clock=clock)
+        assert restarted.get("BTC") == (101.0, "btc", "BTC")
+        assert fetcher.calls == ["BTC"]
+        assert restarted.stats()["hits"] == 1
+        restarted.close()
+
+        small = PriceCache(ttl=30, max_entries=1, persist_path=path, fetcher=fetcher, clock=clock)
+        small.get("ETH")
+        small.close()
+        with sqlite3.connect(path) as db:
+            assert db.execute("SELECT symbol FROM prices").fetchall() == [("ETH",)]
+    print("✓ Persistent tier warms a restarted cache")
+
+
+if __name__ == "__main__":
+    tests = [
+        test_cache_hit_and_miss,
+        test_cache_stale_while_revalidate,
+        test_cache_expired_entry_is_a_miss,
+        test_cache_refresh_error_keeps_entry,
+        test_cache_lru_eviction,
+        test_cache_get_many_batches_misses,
+        test_cache_coalesces_concurrent_misses,
+        test_cache_stale_quote_keeps_its_timestamp,
+        test_cache_persistence_warm_start,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -0,0 +1,233 @@
+"""
+test_crypto_providers.py
+Tests for crypto_providers.py providers and hedged fetching, against local stub servers.
+"""
+
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from crypto_price_cache import PriceCache
+from crypto_providers import (
+    BinanceProvider,
+    CoinGeckoProvider,
+    HedgedProvider,
+    PriceProvider,
+    compare_providers,
+)
+from crypto_resilience import OPEN, CircuitOpenError, breaker_for, deadline, time_left
+from stub_price_server import StubPriceServer
+
+
+class FakeProvider(PriceProvider):
+    """In-process provider with a scripted latency and answer."""
+
+    def __init__(self, name, price=50000.0, latency=0.0, error=None):
+        self.name = name
+        self.price = price
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+
+    def fetch_prices(self, symbols):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.error:
+            raise ValueError(self.error)
+        return {s.upper(): (self.price, s.lower(), s.upper()) for s in symbols}
+
+
+def binance_stub(prices):
+    """StubPriceServer handler answering like Binance /api/v3/ticker/price."""
+    def handler(path, query):
+        wanted = json.loads(query["symbols"][0])
+        return 200, {}, [{"symbol": s, "price": f"{prices[s]:.2f}"} for s in wanted if s in prices]
+    return handler
+
+
+def test_stub_backed_providers():
+    """Test CoinGecko and Binance providers parse their APIs and plug into PriceCache."""
+    with StubPriceServer({"bitcoin": 50000.0, "ethereum": 3000.0}) as gecko, \
+            StubPriceServer(handler=binance_stub({"BTCUSDT": 50010.0, "ETHUSDT": 2999.5})) as binance:
+        coingecko = CoinGeckoProvider(url=gecko.price_url)
+        binance_provider = BinanceProvider(url=binance.url + "/api/v3/ticker/price")
+        assert coingecko(["btc", "ETH"]) == {"BTC": (50000.0, "bitcoin", "BTC"), "ETH": (3000.0, "ethereum", "ETH")}
+        assert binance_provider.fetch_price("eth") == (2999.5, "ethereum", "ETH")
+        assert json.loads(parse_qs(urlsplit(binance.requests[0]).query)["symbols"][0]) == ["ETHUSDT"]
+        try:
+            binance_provider.fetch_price("SOL")
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "SOL" in str(e)
+
+        cache = PriceCache(fetcher=binance_provider.fetch_price, batch_fetcher=binance_provider)
+        assert cache.get_many(["BTC", "ETH"])["BTC"][0] == 50010.0
+        cache.close()
+    print("✓ Stub-backed providers answer in the common format")
+
+
+def test_hedge_fires_only_when_primary_is_slow():
+    """Test the backup is asked only after the hedge delay, and the faster answer wins."""
+    with StubPriceServer({"bitcoin": 50000.0}) as primary, StubPriceServer({"bitcoin": 50001.0}) as backup:
+        provider = HedgedProvider([CoinGeckoProvider(url=primary.price_url, name="primary"),
+                                   CoinGeckoProvider(url=backup.price_url, name="backup")], hedge_delay=0.1)
+        assert provider.fetch_price("BTC")[0] == 50000.0
+        assert backup.request_count == 0
+
+        primary.delay = 1.0
+        start = time.perf_counter()
+        assert provider.fetch_price("BTC")[0] == 50001.0
+        elapsed = time.perf_counter() - start
+        assert 0.1 <= elapsed < 0.6, elapsed
+        assert backup.request_count == 1
+        stats = provider.stats()
+        assert stats["hedged"] == 1 and stats["backup_wins"] == 1 and stats["requests"] == 2
+        provider.close()
+    print(f"✓ Slow primary hedged, answered in {elapsed * 1000:.0f} ms instead of 1000 ms")
+
+
+def test_failover_and_invalid_answers():
+    """Test failed or invalid answers fire the next provider immediately."""
+    for broken in (FakeProvider("down", error="Failed to fetch price from API: 503"),
+                   FakeProvider("zero", price=0.0),
+                   FakeProvider("nan", price=float("nan"))):
+        backup = FakeProvider("backup", price=50002.0)
+        provider = HedgedProvider([broken, backup], hedge_delay=5.0)
+        start = time.perf_counter()
+        assert provider.fetch_price("BTC")[0] == 50002.0
+        assert time.perf_counter() - start < 1.0
+        assert provider.stats()["failovers"] == 1
+        provider.close()
+
+    with HedgedProvider([FakeProvider("a", error="first failure"), FakeProvider("b", error="second")],
+                        hedge_delay=0.01) as provider:
+        try:
+            provider.fetch_price("BTC")
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert str(e) == "first failure"
+        assert provider.stats()["failures"] == 1
+    try:
+        provider.fetch_price("BTC")
+        assert False, "Should have raised RuntimeError"
+    except RuntimeError:
+        pass  # the thread pool is shut down on exit
+    print("✓ Failures and invalid prices fail over immediately")
+
+
+def test_adaptive_p95_delay():
+    """Test the hedge delay follows the primary's p95 latency once enough samples exist."""
+    primary = FakeProvider("primary", latency=0.002)
+    provider = HedgedProvider([primary, FakeProvider("backup")], min_samples=20, initial_delay=0.5)
+    assert provider.current_delay() == 0.5
+    for _ in range(20):
+        provider.fetch_price("BTC")
+    delay = provider.current_delay()
+    assert 0.002 <= delay < 0.1, delay
+    assert provider.stats()["hedged"] == 0
+    provider.close()
+    print(f"✓ Adaptive hedge delay is the primary's p95 ({delay * 1000:.1f} ms)")
+
+
+def test_divergence_flagged():
+    """Test cross-provider checks flag divergent prices without delaying the answer."""
+    flagged = threading.Event()
+    records = []
+
+    def on_divergence(record):
+        records.append(record)
+        flagged.set()
+
+    slow_backup = FakeProvider("backup", price=52000.0, latency=0.2)
+    provider = HedgedProvider([FakeProvider("primary", price=50000.0), slow_backup],
+                              hedge_delay=1.0, max_divergence_percent=1.0, on_divergence=on_divergence)
+    start = time.perf_counter()
+    assert provider.fetch_price("BTC")[0] == 50000.0
+    assert time.perf_counter() - start < 0.15
+    assert flagged.wait(2)
+    assert records[0]["symbol"] == "BTC" and abs(records[0]["divergence_percent"] - 4.0) < 1e-9
+    assert records[0]["prices"] == {"primary": 50000.0, "backup": 52000.0}
+    provider.close()
+
+    report = compare_providers([FakeProvider("a", 100.0), FakeProvider("b", 100.5), FakeProvider("c", error="down")],
+                               ["BTC", "ETH"], max_divergence_percent=1.0)
+    assert report["divergent"] == [] and report["errors"] == {"c": "down"}
+    report = compare_providers([FakeProvider("a", 100.0), FakeProvider("b", 103.0)], ["BTC"], 1.0)
+    assert [r["symbol"] for r in report["divergent"]] == ["BTC"]
+    print("✓ Divergent providers flagged")
+
+
+def test_deadline_and_breaker_reach_providers():
+    """Test hedged fetches inherit the caller's deadline and Binance honours deadline and breaker."""
+    seen = []
+
+    class DeadlineProbe(FakeProvider):
+        def fetch_prices(self, symbols):
+            seen.append((self.name, time_left()))
+            return super().fetch_prices(symbols)
+
+    provider = HedgedProvider([DeadlineProbe("primary", latency=0.3), DeadlineProbe("backup")], hedge_delay=0.05)
+    with deadline(2.0):
+        assert provider.fetch_price("BTC")[0] == 50000.0
+    provider.close()
+    assert [name for name, _ in seen] == ["primary", "backup"]
+    assert all(left is not None and 0 < left <= 2.0 for _, left in seen), seen
+
+    with StubPriceServer(handler=binance_stub({"BTCUSDT": 50010.0}), delay=1.0) as binance:
+        start = time.perf_counter()
+        try:
+            with deadline(0.2):
+                BinanceProvider(url=binance.url + "/api/v3/ticker/price", timeout=30).fetch_price("BTC")
+            assert False, "Should have raised ValueError"
+        except ValueError:
+            pass
+        assert time.perf_counter() - start < 0.9
+
+    with StubPriceServer({}, status=503) as down:
+        url = down.url + "/api/v3/ticker/price"
+        for _ in range(5):
+            try:
+                BinanceProvider(url=url).fetch_price("BTC")
+                assert False, "Should have raised ValueError"
+            except ValueError as e:
+                assert not isinstance(e, CircuitOpenError)
+        assert breaker_for(url).state == OPEN
+        try:
+            BinanceProvider(url=url).fetch_price("BTC")
+            assert False, "Should have raised CircuitOpenError"
+        except CircuitOpenError:
+            pass
+        assert down.request_count == 5
+    print("✓ Deadlines and breakers reach every provider")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Price Provider Tests\n")
+
+    tests = [
+        test_stub_backed_providers,
+        test_hedge_fires_only_when_primary_is_slow,
+        test_failover_and_invalid_answers,
+        test_adaptive_p95_delay,
+        test_divergence_flagged,
+        test_deadline_and_breaker_reach_providers,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
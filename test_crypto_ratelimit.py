@@ -0,0 +1,291 @@
+"""
+test_crypto_ratelimit.py
+Tests for the crypto_ratelimit.py shared token bucket, single-flight lookups
+and 429 handling, against a local stub server.
+"""
+
+import asyncio
+import fcntl
+import functools
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import crypto_leverage
+from crypto_async import AsyncPriceClient
+from crypto_leverage import _retry_after, fetch_crypto_prices
+from crypto_ratelimit import RATE_LIMIT_ENV, RateLimitedError, SharedRateLimiter, TokenBucket
+from crypto_resilience import DeadlineExceeded, StaleQuote, deadline
+from stub_price_server import StubPriceServer
+
+STUB_PRICES = {"bitcoin": 50000.0, "ethereum": 3000.0}
+
+
+def _take_tokens(path, count):
+    bucket = TokenBucket(path, rate=20, capacity=5)
+    for _ in range(count):
+        bucket.acquire()
+    return time.time()
+
+
+def _lookup_in_process(directory, url):
+    limiter = SharedRateLimiter(directory, window=10, fetcher=functools.partial(fetch_crypto_prices, url=url))
+    return limiter.fetch_price("BTC")[0]
+
+
+def test_429_is_rate_limited_error():
+    """Test a 429 surfaces as RateLimitedError with the server's Retry-After."""
+    with StubPriceServer(STUB_PRICES, status=429, headers={"Retry-After": "7"}) as server:
+        try:
+            fetch_crypto_prices(["BTC"], url=server.price_url)
+            assert False, "Should have raised RateLimitedError"
+        except RateLimitedError as e:
+            assert isinstance(e, ValueError) and e.retry_after == 7.0
+            assert "rate limit" in str(e) and "Failed to fetch" not in str(e)
+
+        try:
+            asyncio.run(AsyncPriceClient(url=server.price_url).fetch_crypto_price("BTC"))
+            assert False, "Should have raised RateLimitedError"
+        except RateLimitedError as e:
+            assert e.retry_after == 7.0
+
+    with StubPriceServer(STUB_PRICES, status=500) as server:
+        try:
+            fetch_crypto_prices(["BTC"], url=server.price_url)
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert not isinstance(e, RateLimitedError)
+
+    assert _retry_after(None) == 1.0 and _retry_after("2.5") == 2.5 and _retry_after("-3") == 0.0
+    assert _retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0 and _retry_after("soon", 4.0) == 4.0
+    print("✓ 429 answers raise RateLimitedError with Retry-After")
+
+
+def test_token_bucket_shared_across_processes():
+    """Test the bucket refills at `rate` and is one budget for all processes."""
+    now = [100.0]
+    sleeps = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bucket")
+        bucket = TokenBucket(path, rate=2, capacity=3, clock=lambda: now[0], sleep=sleeps.append)
+        assert [bucket.try_acquire() for _ in range(4)] == [0.0, 0.0, 0.0, 0.5]
+        now[0] += 0.5
+        assert bucket.try_acquire() == 0.0
+        other = TokenBucket(path, rate=2, capacity=3, clock=lambda: now[0])
+        assert other.try_acquire() == 0.5, "a second handle sees the same state"
+
+        bucket.penalize(10)
+        assert other.try_acquire() == 10.0
+        try:
+            other.acquire(timeout=5)
+            assert False, "Should have raised RateLimitedError"
+        except RateLimitedError as e:
+            assert e.retry_after == 10.0
+        bucket.close()
+        other.close()
+
+        # 4 processes x 10 tokens from a bucket of 5 at 20/s: at least (40 - 5) / 20 s
+        shared = os.path.join(tmp, "shared")
+        start = time.time()
+        with ProcessPoolExecutor(4) as pool:
+            finished = list(pool.map(_take_tokens, [shared] * 4, [10] * 4))
+        elapsed = max(finished) - start
+        assert elapsed >= 1.7, elapsed
+    print(f"✓ Token bucket shared across processes ({elapsed:.2f}s for 40 tokens)")
+
+
+def test_concurrent_lookups_share_one_call():
+    """Test concurrent lookups in threads and in processes cost one upstream call."""
+    calls = []
+
+    def slow_fetcher(symbols):
+        calls.append(list(symbols))
+        time.sleep(0.2)
+        return {s: (float(len(calls)), s.lower(), s) for s in symbols}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        limiter = SharedRateLimiter(tmp, fetcher=slow_fetcher)
+        barrier = threading.Barrier(16)
+
+        def lookup(symbol):
+            barrier.wait()
+            return limiter.fetch_price(symbol)
+
+        with ThreadPoolExecutor(16) as pool:
+            prices = list(pool.map(lookup, ["btc", "BTC"] * 8))
+        assert calls == [["BTC"]] and set(prices) == {(1.0, "btc", "BTC")}
+        assert limiter.stats()["coalesced"] == 15 and limiter.stats()["upstream_calls"] == 1
+
+        limiter.fetch_prices(["BTC", "ETH"])
+        assert calls[-1] == ["ETH"], "BTC is still fresh in the shared file"
+        assert limiter.stats()["shared"] == 1
+
+        with StubPriceServer(STUB_PRICES, delay=0.3) as server:
+            with ProcessPoolExecutor(6) as pool:
+                prices = list(pool.map(_lookup_in_process, [os.path.join(tmp, "p")] * 6, [server.price_url] * 6))
+            assert prices == [50000.0] * 6
+            assert server.request_count == 1
+    print("✓ Concurrent lookups share one upstream call")
+
+
+def test_stale_answers_are_not_shared_as_fresh():
+    """Test a degraded StaleQuote never overwrites the shared price file."""
+    answers = [
+        {"BTC": (50000.0, "bitcoin", "BTC")},
+        {"BTC": StaleQuote((50000.0, "bitcoin", "BTC"), fetched_at=1.0, reason="down")},
+        {"BTC": StaleQuote((50000.0, "bitcoin", "BTC"), fetched_at=1.0, reason="down")},
+    ]
+    calls = []
+
+    def fetcher(symbols):
+        calls.append(list(symbols))
+        return answers[len(calls) - 1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        limiter = SharedRateLimiter(tmp, window=0.05, fetcher=fetcher)
+        limiter.fetch_prices(["BTC"])
+        fetched_at = limiter.last_known("BTC")[3]
+        time.sleep(0.1)
+        assert limiter.fetch_prices(["BTC"])["BTC"].stale
+        assert limiter.last_known("BTC")[3] == fetched_at
+        limiter.fetch_prices(["BTC"])
+        assert len(calls) == 3, "a stale answer is not reused as fresh"
+        limiter.close()
+    print("✓ Stale answers are not shared as fresh")
+
+
+def test_429_backoff_and_retry():
+    """Test a 429 blocks the shared bucket for Retry-After, then retries."""
+    answers = [(429, {"Retry-After": "0.2"}, {}), (429, {"Retry-After": "0.2"}, {})]
+
+    def handler(path, query):
+        if answers:
+            return answers.pop(0)
+        return 200, {}, {"bitcoin": {"usd": 50000.0}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with StubPriceServer(handler=handler) as server:
+            limiter = SharedRateLimiter(tmp, fetcher=functools.partial(fetch_crypto_prices, url=server.price_url))
+            start = time.perf_counter()
+            assert limiter.fetch_price("BTC")[0] == 50000.0
+            assert time.perf_counter() - start >= 0.4
+            assert server.request_count == 3 and limiter.stats()["rate_limited"] == 2
+
+        with StubPriceServer(STUB_PRICES, status=429, headers={"Retry-After": "0.1"}) as server:
+            limiter = SharedRateLimiter(os.path.join(tmp, "a"), retries=1,
+                                        fetcher=functools.partial(fetch_crypto_prices, url=server.price_url))
+            try:
+                limiter.fetch_price("BTC")
+                assert False, "Should have raised RateLimitedError"
+            except RateLimitedError:
+                pass
+            assert server.request_count == 2
+
+            limiter.bucket.penalize(60)
+            try:
+                SharedRateLimiter(os.path.join(tmp, "a"), max_wait=1).fetch_price("ETH")
+                assert False, "Should have raised RateLimitedError"
+            except RateLimitedError as e:
+                assert e.retry_after > 59
+            assert server.request_count == 2, "a blocked bucket makes no request"
+    print("✓ 429 backoff blocks every process, then retries")
+
+
+def test_lock_wait_honours_deadline():
+    """Test waiting on another process's lookup gives up at the caller's deadline."""
+    calls = []
+
+    def fetcher(symbols):
+        calls.append(list(symbols))
+        return {s: (50000.0, s.lower(), s) for s in symbols}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        limiter = SharedRateLimiter(tmp, fetcher=fetcher)
+        holder = os.open(os.path.join(tmp, "BTC.price"), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(holder, fcntl.LOCK_EX)  # another process mid-lookup
+        try:
+            start = time.perf_counter()
+            try:
+                with deadline(0.2):
+                    limiter.fetch_price("BTC")
+                assert False, "Should have raised DeadlineExceeded"
+            except DeadlineExceeded:
+                pass
+            elapsed = time.perf_counter() - start
+            assert 0.15 <= elapsed < 0.5, elapsed
+            assert calls == []
+        finally:
+            os.close(holder)
+        with deadline(0.2):
+            assert limiter.fetch_price("BTC")[0] == 50000.0
+        assert calls == [["BTC"]]
+    print(f"✓ Lock waits give up at the deadline ({elapsed:.2f}s)")
+
+
+def test_env_routes_default_fetches():
+    """Test $CRYPTO_RATE_LIMIT routes fetch_crypto_price through the shared limiter."""
+    original_url = crypto_leverage.COINGECKO_PRICE_URL
+    with tempfile.TemporaryDirectory() as tmp, StubPriceServer(STUB_PRICES) as server:
+        crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+        os.environ[RATE_LIMIT_ENV] = tmp
+        try:
+            assert crypto_leverage.fetch_crypto_price("btc")[0] == 50000.0
+            assert crypto_leverage.fetch_crypto_prices(["BTC", "ETH"])["ETH"][0] == 3000.0
+            assert crypto_leverage.fetch_crypto_price("BTC")[0] == 50000.0
+            assert server.request_count == 2, "BTC was reused within the window"
+            assert os.path.exists(os.path.join(tmp, "BTC.price"))
+        finally:
+            del os.environ[RATE_LIMIT_ENV]
+            crypto_leverage.COINGECKO_PRICE_URL = original_url
+        crypto_leverage.fetch_crypto_prices(["BTC"], url=server.price_url)
+        assert server.request_count == 3
+
+    # The caller's timeout reaches the request made through the limiter
+    with tempfile.TemporaryDirectory() as tmp, StubPriceServer(STUB_PRICES, delay=1.0) as server:
+        crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+        os.environ[RATE_LIMIT_ENV] = tmp
+        start = time.perf_counter()
+        try:
+            crypto_leverage.fetch_crypto_prices(["BTC"], timeout=0.1)
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "timed out" in str(e).lower()
+        finally:
+            del os.environ[RATE_LIMIT_ENV]
+            crypto_leverage.COINGECKO_PRICE_URL = original_url
+        assert time.perf_counter() - start < 0.8
+    print("✓ $CRYPTO_RATE_LIMIT routes default fetches through the limiter")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Rate Limiter Tests\n")
+
+    tests = [
+        test_429_is_rate_limited_error,
+        test_token_bucket_shared_across_processes,
+        test_concurrent_lookups_share_one_call,
+        test_stale_answers_are_not_shared_as_fresh,
+        test_429_backoff_and_retry,
+        test_lock_wait_honours_deadline,
+        test_env_routes_default_fetches,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
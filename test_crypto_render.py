@@ -0,0 +1,131 @@
+"""
+test_crypto_render.py
+Unit tests for the crypto_render.py buffered report renderer.
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+
+import crypto_render
+from crypto_leverage import calculate_position, calculate_stop_loss, calculate_take_profit, display_results
+from crypto_render import REPORT_FIELDS, build_report, render_report, write_reports
+
+
+def make_report(symbol="SOL", price=150.0, leverage=5):
+    position_info = calculate_position(price, 1000, leverage=leverage)
+    return build_report(
+        price, 1000, 5.0, 10.0, position_info,
+        calculate_stop_loss(position_info["entry_price"], 5.0),
+        calculate_take_profit(position_info["entry_price"], 10.0),
+        asset_name="solana", symbol=symbol, leverage=leverage,
+    )
+
+
+def test_text_report_uses_symbol_and_leverage():
+    """Test the text layout shows the real symbol and leverage."""
+    text = render_report(make_report(), "text")
+    assert "Position Size (Crypto):       33.33333333 SOL" in text
+    assert "Leverage:                     x5" in text
+    assert "BTC/ETH" not in text and "x10" not in text
+    assert "📥 YOUR INPUTS:" in text
+    assert "Stop Loss Price:              $142.50" in text
+    assert "➜ Result: 1:2.00" in text
+    print("✓ Text report uses real symbol and leverage")
+
+
+def test_display_results_single_write():
+    """Test display_results emits the whole report in one write."""
+    class CountingStream(io.StringIO):
+        writes = 0
+
+        def write(self, s):
+            self.writes += 1
+            return super().write(s)
+
+    position_info = calculate_position(50000, 1000, leverage=10)
+    out = CountingStream()
+    display_results(50000, 1000, 5, 10, position_info, 47500, 55000, "bitcoin", "BTC", out=out)
+    assert out.writes == 1
+    assert "0.20000000 BTC" in out.getvalue()
+    assert out.getvalue().count("\n") > 40
+    print("✓ display_results writes one buffer")
+
+
+def test_machine_formats_round_trip():
+    """Test JSON and CSV reports parse back to the report values."""
+    report = make_report(symbol="A,B")
+    decoded = json.loads(render_report(report, "json"))
+    assert decoded == {name: report[name] for name in REPORT_FIELDS}
+
+    text = crypto_render.render_header("csv") + render_report(report, "csv")
+    row = next(csv.DictReader(io.StringIO(text)))
+    assert row["symbol"] == "A,B"
+    assert float(row["take_profit_price"]) == report["take_profit_price"]
+    assert float(row["risk_reward"]) == report["risk_reward"]
+
+    table = crypto_render.render_header("table") + render_report(report, "table")
+    header, line = table.splitlines()
+    assert len(header) == len(line)
+    try:
+        render_report(report, "xml")
+        assert False, "Should have raised ValueError"
+    except ValueError as e:
+        assert "Unknown report format" in str(e)
+    print("✓ JSON, CSV and table formats render correctly")
+
+
+def test_write_reports_one_write_per_report():
+    """Test streaming to a file descriptor issues one write per report."""
+    reports = [make_report(price=100.0 + i) for i in range(500)]
+    calls = []
+    original_write = os.write
+
+    def counting_write(fd, data):
+        calls.append(len(data))
+        return original_write(fd, data)
+
+    with tempfile.TemporaryFile() as f:
+        os.write = counting_write
+        try:
+            count = write_reports(reports, f.fileno(), "csv")
+        finally:
+            os.write = original_write
+        f.seek(0)
+        rows = list(csv.DictReader(io.TextIOWrapper(f, encoding="utf-8")))
+
+    assert count == 500
+    assert len(calls) == 501  # header + one per report
+    assert len(rows) == 500 and float(rows[-1]["current_price"]) == 599.0
+    print("✓ One write per streamed report")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Crypto Report Renderer Tests\n")
+
+    tests = [
+        test_text_report_uses_symbol_and_leverage,
+        test_display_results_single_write,
+        test_machine_formats_round_trip,
+        test_write_reports_one_write_per_report,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
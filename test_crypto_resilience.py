@@ -0,0 +1,272 @@
+"""
+test_crypto_resilience.py
+Tests for crypto_resilience.py deadlines, circuit breaker and degraded mode,
+against a local stub server.
+"""
+
+import asyncio
+import builtins
+import io
+import os
+import sys
+import tempfile
+import time
+
+import crypto_batch
+import crypto_leverage
+from crypto_async import AsyncPriceClient
+from crypto_leverage import fetch_crypto_price, fetch_crypto_prices, select_crypto_asset
+from crypto_resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    breaker_for,
+    deadline,
+    is_stale,
+    time_left,
+)
+from stub_price_server import StubPriceServer
+
+STUB_PRICES = {"bitcoin": 50000.0, "ethereum": 3000.0}
+
+
+def switchable(prices, statuses):
+    """Stub handler answering with statuses.pop(0) while any are queued, else prices."""
+    def handler(path, query):
+        if statuses:
+            return statuses.pop(0), {}, {"error": "stub error"}
+        ids = ",".join(query.get("ids", [])).split(",")
+        return 200, {}, {i: {"usd": prices[i]} for i in ids if i in prices}
+    return handler
+
+
+def test_deadline_caps_every_request():
+    """Test a caller's deadline bounds the request and stops late requests."""
+    with deadline(5):
+        outer = time_left()
+        with deadline(60):
+            assert time_left() <= outer, "nested deadlines keep the earlier one"
+        with deadline(None):
+            assert time_left() <= outer
+    assert time_left() is None
+
+    with StubPriceServer(STUB_PRICES, delay=1.0) as server:
+        start = time.perf_counter()
+        try:
+            with deadline(0.2):
+                fetch_crypto_prices(["BTC"], url=server.price_url, timeout=30)
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "timed out" in str(e).lower()
+        assert time.perf_counter() - start < 0.9
+
+        try:
+            with deadline(0.2):
+                asyncio.run(AsyncPriceClient(url=server.price_url, timeout=30).fetch_crypto_price("BTC"))
+            assert False, "Should have raised ValueError"
+        except ValueError:
+            pass
+        assert time.perf_counter() - start < 1.8
+
+        requests_made = server.request_count
+        try:
+            with deadline(0.01):
+                time.sleep(0.02)
+                fetch_crypto_prices(["BTC"], url=server.price_url)
+            assert False, "Should have raised DeadlineExceeded"
+        except DeadlineExceeded:
+            pass
+        assert server.request_count == requests_made
+    print("✓ Deadlines propagate into every request")
+
+
+def test_breaker_states():
+    """Test closed -> open -> half-open probes -> closed transitions."""
+    now = [0.0]
+    breaker = CircuitBreaker("stub", failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+    for failed in (True, True, False, True, True):
+        breaker.allow()
+        breaker.record(failed)
+    assert breaker.state == CLOSED, "a success resets the failure count"
+    breaker.allow()
+    breaker.record(True)
+    assert breaker.state == OPEN
+    try:
+        breaker.allow()
+        assert False, "Should have raised CircuitOpenError"
+    except CircuitOpenError as e:
+        assert e.retry_after == 10 and isinstance(e, ValueError)
+
+    now[0] = 10
+    assert breaker.state == HALF_OPEN
+    breaker.allow()
+    try:
+        breaker.allow()
+        assert False, "only one probe at a time"
+    except CircuitOpenError:
+        pass
+    breaker.record(True)
+    assert breaker.state == OPEN, "a failed probe reopens"
+
+    now[0] = 20
+    breaker.allow()
+    breaker.record(None)  # cancelled probe: no verdict
+    breaker.allow()
+    breaker.record(False)
+    assert breaker.state == CLOSED
+    print("✓ Breaker opens, probes half-open and closes")
+
+
+def test_outage_fails_fast_then_recovers():
+    """Test repeated upstream errors open the endpoint's breaker until a probe succeeds."""
+    statuses = [503] * 5 + [404]
+    with StubPriceServer(handler=switchable(STUB_PRICES, statuses)) as server:
+        breaker = breaker_for(server.price_url)
+        breaker.reset_timeout = 0.2
+        for _ in range(5):
+            try:
+                fetch_crypto_prices(["BTC"], url=server.price_url)
+                assert False, "Should have raised ValueError"
+            except ValueError as e:
+                assert not isinstance(e, CircuitOpenError)
+        assert breaker.state == OPEN and breaker_for(crypto_leverage.COINGECKO_PRICE_URL).state == CLOSED
+
+        start = time.perf_counter()
+        try:
+            fetch_crypto_prices(["BTC"], url=server.price_url)
+            assert False, "Should have raised CircuitOpenError"
+        except CircuitOpenError as e:
+            assert "unavailable" in str(e)
+        assert time.perf_counter() - start < 0.05 and server.request_count == 5
+
+        time.sleep(0.25)
+        try:
+            fetch_crypto_prices(["BTC"], url=server.price_url)  # probe answered 404: healthy upstream
+        except ValueError:
+            pass
+        assert breaker.state == CLOSED
+        assert fetch_crypto_prices(["BTC"], url=server.price_url)["BTC"][0] == 50000.0
+    print("✓ Outages fail fast and recover through a probe")
+
+
+def test_degraded_mode_serves_last_known_price():
+    """Test allow_stale serves the last fetched price, marked stale, when the API is down."""
+    original_url = crypto_leverage.COINGECKO_PRICE_URL
+    crypto_leverage._last_known.clear()  # earlier tests' fetches
+    statuses = []
+    try:
+        with StubPriceServer(handler=switchable({"ethereum": 3000.0}, statuses)) as server:
+            crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+            fresh = fetch_crypto_price("ETH")
+            assert not is_stale(fresh)
+
+            statuses.append(500)
+            quote = fetch_crypto_price("eth", allow_stale=True)
+            assert is_stale(quote) and quote == fresh and 0 <= quote.age < 5
+            assert "500" in quote.reason
+            price, asset_name, symbol = quote
+            assert (price, asset_name, symbol) == (3000.0, "ethereum", "ETH")
+            statuses.append(500)
+            try:
+                fetch_crypto_price("ETH")
+                assert False, "Should have raised ValueError"
+            except ValueError:
+                pass
+            statuses.append(500)
+            try:
+                fetch_crypto_prices(["ETH", "DOGE"], allow_stale=True)
+                assert False, "DOGE has no last known price"
+            except ValueError:
+                pass
+
+            # Another process's last answer, from the shared rate-limiter files
+            with tempfile.TemporaryDirectory() as tmp:
+                os.environ[crypto_leverage.RATE_LIMIT_ENV] = tmp
+                try:
+                    with open(os.path.join(tmp, "SOL.price"), "w") as f:
+                        f.write('{"price": 150.0, "asset_name": "solana", "symbol": "SOL", "fetched_at": 0}')
+                    statuses.append(500)
+                    sol = fetch_crypto_price("SOL", allow_stale=True)
+                    assert is_stale(sol) and sol[0] == 150.0 and sol.age > 1e9
+                finally:
+                    del os.environ[crypto_leverage.RATE_LIMIT_ENV]
+
+            statuses.append(500)
+            answers = iter(["ETH"])
+            original_input, builtins.input = builtins.input, lambda prompt="": next(answers)
+            original_stdout, sys.stdout = sys.stdout, io.StringIO()
+            try:
+                assert select_crypto_asset() == (3000.0, "ethereum", "ETH")
+                output = sys.stdout.getvalue()
+            finally:
+                builtins.input = original_input
+                sys.stdout = original_stdout
+            assert "STALE ETHEREUM: $3,000.00 (last fetched" in output
+            assert server.request_count == 6 and not statuses
+    finally:
+        crypto_leverage.COINGECKO_PRICE_URL = original_url
+    print("✓ Degraded mode serves last known prices, marked stale")
+
+
+def test_batch_deadline_and_stale_prices():
+    """Test batch --allow-stale falls back to last known prices and reports them."""
+    original_url = crypto_leverage.COINGECKO_PRICE_URL
+    statuses = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubPriceServer(handler=switchable({"bitcoin": 50000.0}, statuses)) as server:
+        source = os.path.join(tmp, "positions.csv")
+        output = os.path.join(tmp, "results.csv")
+        with open(source, "w") as f:
+            f.write("symbol,investment_amount,stop_loss_percent,profit_target_percent\nBTC,1000,5,10\n")
+        crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+        original_stderr, sys.stderr = sys.stderr, io.StringIO()
+        try:
+            fetch_crypto_price("BTC")
+            statuses.append(502)
+            crypto_batch.main([source, "-o", output, "--allow-stale", "--deadline", "5"])
+            report = sys.stderr.getvalue()
+
+            statuses.append(502)
+            crypto_batch.main([source, "-o", output])
+            failed = sys.stderr.getvalue()[len(report):]
+        finally:
+            sys.stderr = original_stderr
+            crypto_leverage.COINGECKO_PRICE_URL = original_url
+            breaker_for(server.price_url).reset()
+        assert server.request_count == 3 and not statuses
+        assert "STALE prices: BTC" in report and "0 error(s)" in report
+        assert "STALE" not in failed and "1 error(s)" in failed
+    print("✓ Batch mode degrades to stale prices")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Resilience Tests\n")
+
+    tests = [
+        test_deadline_caps_every_request,
+        test_breaker_states,
+        test_outage_fails_fast_then_recovers,
+        test_degraded_mode_serves_last_known_price,
+        test_batch_deadline_and_stale_prices,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -0,0 +1,258 @@
+"""
+test_crypto_server.py
+Tests for the crypto_server.py HTTP/JSON service, run on a background event loop.
+"""
+
+import asyncio
+import http.client
+import io
+import json
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from crypto_leverage import _resolve_symbol
+from crypto_price_cache import PriceCache
+from crypto_server import CalculatorServer
+
+
+class FakeBatchFetcher:
+    """fetch_crypto_prices stand-in that counts calls."""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def __call__(self, symbols):
+        for symbol in symbols:
+            _resolve_symbol(symbol)  # unknown symbols fail like the real fetcher
+        self.calls.append(list(symbols))
+        missing = [s for s in symbols if s not in self.prices]
+        if missing:
+            raise ValueError(f"Failed to fetch price from API: no quote for {missing[0]}\nRetry later.")
+        return {s: (self.prices[s], s.lower(), s) for s in symbols}
+
+
+@contextmanager
+def running_server(prices=None):
+    """Serve a CalculatorServer with a fake-backed cache on a background loop."""
+    fetcher = FakeBatchFetcher(prices or {"BTC": 50000.0, "ETH": 3000.0})
+    cache = PriceCache(fetcher=lambda s: fetcher([s])[s], batch_fetcher=fetcher)
+    server = CalculatorServer(port=0, cache=cache)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, fetcher
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+
+def call(conn, method, path, body=None):
+    conn.request(method, path, body=None if body is None else json.dumps(body),
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    payload = response.read()
+    if response.getheader("Content-Type", "").startswith("application/json"):
+        payload = json.loads(payload)
+    return response.status, payload
+
+
+def test_calculation_endpoints():
+    """Test the single-calculation endpoints match the calculators."""
+    with running_server() as (server, _):
+        conn = http.client.HTTPConnection("127.0.0.1", server.port)
+        status, body = call(conn, "POST", "/position", {"price": 50000, "investment_amount": 1000,
+                                                        "stop_loss_percent": 5, "profit_target_percent": 10})
+        assert status == 200
+        assert body["position_size"] == 0.2 and body["effective_capital"] == 10000
+        assert body["stop_loss_price"] == 47500 and abs(body["risk_reward"] - 2) < 1e-9
+
+        assert call(conn, "POST", "/stop-loss", {"entry_price": 100, "stop_loss_percent": 5}) == \
+            (200, {"stop_loss_price": 95.0})
+        assert call(conn, "POST", "/take-profit", {"entry_price": 100, "profit_target_percent": 10})[1] \
+            ["take_profit_price"] == 100 * 1.1
+        status, body = call(conn, "POST", "/risk-reward",
+                            {"entry_price": 100, "stop_loss_price": 95, "take_profit_price": 110})
+        assert status == 200 and body["risk_reward"] == 2.0
+        conn.close()
+    print("✓ Calculation endpoints correct")
+
+
+def test_prices_share_one_cache():
+    """Test price lookups from several clients hit the API once."""
+    with running_server() as (server, fetcher):
+        for _ in range(3):
+            conn = http.client.HTTPConnection("127.0.0.1", server.port)
+            assert call(conn, "GET", "/price?symbols=BTC,ETH")[1] == {
+                "BTC": {"price": 50000.0, "asset_name": "btc"},
+                "ETH": {"price": 3000.0, "asset_name": "eth"},
+            }
+            status, body = call(conn, "POST", "/position", {"symbol": "btc", "investment_amount": 500})
+            assert status == 200 and body["entry_price"] == 50000.0 and body["symbol"] == "BTC"
+            conn.close()
+        assert fetcher.calls == [["BTC", "ETH"]]
+    print("✓ Clients share one warm price cache")
+
+
+def test_batch_endpoint():
+    """Test many positions per request, with per-row errors and one fetch."""
+    with running_server() as (server, fetcher):
+        conn = http.client.HTTPConnection("127.0.0.1", server.port)
+        positions = [
+            {"symbol": "BTC", "investment_amount": 1000, "stop_loss_percent": 5, "profit_target_percent": 10},
+            {"symbol": "ETH", "investment_amount": 300, "stop_loss_percent": 2, "profit_target_percent": 4,
+             "leverage": 5},
+            {"symbol": "SOL", "price": 150, "investment_amount": 100, "stop_loss_percent": 5,
+             "profit_target_percent": 10},
+            {"symbol": "NOPE", "investment_amount": 100, "stop_loss_percent": 5, "profit_target_percent": 10},
+            {"symbol": "BTC", "investment_amount": -5, "stop_loss_percent": 5, "profit_target_percent": 10},
+            "not an object",
+        ] * 100
+        status, body = call(conn, "POST", "/batch", {"positions": positions})
+        assert status == 200
+        results = body["results"]
+        assert len(results) == 600 and body["errors"] == 300
+        assert results[0]["position_size"] == 0.2
+        assert results[1]["leverage"] == 5 and results[2]["price"] == 150
+        assert "not found" in results[3]["error"]
+        assert "investment amount" in results[4]["error"]
+        assert results[5]["error"]
+        assert fetcher.calls == [["BTC", "ETH"]]
+        conn.close()
+    print("✓ Batch endpoint handles 600 rows with one fetch")
+
+
+def test_error_responses():
+    """Test status codes for invalid input, routes, methods and API failures."""
+    with running_server(prices={"BTC": 50000.0}) as (server, _):
+        conn = http.client.HTTPConnection("127.0.0.1", server.port)
+        status, body = call(conn, "POST", "/stop-loss", {"entry_price": 100, "stop_loss_percent": 150})
+        assert status == 400 and "less than 100%" in body["error"]
+        assert call(conn, "POST", "/position", {"investment_amount": 10})[0] == 400
+        assert call(conn, "GET", "/nope")[0] == 404
+        assert call(conn, "GET", "/stop-loss")[0] == 405
+        assert call(conn, "GET", "/price?symbols=NOPE")[0] == 404
+        status, body = call(conn, "GET", "/price?symbols=ETH")
+        assert status == 502 and "Failed to fetch price" in body["error"]
+
+        conn.request("POST", "/risk-reward", body=b"{not json")
+        response = conn.getresponse()
+        assert response.status == 400 and b"Invalid JSON" in response.read()
+
+        # Overflowing numbers and wrong types are 400s, not dropped connections
+        for leverage in (1e308 * 10, "inf", "1e400", "nan"):
+            payload = json.dumps({"price": 100, "investment_amount": 10, "leverage": leverage})
+            conn.request("POST", "/position", body=payload.replace("Infinity", "1e400"))
+            response = conn.getresponse()
+            assert response.status == 400 and b"leverage" in response.read(), leverage
+        status, body = call(conn, "POST", "/price", {"symbols": {"BTC": 1}})
+        assert status == 400 and "symbols" in body["error"]
+        assert call(conn, "POST", "/price", {"symbols": 5})[0] == 400
+
+        async def broken(body, query):
+            raise RuntimeError("boom")
+
+        server._routes[("GET", "/health")], health = broken, server._routes[("GET", "/health")]
+        stderr, sys.stderr = sys.stderr, io.StringIO()
+        try:
+            status, body = call(conn, "GET", "/health")
+        finally:
+            sys.stderr = stderr
+            server._routes[("GET", "/health")] = health
+        assert status == 500 and body == {"error": "Internal error: RuntimeError"}
+        # The connection is still usable after errors (keep-alive)
+        assert call(conn, "GET", "/health")[1]["status"] == "ok"
+        conn.close()
+    print("✓ Error responses use the right status codes")
+
+
+def test_chunked_request_bodies():
+    """Test chunked bodies are decoded and bad transfer codings rejected."""
+    def send(server, head, body=b""):
+        with socket.create_connection(("127.0.0.1", server.port)) as sock:
+            sock.sendall(b"POST /stop-loss HTTP/1.1\r\nHost: x\r\nConnection: close\r\n" + head + b"\r\n" + body)
+            received = bytearray()
+            while chunk := sock.recv(1 << 16):
+                received += chunk
+        status = int(received.split(b" ", 2)[1])
+        return status, json.loads(received.split(b"\r\n\r\n", 1)[1])
+
+    with running_server() as (server, _):
+        chunked = b"Transfer-Encoding: chunked\r\n"
+        body = b'{"entry_price": 100, "stop_loss_percent": 5}'
+        framed = b"".join(b"%x;ext=1\r\n%s\r\n" % (len(part), part) for part in (body[:10], body[10:]))
+        status, payload = send(server, chunked, framed + b"0\r\nX-Trailer: 1\r\n\r\n")
+        assert status == 200 and payload == {"stop_loss_price": 95.0}
+
+        status, payload = send(server, b"Transfer-Encoding: gzip\r\n")
+        assert status == 501 and "chunked" in payload["error"]
+        status, _ = send(server, chunked + b"Content-Length: 5\r\n", b"0\r\n\r\n")
+        assert status == 400
+        status, payload = send(server, chunked, b"zz\r\n")
+        assert status == 400 and "chunk size" in payload["error"]
+        status, _ = send(server, chunked, b"5\r\nabcdeXX")
+        assert status == 400
+        status, _ = send(server, chunked, b"%x\r\n" % (server.max_body + 1))
+        assert status == 413
+    print("✓ Chunked request bodies are decoded or rejected")
+
+
+def test_pipelined_keep_alive_throughput():
+    """Test pipelined requests on one connection and a sustained request rate."""
+    with running_server() as (server, _):
+        body = json.dumps({"entry_price": 100, "stop_loss_percent": 5}).encode()
+        request = (
+            b"POST /stop-loss HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+        )
+        n = 2000
+        with socket.create_connection(("127.0.0.1", server.port)) as sock:
+            start = time.perf_counter()
+            sock.sendall(request * n)
+            received = bytearray()
+            while received.count(b"HTTP/1.1 200 OK") < n:
+                chunk = sock.recv(1 << 16)
+                assert chunk, "connection closed early"
+                received += chunk
+            rate = n / (time.perf_counter() - start)
+        assert received.count(b'{"stop_loss_price": 95.0}') == n
+        assert rate > 1000, rate
+    print(f"✓ {n} pipelined requests at {rate:,.0f} req/s")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Crypto Server Tests\n")
+
+    tests = [
+        test_calculation_endpoints,
+        test_prices_share_one_cache,
+        test_batch_endpoint,
+        test_error_responses,
+        test_chunked_request_bodies,
+        test_pipelined_keep_alive_throughput,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
@@ -0,0 +1,228 @@
+"""
+test_crypto_symbols.py
+Tests for the crypto_symbols.py memory-mapped symbol index.
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import crypto_leverage
+import crypto_symbols
+from crypto_symbols import SymbolIndex, build_index
+from stub_price_server import StubPriceServer
+
+
+COINS = [
+    {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+    {"id": "batcat", "symbol": "btc", "name": "batcat"},
+    {"id": "uniswap", "symbol": "uni", "name": "Uniswap"},
+    {"id": "universe-token", "symbol": "uni", "name": "Universe"},
+    {"id": "uni", "symbol": "uni", "name": "UNI"},
+    {"id": "pepe", "symbol": "pepe", "name": "Pepe"},
+    {"id": "pepecoin-network", "symbol": "pepecoin", "name": "PepeCoin"},
+    {"id": "based-pepe", "symbol": "bpepe", "name": "Based Pepe"},
+    {"id": "shiba-inu", "symbol": "shib", "name": "Shiba Inu"},
+    {"id": "broken", "symbol": "", "name": "No Ticker"},
+]
+
+
+def synthetic_coins(n, seed=3):
+    """A coin list shaped like CoinGecko's, with many shared tickers."""
+    import random
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    coins = []
+    for i in range(n):
+        symbol = "".join(rng.choice(letters) for _ in range(rng.randint(2, 6)))
+        coins.append({"id": f"{symbol}-{i}", "symbol": symbol, "name": f"{symbol.title()} Token {i}"})
+    return coins
+
+
+@contextmanager
+def index_file(coins):
+    """Build an index in a temp dir and point lookups at it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "coins.idx")
+        build_index(coins, path)
+        crypto_symbols.set_index_path(path)
+        try:
+            yield path
+        finally:
+            crypto_symbols.set_index_path(crypto_symbols.DEFAULT_INDEX_PATH)
+
+
+def test_symbol_index_search_modes():
+    """Test exact, prefix, name prefix and fuzzy search."""
+    with index_file(COINS) as path:
+        index = SymbolIndex(path)
+        assert len(index) == 9  # entry without a ticker dropped
+        assert [e[1] for e in index.exact("pepe")] == ["pepe"]
+        assert index.exact("nope") == []
+        assert [e[0] for e in index.prefix("PEPE")] == ["PEPE", "PEPECOIN"]
+        assert [e[1] for e in index.name_prefix("shiba")] == ["shiba-inu"]
+        assert index.fuzzy("shbi")[0][1] == "shiba-inu"
+        assert index.fuzzy("uniswapp")[0][1] == "uniswap"
+        assert index.fuzzy("zzzzzz") == []
+        assert [e[1] for e in index.search("pep")] == ["pepe", "pepecoin-network"]
+        index.close()
+    print("✓ Exact, prefix, name and fuzzy search work")
+
+
+def test_symbol_index_rejects_corrupt_files():
+    """Test truncated, foreign and corrupt index files raise ValueError."""
+    with index_file(COINS) as path:
+        with open(path, "rb") as f:
+            data = f.read()
+        corrupt_offset = bytearray(data)
+        corrupt_offset[20:24] = (len(data) * 2).to_bytes(4, "little")
+        broken = {
+            "empty": b"",
+            "short header": data[:10],
+            "truncated": data[:len(data) // 2],
+            "old format": b"CGSYMIX1" + data[8:],
+            "bad offset": bytes(corrupt_offset),
+        }
+        for label, content in broken.items():
+            with open(path, "wb") as f:
+                f.write(content)
+            try:
+                index = SymbolIndex(path)
+                index.exact("btc"), index.prefix("a"), index.fuzzy("btcc")
+                assert False, f"{label}: should have raised ValueError"
+            except ValueError as e:
+                assert "index" in str(e), (label, e)
+    print("✓ Corrupt index files raise ValueError")
+
+
+def test_symbol_index_fuzzy_keys_come_from_the_file():
+    """Test the first fuzzy search does not re-read every record."""
+    with index_file(synthetic_coins(5_000)) as path:
+        index = SymbolIndex(path)
+        reads = []
+        original = index._fields
+        index._fields = lambda table, i: reads.append(i) or original(table, i)
+        index.fuzzy("zzzzzzq")
+        assert len(reads) < 50, len(reads)
+        index.close()
+    print("✓ Fuzzy keys load from the index without scanning records")
+
+
+def test_symbol_index_ambiguous_tickers_ranked():
+    """Test shared tickers resolve deterministically, SYMBOL_MAP first."""
+    with index_file(list(reversed(COINS))) as path:
+        index = SymbolIndex(path)
+        # uniswap is pinned by SYMBOL_MAP; then slug-matching ids, shortest first
+        assert [e[1] for e in index.exact("UNI")] == ["uniswap", "uni", "universe-token"]
+        assert index.exact("btc")[0][1] == "bitcoin"
+        index.close()
+        assert crypto_symbols.lookup_symbol("uni") == "uniswap"
+    print("✓ Ambiguous tickers ranked deterministically")
+
+
+def test_symbol_index_lookup_speed():
+    """Test lookups on a ~15k entry index stay well under a millisecond."""
+    coins = synthetic_coins(15_000)
+    with index_file(coins) as path:
+        index = SymbolIndex(path)
+        queries = [coin["symbol"] for coin in coins[:1000]]
+        start = time.perf_counter()
+        for query in queries:
+            assert index.exact(query)
+            index.prefix(query[:2], limit=5)
+        per_lookup = (time.perf_counter() - start) / len(queries)
+        assert per_lookup < 1e-3, per_lookup
+
+        index.fuzzy("warmup")
+        start = time.perf_counter()
+        for query in queries[:200]:
+            index.fuzzy(query[1:] + "x")
+        per_fuzzy = (time.perf_counter() - start) / 200
+        assert per_fuzzy < 1e-3, per_fuzzy
+        index.close()
+    print(f"✓ 15k coins: exact + prefix {per_lookup * 1e6:.0f}µs, fuzzy {per_fuzzy * 1e6:.0f}µs")
+
+
+def test_known_symbols_do_not_load_index():
+    """Test SYMBOL_MAP symbols resolve without opening the index."""
+    with index_file(COINS):
+        assert crypto_leverage._resolve_symbol("btc") == ("BTC", "bitcoin")
+        assert crypto_symbols._index is None
+        assert crypto_leverage._resolve_symbol("pepe") == ("PEPE", "pepe")
+        assert crypto_symbols._index is not None
+    print("✓ Index loads only for symbols outside SYMBOL_MAP")
+
+
+def test_resolve_symbol_suggestions_and_fetch():
+    """Test unknown symbols get suggestions and index symbols are priced."""
+    with index_file(COINS):
+        try:
+            crypto_leverage._resolve_symbol("SHBI")
+            assert False, "Should have raised ValueError"
+        except ValueError as e:
+            assert "not found" in str(e) and "SHIB" in str(e)
+
+        original_url = crypto_leverage.COINGECKO_PRICE_URL
+        crypto_leverage._session = None
+        with StubPriceServer(prices={"bitcoin": 50000.0, "pepe": 0.00001}) as server:
+            crypto_leverage.COINGECKO_PRICE_URL = server.price_url
+            try:
+                prices = crypto_leverage.fetch_crypto_prices(["BTC", "PEPE"])
+            finally:
+                crypto_leverage.COINGECKO_PRICE_URL = original_url
+                crypto_leverage._session = None
+        assert prices["PEPE"] == (0.00001, "pepe", "PEPE")
+        assert server.request_count == 1
+    print("✓ Index symbols resolve, price, and suggest corrections")
+
+
+def test_refresh_index_downloads_coin_list():
+    """Test refresh_index builds the index from /coins/list."""
+    original_url = crypto_symbols.COINGECKO_COINS_URL
+    crypto_leverage._session = None
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubPriceServer(handler=lambda path, query: (200, {}, COINS)) as server:
+        crypto_symbols.COINGECKO_COINS_URL = server.url + "/api/v3/coins/list"
+        path = os.path.join(tmp, "cache", "coins.idx")
+        try:
+            assert crypto_symbols.refresh_index(path) == 9
+            assert crypto_symbols.lookup_symbol("shib") == "shiba-inu"
+        finally:
+            crypto_symbols.COINGECKO_COINS_URL = original_url
+            crypto_symbols.set_index_path(crypto_symbols.DEFAULT_INDEX_PATH)
+            crypto_leverage._session = None
+    print("✓ Coin list downloaded and indexed")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Crypto Symbol Index Tests\n")
+
+    tests = [
+        test_symbol_index_search_modes,
+        test_symbol_index_rejects_corrupt_files,
+        test_symbol_index_fuzzy_keys_come_from_the_file,
+        test_symbol_index_ambiguous_tickers_ranked,
+        test_symbol_index_lookup_speed,
+        test_known_symbols_do_not_load_index,
+        test_resolve_symbol_suggestions_and_fetch,
+        test_refresh_index_downloads_coin_list,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")
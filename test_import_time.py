@@ -0,0 +1,97 @@
+"""
+test_import_time.py
+Import-time budget for the entry points: heavy dependencies (requests,
+numpy, tkinter, http.server) must load on first use, not at import.
+"""
+
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative `-X importtime` budget for the math-only import, in ms.
+# Loading requests or numpy alone costs ~80 ms, so this fails loudly if
+# either creeps back to module level, while leaving room for slow machines.
+IMPORT_BUDGET_MS = 50
+
+HEAVY_MODULES = ("requests", "numpy", "tkinter", "http.server")
+
+
+def import_profile(module):
+    """Import module in a fresh interpreter; return (cumulative µs, heavy modules loaded)."""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=HERE, capture_output=True, text=True, check=True,
+    )
+    cumulative = None
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative = int(fields[1])
+    assert cumulative is not None, result.stderr[-500:]
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return cumulative, loaded
+
+
+def test_heavy_dependencies_are_lazy():
+    """Test importing the entry points loads none of the heavy dependencies."""
+    for module in ("crypto_leverage", "crypto_render", "crypto_batch", "surprise", "calendar_surprise"):
+        _, loaded = import_profile(module)
+        assert loaded == [], f"{module} imported {loaded}"
+    print("✓ Entry points import without requests, numpy or tkinter")
+
+
+def test_calculator_import_budget():
+    """Test `import crypto_leverage` stays within the import-time budget."""
+    # Best of three: the first run may still be writing .pyc files
+    best = min(import_profile("crypto_leverage")[0] for _ in range(3)) / 1000
+    assert best < IMPORT_BUDGET_MS, f"import crypto_leverage took {best:.1f} ms (budget {IMPORT_BUDGET_MS} ms)"
+    print(f"✓ import crypto_leverage: {best:.1f} ms (budget {IMPORT_BUDGET_MS} ms)")
+
+
+def test_lazy_attributes_still_resolve():
+    """Test module.np / module.requests / module.tk load on first access."""
+    import crypto_leverage
+    import surprise
+
+    np = crypto_leverage.np
+    assert np is None or np.__name__ == "numpy"
+    assert crypto_leverage.np is np  # cached as a real module attribute
+    assert crypto_leverage.requests is None or hasattr(crypto_leverage.requests, "Session")
+    assert surprise.tk is None or surprise.tk.__name__ == "tkinter"
+    try:
+        crypto_leverage.nope
+        assert False, "Should have raised AttributeError"
+    except AttributeError:
+        pass
+    print("✓ Lazy module attributes resolve on first access")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Running Import Time Tests\n")
+
+    tests = [
+        test_heavy_dependencies_are_lazy,
+        test_calculator_import_budget,
+        test_lazy_attributes_still_resolve,
+    ]
+
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            print(f"✗ {test.__name__}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"✗ {test.__name__}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print()
+    if failed:
+        print(f"❌ {failed}/{len(tests)} tests failed")
+        exit(1)
+    else:
+        print(f"✅ All {len(tests)} tests passed!")